@@ -0,0 +1,23 @@
+"""
+Process configuration: the ``.env`` file is loaded once, when this module is first imported.
+
+Most modules read their settings with ``os.getenv`` at import time, so
+``app/main.py`` imports this module before any other ``app`` module. Modules
+that can also be imported on their own (scripts, tests) call
+``load_environment()``, which does nothing once the file has been loaded.
+Variables already set in the process environment take precedence over
+``.env``, as before.
+"""
+from dotenv import load_dotenv
+
+_loaded = False
+
+
+def load_environment() -> None:
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        load_dotenv()
+
+
+load_environment()
@@ -1,51 +1,77 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+# First app import: loads .env before any module reads its settings
+from app.config import load_environment
 from app.routes.execute import router as execute_router
 from app.routes.chat import router as chat_router
 from app.routes.challenge import router as challenge_router
+from app.routes.debug import router as debug_router
 from app.constants import ALLOWED_ORIGINS
-from dotenv import load_dotenv
-import httpx
-import time
+from app.utils.rate_limiter import get_rate_limit_backend, run_rate_limit_sweeper
+from app.services import judge0_service, openai_service
+from app.services.geo_service import geo_resolver
+from app.services.warmup import WARMUP_ENABLED, warm_up, warmup_state
+from app.middleware.admission import ADMISSION_REQUIRE_AUTH, AdmissionMiddleware, run_admission_sweeper
+from app.middleware.server_timing import ServerTimingMiddleware
+from app.middleware.profiling import RequestProfilerMiddleware
+from app.utils.firebase_auth import cert_cache
+from app.utils.responses import FastJSONResponse
+from app.utils import metrics
+from app.utils.loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
+from app.utils.memory import MEMORY_MONITOR_ENABLED, memory_monitor
+from app.utils.profiler import DEBUG_PROFILE_TOKEN
+from app.utils.server_timing import SERVER_TIMING_ENABLED
+from app.utils.startup import FIREBASE_MODULES, PRELOAD_MODULES, preload_modules
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
-load_dotenv()
+load_environment()
 
 ALLOW_COUNTRY = "CL"
 ALLOW_CITY = "santiago"
-CACHE_TTL = 600
 FAIL_OPEN = False
-GEO_API_URL = os.getenv("GEO_API_URL", "http://ip-api.com/json")
 
-_cache = {}
-
-def client_ip(req: Request) -> str:
-    xff = req.headers.get("x-forwarded-for")
-    if xff:
-        return xff.split(",")[0].strip()
-    return req.client.host
-
-async def geo(ip: str) -> dict:
-    now = time.time()
-    hit = _cache.get(ip)
-    if hit and hit[0] > now:
-        return hit[1]
-
-    async with httpx.AsyncClient(timeout=1.5) as c:
-        r = await c.get(f"{GEO_API_URL}/{ip}")
-        r.raise_for_status()
-        j = r.json()
-        info = {
-            "country": (j.get("countryCode") or "").upper(),
-            "city": (j.get("city") or ""),
-        }
-        _cache[ip] = (now + CACHE_TTL, info)
-        return info
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background maintenance tasks, kept off the request path
+    await geo_resolver.load_database()
+    sweeper = asyncio.create_task(run_rate_limit_sweeper())
+    geo_reloader = asyncio.create_task(geo_resolver.run_reloader())
+    tasks = [sweeper, geo_reloader, asyncio.create_task(run_admission_sweeper())]
+    if LOOP_MONITOR_ENABLED:
+        tasks.append(asyncio.create_task(loop_monitor.run()))
+    if MEMORY_MONITOR_ENABLED:
+        tasks.append(asyncio.create_task(memory_monitor.run()))
+    firebase = ADMISSION_REQUIRE_AUTH or os.getenv("FIREBASE_PROJECT_ID")
+    if firebase:
+        # Keep Google's signing certs prefetched so token verification never fetches inline
+        tasks.append(asyncio.create_task(cert_cache.run_refresher()))
+    # Heavy SDKs are imported lazily; load them now, while the server already listens
+    modules = PRELOAD_MODULES + (FIREBASE_MODULES if firebase else ())
+    if WARMUP_ENABLED:
+        # Also primes templates and upstream connections; /ready answers 200 once done
+        tasks.append(asyncio.create_task(warm_up(modules=modules)))
+    else:
+        warmup_state.mark_ready()
+        tasks.append(asyncio.create_task(preload_modules(modules)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await get_rate_limit_backend().close()
+        await geo_resolver.aclose()
+        await judge0_service.aclose()
+        await openai_service.aclose()
 
 app = FastAPI(
     title="Fluent Reflect API",
     description="Backend for code execution, AI chat, and challenge generation using Judge0 and OpenAI APIs",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson-backed; routes with a response_model return model_response(...) directly
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -64,27 +90,33 @@ app.add_middleware(
     ],
 )
 
-@app.middleware("http")
-async def only_santiago(request: Request, call_next):
-    if request.url.path in ("/health", "/metrics", "/"):
-        return await call_next(request)
+# Added after CORS so it wraps it: denied requests never reach the app.
+# Lists, admission rate limit, geo, then auth (see app/middleware/admission.py)
+app.add_middleware(
+    AdmissionMiddleware,
+    allow_country=ALLOW_COUNTRY,
+    allow_city=ALLOW_CITY,
+    fail_open=FAIL_OPEN,
+    exempt_paths=("/health", "/ready", "/metrics", "/"),
+    resolver=geo_resolver,
+)
+
+# Outermost, so admission phases and rejected requests are timed too.
+# Not installed at all when disabled: phase() timers are then no-ops
+if SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
 
-    ip = client_ip(request)
-    try:
-        g = await geo(ip)
-        ok = (g["country"] == ALLOW_COUNTRY) and (ALLOW_CITY in g["city"].lower())
-        if not ok:
-            raise HTTPException(status_code=403, detail="Forbidden")
-        return await call_next(request)
-    except Exception:
-        if FAIL_OPEN:
-            return await call_next(request)
-        raise HTTPException(status_code=403, detail="Forbidden")
+# On-demand profiling (app/utils/profiler.py), only with a DEBUG_PROFILE_TOKEN.
+# Outermost, so a tagged request's profile includes admission and Server-Timing
+if DEBUG_PROFILE_TOKEN:
+    app.add_middleware(RequestProfilerMiddleware)
 
 # Include routes
 app.include_router(execute_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 app.include_router(challenge_router, prefix="/api")
+if DEBUG_PROFILE_TOKEN:
+    app.include_router(debug_router)
 
 # Explicit OPTIONS handler for CORS preflight requests (after routers)
 @app.options("/{path:path}")
@@ -100,6 +132,16 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """503 until the startup warm-up (app/services/warmup.py) has finished"""
+    return FastJSONResponse(warmup_state.report(), status_code=200 if warmup_state.ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text exposition of the process-local metrics"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
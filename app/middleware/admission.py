@@ -0,0 +1,252 @@
+"""
+Cheap-first admission pipeline.
+
+Every gated request passes these stages in order of cost, and stops at the first
+one that rejects it:
+
+1. allowlist / blocklist - in-memory lookups, no I/O;
+2. per-IP admission rate limit - one GCRA update, or a leased Redis counter;
+3. geo gate - cached or offline lookup, rarely an upstream call;
+4. Firebase auth - only when ``ADMISSION_REQUIRE_AUTH`` is enabled.
+
+IPs that keep hitting the rate limit, or that the geo lookup places outside
+the allowed city, collect *strikes*. A failed lookup (upstream outage, timeout)
+applies ``fail_open`` to that request but is not a strike. After
+``ADMISSION_STRIKE_LIMIT`` strikes within ``ADMISSION_STRIKE_WINDOW`` seconds they
+are promoted to the blocklist for ``ADMISSION_BLOCK_TTL`` seconds. From then on
+their requests are refused at stage 1 with a prebuilt 403, which costs one dict
+probe and makes no upstream call. Expired strikes and blocks are dropped by
+``run_admission_sweeper()``, a lifespan task, never on the request path.
+
+The client IP is the X-Forwarded-For entry appended by Cloud Run
+(``TRUSTED_PROXY_HOPS``, see app/middleware/gates.py): entries the client
+sends itself cannot dodge a limit or get somebody else blocklisted.
+"""
+import asyncio
+import ipaddress
+import math
+import os
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from app.middleware.gates import DEFAULT_EXEMPT_PATHS, FORBIDDEN, GeoGateMiddleware, PrebuiltResponse, client_ip_from_scope
+from app.services.geo_service import GeoResolver, geo_resolver
+from app.utils.firebase_auth import verify_bearer_token_async
+from app.utils.rate_limiter import ROUTE_LIMITS, SWEEP_INTERVAL_SECONDS, RateLimit, RateLimitBackend, get_rate_limit_backend
+from app.utils.server_timing import phase
+
+ADMISSION_ALLOWLIST = os.getenv("ADMISSION_ALLOWLIST", "")
+ADMISSION_BLOCKLIST = os.getenv("ADMISSION_BLOCKLIST", "")
+ADMISSION_STRIKE_LIMIT = int(os.getenv("ADMISSION_STRIKE_LIMIT", "5"))
+ADMISSION_STRIKE_WINDOW = int(os.getenv("ADMISSION_STRIKE_WINDOW", "300"))
+ADMISSION_BLOCK_TTL = int(os.getenv("ADMISSION_BLOCK_TTL", "900"))
+ADMISSION_REQUIRE_AUTH = os.getenv("ADMISSION_REQUIRE_AUTH", "false").strip().lower() in ("1", "true", "yes")
+
+# Pipelines built by Starlette, swept by run_admission_sweeper()
+_pipelines: "weakref.WeakSet[AdmissionMiddleware]" = weakref.WeakSet()
+
+UNAUTHORIZED = PrebuiltResponse(401, {"detail": "Invalid or expired Firebase ID token"}, {"WWW-Authenticate": "Bearer"})
+
+
+class IPList:
+    """
+    Exact IPs (optionally with a TTL) plus CIDR networks.
+
+    A miss is a single dict probe. Networks are only checked when some are
+    configured, because that needs the address parsed.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self._expires: Dict[str, float] = {}
+        self._networks = []
+        for entry in entries:
+            entry = entry.strip()
+            if not entry:
+                continue
+            if "/" in entry:
+                self._networks.append(ipaddress.ip_network(entry, strict=False))
+            else:
+                self.add(entry)
+
+    @classmethod
+    def from_env(cls, value: str) -> "IPList":
+        return cls(value.split(","))
+
+    def add(self, ip: str, ttl: Optional[float] = None, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.monotonic()
+        self._expires[ip] = math.inf if ttl is None else now + ttl
+
+    def contains(self, ip: str, now: Optional[float] = None) -> bool:
+        expires_at = self._expires.get(ip)
+        if expires_at is not None:
+            if now is None:
+                now = time.monotonic()
+            if expires_at > now:
+                return True
+        if self._networks:
+            try:
+                address = ipaddress.ip_address(ip)
+            except ValueError:
+                return False
+            return any(address in network for network in self._networks)
+        return False
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop expired entries. Returns the number removed."""
+        if now is None:
+            now = time.monotonic()
+        expired = [ip for ip, expires_at in self._expires.items() if expires_at <= now]
+        for ip in expired:
+            del self._expires[ip]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._expires) + len(self._networks)
+
+
+class StrikeCounter:
+    """Counts failures per IP in a fixed window."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._strikes: Dict[str, list] = {}
+
+    def strike(self, ip: str, now: float) -> bool:
+        """Record a failure. Returns True when the IP reached the limit (and resets it)."""
+        entry = self._strikes.get(ip)
+        if entry is None or now - entry[0] >= self.window_seconds:
+            entry = self._strikes[ip] = [now, 0]
+        entry[1] += 1
+        if entry[1] >= self.limit:
+            del self._strikes[ip]
+            return True
+        return False
+
+    def sweep(self, now: float) -> int:
+        expired = [ip for ip, (started, _) in self._strikes.items() if now - started >= self.window_seconds]
+        for ip in expired:
+            del self._strikes[ip]
+        return len(expired)
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+class AdmissionMiddleware(GeoGateMiddleware):
+    """Pure ASGI admission pipeline: lists, rate limit, geo, auth - cheapest first."""
+
+    def __init__(
+        self,
+        app,
+        allow_country: str = "CL",
+        allow_city: str = "santiago",
+        fail_open: bool = False,
+        exempt_paths: Iterable[str] = DEFAULT_EXEMPT_PATHS,
+        resolver: GeoResolver = geo_resolver,
+        allowlist: Optional[IPList] = None,
+        blocklist: Optional[IPList] = None,
+        route: str = "admission",
+        rate_limit: Optional[RateLimit] = None,
+        backend: Optional[RateLimitBackend] = None,
+        strike_limit: int = ADMISSION_STRIKE_LIMIT,
+        strike_window: float = ADMISSION_STRIKE_WINDOW,
+        block_ttl: float = ADMISSION_BLOCK_TTL,
+        require_auth: bool = ADMISSION_REQUIRE_AUTH,
+        verify_token: Callable[[str], Awaitable[dict]] = verify_bearer_token_async,
+    ):
+        super().__init__(app, allow_country, allow_city, fail_open, exempt_paths, resolver)
+        self.allowlist = allowlist if allowlist is not None else IPList.from_env(ADMISSION_ALLOWLIST)
+        self.blocklist = blocklist if blocklist is not None else IPList.from_env(ADMISSION_BLOCKLIST)
+        self.route = route
+        self.rate_limit = rate_limit or ROUTE_LIMITS[route]
+        self.backend = backend
+        self.strikes = StrikeCounter(strike_limit, strike_window)
+        self.block_ttl = block_ttl
+        self.require_auth = require_auth
+        self.verify_token = verify_token
+        self.rejections = {"blocklist": 0, "rate_limit": 0, "geo": 0, "auth": 0}
+        self.promotions = 0
+        _pipelines.add(self)
+
+    def _strike(self, ip: str, now: float) -> None:
+        if self.strikes.strike(ip, now):
+            self.blocklist.add(ip, ttl=self.block_ttl, now=now)
+            self.promotions += 1
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        return self.blocklist.sweep(now) + self.strikes.sweep(now)
+
+    async def _too_many_requests(self, scope, receive, send, retry_after: float) -> None:
+        await PrebuiltResponse(
+            429,
+            {"detail": f"Rate limit exceeded. Maximum {self.rate_limit.limit} requests per {self.rate_limit.window_seconds:g} seconds."},
+            {"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )(scope, receive, send)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        ip = client_ip_from_scope(scope)
+        now = time.monotonic()
+        if self.allowlist.contains(ip, now):
+            await self.app(scope, receive, send)
+            return
+        if self.blocklist.contains(ip, now):
+            self.rejections["blocklist"] += 1
+            await FORBIDDEN(scope, receive, send)
+            return
+
+        backend = self.backend or get_rate_limit_backend()
+        with phase("ratelimit"):
+            retry_after = await backend.acquire(self.route, ip, self.rate_limit)
+        if retry_after:
+            self.rejections["rate_limit"] += 1
+            self._strike(ip, now)
+            await self._too_many_requests(scope, receive, send, retry_after)
+            return
+
+        with phase("geo"):
+            verdict = await self.verdict(ip)
+        if not (self.fail_open if verdict is None else verdict):
+            self.rejections["geo"] += 1
+            # Solo un resultado real cuenta: una caída del proveedor no bloquea a nadie
+            if verdict is False:
+                self._strike(ip, now)
+            await FORBIDDEN(scope, receive, send)
+            return
+
+        if self.require_auth and scope["method"] != "OPTIONS":
+            token = _bearer_token(scope)
+            try:
+                if token is None:
+                    raise ValueError("missing bearer token")
+                with phase("auth"):
+                    claims = await self.verify_token(token)
+            except Exception:
+                self.rejections["auth"] += 1
+                await UNAUTHORIZED(scope, receive, send)
+                return
+            # Routes read it back as request.state.firebase_claims
+            scope.setdefault("state", {})["firebase_claims"] = claims
+
+        await self.app(scope, receive, send)
+
+
+async def run_admission_sweeper(interval_seconds: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """Background task that drops expired strikes and blocklist entries."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        for pipeline in list(_pipelines):
+            pipeline.sweep()
+            await asyncio.sleep(0)
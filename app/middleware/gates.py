@@ -0,0 +1,112 @@
+"""
+Pure ASGI request gates.
+
+Gates run before routing and either pass the request through untouched or
+short-circuit it with a response that was built at import time. They are plain
+ASGI callables rather than ``@app.middleware("http")`` functions. That avoids
+``BaseHTTPMiddleware``'s per-request task and stream plumbing, keeps streaming
+responses intact, and lets a gate return a proper 403 instead of raising.
+"""
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+from app.services.geo_service import GeoResolver, geo_resolver
+from app.utils.server_timing import phase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXEMPT_PATHS = ("/health", "/ready", "/metrics", "/")
+# X-Forwarded-For entries appended by our own infrastructure. Cloud Run's front end
+# appends the address it received the connection from, so the client's IP is the
+# last entry; one more per load balancer in front of it. 0 ignores the header.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+
+class PrebuiltResponse:
+    """A fixed JSON response encoded once and replayed as raw ASGI messages."""
+
+    def __init__(self, status_code: int, content: dict, headers: Optional[dict] = None):
+        body = json.dumps(content, separators=(",", ":")).encode("utf-8")
+        raw_headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+        self.start = {"type": "http.response.start", "status": status_code, "headers": raw_headers}
+        self.body = {"type": "http.response.body", "body": body}
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send(self.start)
+        await send(self.body)
+
+
+FORBIDDEN = PrebuiltResponse(403, {"detail": "Forbidden"})
+
+
+def client_ip_from_scope(scope, trusted_hops: int = TRUSTED_PROXY_HOPS) -> str:
+    """
+    The X-Forwarded-For entry added by the outermost trusted proxy, else the peer address.
+
+    Entries to its left are whatever the client sent and can be forged, so they
+    never key rate limits, strikes or the blocklist.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else ""
+    if trusted_hops <= 0:
+        return peer
+    hops = []
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            hops.extend(hop.strip() for hop in value.decode("latin-1").split(","))
+    hops = [hop for hop in hops if hop]
+    if len(hops) < trusted_hops:
+        return peer
+    return hops[-trusted_hops]
+
+
+class GeoGateMiddleware:
+    """Only let through requests whose IP resolves to the allowed country and city."""
+
+    def __init__(
+        self,
+        app,
+        allow_country: str = "CL",
+        allow_city: str = "santiago",
+        fail_open: bool = False,
+        exempt_paths: Iterable[str] = DEFAULT_EXEMPT_PATHS,
+        resolver: GeoResolver = geo_resolver,
+    ):
+        self.app = app
+        self.allow_country = allow_country.upper()
+        self.allow_city = allow_city.lower()
+        self.fail_open = fail_open
+        self.exempt_paths = frozenset(exempt_paths)
+        self.resolver = resolver
+
+    async def verdict(self, ip: str) -> Optional[bool]:
+        """Whether the IP's location is allowed; None when the lookup itself failed."""
+        try:
+            info = await self.resolver.lookup(ip)
+        except Exception as exc:
+            logger.debug("Geo lookup failed for %s: %s", ip, exc)
+            return None
+        return info["country"] == self.allow_country and self.allow_city in info["city"].lower()
+
+    async def allowed(self, ip: str) -> bool:
+        verdict = await self.verdict(ip)
+        return self.fail_open if verdict is None else verdict
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        with phase("geo"):
+            allowed = await self.allowed(client_ip_from_scope(scope))
+        if allowed:
+            await self.app(scope, receive, send)
+        else:
+            await FORBIDDEN(scope, receive, send)
@@ -0,0 +1,77 @@
+"""
+Pure ASGI middleware that profiles single requests tagged with ``X-Profile-Request``.
+
+Installed outermost (only when ``DEBUG_PROFILE_TOKEN`` is set) so the
+admission stages are part of the profile. Untagged requests cost one scan of
+the request headers. See app/utils/profiler.py.
+"""
+import asyncio
+import hmac
+import logging
+import threading
+import uuid
+
+from app.utils.profiler import DEBUG_PROFILE_INTERVAL_MS, DEBUG_PROFILE_TOKEN, SamplingProfiler, profile_sessions
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-request"
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, app, token: str = DEBUG_PROFILE_TOKEN, interval_ms: float = DEBUG_PROFILE_INTERVAL_MS, sessions=profile_sessions):
+        self.app = app
+        self.token = token.encode()
+        self.interval = interval_ms / 1000
+        self.sessions = sessions
+
+    def _tagged(self, scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                return bool(self.token) and hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self._tagged(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{scope['method']} {scope['path']}"
+        loop_thread = threading.get_ident()
+        profiler = self.sessions.try_start(lambda: SamplingProfiler(
+            name,
+            interval=self.interval,
+            thread_ids=[loop_thread],
+            task=asyncio.current_task(),
+            loop=asyncio.get_running_loop(),
+        ))
+        if profiler is None:
+            logger.info("Profile of %s skipped: another profiling session is running", name)
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if not finished:
+                finished = True
+                profile = self.sessions.finish(profiler)
+                self.sessions.store(profile, profile_id)
+                logger.info("Profiled %s: %d samples, id %s", name, profile.samples, profile_id)
+
+        async def send_with_id(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Guardado antes del último chunk: el cliente puede pedirlo apenas recibe la respuesta
+                finish()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            finish()
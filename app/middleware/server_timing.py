@@ -0,0 +1,39 @@
+"""
+Pure ASGI middleware that adds the ``Server-Timing`` header (see app/utils/server_timing.py).
+
+Installed outermost so the admission phases (rate limit, geo, auth) are
+included and rejected requests get the header too.
+"""
+import logging
+
+from app.utils.server_timing import SERVER_TIMING_LOG, ServerTimings, activate, deactivate
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app, log: bool = SERVER_TIMING_LOG):
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = ServerTimings()
+        token = activate(timings)
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", timings.header_value().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            deactivate(token)
+            if self.log:
+                logger.info("Server-Timing %s %s: %s", scope["method"], scope["path"], timings.header_value())
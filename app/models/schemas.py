@@ -1,6 +1,21 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 from typing import Optional, List
 
+from app.utils.request_limits import (
+    CHAT_CODE_TOKEN_BUDGET,
+    CHAT_MAX_CODE_BYTES,
+    CHAT_MAX_MESSAGE_BYTES,
+    CHAT_MAX_MESSAGES,
+    CHAT_MAX_OUTPUT_BYTES,
+    CHAT_MESSAGE_TOKEN_BUDGET,
+    CHAT_OUTPUT_TOKEN_BUDGET,
+    enforce_text_limit,
+    estimate_tokens,
+    field_rejections,
+    reject_over_cap,
+    window_messages,
+)
+
 
 class CamelCaseModel(BaseModel):
     """
@@ -30,8 +45,13 @@ class ChatMessage(CamelCaseModel):
     role: str = Field(alias="role")  # "system", "user", "assistant"
     content: str = Field(alias="content")
 
+    @field_validator("content")
+    @classmethod
+    def limit_content(cls, value: str) -> str:
+        return enforce_text_limit(value, "messages", CHAT_MAX_MESSAGE_BYTES, CHAT_MESSAGE_TOKEN_BUDGET)
+
 class ChatRequest(CamelCaseModel):
-    messages: Optional[List[ChatMessage]] = Field(default=None, alias="messages")  # Can be null for verdict requests
+    messages: Optional[List[ChatMessage]] = Field(default=None, max_length=CHAT_MAX_MESSAGES, alias="messages")  # Can be null for verdict requests; windowed before validation
     language_id: int = Field(default=97, alias="languageId")  # Always sent, default JavaScript
     exercise_active: bool = Field(default=False, alias="exerciseActive")  # Always sent
     current_code: str = Field(default="", alias="currentCode")  # Always sent, empty string if no code
@@ -40,6 +60,38 @@ class ChatRequest(CamelCaseModel):
     exercise_description_snapshot: Optional[str] = Field(default=None, alias="exerciseDescriptionSnapshot")  # Always sent, snapshot en base64
     finished: bool = Field(default=False, alias="finished")  # Always sent
     execution_output: str = Field(default="", alias="executionOutput")  # Always sent, empty if no output
+    challenge_id: Optional[str] = Field(default=None, alias="challengeId")  # Stored challenge, replaces re-uploading snapshots
+
+    # Older messages never reach the prompt: dropped before their size limits apply
+    @field_validator("messages", mode="before")
+    @classmethod
+    def window_history(cls, value):
+        return window_messages(value)
+
+    # Capped and truncated while parsing, so prompts never see unbounded code or output
+    @field_validator("current_code")
+    @classmethod
+    def limit_current_code(cls, value: str) -> str:
+        # Truncation depends on `finished`, so it happens in limit_verdict_code
+        return reject_over_cap(value, "current_code", CHAT_MAX_CODE_BYTES)
+
+    @field_validator("execution_output")
+    @classmethod
+    def limit_execution_output(cls, value: str) -> str:
+        return enforce_text_limit(value, "execution_output", CHAT_MAX_OUTPUT_BYTES, CHAT_OUTPUT_TOKEN_BUDGET)
+
+    @model_validator(mode="after")
+    def limit_verdict_code(self) -> "ChatRequest":
+        if not self.finished:
+            self.current_code = enforce_text_limit(self.current_code, "current_code", CHAT_MAX_CODE_BYTES, CHAT_CODE_TOKEN_BUDGET)
+        elif self.current_code and estimate_tokens(self.current_code) > CHAT_CODE_TOKEN_BUDGET:
+            # Un veredicto sobre código recortado juzgaría código que el modelo no vio
+            field_rejections.inc(field="current_code")
+            raise ValueError(
+                f"current_code is about {estimate_tokens(self.current_code)} tokens; verdicts are limited to "
+                f"{CHAT_CODE_TOKEN_BUDGET} tokens of code so the whole solution can be judged"
+            )
+        return self
 
 class ChatResponse(CamelCaseModel):
     response: str = Field(alias="response")  # Always sent
@@ -61,6 +113,31 @@ class ChallengeResponse(CamelCaseModel):
     template_code: str = Field(alias="templateCode")
     exercise_description: str = Field(alias="exerciseDescription")
 
+class ChallengeBatchRequest(CamelCaseModel):
+    language: str = Field(default="javascript", alias="language")
+    difficulty: Optional[str] = Field(default="easy", alias="difficulty")  # easy, medium, hard
+    topic: Optional[str] = Field(default=None, alias="topic")
+    count: int = Field(default=3, ge=1, le=10, alias="count")  # Challenges to return in one model call
+    exercise_names: Optional[List[str]] = Field(default=None, max_length=10, alias="exerciseNames")  # Specific exercises, served from the store when available
+
+class ChallengeCost(CamelCaseModel):
+    prompt_tokens: int = Field(alias="promptTokens")
+    completion_tokens: int = Field(alias="completionTokens")
+    cost_usd: float = Field(alias="costUsd")
+
+class BatchChallenge(ChallengeResponse):
+    cost: ChallengeCost = Field(alias="cost")  # Share of the batch call attributed to this challenge
+    latency_ms: float = Field(alias="latencyMs")  # Share of model latency plus local rendering time
+
+class ChallengeBatchResponse(CamelCaseModel):
+    challenges: List[BatchChallenge] = Field(alias="challenges")
+    model: str = Field(alias="model")
+    requested: int = Field(alias="requested")
+    invalid: int = Field(alias="invalid")  # Items the model returned that failed validation
+    llm_latency_ms: float = Field(alias="llmLatencyMs")
+    total_latency_ms: float = Field(alias="totalLatencyMs")
+    total_cost: ChallengeCost = Field(alias="totalCost")
+
 class Language(CamelCaseModel):
     id: int = Field(alias="id")
     name: str = Field(alias="name")
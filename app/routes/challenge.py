@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Request
-from app.models.schemas import ChallengeRequest, ChallengeResponse
-from app.services.challenge_service import generate_challenge
-from app.utils.rate_limiter import check_rate_limit
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.models.schemas import ChallengeRequest, ChallengeResponse, ChallengeBatchRequest, ChallengeBatchResponse
+from app.services.challenge_service import effective_batch_count, generate_challenge, generate_challenge_batch, get_stored_challenge
+from app.services.challenge_templates import UnsupportedLanguageError
+from app.utils.rate_limiter import enforce_rate_limit
+from app.utils.responses import model_response
 
 router = APIRouter()
 
+# Stored challenges never change, so clients and proxies may cache them freely
+CHALLENGE_CACHE_CONTROL = "public, max-age=86400, immutable"
+
 @router.post("/generate-challenge", response_model=ChallengeResponse)
 async def generate_challenge_endpoint(request: ChallengeRequest, client_request: Request):
     """Generate a programming challenge with template code"""
@@ -13,23 +20,82 @@ async def generate_challenge_endpoint(request: ChallengeRequest, client_request:
         client_ip = client_request.client.host
 
         # Apply rate limiting (more restrictive for challenge generation)
-        check_rate_limit(client_ip, limit=10, window_seconds=60)
+        await enforce_rate_limit(client_ip, route="challenge")
 
         # Generate challenge
         challenge = await generate_challenge(
             language=request.language,
             difficulty=request.difficulty,
             topic=request.topic,
-            chat_context=[msg.dict() for msg in request.chat_context] if request.chat_context else None
+            chat_context=[msg.dict() for msg in request.chat_context] if request.chat_context else None,
+            exercise_name=request.exercise_name
         )
 
-        return ChallengeResponse(**challenge)
+        return model_response(ChallengeResponse(**challenge))
 
     except HTTPException:
         # Re-raise HTTP exceptions (like rate limit)
         raise
+    except UnsupportedLanguageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Challenge generation failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/generate-challenges/batch", response_model=ChallengeBatchResponse)
+async def generate_challenge_batch_endpoint(request: ChallengeBatchRequest, client_request: Request):
+    """Generate several challenges with a single model call"""
+    try:
+        client_ip = client_request.client.host
+
+        # Each challenge returned consumes one token of the challenge bucket:
+        # count=1 with ten exerciseNames still returns (and is charged) ten
+        count = effective_batch_count(request.count, request.exercise_names)
+        await enforce_rate_limit(client_ip, route="challenge", cost=count)
+
+        batch = await generate_challenge_batch(
+            language=request.language,
+            difficulty=request.difficulty,
+            topic=request.topic,
+            count=count,
+            exercise_names=request.exercise_names
+        )
+
+        return model_response(ChallengeBatchResponse(**batch))
+
+    except HTTPException:
+        raise
+    except UnsupportedLanguageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Challenge batch generation failed: {str(e)}"
+        )
+
+@router.get("/challenges/{challenge_id}", response_model=ChallengeResponse)
+async def get_challenge_endpoint(
+    challenge_id: str,
+    client_request: Request,
+    language: Optional[str] = None
+):
+    """Fetch a stored challenge by id, optionally re-rendering its template for another language"""
+    try:
+        challenge = await get_stored_challenge(challenge_id, language=language)
+    except UnsupportedLanguageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Stores are per instance (and bounded): only confirm an ETag for a challenge this instance has
+    if challenge is None:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+
+    etag = f'"{challenge_id}:{(language or "").lower()}"'
+    if client_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CHALLENGE_CACHE_CONTROL})
+
+    return model_response(
+        ChallengeResponse(**challenge),
+        headers={"ETag": etag, "Cache-Control": CHALLENGE_CACHE_CONTROL},
+    )
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException, Request
 from app.models.schemas import ChatRequest, ChatResponse
-from app.services.openai_service import chat_with_openai
+from app.services.openai_service import chat_with_context
+from app.services.automatic_prompts_service import should_override_exercise_logic
+from app.services.chat_context import ChatContext
 from app.services.judge0_service import get_language_name
-from app.utils.message_utils import trim_messages
-from app.utils.rate_limiter import check_rate_limit, cleanup_old_ips
+from app.services.challenge_service import get_stored_challenge
+from app.utils.rate_limiter import enforce_rate_limit
 from app.utils.exercise_name_detector import should_enable_generate_code_new_logic
-from app.utils.snapshot_validator import validate_exercise_snapshots
-import random
+from app.utils.snapshot_validator import check_exercise_snapshots
+from app.utils.responses import model_response
+from app.utils.server_timing import phase
 
 router = APIRouter()
 
@@ -17,15 +20,9 @@ async def chat_endpoint(request: ChatRequest, client_request: Request):
         # Get client IP for rate limiting
         client_ip = client_request.client.host
 
-        # Apply rate limiting
-        check_rate_limit(client_ip)
-
-        # Periodically cleanup old IPs (10% chance per request)
-        if random.random() < 0.1:
-            cleanup_old_ips()
-
-        # Apply sliding window: keep only last 7 messages (+ system messages)
-        trimmed_messages = trim_messages(request.messages, limit=7)
+        # Apply rate limiting (idle IPs are swept by a background task)
+        with phase("ratelimit_chat"):
+            await enforce_rate_limit(client_ip, route="chat")
 
         # Get language name from language_id
         language_name = get_language_name(request.language_id)
@@ -36,81 +33,57 @@ async def chat_endpoint(request: ChatRequest, client_request: Request):
                 detail="finished=True requiere automatic=True para activar el veredicto"
             )
 
-        # Validate exercise snapshots for consistency
-        is_valid, error_message = validate_exercise_snapshots(
-            request.exercise_name_snapshot,
-            request.exercise_description_snapshot
-        )
+        with phase("snapshot"):
+            # Hydrate snapshots from the challenge store when the client only sends the challenge id
+            if request.challenge_id and not request.exercise_name_snapshot and not request.exercise_description_snapshot:
+                stored_challenge = await get_stored_challenge(request.challenge_id)
+                if stored_challenge is None:
+                    # El store es local a cada instancia: el cliente reintenta con los snapshots
+                    raise HTTPException(
+                        status_code=404,
+                        detail="Challenge not found; send exerciseNameSnapshot and exerciseDescriptionSnapshot instead",
+                    )
+                request.exercise_name_snapshot = stored_challenge["title"]
+                request.exercise_description_snapshot = stored_challenge["exercise_description"]
+
+            # Validate exercise snapshots for consistency (decodes the description once)
+            is_valid, error_message, exercise_description = check_exercise_snapshots(
+                request.exercise_name_snapshot,
+                request.exercise_description_snapshot
+            )
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_message)
 
-        # Handle automatic prompts with special logic
-        if request.automatic:
-            from app.services.automatic_prompts_service import detect_automatic_prompt_type, should_override_exercise_logic
-
-            # Get the user message content to detect prompt type
-            user_message_content = ""
-            if request.messages and request.messages[-1].role == "user":
-                user_message_content = request.messages[-1].content
-
-            prompt_type = detect_automatic_prompt_type(user_message_content, request.finished)
-
-            # Call OpenAI with automatic prompt handling
-            response = await chat_with_openai(
-                messages=trimmed_messages,
-                language_name=language_name,
-                exercise_in_progress=request.exercise_active,
-                temperature=0.5,
-                max_tokens=400,
-                presence_penalty=0,
-                frequency_penalty=0.2,
-                top_p=0.9,
-                is_automatic=True,
-                current_code=request.current_code or "",
-                exercise_name_snapshot=request.exercise_name_snapshot or "",
-                exercise_description_snapshot=request.exercise_description_snapshot or "",
-                execution_output=request.execution_output or "",
-                finished=request.finished
-            )
+        # Parse everything once: sliding window of the last 7 messages (+ system messages),
+        # prompt type, decoded snapshot. Services read it from the context.
+        with phase("context"):
+            context = ChatContext.from_request(request, language_name, exercise_description)
+
+        response = await chat_with_context(
+            context,
+            temperature=0.5,
+            max_tokens=400,
+            presence_penalty=0,
+            frequency_penalty=0.2,
+            top_p=0.9,
+        )
 
-            # Use automatic prompt logic for response flags
-            if prompt_type:
-                can_generate_exercise, exercise_name = should_override_exercise_logic(prompt_type)
+        with phase("exercise_detection"):
+            if context.prompt_type:
+                # Use automatic prompt logic for response flags
+                can_generate_exercise, exercise_name = should_override_exercise_logic(context.prompt_type)
             else:
-                # Fallback to normal logic if prompt type not recognized
+                # Normal chat, or automatic prompt type not recognized
                 can_generate_exercise, exercise_name = should_enable_generate_code_new_logic(
                     response, request.exercise_active
                 )
-        else:
-            # Normal chat processing
-            response = await chat_with_openai(
-                messages=trimmed_messages,
-                language_name=language_name,
-                exercise_in_progress=request.exercise_active,
-                temperature=0.5,
-                max_tokens=400,
-                presence_penalty=0,
-                frequency_penalty=0.2,
-                top_p=0.9,
-                is_automatic=False,
-                current_code=request.current_code or "",
-                exercise_name_snapshot=request.exercise_name_snapshot or "",
-                exercise_description_snapshot=request.exercise_description_snapshot or "",
-                execution_output=request.execution_output or "",
-                finished=request.finished
-            )
 
-            # Use normal logic to determine response flags
-            can_generate_exercise, exercise_name = should_enable_generate_code_new_logic(
-                response, request.exercise_active
-            )
-
-        return ChatResponse(
+        return model_response(ChatResponse(
             response=response,
             can_generate_exercise=can_generate_exercise,
             exercise_name=exercise_name,
             exercise_description=None  # TODO: Implement base64 encoding when generating exercises
-        )
+        ))
 
     except HTTPException:
         # Re-raise HTTP exceptions (like rate limit)
@@ -0,0 +1,169 @@
+import asyncio
+import hmac
+import threading
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from typing import Optional
+
+from app.utils import profiler
+from app.utils.memory import memory_stats, tracemalloc_snapshots
+from app.utils.profiler import Profile, SamplingProfiler, profile_sessions
+from app.utils.responses import FastJSONResponse
+
+router = APIRouter(prefix="/debug", include_in_schema=False)
+
+FORMATS = ("collapsed", "speedscope")
+GROUP_BY = ("lineno", "filename", "traceback")
+
+
+def _check_token(token: Optional[str]) -> None:
+    # Se lee en cada request para que los tests puedan cambiarlo
+    expected = profiler.DEBUG_PROFILE_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+def _render(profile: Profile, fmt: str) -> Response:
+    filename = f"profile-{int(profile.started)}"
+    if fmt == "speedscope":
+        return FastJSONResponse(
+            profile.to_speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'},
+        )
+    return Response(
+        profile.to_collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'inline; filename="{filename}.collapsed.txt"', "X-Profile-Samples": str(profile.samples)},
+    )
+
+
+@router.get("/profile")
+async def profile_endpoint(
+    seconds: float = Query(10, gt=0),
+    format: str = Query("collapsed"),
+    threads: str = Query("loop"),
+    interval_ms: float = Query(profiler.DEBUG_PROFILE_INTERVAL_MS, ge=1, le=1000),
+    x_debug_token: Optional[str] = Header(None),
+):
+    """Sample the running process for ``seconds`` and return the stacks"""
+    _check_token(x_debug_token)
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    if threads not in ("loop", "all"):
+        raise HTTPException(status_code=422, detail="threads must be 'loop' or 'all'")
+    seconds = min(seconds, profiler.DEBUG_PROFILE_MAX_SECONDS)
+
+    # threads=loop: solo el hilo del event loop, donde corren los handlers async
+    thread_ids = [threading.get_ident()] if threads == "loop" else None
+    session = profile_sessions.try_start(
+        lambda: SamplingProfiler(f"{seconds:g}s {threads}", interval=interval_ms / 1000, thread_ids=thread_ids)
+    )
+    if session is None:
+        raise HTTPException(status_code=409, detail="Another profiling session is running")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profile_sessions.finish(session)
+    return _render(profile, format)
+
+
+@router.get("/profile/requests")
+async def list_request_profiles(x_debug_token: Optional[str] = Header(None)):
+    """Latest profiles of requests tagged with X-Profile-Request"""
+    _check_token(x_debug_token)
+    return {"profiles": profile_sessions.recent()}
+
+
+@router.get("/profile/requests/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: str = Query("collapsed"),
+    x_debug_token: Optional[str] = Header(None),
+):
+    """Profile of one tagged request, by the id from its X-Profile-Id header"""
+    _check_token(x_debug_token)
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    profile = profile_sessions.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _render(profile, format)
+
+
+def _check_group_by(group_by: str) -> None:
+    if group_by not in GROUP_BY:
+        raise HTTPException(status_code=422, detail=f"group_by must be one of {', '.join(GROUP_BY)}")
+
+
+def _require_tracing() -> None:
+    if not tracemalloc_snapshots.tracing:
+        raise HTTPException(status_code=409, detail="tracemalloc is not tracing: POST /debug/memory/tracemalloc/start first")
+
+
+@router.get("/memory")
+async def memory_endpoint(x_debug_token: Optional[str] = Header(None)):
+    """RSS, container usage, allocator and GC counters, tracemalloc state"""
+    _check_token(x_debug_token)
+    return {**memory_stats(), "snapshots": tracemalloc_snapshots.stored()}
+
+
+@router.post("/memory/tracemalloc/start")
+async def tracemalloc_start(frames: int = Query(1, ge=1, le=50), x_debug_token: Optional[str] = Header(None)):
+    """Start tracing allocations (slows every allocation down until stopped)"""
+    _check_token(x_debug_token)
+    tracemalloc_snapshots.start(frames)
+    return {"tracing": True, "frames": frames}
+
+
+@router.post("/memory/tracemalloc/stop")
+async def tracemalloc_stop(x_debug_token: Optional[str] = Header(None)):
+    """Stop tracing and drop the stored snapshots"""
+    _check_token(x_debug_token)
+    tracemalloc_snapshots.stop()
+    return {"tracing": False}
+
+
+@router.get("/memory/top")
+async def memory_top(
+    limit: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno"),
+    x_debug_token: Optional[str] = Header(None),
+):
+    """Top allocation sites right now"""
+    _check_token(x_debug_token)
+    _check_group_by(group_by)
+    _require_tracing()
+    # Tomar y agrupar un snapshot cuesta cientos de ms: fuera del event loop
+    snapshot = await asyncio.to_thread(tracemalloc_snapshots.snapshot)
+    return {"group_by": group_by, "top": await asyncio.to_thread(tracemalloc_snapshots.top, snapshot, group_by, limit)}
+
+
+@router.post("/memory/snapshots")
+async def memory_snapshot(x_debug_token: Optional[str] = Header(None)):
+    """Store a snapshot to diff against later"""
+    _check_token(x_debug_token)
+    _require_tracing()
+    snapshot_id = await asyncio.to_thread(tracemalloc_snapshots.take)
+    return {"id": snapshot_id, "snapshots": tracemalloc_snapshots.stored()}
+
+
+@router.get("/memory/diff")
+async def memory_diff(
+    base: str,
+    against: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno"),
+    x_debug_token: Optional[str] = Header(None),
+):
+    """Growth per allocation site from snapshot ``base`` to ``against`` (default: now)"""
+    _check_token(x_debug_token)
+    _check_group_by(group_by)
+    _require_tracing()
+    base_snapshot = tracemalloc_snapshots.get(base)
+    current = tracemalloc_snapshots.get(against) if against else await asyncio.to_thread(tracemalloc_snapshots.snapshot)
+    if base_snapshot is None or current is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    diff = await asyncio.to_thread(tracemalloc_snapshots.diff, base_snapshot, current, group_by, limit)
+    return {"base": base, "against": against or "now", "group_by": group_by, "diff": diff}
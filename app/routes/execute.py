@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.models.schemas import ExecuteRequest, ExecuteResponse, LanguagesResponse, Language, DropdownLanguagesResponse, DropdownLanguage
 from app.services.judge0_service import execute_code, get_languages, get_supported_languages
+from app.utils.responses import model_response
 
 router = APIRouter()
 
@@ -13,7 +14,7 @@ async def execute_code_endpoint(request: ExecuteRequest):
             source_code=request.source_code,
             stdin=request.stdin
         )
-        return result
+        return model_response(ExecuteResponse(**result))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -31,7 +32,7 @@ async def get_languages_endpoint():
             for lang in languages_data
             if not lang.get("is_archived", False)
         ]
-        return LanguagesResponse(languages=active_languages)
+        return model_response(LanguagesResponse(languages=active_languages))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -51,7 +52,7 @@ async def get_dropdown_languages():
             )
             for lang in languages_data
         ]
-        return DropdownLanguagesResponse(languages=dropdown_languages)
+        return model_response(DropdownLanguagesResponse(languages=dropdown_languages))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,37 +1,44 @@
+import asyncio
+import json
+import logging
 import os
+import time
 import uuid
-from openai import OpenAI
-from typing import Optional
-from dotenv import load_dotenv
+from typing import List, Optional
 
+from app.config import load_environment
+from app.services.challenge_store import get_challenge_store
+from app.services.challenge_templates import render_template, resolve_language
 from app.utils.snapshot_validator import encode_exercise_description_for_response
+from app.utils.server_timing import phase
 
-# Load environment variables
-load_dotenv()
+load_environment()
+
+logger = logging.getLogger(__name__)
+
+_openai_clients = {}
 
 def get_openai_client():
     """Get OpenAI client with proper error handling"""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise Exception("OPENAI_API_KEY environment variable not set")
-    return OpenAI(api_key=api_key)
-
-CHALLENGE_GENERATION_PROMPT = """You are a programming challenge generator for technical interviews.
-
-{context_instruction}
-
-Generate a programming challenge with these specifications:
-- Language: {language}
-- Difficulty: {difficulty}
-- Topic: {topic}
-
-You must respond EXACTLY in this JSON format (no markdown, no extra explanations):
-
-{{
+    # OPENAI_BASE_URL apunta el SDK a un stand-in local (ver standins/openai_server.py)
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    # Un cliente por configuración: reutiliza su pool de conexiones entre requests
+    client = _openai_clients.get((api_key, base_url))
+    if client is None:
+        # The SDK costs ~0.5 s to import: loaded on first use or by the startup preload (app/utils/startup.py)
+        from openai import OpenAI
+
+        client = _openai_clients[(api_key, base_url)] = OpenAI(api_key=api_key, base_url=base_url)
+    return client
+
+CHALLENGE_JSON_FORMAT = """{{
   "title": "Concise challenge title",
   "description": "Clear problem description in Spanish. Explain what the function should do.",
   "function_name": "functionName",
-  "function_signature": "function functionName(param1, param2)",
+  "function_signature": "Signature of functionName written in {language} syntax, without the body",
   "constraints": [
     "Cada restricción breve y concreta en español"
   ],
@@ -39,14 +46,43 @@ You must respond EXACTLY in this JSON format (no markdown, no extra explanations
     {{"input": "example parameters", "expected": "expected result", "explanation": "Why this result"}},
     {{"input": "example parameters 2", "expected": "expected result 2", "explanation": "Why this result"}}
   ]
-}}
+}}"""
 
-Requirements:
+CHALLENGE_REQUIREMENTS = """Requirements:
 - Challenge must be appropriate for technical interviews
 - Include 3-4 diverse test cases
 - Function should be implementable in 10-15 lines of code
 - If no topic specified, choose one appropriate for the difficulty"""
 
+CHALLENGE_GENERATION_PROMPT = """You are a programming challenge generator for technical interviews.
+
+{context_instruction}
+
+Generate a programming challenge with these specifications:
+- Language: {language}
+- Difficulty: {difficulty}
+- Topic: {topic}
+
+You must respond EXACTLY in this JSON format (no markdown, no extra explanations):
+
+""" + CHALLENGE_JSON_FORMAT + """
+
+""" + CHALLENGE_REQUIREMENTS
+
+CHALLENGE_BATCH_PROMPT = """You are a programming challenge generator for technical interviews.
+
+Generate {count} DIFFERENT programming challenges with these specifications:
+- Language: {language}
+- Difficulty: {difficulty}
+- Topic: {topic}
+{exercise_instruction}
+You must respond EXACTLY with a JSON object {{"challenges": [...]}} containing {count} items (no markdown, no extra explanations). Each item uses this format:
+
+""" + CHALLENGE_JSON_FORMAT + """
+
+""" + CHALLENGE_REQUIREMENTS + """
+- Every challenge must be different from the others"""
+
 CONTEXT_ANALYSIS_PROMPT = """Analyze this chat conversation to understand what programming challenge was discussed or agreed upon.
 
 CHAT CONVERSATION:
@@ -60,13 +96,48 @@ Extract:
 Based on this conversation, I need to generate a challenge that matches EXACTLY what was discussed.
 If no specific challenge was mentioned, suggest an appropriate one for the language and context."""
 
+PUBLIC_CHALLENGE_FIELDS = ("challenge_id", "title", "description", "template_code", "exercise_description")
+
+def _public_challenge(record: dict) -> dict:
+    """Strip store-only fields from a challenge record"""
+    return {field: record[field] for field in PUBLIC_CHALLENGE_FIELDS}
+
+# The store helpers run in a worker thread (asyncio.to_thread): SQLite blocks on disk
+# I/O and on the store lock, which would stall every request sharing the event loop
+
+def _find_stored(exercise_names: List[str], language: str, difficulty: str) -> List[Optional[dict]]:
+    """Look up several exercises with a single thread hop"""
+    store = get_challenge_store()
+    return [store.find(name, language, difficulty) for name in exercise_names]
+
+def _save_challenges(records: List[dict]) -> None:
+    """Persist challenges; a store failure must not throw away a challenge we already paid for"""
+    store = get_challenge_store()
+    for record in records:
+        try:
+            store.save(record)
+        except Exception:
+            logger.exception("Could not persist challenge %s", record["challenge_id"])
+
 async def generate_challenge(
     language: str = "javascript",
     difficulty: str = "easy",
     topic: Optional[str] = None,
-    chat_context: Optional[list] = None
+    chat_context: Optional[list] = None,
+    exercise_name: Optional[str] = None
 ) -> dict:
-    """Generate a programming challenge using OpenAI"""
+    """Generate a programming challenge using OpenAI, reusing stored challenges when possible"""
+
+    # Validate the language before paying for any upstream call
+    language = resolve_language(language).name
+    difficulty = difficulty or "easy"
+
+    # An exercise agreed in chat (e.g. "FizzBuzz") is served from the store when it already exists
+    if exercise_name:
+        with phase("store_lookup"):
+            (stored,) = await asyncio.to_thread(_find_stored, [exercise_name], language, difficulty)
+        if stored:
+            return _public_challenge(stored)
 
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -74,8 +145,12 @@ async def generate_challenge(
 
     # Analyze chat context if provided
     context_instruction = ""
-    if chat_context and len(chat_context) > 0:
-        context_instruction = await analyze_chat_context(chat_context, language)
+    if exercise_name:
+        # The exercise is already agreed, no need to spend a call analyzing the conversation
+        context_instruction = f'The candidate agreed on the exercise "{exercise_name}". Generate exactly that challenge.'
+    elif chat_context and len(chat_context) > 0:
+        with phase("context_analysis"):
+            context_instruction = await analyze_chat_context(chat_context, language)
     else:
         context_instruction = "Generate a random appropriate challenge for the given parameters."
 
@@ -89,26 +164,29 @@ async def generate_challenge(
 
     try:
         client = get_openai_client()
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": f"Generate a {difficulty} challenge in {language} based on the conversation context."}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
+        with phase("llm"):
+            # The SDK client is synchronous: keep the call off the event loop
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": f"Generate a {difficulty} challenge in {language} based on the conversation context."}
+                ],
+                temperature=0.7,
+                max_tokens=800
+            )
 
         challenge_json = response.choices[0].message.content
 
         # Parse the JSON response
-        import json
         challenge_data = json.loads(challenge_json)
 
         # Generate template code
-        template_code = generate_template_code(challenge_data, language)
+        with phase("template"):
+            template_code = generate_template_code(challenge_data, language)
 
-        return {
+        challenge = {
             "challenge_id": str(uuid.uuid4()),
             "title": challenge_data["title"],
             "description": challenge_data["description"],
@@ -121,139 +199,227 @@ async def generate_challenge(
     except Exception as e:
         raise Exception(f"Challenge generation failed: {str(e)}")
 
+    with phase("store_save"):
+        await asyncio.to_thread(_save_challenges, [{
+            **challenge,
+            "exercise_name": exercise_name or challenge["title"],
+            "language": language,
+            "difficulty": difficulty,
+            "challenge_data": challenge_data,
+        }])
+
+    return challenge
+
+async def get_stored_challenge(challenge_id: str, language: Optional[str] = None) -> Optional[dict]:
+    """
+    Fetch a stored challenge by id.
+
+    If a different language is requested the template is re-rendered from the stored
+    challenge data (memoized by the template renderer), with no OpenAI call.
+    """
+    record = await asyncio.to_thread(lambda: get_challenge_store().get(challenge_id))
+    if record is None:
+        return None
+
+    challenge = _public_challenge(record)
+    if language and record.get("challenge_data"):
+        challenge["template_code"] = render_template(record["challenge_data"], language)
+    elif language:
+        resolve_language(language)
+    return challenge
+
+CHALLENGE_MODEL = "gpt-3.5-turbo"
+MAX_BATCH_CHALLENGES = 10
+BATCH_TOKENS_PER_CHALLENGE = 600
+MODEL_MAX_OUTPUT_TOKENS = 4096
+REQUIRED_CHALLENGE_FIELDS = ("title", "description", "function_name")
+
+# USD per 1M tokens (input, output)
+MODEL_PRICING_USD_PER_1M = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+def effective_batch_count(count: int, exercise_names: Optional[List[str]] = None) -> int:
+    """Challenges a batch really returns: at least one per named exercise, capped at MAX_BATCH_CHALLENGES"""
+    names = [name for name in (exercise_names or []) if name and name.strip()]
+    return min(max(count, len(names), 1), MAX_BATCH_CHALLENGES)
+
+def estimate_cost_usd(model: str, prompt_tokens: float, completion_tokens: float) -> float:
+    """Estimate the cost of a call from its token usage"""
+    input_price, output_price = MODEL_PRICING_USD_PER_1M.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+def _is_valid_challenge(challenge_data) -> bool:
+    """Check that a model-generated challenge has the fields the template needs"""
+    if not isinstance(challenge_data, dict):
+        return False
+    if any(not isinstance(challenge_data.get(field), str) or not challenge_data[field].strip()
+           for field in REQUIRED_CHALLENGE_FIELDS):
+        return False
+    return isinstance(challenge_data.get("test_cases", []), list)
+
+def _cost_breakdown(model: str, prompt_tokens: float, completion_tokens: float) -> dict:
+    return {
+        "prompt_tokens": round(prompt_tokens),
+        "completion_tokens": round(completion_tokens),
+        "cost_usd": round(estimate_cost_usd(model, prompt_tokens, completion_tokens), 8),
+    }
+
+async def generate_challenge_batch(
+    language: str = "javascript",
+    difficulty: str = "easy",
+    topic: Optional[str] = None,
+    count: int = 3,
+    exercise_names: Optional[list] = None
+) -> dict:
+    """
+    Generate several challenges with a single model call.
+
+    Exercises that already exist in the store are returned at zero cost. The rest are
+    requested together, validated, split and rendered one by one. Token usage and model
+    latency are apportioned to each challenge by its share of the completion.
+    """
+    started = time.perf_counter()
+
+    # Validate the language before paying for any upstream call
+    language = resolve_language(language).name
+    difficulty = difficulty or "easy"
+    exercise_names = [name for name in (exercise_names or []) if name and name.strip()]
+    count = effective_batch_count(count, exercise_names)
+
+    results = []
+    pending_names = []
+    names = exercise_names[:count]
+    found = await asyncio.to_thread(_find_stored, names, language, difficulty) if names else []
+    for name, stored in zip(names, found):
+        if stored:
+            results.append({
+                **_public_challenge(stored),
+                "cost": _cost_breakdown(CHALLENGE_MODEL, 0, 0),
+                "latency_ms": 0.0,
+            })
+        else:
+            pending_names.append(name)
+
+    to_generate = count - len(results)
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    llm_latency_ms = 0.0
+    invalid = 0
+
+    if to_generate > 0:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise Exception("OPENAI_API_KEY environment variable not set")
+
+        exercise_instruction = ""
+        if pending_names:
+            exercise_instruction = f"- Exercises (one challenge each, in this order): {', '.join(pending_names)}\n"
+
+        prompt = CHALLENGE_BATCH_PROMPT.format(
+            count=to_generate,
+            language=language,
+            difficulty=difficulty,
+            topic=topic or "algorithms",
+            exercise_instruction=exercise_instruction
+        )
+
+        try:
+            client = get_openai_client()
+            llm_started = time.perf_counter()
+            # The batch call takes several seconds, keep it off the event loop
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
+                model=CHALLENGE_MODEL,
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": f"Generate {to_generate} {difficulty} challenges in {language}."}
+                ],
+                temperature=0.7,
+                max_tokens=min(BATCH_TOKENS_PER_CHALLENGE * to_generate, MODEL_MAX_OUTPUT_TOKENS),
+                response_format={"type": "json_object"}
+            )
+            llm_latency_ms = (time.perf_counter() - llm_started) * 1000
+
+            payload = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            raise Exception(f"Challenge batch generation failed: {str(e)}")
+
+        if response.usage is not None:
+            usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+            }
+
+        raw_challenges = payload.get("challenges", []) if isinstance(payload, dict) else payload
+        if not isinstance(raw_challenges, list):
+            raw_challenges = []
+
+        # Keep the position of each item, it maps the challenge to the requested exercise name
+        candidates = [
+            (index, item) for index, item in enumerate(raw_challenges[:to_generate])
+            if _is_valid_challenge(item)
+        ]
+        invalid = len(raw_challenges[:to_generate]) - len(candidates)
+
+        # Apportion tokens and model latency by each challenge's share of the completion
+        sizes = [len(json.dumps(item, ensure_ascii=False)) for _, item in candidates]
+        total_size = sum(sizes) or 1
+
+        records = []
+        for (index, challenge_data), size in zip(candidates, sizes):
+            item_started = time.perf_counter()
+            share = size / total_size
+
+            challenge = {
+                "challenge_id": str(uuid.uuid4()),
+                "title": challenge_data["title"],
+                "description": challenge_data["description"],
+                "template_code": generate_template_code(challenge_data, language),
+                "exercise_description": encode_exercise_description_for_response(challenge_data["description"]),
+            }
+
+            exercise_name = pending_names[index] if index < len(pending_names) else challenge["title"]
+            records.append({
+                **challenge,
+                "exercise_name": exercise_name,
+                "language": language,
+                "difficulty": difficulty,
+                "challenge_data": challenge_data,
+            })
+
+            render_ms = (time.perf_counter() - item_started) * 1000
+            results.append({
+                **challenge,
+                "cost": _cost_breakdown(
+                    CHALLENGE_MODEL,
+                    usage["prompt_tokens"] / len(candidates),
+                    usage["completion_tokens"] * share,
+                ),
+                "latency_ms": round(llm_latency_ms * share + render_ms, 3),
+            })
+        await asyncio.to_thread(_save_challenges, records)
+
+    return {
+        "challenges": results,
+        "model": CHALLENGE_MODEL,
+        "requested": count,
+        "invalid": invalid,
+        "llm_latency_ms": round(llm_latency_ms, 3),
+        "total_latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        "total_cost": _cost_breakdown(CHALLENGE_MODEL, usage["prompt_tokens"], usage["completion_tokens"]),
+    }
+
 def generate_template_code(challenge_data: dict, language: str) -> str:
     """Generate the template code that users will see in the editor"""
-
-    if language.lower() == "javascript":
-        return generate_javascript_template(challenge_data)
-    elif language.lower() == "python":
-        return generate_python_template(challenge_data)
-    else:
-        raise Exception(f"Language {language} not supported yet")
+    return render_template(challenge_data, language)
 
 def generate_javascript_template(challenge_data: dict) -> str:
     """Generate JavaScript template with function signature and test cases"""
-
-    function_name = challenge_data.get("function_name", "solution")
-    title = challenge_data.get("title", function_name)
-    description_raw = challenge_data.get("description", "Completa la función solicitada.")
-    description = " ".join(description_raw.splitlines()).strip()
-    constraints = [c.strip() for c in challenge_data.get("constraints", []) if c.strip()]
-    test_cases = challenge_data.get("test_cases", [])
-
-    # Clean up function signature if it has extra braces
-    signature = challenge_data.get("function_signature", f"function {function_name}()")
-    if signature.endswith(" { }"):
-        signature = signature[:-4]  # Remove " { }"
-    elif signature.endswith(" {}"):
-        signature = signature[:-3]  # Remove " {}"
-
-    template_lines = [
-        f"// 🧪 Ejercicio: {title}",
-        f"// 📋 Descripción: {description}",
-        "",
-        f"{signature} {{",
-        "  // ✍️ TU CÓDIGO AQUÍ",
-        "",
-        "}",
-        "",
-        "// 📥 Ejemplos de Entrada/Salida:",
-    ]
-
-    if test_cases:
-        for test_case in test_cases:
-            sample_input = test_case.get("input", "")
-            expected = test_case.get("expected", "")
-            template_lines.append(f"// Entrada: {sample_input}  →  Salida esperada: {expected}")
-    else:
-        template_lines.append("// - (Agrega un ejemplo de entrada/salida)")
-
-    template_lines.append("")
-    template_lines.append("// 🛑 Restricciones:")
-
-    if constraints:
-        for constraint in constraints:
-            template_lines.append(f"// - {constraint}")
-    else:
-        template_lines.append("// - (Proporciona restricciones claras para validar el ejercicio)")
-
-    template_lines.append("")
-    template_lines.append("// Test Cases (ejecutables)")
-
-    if test_cases:
-        for test_case in test_cases:
-            sample_input = test_case.get("input", "")
-            expected = test_case.get("expected", "")
-            template_lines.append(
-                f"console.log({function_name}({sample_input})); // Esperado: {expected}"
-            )
-    else:
-        template_lines.append(
-            "// console.log(funcionEjemplo(args)); // Esperado: resultado"
-        )
-
-    return "\n".join(template_lines)
+    return render_template(challenge_data, "javascript")
 
 def generate_python_template(challenge_data: dict) -> str:
     """Generate Python template with function signature and test cases"""
-
-    function_name = challenge_data.get("function_name", "solution")
-    title = challenge_data.get("title", function_name)
-    description_raw = challenge_data.get("description", "Completa la función solicitada.")
-    description = " ".join(description_raw.splitlines()).strip()
-    constraints = [c.strip() for c in challenge_data.get("constraints", []) if c.strip()]
-    test_cases = challenge_data.get("test_cases", [])
-
-    # Convert JS signature to Python if needed
-    signature = challenge_data.get("function_signature", f"def {function_name}():")
-    if "function " in signature:
-        # Basic conversion from JS to Python signature
-        signature = signature.replace("function ", "def ").replace(" {", ":").replace("}", "")
-
-    template_lines = [
-        f"# 🧪 Ejercicio: {title}",
-        f"# 📋 Descripción: {description}",
-        "",
-        f"{signature}",
-        "    # ✍️ TU CÓDIGO AQUÍ",
-        "    pass",
-        "",
-        "# 📥 Ejemplos de Entrada/Salida:",
-    ]
-
-    if test_cases:
-        for test_case in test_cases:
-            sample_input = test_case.get("input", "")
-            expected = test_case.get("expected", "")
-            template_lines.append(f"# Entrada: {sample_input}  →  Salida esperada: {expected}")
-    else:
-        template_lines.append("# - (Agrega un ejemplo de entrada/salida)")
-
-    template_lines.append("")
-    template_lines.append("# 🛑 Restricciones:")
-
-    if constraints:
-        for constraint in constraints:
-            template_lines.append(f"# - {constraint}")
-    else:
-        template_lines.append("# - (Proporciona restricciones claras para validar el ejercicio)")
-
-    template_lines.append("")
-    template_lines.append("# Test Cases (ejecutables)")
-
-    if test_cases:
-        for test_case in test_cases:
-            sample_input = test_case.get("input", "")
-            expected = test_case.get("expected", "")
-            template_lines.append(
-                f"print({function_name}({sample_input}))  # Esperado: {expected}"
-            )
-    else:
-        template_lines.append(
-            "# print(funcion_ejemplo(args))  # Esperado: resultado"
-        )
-
-    return "\n".join(template_lines)
+    return render_template(challenge_data, "python")
 
 async def analyze_chat_context(chat_context: list, language: str) -> str:
     """Analyze chat context to understand what challenge was discussed"""
@@ -267,7 +433,8 @@ async def analyze_chat_context(chat_context: list, language: str) -> str:
 
     try:
         client = get_openai_client()
-        response = client.chat.completions.create(
+        response = await asyncio.to_thread(
+            client.chat.completions.create,
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": CONTEXT_ANALYSIS_PROMPT.format(chat_context=chat_text)},
@@ -0,0 +1,245 @@
+"""Persistent storage for generated challenges.
+
+Challenges are saved by id and indexed by normalized exercise name, language and
+difficulty, so an exercise that was already generated can be served again without
+calling OpenAI. SQLite is the default backend; ``InMemoryChallengeStore`` is used
+when ``CHALLENGE_STORE=memory`` (and in tests).
+
+Both backends are bounded, oldest challenges first: the default SQLite path is in
+``/tmp``, which on Cloud Run is memory counted against the instance's limit.
+Both are also local to one instance. With several instances a challenge id is
+only known to the instance that generated it, so clients keep the snapshots and
+resend them when ``challengeId`` gets a 404. A store shared by every instance
+plugs in through ``set_challenge_store()``.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+CHALLENGE_STORE = os.getenv("CHALLENGE_STORE", "sqlite").strip().lower()
+CHALLENGE_STORE_PATH = os.getenv(
+    "CHALLENGE_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "fluent_reflect_challenges.sqlite3"),
+)
+IN_MEMORY_MAX_CHALLENGES = 1000
+# A few KB per row: 2000 rows stay within a few MB of /tmp
+SQLITE_MAX_CHALLENGES = int(os.getenv("CHALLENGE_STORE_MAX_ROWS", "2000"))
+
+_NON_ALNUM_REGEX = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_exercise_name(name: Optional[str]) -> str:
+    """
+    Normalize an exercise name for lookups.
+
+    Examples:
+        "FizzBuzz" -> "fizzbuzz"
+        "Fizz Buzz!" -> "fizzbuzz"
+        "Búsqueda Binaria" -> "busquedabinaria"
+    """
+    if not name:
+        return ""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM_REGEX.sub("", ascii_name.lower())
+
+
+def _lookup_key(exercise_name: str, language: str, difficulty: Optional[str]) -> tuple:
+    return (
+        normalize_exercise_name(exercise_name),
+        (language or "").strip().lower(),
+        (difficulty or "easy").strip().lower(),
+    )
+
+
+class ChallengeStore(ABC):
+    """Interface implemented by every challenge store backend."""
+
+    @abstractmethod
+    def get(self, challenge_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def find(self, exercise_name: str, language: str, difficulty: Optional[str]) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def save(self, challenge: dict) -> None:
+        """
+        Save a challenge record.
+
+        The record carries the public fields (challenge_id, title, description,
+        template_code, exercise_description) plus exercise_name, language,
+        difficulty and the raw challenge_data returned by the model.
+        """
+
+
+class InMemoryChallengeStore(ChallengeStore):
+    """Bounded, process-local store. Oldest challenges are evicted first."""
+
+    def __init__(self, max_challenges: int = IN_MEMORY_MAX_CHALLENGES):
+        self._max_challenges = max_challenges
+        self._by_id: "OrderedDict[str, dict]" = OrderedDict()
+        self._index: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, challenge_id: str) -> Optional[dict]:
+        return self._by_id.get(challenge_id)
+
+    def find(self, exercise_name: str, language: str, difficulty: Optional[str]) -> Optional[dict]:
+        key = _lookup_key(exercise_name, language, difficulty)
+        if not key[0]:
+            return None
+        challenge_id = self._index.get(key)
+        return self._by_id.get(challenge_id) if challenge_id else None
+
+    def save(self, challenge: dict) -> None:
+        record = {"created_at": time.time(), **challenge}
+        key = _lookup_key(record["exercise_name"], record["language"], record["difficulty"])
+        with self._lock:
+            self._by_id[record["challenge_id"]] = record
+            self._index[key] = record["challenge_id"]
+            while len(self._by_id) > self._max_challenges:
+                _, evicted = self._by_id.popitem(last=False)
+                evicted_key = _lookup_key(evicted["exercise_name"], evicted["language"], evicted["difficulty"])
+                if self._index.get(evicted_key) == evicted["challenge_id"]:
+                    del self._index[evicted_key]
+
+
+class SQLiteChallengeStore(ChallengeStore):
+    """SQLite-backed store indexed by (exercise_key, language, difficulty), capped at ``max_challenges`` rows."""
+
+    _COLUMNS = (
+        "challenge_id", "exercise_name", "language", "difficulty", "title", "description",
+        "template_code", "exercise_description", "challenge_data", "created_at",
+    )
+
+    def __init__(self, path: str = CHALLENGE_STORE_PATH, max_challenges: int = SQLITE_MAX_CHALLENGES):
+        self._max_challenges = max_challenges
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS challenges (
+                    challenge_id TEXT PRIMARY KEY,
+                    exercise_key TEXT NOT NULL,
+                    exercise_name TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    template_code TEXT NOT NULL,
+                    exercise_description TEXT NOT NULL,
+                    challenge_data TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_challenges_lookup "
+                "ON challenges (exercise_key, language, difficulty, created_at)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_challenges_created ON challenges (created_at)")
+
+    def _to_record(self, row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        record = {column: row[column] for column in self._COLUMNS}
+        record["challenge_data"] = json.loads(record["challenge_data"]) if record["challenge_data"] else None
+        return record
+
+    def get(self, challenge_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM challenges WHERE challenge_id = ?",
+                (challenge_id,),
+            ).fetchone()
+        return self._to_record(row)
+
+    def find(self, exercise_name: str, language: str, difficulty: Optional[str]) -> Optional[dict]:
+        exercise_key, language_key, difficulty_key = _lookup_key(exercise_name, language, difficulty)
+        if not exercise_key:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM challenges "
+                "WHERE exercise_key = ? AND language = ? AND difficulty = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (exercise_key, language_key, difficulty_key),
+            ).fetchone()
+        return self._to_record(row)
+
+    def save(self, challenge: dict) -> None:
+        exercise_key, language_key, difficulty_key = _lookup_key(
+            challenge["exercise_name"], challenge["language"], challenge["difficulty"]
+        )
+        challenge_data = challenge.get("challenge_data")
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO challenges (
+                    challenge_id, exercise_key, exercise_name, language, difficulty, title,
+                    description, template_code, exercise_description, challenge_data, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    challenge["challenge_id"],
+                    exercise_key,
+                    challenge["exercise_name"],
+                    language_key,
+                    difficulty_key,
+                    challenge["title"],
+                    challenge["description"],
+                    challenge["template_code"],
+                    challenge["exercise_description"],
+                    json.dumps(challenge_data, ensure_ascii=False) if challenge_data is not None else None,
+                    challenge.get("created_at", time.time()),
+                ),
+            )
+            # Saves follow a model call, so one COUNT per save is negligible
+            (rows,) = self._conn.execute("SELECT COUNT(*) FROM challenges").fetchone()
+            if rows > self._max_challenges:
+                self._conn.execute(
+                    "DELETE FROM challenges WHERE challenge_id IN "
+                    "(SELECT challenge_id FROM challenges ORDER BY created_at LIMIT ?)",
+                    (rows - self._max_challenges,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM challenges").fetchone()[0]
+
+
+_store: Optional[ChallengeStore] = None
+_store_lock = threading.Lock()
+
+
+def get_challenge_store() -> ChallengeStore:
+    """Return the process-wide challenge store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if CHALLENGE_STORE == "memory":
+                    _store = InMemoryChallengeStore()
+                else:
+                    _store = SQLiteChallengeStore(CHALLENGE_STORE_PATH)
+    return _store
+
+
+def set_challenge_store(store: Optional[ChallengeStore]) -> None:
+    """Replace the process-wide store (used by tests and alternative backends)."""
+    global _store
+    _store = store
@@ -0,0 +1,584 @@
+"""Table-driven template rendering for generated challenges.
+
+Every language in ``judge0_service.SUPPORTED_LANGUAGES`` is described once in
+``LANGUAGE_SPECS`` (comment syntax, signature shape, body stub and executable
+test harness). The table is compiled at import time, so rendering a template is
+just string concatenation, and rendered templates are memoized per challenge.
+"""
+import re
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.services.judge0_service import SUPPORTED_LANGUAGES
+
+TEMPLATE_CACHE_SIZE = 512
+
+
+class UnsupportedLanguageError(ValueError):
+    """Raised when a challenge is requested for a language without a template."""
+
+
+@dataclass(frozen=True)
+class LanguageSpec:
+    """Declarative description of how a template looks in one language."""
+
+    name: str  # Canonical name, as in SUPPORTED_LANGUAGES
+    comment: str  # Line comment prefix
+    signature: Optional[str]  # Synthesized signature, None for languages without functions (SQL)
+    param: str  # How a single untyped parameter is declared
+    native_signature: Optional[str]  # Regex matching a signature already written in this language
+    body_open: str  # Appended to the signature to open the body
+    body: Tuple[str, ...]  # Stub lines after the "TU CÓDIGO AQUÍ" line
+    body_close: Optional[str]  # Line closing the function body
+    call: Optional[str]  # Executable test harness line
+    indent: str = "  "
+    example_name: str = "funcionEjemplo"
+    preamble: Tuple[str, ...] = ()
+    container_open: Tuple[str, ...] = ()
+    container_close: Tuple[str, ...] = ()
+    main_open: Tuple[str, ...] = ()
+    main_close: Tuple[str, ...] = ()
+    requires_static: bool = False
+
+
+_NOT_A_TYPE = r"(?!(?:function|def|fn|func|fun)\b)"
+_C_LIKE_SIGNATURE = _NOT_A_TYPE + r"[A-Za-z_][\w\s\*&:<>,\[\]]*?[\s\*&>\]]\**\w+\s*\("
+
+LANGUAGE_SPECS: Dict[str, LanguageSpec] = {
+    "javascript": LanguageSpec(
+        name="JavaScript",
+        comment="//",
+        signature="function {name}({params})",
+        param="{p}",
+        native_signature=r"(?:async\s+)?function\b",
+        body_open=" {",
+        body=("",),
+        body_close="}",
+        call="console.log({call}); // Esperado: {expected}",
+    ),
+    "python": LanguageSpec(
+        name="Python",
+        comment="#",
+        signature="def {name}({params})",
+        param="{p}",
+        native_signature=r"def\s",
+        body_open=":",
+        body=("pass",),
+        body_close=None,
+        call="print({call})  # Esperado: {expected}",
+        indent="    ",
+        example_name="funcion_ejemplo",
+    ),
+    "c": LanguageSpec(
+        name="C",
+        comment="//",
+        signature="int {name}({params})",
+        param="int {p}",
+        native_signature=_C_LIKE_SIGNATURE,
+        body_open=" {",
+        body=("return 0;",),
+        body_close="}",
+        call='printf("{fmt}\\n", {call}); // Esperado: {expected}',
+        indent="    ",
+        preamble=("#include <stdio.h>", "#include <stdlib.h>", "#include <string.h>", "#include <stdbool.h>"),
+        main_open=("int main(void) {",),
+        main_close=("    return 0;", "}"),
+    ),
+    "c++": LanguageSpec(
+        name="C++",
+        comment="//",
+        signature="int {name}({params})",
+        param="int {p}",
+        native_signature=_C_LIKE_SIGNATURE,
+        body_open=" {",
+        body=("return 0;",),
+        body_close="}",
+        call="cout << {call} << endl; // Esperado: {expected}",
+        indent="    ",
+        preamble=("#include <bits/stdc++.h>", "using namespace std;"),
+        main_open=("int main() {",),
+        main_close=("    return 0;", "}"),
+    ),
+    "java": LanguageSpec(
+        name="Java",
+        comment="//",
+        signature="public static Object {name}({params})",
+        param="Object {p}",
+        native_signature=_C_LIKE_SIGNATURE,
+        body_open=" {",
+        body=("return null;",),
+        body_close="}",
+        call="System.out.println({call}); // Esperado: {expected}",
+        indent="    ",
+        preamble=("import java.util.*;",),
+        container_open=("public class Main {",),
+        container_close=("}",),
+        main_open=("public static void main(String[] args) {",),
+        main_close=("}",),
+        requires_static=True,
+    ),
+    "go": LanguageSpec(
+        name="Go",
+        comment="//",
+        signature="func {name}({params}) interface{{}}",
+        param="{p} interface{{}}",
+        native_signature=r"func\s+\w+\s*\((?![^)]*:)",
+        body_open=" {",
+        body=("return nil",),
+        body_close="}",
+        call="fmt.Println({call}) // Esperado: {expected}",
+        indent="    ",
+        preamble=("package main", "", 'import "fmt"'),
+        main_open=("func main() {",),
+        main_close=("}",),
+    ),
+    "rust": LanguageSpec(
+        name="Rust",
+        comment="//",
+        signature="fn {name}({params}) -> i64",
+        param="{p}: i64",
+        native_signature=r"(?:pub\s+)?fn\s",
+        body_open=" {",
+        body=("0",),
+        body_close="}",
+        call='println!("{{:?}}", {call}); // Esperado: {expected}',
+        indent="    ",
+        example_name="funcion_ejemplo",
+        main_open=("fn main() {",),
+        main_close=("}",),
+    ),
+    "php": LanguageSpec(
+        name="PHP",
+        comment="//",
+        signature="function {name}({params})",
+        param="${p}",
+        native_signature=r"function\s+\w+\s*\(\s*(?:[\w?]+\s+)?(?:\$|\))",
+        body_open=" {",
+        body=("return null;",),
+        body_close="}",
+        call="echo json_encode({call}), PHP_EOL; // Esperado: {expected}",
+        indent="    ",
+        preamble=("<?php",),
+    ),
+    "typescript": LanguageSpec(
+        name="TypeScript",
+        comment="//",
+        signature="function {name}({params}): any",
+        param="{p}: any",
+        native_signature=r"(?:export\s+)?(?:async\s+)?function\b",
+        body_open=" {",
+        body=("",),
+        body_close="}",
+        call="console.log({call}); // Esperado: {expected}",
+    ),
+    "kotlin": LanguageSpec(
+        name="Kotlin",
+        comment="//",
+        signature="fun {name}({params}): Any?",
+        param="{p}: Any?",
+        native_signature=r"fun\s",
+        body_open=" {",
+        body=("return null",),
+        body_close="}",
+        call="println({call}) // Esperado: {expected}",
+        indent="    ",
+        main_open=("fun main() {",),
+        main_close=("}",),
+    ),
+    "scala": LanguageSpec(
+        name="Scala",
+        comment="//",
+        signature="def {name}({params}): Any",
+        param="{p}: Any",
+        native_signature=r"def\s+\w+.*\(.*:",
+        body_open=" = {",
+        body=("null",),
+        body_close="}",
+        call="println({call}) // Esperado: {expected}",
+        container_open=("object Main {",),
+        container_close=("}",),
+        main_open=("def main(args: Array[String]): Unit = {",),
+        main_close=("}",),
+    ),
+    "ruby": LanguageSpec(
+        name="Ruby",
+        comment="#",
+        signature="def {name}({params})",
+        param="{p}",
+        native_signature=r"def\s",
+        body_open="",
+        body=("nil",),
+        body_close="end",
+        call="p {call} # Esperado: {expected}",
+        example_name="funcion_ejemplo",
+    ),
+    "c#": LanguageSpec(
+        name="C#",
+        comment="//",
+        signature="public static object {name}({params})",
+        param="object {p}",
+        native_signature=_C_LIKE_SIGNATURE,
+        body_open=" {",
+        body=("return null;",),
+        body_close="}",
+        call="Console.WriteLine({call}); // Esperado: {expected}",
+        indent="    ",
+        preamble=("using System;", "using System.Collections.Generic;", "using System.Linq;"),
+        container_open=("public class Program {",),
+        container_close=("}",),
+        main_open=("public static void Main() {",),
+        main_close=("}",),
+        requires_static=True,
+    ),
+    "dart": LanguageSpec(
+        name="Dart",
+        comment="//",
+        signature="dynamic {name}({params})",
+        param="dynamic {p}",
+        native_signature=_C_LIKE_SIGNATURE,
+        body_open=" {",
+        body=("return null;",),
+        body_close="}",
+        call="print({call}); // Esperado: {expected}",
+        main_open=("void main() {",),
+        main_close=("}",),
+    ),
+    "swift": LanguageSpec(
+        name="Swift",
+        comment="//",
+        signature="func {name}({params}) -> Any?",
+        param="_ {p}: Any",
+        native_signature=r"func\s+\w+\s*\(.*:",
+        body_open=" {",
+        body=("return nil",),
+        body_close="}",
+        call="print({call} as Any) // Esperado: {expected}",
+        indent="    ",
+        preamble=("import Foundation",),
+    ),
+    "r": LanguageSpec(
+        name="R",
+        comment="#",
+        signature="{name} <- function({params})",
+        param="{p}",
+        native_signature=r"[\w.]+\s*(?:<-|=)\s*function\s*\(",
+        body_open=" {",
+        body=("NULL",),
+        body_close="}",
+        call="print({call})  # Esperado: {expected}",
+        example_name="funcion_ejemplo",
+    ),
+    "sql": LanguageSpec(
+        name="SQL",
+        comment="--",
+        signature=None,
+        param="{p}",
+        native_signature=None,
+        body_open="",
+        body=(),
+        body_close=None,
+        call=None,
+        indent="",
+    ),
+}
+
+LANGUAGE_ALIASES = {
+    "js": "javascript",
+    "node": "javascript",
+    "nodejs": "javascript",
+    "py": "python",
+    "python3": "python",
+    "cpp": "c++",
+    "cplusplus": "c++",
+    "golang": "go",
+    "rs": "rust",
+    "ts": "typescript",
+    "kt": "kotlin",
+    "rb": "ruby",
+    "csharp": "c#",
+    "cs": "c#",
+}
+
+# Return-type prefixes for C, whose printf needs an explicit conversion
+C_PRINTF_FORMATS = (
+    ("char*", "%s"),
+    ("char *", "%s"),
+    ("const char", "%s"),
+    ("double", "%f"),
+    ("float", "%f"),
+    ("long", "%ld"),
+)
+
+_TRAILING_BODY_REGEX = re.compile(r"(?:(?<=[\s)])\{\s*\}?|=|:)\s*$")
+_PARAMS_REGEX = re.compile(r"\(([^()]*)\)")
+_IDENTIFIER_REGEX = re.compile(r"[A-Za-z_]\w*")
+_ACCESS_MODIFIER_REGEX = re.compile(r"^\s*(?:public|private|protected|internal)\s+")
+_STATIC_REGEX = re.compile(r"\bstatic\b")
+
+
+def _compile_format(fmt: Optional[str]) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """Pre-parse a str.format template into (literal, field) chunks."""
+    if fmt is None:
+        return None
+    return tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(fmt))
+
+
+def _apply_format(compiled, values: Dict[str, str]) -> str:
+    parts = []
+    for literal, field in compiled:
+        parts.append(literal)
+        if field is not None:
+            parts.append(values[field])
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class _CompiledSpec:
+    key: str
+    spec: LanguageSpec
+    native_signature: Optional["re.Pattern[str]"]
+    signature: Optional[tuple]
+    param: tuple
+    call: Optional[tuple]
+    title_prefix: str
+    description_prefix: str
+    code_here: str
+    examples_header: str
+    example_prefix: str
+    example_placeholder: str
+    constraints_header: str
+    constraint_prefix: str
+    constraint_placeholder: str
+    tests_header: str
+    call_placeholder: Optional[str]
+
+
+def _compile_spec(key: str, spec: LanguageSpec) -> _CompiledSpec:
+    c = spec.comment
+    call = _compile_format(spec.call)
+    call_placeholder = None
+    if call is not None:
+        example = _apply_format(call, {
+            "call": f"{spec.example_name}(args)",
+            "expected": "resultado",
+            "fmt": "%d",
+        })
+        call_placeholder = f"{c} {example}"
+
+    return _CompiledSpec(
+        key=key,
+        spec=spec,
+        native_signature=re.compile(r"^\s*" + spec.native_signature) if spec.native_signature else None,
+        signature=_compile_format(spec.signature),
+        param=_compile_format(spec.param),
+        call=call,
+        title_prefix=f"{c} 🧪 Ejercicio: ",
+        description_prefix=f"{c} 📋 Descripción: ",
+        code_here=f"{c} ✍️ TU CÓDIGO AQUÍ",
+        examples_header=f"{c} 📥 Ejemplos de Entrada/Salida:",
+        example_prefix=f"{c} Entrada: ",
+        example_placeholder=f"{c} - (Agrega un ejemplo de entrada/salida)",
+        constraints_header=f"{c} 🛑 Restricciones:",
+        constraint_prefix=f"{c} - ",
+        constraint_placeholder=f"{c} - (Proporciona restricciones claras para validar el ejercicio)",
+        tests_header=f"{c} Test Cases (ejecutables)",
+        call_placeholder=call_placeholder,
+    )
+
+
+_COMPILED_SPECS: Dict[str, _CompiledSpec] = {
+    key: _compile_spec(key, spec) for key, spec in LANGUAGE_SPECS.items()
+}
+
+# Every curated Judge0 language must have a template (not an assert: python -O strips those)
+_curated_languages = {info["name"].lower() for info in SUPPORTED_LANGUAGES.values()}
+if _curated_languages != set(LANGUAGE_SPECS):
+    raise RuntimeError(
+        f"LANGUAGE_SPECS out of sync with SUPPORTED_LANGUAGES: "
+        f"missing {sorted(_curated_languages - set(LANGUAGE_SPECS))}, "
+        f"extra {sorted(set(LANGUAGE_SPECS) - _curated_languages)}"
+    )
+
+
+def resolve_language(language: str) -> LanguageSpec:
+    """
+    Resolve a language name, alias or Judge0 id to its template spec.
+
+    Raises:
+        UnsupportedLanguageError: If the language has no template
+    """
+    return _resolve_compiled(language).spec
+
+
+def _resolve_compiled(language) -> _CompiledSpec:
+    key = str(language or "").strip().lower()
+    if key.isdigit() and int(key) in SUPPORTED_LANGUAGES:
+        key = SUPPORTED_LANGUAGES[int(key)]["name"].lower()
+    key = LANGUAGE_ALIASES.get(key, key)
+
+    compiled = _COMPILED_SPECS.get(key)
+    if compiled is None:
+        supported = ", ".join(spec.name for spec in LANGUAGE_SPECS.values())
+        raise UnsupportedLanguageError(f"Language {language} not supported yet. Supported: {supported}")
+    return compiled
+
+
+def render_template(challenge_data: dict, language: str) -> str:
+    """Render the editor template for a challenge, memoized per challenge and language."""
+    compiled = _resolve_compiled(language)
+    return _render_cached(compiled.key, _freeze_challenge(challenge_data))
+
+
+def _freeze_challenge(challenge_data: dict) -> tuple:
+    """Reduce the challenge to the hashable fields the template depends on."""
+    function_name = str(challenge_data.get("function_name", "solution"))
+    return (
+        function_name,
+        str(challenge_data.get("title", function_name)),
+        str(challenge_data.get("description", "Completa la función solicitada.")),
+        challenge_data.get("function_signature"),
+        tuple(str(c) for c in challenge_data.get("constraints", []) or []),
+        tuple(
+            (str(test_case.get("input", "")), str(test_case.get("expected", "")))
+            for test_case in challenge_data.get("test_cases", []) or []
+        ),
+    )
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _render_cached(language_key: str, frozen: tuple) -> str:
+    return _render(_COMPILED_SPECS[language_key], *frozen)
+
+
+def _parameter_names(signature: str) -> List[str]:
+    """Extract bare parameter names from a signature written in any language."""
+    match = _PARAMS_REGEX.search(signature or "")
+    if not match:
+        return []
+
+    names = []
+    for raw in match.group(1).split(","):
+        raw = raw.split("=")[0]
+        if ":" in raw:
+            raw = raw.split(":")[0]
+        identifiers = _IDENTIFIER_REGEX.findall(raw)
+        if identifiers:
+            names.append(identifiers[-1])
+    return names
+
+
+def _strip_body(signature: str) -> str:
+    """Remove a trailing body opener ({, {}, :, =) so the spec can add its own."""
+    signature = signature.strip()
+    for _ in range(2):
+        stripped = _TRAILING_BODY_REGEX.sub("", signature).rstrip()
+        if stripped == signature:
+            break
+        signature = stripped
+    return signature
+
+
+def _build_signature(compiled: _CompiledSpec, function_name: str, raw_signature: Optional[str]) -> str:
+    spec = compiled.spec
+    if raw_signature and compiled.native_signature.match(raw_signature):
+        signature = _strip_body(raw_signature)
+        if spec.requires_static and not _STATIC_REGEX.search(signature):
+            signature = "public static " + _ACCESS_MODIFIER_REGEX.sub("", signature)
+    else:
+        params = ", ".join(
+            _apply_format(compiled.param, {"p": name})
+            for name in _parameter_names(raw_signature or "")
+        )
+        signature = _apply_format(compiled.signature, {"name": function_name, "params": params})
+    return signature + spec.body_open
+
+
+def _c_printf_format(signature: str) -> str:
+    for prefix, fmt in C_PRINTF_FORMATS:
+        if signature.lstrip().startswith(prefix):
+            return fmt
+    return "%d"
+
+
+def _indent(lines: List[str], indent: str) -> List[str]:
+    return [f"{indent}{line}" if line else line for line in lines]
+
+
+def _render(
+    compiled: _CompiledSpec,
+    function_name: str,
+    title: str,
+    description_raw: str,
+    raw_signature: Optional[str],
+    constraints: Tuple[str, ...],
+    test_cases: Tuple[Tuple[str, str], ...],
+) -> str:
+    spec = compiled.spec
+    description = " ".join(description_raw.splitlines()).strip()
+    constraints = [c.strip() for c in constraints if c.strip()]
+
+    lines = list(spec.preamble)
+    if lines:
+        lines.append("")
+    lines += [
+        compiled.title_prefix + title,
+        compiled.description_prefix + description,
+        "",
+    ]
+
+    inner = []
+    signature = ""
+    if compiled.signature is not None:
+        signature = _build_signature(compiled, function_name, raw_signature)
+        inner.append(signature)
+        inner += _indent([compiled.code_here, *spec.body], spec.indent)
+        if spec.body_close is not None:
+            inner.append(spec.body_close)
+    else:
+        inner.append(compiled.code_here)
+    inner.append("")
+
+    inner.append(compiled.examples_header)
+    if test_cases:
+        for sample_input, expected in test_cases:
+            inner.append(f"{compiled.example_prefix}{sample_input}  →  Salida esperada: {expected}")
+    else:
+        inner.append(compiled.example_placeholder)
+
+    inner.append("")
+    inner.append(compiled.constraints_header)
+    if constraints:
+        inner += [compiled.constraint_prefix + constraint for constraint in constraints]
+    else:
+        inner.append(compiled.constraint_placeholder)
+
+    if compiled.call is not None:
+        inner.append("")
+        inner.append(compiled.tests_header)
+
+        if test_cases:
+            fmt = _c_printf_format(signature) if spec.name == "C" else "%d"
+            calls = [
+                _apply_format(compiled.call, {
+                    "call": f"{function_name}({sample_input})",
+                    "expected": expected,
+                    "fmt": fmt,
+                })
+                for sample_input, expected in test_cases
+            ]
+        else:
+            calls = [compiled.call_placeholder]
+
+        if spec.main_open:
+            inner += [*spec.main_open, *_indent(calls, spec.indent or "  "), *spec.main_close]
+        else:
+            inner += calls
+
+    if spec.container_open:
+        lines += [*spec.container_open, *_indent(inner, spec.indent or "  "), *spec.container_close]
+    else:
+        lines += inner
+
+    return "\n".join(lines)
@@ -0,0 +1,96 @@
+"""
+Request-scoped context for the chat flow.
+
+The route builds one ``ChatContext`` per request. It detects the automatic prompt
+type, decodes the base64 description snapshot and converts the trimmed messages
+into plain dicts once; the services then read those results instead of redoing
+the work.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.models.schemas import ChatMessage, ChatRequest
+from app.services.automatic_prompts_service import detect_automatic_prompt_type
+from app.utils.message_utils import trim_messages
+from app.utils.request_limits import CHAT_MESSAGE_WINDOW
+from app.utils.snapshot_validator import decode_exercise_description_snapshot
+
+# Also applied while parsing, before message limits (app/models/schemas.py)
+MESSAGE_WINDOW = CHAT_MESSAGE_WINDOW
+
+
+@dataclass
+class ChatContext:
+    language_name: str
+    # Trimmed conversation as {"role", "content"} dicts, ready for the OpenAI payload
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    is_automatic: bool = False
+    finished: bool = False
+    exercise_active: bool = False
+    prompt_type: Optional[str] = None
+    current_code: str = ""
+    execution_output: str = ""
+    exercise_name_snapshot: str = ""
+    exercise_description_snapshot: str = ""
+    # Decoded once from exercise_description_snapshot (None if absent or invalid)
+    exercise_description: Optional[str] = None
+
+    @classmethod
+    def build(
+        cls,
+        messages: Optional[List[ChatMessage]],
+        language_name: str,
+        *,
+        is_automatic: bool = False,
+        finished: bool = False,
+        exercise_active: bool = False,
+        current_code: str = "",
+        execution_output: str = "",
+        exercise_name_snapshot: str = "",
+        exercise_description_snapshot: str = "",
+        exercise_description: Optional[str] = None,
+    ) -> "ChatContext":
+        messages = messages or []
+        prompt_type = None
+        if is_automatic:
+            last_user_content = messages[-1].content if messages and messages[-1].role == "user" else ""
+            prompt_type = detect_automatic_prompt_type(last_user_content, finished)
+
+        if exercise_description is None and exercise_description_snapshot:
+            exercise_description = decode_exercise_description_snapshot(exercise_description_snapshot)
+
+        return cls(
+            language_name=language_name,
+            messages=[{"role": message.role, "content": message.content} for message in messages],
+            is_automatic=is_automatic,
+            finished=finished,
+            exercise_active=exercise_active,
+            prompt_type=prompt_type,
+            current_code=current_code or "",
+            execution_output=execution_output or "",
+            exercise_name_snapshot=exercise_name_snapshot or "",
+            exercise_description_snapshot=exercise_description_snapshot or "",
+            exercise_description=exercise_description,
+        )
+
+    @classmethod
+    def from_request(
+        cls,
+        request: ChatRequest,
+        language_name: str,
+        exercise_description: Optional[str] = None,
+        message_limit: int = MESSAGE_WINDOW,
+    ) -> "ChatContext":
+        """Build the context at the route boundary (after snapshot validation)."""
+        return cls.build(
+            trim_messages(request.messages, limit=message_limit),
+            language_name,
+            is_automatic=request.automatic,
+            finished=request.finished,
+            exercise_active=request.exercise_active,
+            current_code=request.current_code,
+            execution_output=request.execution_output,
+            exercise_name_snapshot=request.exercise_name_snapshot,
+            exercise_description_snapshot=request.exercise_description_snapshot,
+            exercise_description=exercise_description,
+        )
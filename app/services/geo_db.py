@@ -0,0 +1,333 @@
+"""
+Offline IP geolocation database.
+
+The geo gate resolves country/city locally instead of calling ``GEO_API_URL`` on
+every cold IP. Two kinds of source file are supported:
+
+- **CSV range tables** such as IP2Location LITE DB3/DB11
+  (``ip_from,ip_to,country_code,country_name,region,city,...``). Plain
+  ``start,end,country_code,city`` files also work, with IPs written as integers
+  or dotted/colon notation. A CSV is compiled into a compact binary file of
+  sorted range arrays, ``<source>.bin`` next to it. That file is memory-mapped,
+  so lookups are a binary search over pages the OS loads on demand, and the
+  table adds almost nothing to RSS.
+- **MaxMind MMDB** (GeoLite2-City and similar). This needs the optional
+  ``maxminddb`` package, which memory-maps the file itself.
+
+Compile the table when building the image (``python -m app.services.geo_db
+SOURCE``, see the Dockerfile). On Cloud Run every file written at runtime, in
+``/tmp`` or anywhere else, lives in memory and counts against the instance limit
+(about 12 MB per million ranges). A file that ships in the image is only read
+into the page cache, which the kernel can evict. When no compiled copy exists and
+the source directory is read-only, the table is compiled into the temp dir, with
+a warning.
+
+``GeoDatabase`` watches the source file. When a new file is copied over it,
+``reload_if_changed`` builds the new table and swaps it in, with no restart.
+"""
+import argparse
+import array
+import bisect
+import csv
+import hashlib
+import ipaddress
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+try:
+    import maxminddb  # type: ignore
+    _MAXMINDDB_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    maxminddb = None  # type: ignore
+    _MAXMINDDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# magic, byte order flag, IPv4 range count, IPv6 range count, locations offset, locations size
+_HEADER = struct.Struct("<8sIIIQQ")
+_MAGIC = b"FRGEODB1"
+_V6_KEY_SIZE = 16
+_IPV4_MAPPED = ipaddress.ip_network("::ffff:0:0/96")
+
+Location = Tuple[str, str]
+
+
+def _parse_ip(value: str) -> int:
+    value = value.strip().strip('"')
+    if value.isdigit():
+        return int(value)
+    return int(ipaddress.ip_address(value))
+
+
+def _read_csv_ranges(path: str) -> Tuple[list, list, List[Location]]:
+    """Parse a CSV range table into sorted IPv4 and IPv6 (start, end, location index) lists."""
+    v4, v6 = [], []
+    locations: List[Location] = []
+    location_ids = {}
+
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.reader(handle):
+            if len(row) < 3 or row[0].startswith("#"):
+                continue
+            try:
+                start, end = _parse_ip(row[0]), _parse_ip(row[1])
+            except ValueError:
+                continue  # header line
+            country = row[2].strip().upper()
+            if country in ("", "-"):
+                continue
+            # IP2Location layout puts the city in column 6, the short layout in column 4
+            city = (row[5] if len(row) >= 6 else row[3] if len(row) >= 4 else "").strip()
+            if city == "-":
+                city = ""
+
+            location = (country, city)
+            location_id = location_ids.get(location)
+            if location_id is None:
+                location_id = location_ids[location] = len(locations)
+                locations.append(location)
+
+            if end <= 0xFFFFFFFF and start <= end:
+                v4.append((start, end, location_id))
+            elif int(_IPV4_MAPPED.network_address) <= start and end <= int(_IPV4_MAPPED.broadcast_address):
+                # IPv4-mapped ranges of IPv6 tables are looked up as plain IPv4
+                v4.append((start & 0xFFFFFFFF, end & 0xFFFFFFFF, location_id))
+            elif start <= end:
+                v6.append((start, end, location_id))
+
+    v4.sort()
+    v6.sort()
+    return v4, v6, locations
+
+
+def compile_csv(source_path: str, compiled_path: str) -> None:
+    """Compile a CSV range table into the memory-mappable binary format."""
+    v4, v6, locations = _read_csv_ranges(source_path)
+
+    body = bytearray()
+    for column in range(3):
+        body += array.array("I", [row[column] for row in v4]).tobytes()
+    body += b"".join(row[0].to_bytes(_V6_KEY_SIZE, "big") for row in v6)
+    body += b"".join(row[1].to_bytes(_V6_KEY_SIZE, "big") for row in v6)
+    body += array.array("I", [row[2] for row in v6]).tobytes()
+    location_bytes = json.dumps(locations, ensure_ascii=False).encode("utf-8")
+
+    header = _HEADER.pack(
+        _MAGIC, 1 if sys.byteorder == "little" else 0, len(v4), len(v6),
+        _HEADER.size + len(body), len(location_bytes),
+    )
+    tmp_path = f"{compiled_path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(header)
+        handle.write(body)
+        handle.write(location_bytes)
+    os.replace(tmp_path, compiled_path)
+
+
+class _V6Keys:
+    """Sequence view over 16-byte big-endian keys, so ``bisect`` works on the raw mmap."""
+
+    def __init__(self, view: memoryview, count: int):
+        self._view = view
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        offset = index * _V6_KEY_SIZE
+        return bytes(self._view[offset:offset + _V6_KEY_SIZE])
+
+    def release(self) -> None:
+        self._view.release()
+
+
+class RangeTable:
+    """Memory-mapped sorted range arrays with binary search lookups."""
+
+    def __init__(self, compiled_path: str):
+        self._file = open(compiled_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, little_endian, v4_count, v6_count, locations_offset, locations_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or bool(little_endian) != (sys.byteorder == "little"):
+            self.close()
+            raise ValueError(f"{compiled_path} is not a compiled geo database for this platform")
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        parts = []
+
+        def take(size: int) -> memoryview:
+            nonlocal offset
+            part = view[offset:offset + size]
+            offset += size
+            parts.append(part)
+            return part
+
+        self._v4_starts = take(v4_count * 4).cast("I")
+        self._v4_ends = take(v4_count * 4).cast("I")
+        self._v4_locations = take(v4_count * 4).cast("I")
+        self._v6_starts = _V6Keys(take(v6_count * _V6_KEY_SIZE), v6_count)
+        self._v6_ends = _V6Keys(take(v6_count * _V6_KEY_SIZE), v6_count)
+        self._v6_locations = take(v6_count * 4).cast("I")
+        # Every view must be released (derived ones first) before the mmap can close
+        self._views = [self._v4_starts, self._v4_ends, self._v4_locations, self._v6_locations] + parts + [view]
+
+        self.locations: List[Location] = [
+            tuple(item) for item in json.loads(self._mmap[locations_offset:locations_offset + locations_size])
+        ]
+        self.size = v4_count + v6_count
+
+    def lookup(self, ip: str) -> Optional[dict]:
+        if ":" not in ip:
+            # Fast path for IPv4, several times cheaper than ipaddress.ip_address
+            try:
+                address = socket.inet_pton(socket.AF_INET, ip)
+            except OSError:
+                raise ValueError(f"{ip!r} does not appear to be an IPv4 or IPv6 address") from None
+        else:
+            address = ipaddress.ip_address(ip)
+            address = address.ipv4_mapped.packed if address.ipv4_mapped is not None else address.packed
+
+        if len(address) == 4:
+            key = int.from_bytes(address, "big")
+            index = bisect.bisect_right(self._v4_starts, key) - 1
+            if index < 0 or self._v4_ends[index] < key:
+                return None
+            location_id = self._v4_locations[index]
+        else:
+            key = address
+            index = bisect.bisect_right(self._v6_starts, key) - 1
+            if index < 0 or self._v6_ends[index] < key:
+                return None
+            location_id = self._v6_locations[index]
+
+        country, city = self.locations[location_id]
+        return {"country": country, "city": city}
+
+    def close(self) -> None:
+        for view in getattr(self, "_views", []):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class MMDBTable:
+    """MaxMind MMDB reader (memory-mapped by ``maxminddb``)."""
+
+    def __init__(self, path: str):
+        if not _MAXMINDDB_AVAILABLE:
+            raise RuntimeError("maxminddb not installed. Install maxminddb to load .mmdb geo databases.")
+        self._reader = maxminddb.open_database(path, maxminddb.MODE_MMAP)
+        self.size = self._reader.metadata().node_count
+
+    def lookup(self, ip: str) -> Optional[dict]:
+        record = self._reader.get(ip)
+        if not record:
+            return None
+        country = ((record.get("country") or record.get("registered_country") or {}).get("iso_code") or "").upper()
+        if not country:
+            return None
+        city = ((record.get("city") or {}).get("names") or {}).get("en", "")
+        return {"country": country, "city": city}
+
+    def close(self) -> None:
+        self._reader.close()
+
+
+def _compiled_path_for(source_path: str) -> str:
+    """The compiled copy next to the source, as built into the image."""
+    return f"{source_path}.bin"
+
+
+def _temp_compiled_path_for(source_path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(source_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"fluent_reflect_geo_{digest}.bin")
+
+
+def _is_fresh(compiled_path: str, source_path: str) -> bool:
+    return os.path.exists(compiled_path) and os.path.getmtime(compiled_path) >= os.path.getmtime(source_path)
+
+
+def open_table(source_path: str, compiled_path: Optional[str] = None):
+    """Open ``source_path``, compiling CSV sources when the compiled copy is missing or stale."""
+    if source_path.endswith(".mmdb"):
+        return MMDBTable(source_path)
+
+    with open(source_path, "rb") as handle:
+        is_compiled = handle.read(len(_MAGIC)) == _MAGIC
+    if is_compiled:
+        return RangeTable(source_path)
+
+    if compiled_path is None:
+        compiled_path = _compiled_path_for(source_path)
+        if not _is_fresh(compiled_path, source_path) and not os.access(os.path.dirname(compiled_path) or ".", os.W_OK):
+            compiled_path = _temp_compiled_path_for(source_path)
+            logger.warning(
+                "Geo database %s has no compiled copy and its directory is read-only; compiling into %s, "
+                "which on Cloud Run takes instance memory. Run `python -m app.services.geo_db %s` at build time.",
+                source_path, compiled_path, source_path,
+            )
+    if not _is_fresh(compiled_path, source_path):
+        compile_csv(source_path, compiled_path)
+    return RangeTable(compiled_path)
+
+
+class GeoDatabase:
+    """A geo table that follows its source file and can be hot-reloaded."""
+
+    def __init__(self, source_path: str, compiled_path: Optional[str] = None):
+        self.source_path = source_path
+        self.compiled_path = compiled_path
+        self._signature = self._stat()
+        self._table = open_table(source_path, compiled_path)
+        logger.info("Loaded geo database %s (%d ranges)", source_path, self._table.size)
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.source_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def lookup(self, ip: str) -> Optional[dict]:
+        """Return {"country", "city"} or None if the IP is not covered. Raises ValueError on invalid IPs."""
+        return self._table.lookup(ip)
+
+    def load_if_changed(self):
+        """Build the new table if the source file changed (blocking; run off the event loop)."""
+        signature = self._stat()
+        if signature == self._signature:
+            return None
+        table = open_table(self.source_path, self.compiled_path)
+        self._signature = signature
+        return table
+
+    def swap(self, table) -> None:
+        old, self._table = self._table, table
+        old.close()
+        logger.info("Reloaded geo database %s (%d ranges)", self.source_path, table.size)
+
+    def reload_if_changed(self) -> bool:
+        table = self.load_if_changed()
+        if table is None:
+            return False
+        self.swap(table)
+        return True
+
+    def close(self) -> None:
+        self._table.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a CSV geo range table (run at image build time).")
+    parser.add_argument("source", help="IP2Location-style CSV")
+    parser.add_argument("output", nargs="?", help="compiled file (default: <source>.bin, where GeoDatabase looks for it)")
+    args = parser.parse_args()
+    output = args.output or _compiled_path_for(args.source)
+    compile_csv(args.source, output)
+    print(f"{output}: {os.path.getsize(output) / 1e6:.1f} MB")
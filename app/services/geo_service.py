@@ -0,0 +1,205 @@
+"""
+IP geolocation lookups for the geo gate.
+
+Lookups go through a bounded LRU+TTL cache. Failed lookups are cached for a
+shorter time (negative caching). Concurrent misses for the same key share one
+upstream request (single-flight). Entries can optionally be aggregated by /24
+(IPv4) or /48 (IPv6) prefix to raise the hit rate. All remaining lookups reuse a
+single pooled ``httpx.AsyncClient``.
+
+When ``GEO_DB_PATH`` points to an offline database (see ``geo_db``), lookups are
+answered locally in microseconds. The HTTP API is then only a fallback for IPs the
+database does not cover, and only if ``GEO_HTTP_FALLBACK`` is enabled.
+"""
+import asyncio
+import ipaddress
+import logging
+import os
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional
+
+from app.config import load_environment
+from app.services.geo_db import GeoDatabase
+from app.utils.ttl_cache import MISSING, TTLCache
+
+if TYPE_CHECKING:
+    import httpx
+
+load_environment()
+
+GEO_API_URL = os.getenv("GEO_API_URL", "http://ip-api.com/json")
+GEO_CACHE_TTL = int(os.getenv("GEO_CACHE_TTL", "600"))
+GEO_NEGATIVE_CACHE_TTL = int(os.getenv("GEO_NEGATIVE_CACHE_TTL", "60"))
+GEO_CACHE_MAX_ENTRIES = int(os.getenv("GEO_CACHE_MAX_ENTRIES", "10000"))
+GEO_CACHE_BY_PREFIX = os.getenv("GEO_CACHE_BY_PREFIX", "false").strip().lower() in ("1", "true", "yes")
+GEO_TIMEOUT_SECONDS = 1.5
+
+GEO_DB_PATH = os.getenv("GEO_DB_PATH", "")
+GEO_DB_RELOAD_INTERVAL = int(os.getenv("GEO_DB_RELOAD_INTERVAL", "300"))
+# Without an offline DB the HTTP API is the only source, so it defaults on
+GEO_HTTP_FALLBACK = os.getenv("GEO_HTTP_FALLBACK", "false" if GEO_DB_PATH else "true").strip().lower() in ("1", "true", "yes")
+
+IPV4_PREFIX_LENGTH = 24
+IPV6_PREFIX_LENGTH = 48
+
+logger = logging.getLogger(__name__)
+
+
+class GeoLookupError(Exception):
+    """The location of an IP could not be determined."""
+
+
+class _Failure:
+    """Negative cache entry."""
+
+    __slots__ = ("reason",)
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+def cache_key(ip: str, by_prefix: bool = GEO_CACHE_BY_PREFIX) -> str:
+    """Cache key for an IP: the address itself, or its /24 (IPv4) or /48 (IPv6) network."""
+    if not by_prefix:
+        return ip
+    address = ipaddress.ip_address(ip)
+    prefix = IPV4_PREFIX_LENGTH if address.version == 4 else IPV6_PREFIX_LENGTH
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class GeoResolver:
+    """Cached, single-flight resolver of IP -> {"country", "city"}."""
+
+    def __init__(
+        self,
+        fetch: Optional[Callable[[str], Awaitable[dict]]] = None,
+        max_entries: int = GEO_CACHE_MAX_ENTRIES,
+        ttl: float = GEO_CACHE_TTL,
+        negative_ttl: float = GEO_NEGATIVE_CACHE_TTL,
+        by_prefix: bool = GEO_CACHE_BY_PREFIX,
+        db: Optional[GeoDatabase] = None,
+        http_fallback: bool = GEO_HTTP_FALLBACK,
+    ):
+        self.db = db
+        self.http_fallback = http_fallback
+        self.cache = TTLCache(max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.by_prefix = by_prefix
+        self._fetch = fetch or self._fetch_from_api
+        self._inflight: Dict[str, "asyncio.Task[dict]"] = {}
+        self._client: Optional["httpx.AsyncClient"] = None
+        self.upstream_calls = 0
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Pooled client shared by every lookup (keeps connections to the geo API warm)."""
+        import httpx
+
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=GEO_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def _fetch_from_api(self, ip: str) -> dict:
+        response = await self.client.get(f"{GEO_API_URL}/{ip}")
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "fail":
+            raise GeoLookupError(data.get("message") or "lookup failed")
+        return {
+            "country": (data.get("countryCode") or "").upper(),
+            "city": (data.get("city") or ""),
+        }
+
+    async def _resolve(self, key: str, ip: str) -> dict:
+        self.upstream_calls += 1
+        try:
+            info = await self._fetch(ip)
+        except Exception as exc:
+            self.cache.set(key, _Failure(str(exc) or exc.__class__.__name__), self.negative_ttl)
+            raise GeoLookupError(f"Geo lookup failed for {ip}: {exc}") from exc
+        self.cache.set(key, info, self.ttl)
+        return info
+
+    async def lookup(self, ip: str) -> dict:
+        """
+        Resolve the location of an IP.
+
+        Raises:
+            GeoLookupError: If the IP is invalid or the lookup failed (recently)
+        """
+        if self.db is not None:
+            try:
+                info = self.db.lookup(ip)
+            except ValueError as exc:
+                raise GeoLookupError(f"Invalid IP address: {ip!r}") from exc
+            if info is not None:
+                return info
+            if not self.http_fallback:
+                raise GeoLookupError(f"{ip} not found in the geo database")
+
+        try:
+            key = cache_key(ip, self.by_prefix)
+        except ValueError as exc:
+            raise GeoLookupError(f"Invalid IP address: {ip!r}") from exc
+
+        hit = self.cache.get(key)
+        if hit is not MISSING:
+            if isinstance(hit, _Failure):
+                raise GeoLookupError(f"Geo lookup failed recently for {ip}: {hit.reason}")
+            return hit
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(key, ip))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so a cancelled request does not cancel the lookup other requests wait on
+        return await asyncio.shield(task)
+
+    async def warm_connection(self) -> Optional[int]:
+        """Open the pooled connection to the geo API; None when lookups never reach it."""
+        if self.db is not None and not self.http_fallback:
+            return None
+        # Any status will do: what matters is the keep-alive connection left in the pool
+        response = await self.client.head(GEO_API_URL)
+        return response.status_code
+
+    async def load_database(self, path: str = GEO_DB_PATH) -> None:
+        """Open the offline database (compiling a CSV can take a while, so off the event loop)."""
+        if not path:
+            return
+        try:
+            self.db = await asyncio.to_thread(GeoDatabase, path)
+        except Exception as exc:
+            logger.error("Could not load geo database %s: %s", path, exc)
+
+    async def run_reloader(self, interval_seconds: float = GEO_DB_RELOAD_INTERVAL) -> None:
+        """Background task that hot-reloads the offline database when its file changes."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            db = self.db
+            if db is None:
+                continue
+            try:
+                table = await asyncio.to_thread(db.load_if_changed)
+            except Exception as exc:
+                logger.error("Could not reload geo database %s: %s", db.source_path, exc)
+                continue
+            if table is not None:
+                # Swapped on the event loop so no lookup is reading the old table while it closes
+                db.swap(table)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+geo_resolver = GeoResolver()
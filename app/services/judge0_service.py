@@ -1,14 +1,54 @@
-import httpx
+import asyncio
+import logging
 import os
+import time
+from app.config import load_environment
 from app.utils.decoder import decode_base64
-from dotenv import load_dotenv
+from app.utils.server_timing import phase
+
+load_environment()
+
+logger = logging.getLogger(__name__)
+
+# Override to point at a local stand-in (standins/judge0_server.py)
+JUDGE0_API = os.getenv("JUDGE0_API_URL", "https://judge0-ce.p.rapidapi.com").rstrip("/")
+# The catalogue changes with Judge0 releases, not between requests
+JUDGE0_LANGUAGES_TTL = int(os.getenv("JUDGE0_LANGUAGES_TTL", "3600"))
+
+_client = None
+_client_loop = None
+# (JUDGE0_API, expires at, languages)
+_languages = None
+
+def get_client():
+    """
+    Pooled client shared by every Judge0 call, so the TLS connection to RapidAPI is
+    reused instead of handshaking (and loading the CA bundle) on each request.
+    Recreated if the event loop changed (scripts and tests that call asyncio.run repeatedly).
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        import httpx  # preloaded at startup (app/utils/startup.py), not at import
+
+        _client = httpx.AsyncClient()
+        _client_loop = loop
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def get_languages(refresh: bool = False):
+    """Get all active languages from Judge0 API (cached for JUDGE0_LANGUAGES_TTL seconds)"""
+    global _languages
+    if not refresh and _languages is not None:
+        api, expires_at, languages = _languages
+        if api == JUDGE0_API and time.monotonic() < expires_at:
+            return languages
 
-load_dotenv()
-
-JUDGE0_API = "https://judge0-ce.p.rapidapi.com"
-
-async def get_languages():
-    """Get all active languages from Judge0 API"""
     API_KEY = os.getenv("JUDGE0_API_KEY")
     if not API_KEY:
         raise Exception("JUDGE0_API_KEY environment variable not set")
@@ -19,13 +59,14 @@ async def get_languages():
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{JUDGE0_API}/languages",
-            headers=headers
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().get(
+        f"{JUDGE0_API}/languages",
+        headers=headers
+    )
+    response.raise_for_status()
+    languages = response.json()
+    _languages = (JUDGE0_API, time.monotonic() + JUDGE0_LANGUAGES_TTL, languages)
+    return languages
 
 # Curated language selection - one stable/LTS version per language
 SUPPORTED_LANGUAGES = {
@@ -68,7 +109,6 @@ def get_supported_languages():
 async def execute_code(language_id: int, source_code: str, stdin: str = ""):
     """Execute code using Judge0 API - replicates frontend logic"""
     API_KEY = os.getenv("JUDGE0_API_KEY")
-    print(f"DEBUG - API_KEY: {API_KEY}")
     if not API_KEY:
         raise Exception("JUDGE0_API_KEY environment variable not set")
 
@@ -78,89 +118,89 @@ async def execute_code(language_id: int, source_code: str, stdin: str = ""):
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient() as client:
-        # 1. Submit code to Judge0
-        submit_payload = {
-            "language_id": language_id,
-            "source_code": source_code,
-            "stdin": stdin
-        }
+    client = get_client()
+    # 1. Submit code to Judge0
+    submit_payload = {
+        "language_id": language_id,
+        "source_code": source_code,
+        "stdin": stdin
+    }
 
+    with phase("judge0_submit"):
         submit_response = await client.post(
             f"{JUDGE0_API}/submissions",
             json=submit_payload,
             headers=headers
         )
-        submit_response.raise_for_status()
-        token = submit_response.json()["token"]
+    submit_response.raise_for_status()
+    token = submit_response.json()["token"]
 
-        # 2. Poll for submission results until completion
-        import asyncio
-        max_attempts = 30  # Maximum polling attempts
-        delay = 1  # Delay between polls in seconds
+    # 2. Poll for submission results until completion
+    max_attempts = 30  # Maximum polling attempts
+    delay = 1  # Delay between polls in seconds
 
-        for attempt in range(max_attempts):
+    for attempt in range(max_attempts):
+        with phase(f"judge0_poll_{attempt + 1}"):
             result_response = await client.get(
                 f"{JUDGE0_API}/submissions/{token}?base64_encoded=true",
                 headers=headers
             )
-            result_response.raise_for_status()
-            result = result_response.json()
-
-            status = result.get("status", {})
-            status_id = status.get("id")
-
-            # Status IDs: 1=In Queue, 2=Processing, 3=Accepted, 4=Wrong Answer, 5=Time Limit Exceeded, etc.
-            # We continue polling while status is 1 (In Queue) or 2 (Processing)
-            if status_id not in [1, 2]:
-                break
-
-            print(f"DEBUG - Polling attempt {attempt + 1}, status: {status.get('description')}")
-            await asyncio.sleep(delay)
-
-        # 3. Process response (replicating frontend logic from Playground.jsx)
-        submission_stdout = result.get("stdout")
-        submission_stderr = result.get("stderr")
-        submission_compile_output = result.get("compile_output")
-        submission_status = result.get("status", {}).get("description")
-
-        # Debug logging
-        print(f"DEBUG - stdout: {submission_stdout}")
-        print(f"DEBUG - stderr: {submission_stderr}")
-        print(f"DEBUG - compile_output: {submission_compile_output}")
-        print(f"DEBUG - status: {submission_status}")
-
-        # Handle different output scenarios like frontend does
-        if submission_compile_output:
-            # Compilation error
-            return {
-                "status": submission_status,
-                "stdout": None,
-                "stderr": None,
-                "compile_output": decode_base64(submission_compile_output),
-                "time": None,
-                "memory": None,
-                "exit_code": result.get("exit_code")
-            }
-        elif submission_stderr:
-            # Runtime error
-            return {
-                "status": submission_status,
-                "stdout": None,
-                "stderr": decode_base64(submission_stderr),
-                "compile_output": None,
-                "time": result.get("time"),
-                "memory": result.get("memory"),
-                "exit_code": result.get("exit_code")
-            }
-        else:
-            # Success case
-            return {
-                "status": submission_status,
-                "stdout": decode_base64(submission_stdout) if submission_stdout else None,
-                "stderr": None,
-                "compile_output": None,
-                "time": result.get("time"),
-                "memory": result.get("memory"),
-                "exit_code": result.get("exit_code")
-            }
\ No newline at end of file
+        result_response.raise_for_status()
+        result = result_response.json()
+
+        status = result.get("status", {})
+        status_id = status.get("id")
+
+        # Status IDs: 1=In Queue, 2=Processing, 3=Accepted, 4=Wrong Answer, 5=Time Limit Exceeded, etc.
+        # We continue polling while status is 1 (In Queue) or 2 (Processing)
+        if status_id not in [1, 2]:
+            break
+
+        logger.debug("Judge0 poll %d for %s: %s", attempt + 1, token, status.get("description"))
+        await asyncio.sleep(delay)
+
+    # 3. Process response (replicating frontend logic from Playground.jsx)
+    submission_stdout = result.get("stdout")
+    submission_stderr = result.get("stderr")
+    submission_compile_output = result.get("compile_output")
+    submission_status = result.get("status", {}).get("description")
+
+    logger.debug(
+        "Judge0 submission %s finished: status=%s stdout=%s stderr=%s compile_output=%s",
+        token, submission_status, submission_stdout, submission_stderr, submission_compile_output,
+    )
+
+    # Handle different output scenarios like frontend does
+    if submission_compile_output:
+        # Compilation error
+        return {
+            "status": submission_status,
+            "stdout": None,
+            "stderr": None,
+            "compile_output": decode_base64(submission_compile_output),
+            "time": None,
+            "memory": None,
+            "exit_code": result.get("exit_code")
+        }
+    elif submission_stderr:
+        # Runtime error
+        return {
+            "status": submission_status,
+            "stdout": None,
+            "stderr": decode_base64(submission_stderr),
+            "compile_output": None,
+            "time": result.get("time"),
+            "memory": result.get("memory"),
+            "exit_code": result.get("exit_code")
+        }
+    else:
+        # Success case
+        return {
+            "status": submission_status,
+            "stdout": decode_base64(submission_stdout) if submission_stdout else None,
+            "stderr": None,
+            "compile_output": None,
+            "time": result.get("time"),
+            "memory": result.get("memory"),
+            "exit_code": result.get("exit_code")
+        }
\ No newline at end of file
@@ -1,12 +1,54 @@
+import asyncio
 import os
-import requests
 import json
 from app.models.schemas import ChatMessage
+from app.services.automatic_prompts_service import get_automatic_system_prompt
+from app.services.chat_context import ChatContext
+from app.services.verdict_chain import build_verdict_reasoning_prompt
+from app.utils.server_timing import phase
 from typing import List
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from app.config import load_environment
+
+load_environment()
+
+# Same variable the OpenAI SDK reads, so challenge_service follows it too (e.g. standins/openai_server.py)
+OPENAI_BASE_URL = (os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
+
+_client = None
+_client_loop = None
+
+def get_http_client():
+    """
+    Pooled async client for the Responses and chat completions calls: keeps the TLS
+    connection to OpenAI alive and never blocks the event loop while the model answers.
+    Recreated if the event loop changed (scripts and tests that call asyncio.run repeatedly).
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        import httpx  # preloaded at startup (app/utils/startup.py), not at import
+
+        _client = httpx.AsyncClient(timeout=60)
+        _client_loop = loop
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def probe_openai(timeout: float = 5) -> int:
+    """
+    Open the pooled connection with a metadata request (GET /models/gpt-5-mini):
+    authenticated like a real call but spends no tokens. Returns the HTTP status.
+    """
+    response = await get_http_client().get(
+        f"{OPENAI_BASE_URL}/models/gpt-5-mini",
+        headers=get_openai_headers(),
+        timeout=timeout,
+    )
+    return response.status_code
 
 def get_openai_headers():
     """Get OpenAI headers with proper authentication"""
@@ -61,48 +103,18 @@ RESTRICCIONES GENERALES:
 - Mantén cada interacción orientada a un siguiente paso práctico.
 - Estamos aquí para PROGRAMAR, no para charlar."""
 
-async def chat_with_openai(
-    messages: List[ChatMessage],
-    language_name: str = "JavaScript",
-    exercise_in_progress: bool = False,
-    temperature: float = 0.5,
-    max_tokens: int = 400,
-    presence_penalty: float = 0,
-    frequency_penalty: float = 0.2,
-    top_p: float = 0.9,
-    is_automatic: bool = False,
-    current_code: str = "",
-    exercise_name_snapshot: str = "",
-    exercise_description_snapshot: str = "",
-    execution_output: str = "",
-    finished: bool = False
-) -> str:
-    """Chat with OpenAI GPT using the FluentReflect system prompt"""
-
-    if finished and not is_automatic:
-        raise ValueError("Finished verdict flow must be requested as an automatic prompt")
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise Exception("OPENAI_API_KEY environment variable not set")
-
-    # Prepare messages for OpenAI API
+def build_openai_messages(context: ChatContext) -> List[dict]:
+    """Build the system prompt(s) plus conversation for a request context."""
     openai_messages = []
+    language_name = context.language_name
 
     # Handle automatic prompts with special system prompts
-    if is_automatic:
-        from app.services.automatic_prompts_service import detect_automatic_prompt_type, get_automatic_system_prompt
-
-        # Get the user message content to detect prompt type
-        user_message_content = ""
-        if messages and messages[-1].role == "user":
-            user_message_content = messages[-1].content
-
-        prompt_type = detect_automatic_prompt_type(user_message_content, finished)
+    if context.is_automatic:
+        prompt_type = context.prompt_type
 
         if prompt_type:
             # Use specialized system prompt for automatic prompts
-            system_prompt = get_automatic_system_prompt(prompt_type, language_name, current_code, exercise_name_snapshot, execution_output)
+            system_prompt = get_automatic_system_prompt(prompt_type, language_name, context.current_code, context.exercise_name_snapshot, context.execution_output)
             openai_messages.append({
                 "role": "system",
                 "content": system_prompt
@@ -110,14 +122,13 @@ async def chat_with_openai(
 
             # Inject deliberate reasoning flow for verdicts
             if prompt_type == "EXERCISE_VERDICT":
-                from app.services.verdict_chain import build_verdict_reasoning_prompt
-
                 reasoning_prompt = build_verdict_reasoning_prompt(
                     language_name=language_name,
-                    exercise_name_snapshot=exercise_name_snapshot,
-                    exercise_description_snapshot=exercise_description_snapshot,
-                    current_code=current_code,
-                    execution_output=execution_output,
+                    exercise_name_snapshot=context.exercise_name_snapshot,
+                    exercise_description_snapshot=context.exercise_description_snapshot,
+                    current_code=context.current_code,
+                    execution_output=context.execution_output,
+                    decoded_description=context.exercise_description,
                 )
 
                 openai_messages.append({
@@ -133,50 +144,112 @@ async def chat_with_openai(
             })
     else:
         # Normal system prompt for regular conversations
-        language_specific_prompt = f"{SYSTEM_PROMPT}\n\nIMPORTANTE: El usuario está trabajando con {language_name}. Todos los ejemplos de código, explicaciones y soluciones deben estar basados en {language_name}."
+        prompt_parts = [f"{SYSTEM_PROMPT}\n\nIMPORTANTE: El usuario está trabajando con {language_name}. Todos los ejemplos de código, explicaciones y soluciones deben estar basados en {language_name}."]
 
         # Add current code context if available
+        current_code = context.current_code
         if current_code and current_code.strip():
-            language_specific_prompt += f"\n\n📝 CÓDIGO ACTUAL EN EL EDITOR:\n```{language_name.lower()}\n{current_code}\n```\n\n🎯 INSTRUCCIONES IMPORTANTES:\n- SIEMPRE refiere a este código específico cuando el usuario pregunte\n- Analiza línea por línea lo que está implementado y lo que falta\n- Menciona elementos específicos del código (nombres de variables, funciones, comentarios)\n- Si hay comentarios como '// TU CÓDIGO AQUÍ', mencionalo directamente\n- Si hay test cases, analízalos y úsalos para explicar qué debería hacer la función"
+            prompt_parts.append(f"\n\n📝 CÓDIGO ACTUAL EN EL EDITOR:\n```{language_name.lower()}\n{current_code}\n```\n\n🎯 INSTRUCCIONES IMPORTANTES:\n- SIEMPRE refiere a este código específico cuando el usuario pregunte\n- Analiza línea por línea lo que está implementado y lo que falta\n- Menciona elementos específicos del código (nombres de variables, funciones, comentarios)\n- Si hay comentarios como '// TU CÓDIGO AQUÍ', mencionalo directamente\n- Si hay test cases, analízalos y úsalos para explicar qué debería hacer la función")
 
         # Add exercise state context
-        if exercise_in_progress:
-            language_specific_prompt += "\n\n🎯 ESTADO ACTUAL: Hay un ejercicio en curso. NO ofrezcas nuevos ejercicios. Enfócate en ayudar con el ejercicio actual: responder preguntas, dar pistas, revisar código, etc."
+        if context.exercise_active:
+            prompt_parts.append("\n\n🎯 ESTADO ACTUAL: Hay un ejercicio en curso. NO ofrezcas nuevos ejercicios. Enfócate en ayudar con el ejercicio actual: responder preguntas, dar pistas, revisar código, etc.")
         else:
-            language_specific_prompt += "\n\n🚀 ESTADO ACTUAL: No hay ejercicio activo. Tu objetivo es SIEMPRE proponer ejercicios concretos. Si el usuario pregunta sobre conceptos, sugiere inmediatamente un ejercicio relacionado."
+            prompt_parts.append("\n\n🚀 ESTADO ACTUAL: No hay ejercicio activo. Tu objetivo es SIEMPRE proponer ejercicios concretos. Si el usuario pregunta sobre conceptos, sugiere inmediatamente un ejercicio relacionado.")
 
         # Add system prompt
         openai_messages.append({
             "role": "system",
-            "content": language_specific_prompt
+            "content": "".join(prompt_parts)
         })
 
-    # Add user messages
-    for message in messages:
-        openai_messages.append({
-            "role": message.role,
-            "content": message.content
-        })
+    # Add user messages (already normalized to dicts by the context)
+    openai_messages.extend(context.messages)
+    return openai_messages
 
-    try:
-        # Try GPT-5-mini first, fallback to standard chat endpoint if not available
-        BASE_URL = "https://api.openai.com/v1/responses"
-        headers = get_openai_headers()
 
+_ROLE_PREFIXES = {"system": "SYSTEM", "user": "USER", "assistant": "ASSISTANT"}
+
+
+def build_responses_input(openai_messages: List[dict]) -> str:
+    """Flatten messages into the single input string used by the Responses API."""
+    return "\n\n".join(
+        f"{_ROLE_PREFIXES[msg['role']]}: {msg['content']}"
+        for msg in openai_messages
+        if msg["role"] in _ROLE_PREFIXES
+    ).strip()
+
+
+async def chat_with_openai(
+    messages: List[ChatMessage],
+    language_name: str = "JavaScript",
+    exercise_in_progress: bool = False,
+    temperature: float = 0.5,
+    max_tokens: int = 400,
+    presence_penalty: float = 0,
+    frequency_penalty: float = 0.2,
+    top_p: float = 0.9,
+    is_automatic: bool = False,
+    current_code: str = "",
+    exercise_name_snapshot: str = "",
+    exercise_description_snapshot: str = "",
+    execution_output: str = "",
+    finished: bool = False
+) -> str:
+    """Chat with OpenAI GPT using the FluentReflect system prompt"""
+
+    context = ChatContext.build(
+        messages,
+        language_name,
+        is_automatic=is_automatic,
+        finished=finished,
+        exercise_active=exercise_in_progress,
+        current_code=current_code,
+        execution_output=execution_output,
+        exercise_name_snapshot=exercise_name_snapshot,
+        exercise_description_snapshot=exercise_description_snapshot,
+    )
+    return await chat_with_context(
+        context,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        presence_penalty=presence_penalty,
+        frequency_penalty=frequency_penalty,
+        top_p=top_p,
+    )
+
+
+async def chat_with_context(
+    context: ChatContext,
+    temperature: float = 0.5,
+    max_tokens: int = 400,
+    presence_penalty: float = 0,
+    frequency_penalty: float = 0.2,
+    top_p: float = 0.9,
+) -> str:
+    """Chat with OpenAI for a request context built once at the route boundary"""
+
+    if context.finished and not context.is_automatic:
+        raise ValueError("Finished verdict flow must be requested as an automatic prompt")
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise Exception("OPENAI_API_KEY environment variable not set")
+
+    with phase("prompt"):
+        openai_messages = build_openai_messages(context)
         # Convert messages to the proper format for gpt-5-mini
         # Combine system and user messages into a single input string
-        input_content = ""
+        input_content = build_responses_input(openai_messages)
+    is_automatic = context.is_automatic
 
-        for msg in openai_messages:
-            if msg["role"] == "system":
-                input_content += f"SYSTEM: {msg['content']}\n\n"
-            elif msg["role"] == "user":
-                input_content += f"USER: {msg['content']}\n\n"
-            elif msg["role"] == "assistant":
-                input_content += f"ASSISTANT: {msg['content']}\n\n"
+    import httpx  # preloaded at startup (app/utils/startup.py), not at import
 
-        # Remove trailing newlines
-        input_content = input_content.strip()
+    client = get_http_client()
+    try:
+        # Try GPT-5-mini first, fallback to standard chat endpoint if not available
+        BASE_URL = f"{OPENAI_BASE_URL}/responses"
+        headers = get_openai_headers()
 
         # Select reasoning effort with optional env override for verdict-only escalation
         reasoning_effort = "minimal"
@@ -194,16 +267,17 @@ async def chat_with_openai(
             "reasoning": {"effort": reasoning_effort}  # Minimal by default; allow low via env for verdicts
         }
 
-        response = requests.post(
-            BASE_URL,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=60
-        )
+        with phase("llm"):
+            response = await client.post(
+                BASE_URL,
+                headers=headers,
+                content=json.dumps(payload),
+                timeout=60
+            )
 
         if response.status_code == 404 or response.status_code == 401:
             # Fallback to standard chat/completions endpoint with gpt-4
-            fallback_url = "https://api.openai.com/v1/chat/completions"
+            fallback_url = f"{OPENAI_BASE_URL}/chat/completions"
             fallback_payload = {
                 "model": "gpt-4",
                 "messages": openai_messages,
@@ -214,12 +288,13 @@ async def chat_with_openai(
                 "top_p": top_p
             }
 
-            response = requests.post(
-                fallback_url,
-                headers=headers,
-                data=json.dumps(fallback_payload),
-                timeout=60
-            )
+            with phase("llm_fallback"):
+                response = await client.post(
+                    fallback_url,
+                    headers=headers,
+                    content=json.dumps(fallback_payload),
+                    timeout=60
+                )
 
         response.raise_for_status()
         data = response.json()
@@ -243,7 +318,7 @@ async def chat_with_openai(
 
         return result_text
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"HTTP request error: {str(e)}")
     except Exception as e:
         raise Exception(f"API error: {str(e)}")
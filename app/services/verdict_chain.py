@@ -20,6 +20,7 @@ def build_verdict_reasoning_prompt(
     exercise_description_snapshot: str | None = None,
     current_code: str,
     execution_output: str,
+    decoded_description: str | None = None,
 ) -> str:
     """Return an additional system prompt enforcing the structured verdict reasoning.
 
@@ -31,9 +32,9 @@ def build_verdict_reasoning_prompt(
     TODO: Los snapshots son fuente de verdad prioritaria sobre cualquier contexto conversacional.
     """
 
-    # Decodificar descripción base64 para contexto del ejercicio (snapshot-first)
-    decoded_description = None
-    if exercise_description_snapshot:
+    # Decodificar descripción base64 para contexto del ejercicio (snapshot-first),
+    # salvo que el ChatContext ya la haya decodificado
+    if decoded_description is None and exercise_description_snapshot:
         try:
             decoded_description = base64.b64decode(exercise_description_snapshot).decode("utf-8")
         except Exception:
@@ -0,0 +1,178 @@
+"""
+Startup warm-up, and the readiness state behind ``GET /ready``.
+
+A cold instance pays several one-off costs on its first requests: importing the
+SDKs, the first render of every template, and opening a TLS connection to each
+upstream. ``warm_up()`` runs in the lifespan, right after the server starts
+listening, and pays them before real traffic arrives:
+
+1. ``imports``: ``preload_modules()`` (app/utils/startup.py);
+2. ``templates``: renders one challenge template per curated language and builds
+   every automatic and verdict prompt once;
+3. the upstream probes, concurrently and each capped at ``WARMUP_TIMEOUT_SECONDS``.
+   They open the pooled connections the request path reuses and spend no quota:
+
+   - ``judge0``: ``GET /languages``, which also fills the language catalogue cache;
+   - ``openai``: ``GET /models/gpt-5-mini``, a metadata call that costs no tokens;
+   - ``geo``: ``HEAD`` on the geo API, skipped when the offline database answers alone.
+
+``/ready`` answers 503 until the warm-up has finished, then 200, also when an
+upstream probe failed: an OpenAI or Judge0 outage must not keep the instance out
+of rotation, its requests fail and retry as before. Each step's outcome and
+duration is reported in the ``/ready`` body and on ``/metrics``.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from app.services import judge0_service, openai_service
+from app.services.automatic_prompts_service import get_automatic_system_prompt
+from app.services.challenge_templates import render_template
+from app.services.geo_service import geo_resolver
+from app.services.judge0_service import SUPPORTED_LANGUAGES
+from app.services.verdict_chain import build_verdict_reasoning_prompt
+from app.utils.metrics import gauge
+from app.utils.startup import PRELOAD_MODULES, preload_modules
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "10"))
+WARMUP_UPSTREAMS = tuple(name.strip() for name in os.getenv("WARMUP_UPSTREAMS", "judge0,openai,geo").split(",") if name.strip())
+
+AUTOMATIC_PROMPT_TYPES = ("INIT_INTERVIEW", "HINT_REQUEST", "EXERCISE_END", "EXERCISE_VERDICT")
+SAMPLE_CHALLENGE = {
+    "title": "Suma de dos números",
+    "function_name": "sumTwo",
+    "description": "Retorna la suma de a y b.",
+    "constraints": ["-1000 <= a, b <= 1000"],
+    "test_cases": [{"input": "2, 3", "expected": "5"}],
+}
+
+app_ready = gauge("app_ready", "1 once the startup warm-up has finished")
+warmup_step_seconds = gauge("warmup_step_seconds", "Duration of each startup warm-up step", ("step",))
+warmup_step_ok = gauge("warmup_step_ok", "1 if the warm-up step succeeded (or was skipped), 0 if it failed", ("step",))
+
+
+class SkipStep(Exception):
+    """The step does not apply to this configuration (e.g. no API key)."""
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Dict[str, object]] = {}
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.finished_at = time.time()
+        app_ready.set(1)
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "status": "ready" if self.ready else "warming",
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+        }
+
+
+def prime_templates() -> int:
+    """First render of every template and prompt; returns how many were built."""
+    built = 0
+    for info in SUPPORTED_LANGUAGES.values():
+        render_template(SAMPLE_CHALLENGE, info["name"])
+        for prompt_type in AUTOMATIC_PROMPT_TYPES:
+            get_automatic_system_prompt(prompt_type, info["name"], "", SAMPLE_CHALLENGE["title"], "")
+        build_verdict_reasoning_prompt(
+            language_name=info["name"],
+            exercise_name_snapshot=SAMPLE_CHALLENGE["title"],
+            exercise_description_snapshot=SAMPLE_CHALLENGE["description"],
+            current_code="",
+            execution_output="",
+        )
+        built += 2 + len(AUTOMATIC_PROMPT_TYPES)
+    return built
+
+
+async def probe_judge0() -> str:
+    if not os.getenv("JUDGE0_API_KEY"):
+        raise SkipStep("JUDGE0_API_KEY not set")
+    languages = await judge0_service.get_languages(refresh=True)
+    return f"{len(languages)} languages"
+
+
+async def probe_openai() -> str:
+    if not os.getenv("OPENAI_API_KEY"):
+        raise SkipStep("OPENAI_API_KEY not set")
+    status = await openai_service.probe_openai(WARMUP_TIMEOUT_SECONDS)
+    return f"HTTP {status}"
+
+
+async def probe_geo() -> str:
+    status = await geo_resolver.warm_connection()
+    if status is None:
+        raise SkipStep("offline geo database without HTTP fallback")
+    return f"HTTP {status}"
+
+
+PROBES: Dict[str, Callable[[], Awaitable[str]]] = {
+    "judge0": probe_judge0,
+    "openai": probe_openai,
+    "geo": probe_geo,
+}
+
+
+async def _run_step(state: WarmupState, name: str, step: Awaitable, timeout: Optional[float] = None) -> None:
+    started = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(step, timeout)
+        outcome = {"status": "ok", "detail": detail}
+    except SkipStep as exc:
+        outcome = {"status": "skipped", "detail": str(exc)}
+    except asyncio.TimeoutError:
+        outcome = {"status": "failed", "detail": f"timed out after {timeout:g}s"}
+    except Exception as exc:
+        outcome = {"status": "failed", "detail": str(exc) or exc.__class__.__name__}
+    seconds = time.perf_counter() - started
+    if outcome["status"] == "failed":
+        logger.warning("Warm-up step %s failed after %.2f s: %s", name, seconds, outcome["detail"])
+    state.steps[name] = {**outcome, "seconds": round(seconds, 4)}
+    warmup_step_seconds.set(seconds, step=name)
+    warmup_step_ok.set(0 if outcome["status"] == "failed" else 1, step=name)
+
+
+async def warm_up(
+    state: Optional[WarmupState] = None,
+    modules: Iterable[str] = PRELOAD_MODULES,
+    upstreams: Iterable[str] = WARMUP_UPSTREAMS,
+    timeout: float = WARMUP_TIMEOUT_SECONDS,
+) -> WarmupState:
+    """Run every step in order and mark ``state`` ready, whatever their outcome."""
+    state = state or warmup_state
+    state.started_at = time.time()
+    try:
+        # Los imports primero: las pruebas usan httpx
+        await _run_step(state, "imports", preload_modules(modules))
+        await _run_step(state, "templates", _prime_templates_step())
+        probes = [name for name in upstreams if name in PROBES]
+        await asyncio.gather(*(_run_step(state, name, PROBES[name](), timeout) for name in probes))
+    finally:
+        state.mark_ready()
+    logger.info(
+        "Warm-up finished in %.2f s: %s",
+        state.finished_at - state.started_at,
+        ", ".join(f"{name} {step['status']}" for name, step in state.steps.items()),
+    )
+    return state
+
+
+async def _prime_templates_step() -> str:
+    return f"{await asyncio.to_thread(prime_templates)} built"
+
+
+warmup_state = WarmupState()
@@ -2,9 +2,17 @@
 Utilidades para transformar entre camelCase y snake_case
 """
 import re
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Any, Callable, Dict
 
+# Key vocabularies are tiny (a few dozen field names), so conversions are memoized
+KEY_CACHE_SIZE = 4096
 
+_FIRST_CAP_RE = re.compile('(.)([A-Z][a-z]+)')
+_ALL_CAP_RE = re.compile('([a-z0-9])([A-Z])')
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def camel_to_snake(name: str) -> str:
     """
     Convierte camelCase a snake_case
@@ -15,11 +23,12 @@ def camel_to_snake(name: str) -> str:
         canGenerateExercise -> can_generate_exercise
     """
     # Insertar un guión bajo antes de cualquier mayúscula que siga a una minúscula
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+    s1 = _FIRST_CAP_RE.sub(r'\1_\2', name)
     # Insertar un guión bajo antes de cualquier mayúscula que siga a una minúscula o número
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+    return _ALL_CAP_RE.sub(r'\1_\2', s1).lower()
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def snake_to_camel(name: str) -> str:
     """
     Convierte snake_case a camelCase
@@ -33,53 +42,82 @@ def snake_to_camel(name: str) -> str:
     return components[0] + ''.join(word.capitalize() for word in components[1:])
 
 
-def transform_dict_keys_to_snake(data: Dict[str, Any]) -> Dict[str, Any]:
+def _holds_dict(root: list, memo: Dict[int, bool]) -> bool:
     """
-    Transforma todas las claves de un diccionario de camelCase a snake_case
+    Whether ``root`` holds a dict, directly or in nested lists.
+
+    Post-order walk with an explicit stack; the answer for every sublist is kept in
+    ``memo`` (by id) so each list is scanned once per transform.
+    """
+    if id(root) in memo:
+        return memo[id(root)]
+    stack = [(root, False)]
+    while stack:
+        items, scanned = stack.pop()
+        if scanned:
+            memo[id(items)] = any(
+                isinstance(item, dict) or (isinstance(item, list) and memo[id(item)]) for item in items
+            )
+            continue
+        stack.append((items, True))
+        stack.extend((item, False) for item in items if isinstance(item, list) and id(item) not in memo)
+    return memo[id(root)]
+
+
+def _transform_keys(data: Dict[str, Any], convert: Callable[[str], str]) -> Dict[str, Any]:
+    """
+    Rebuild ``data`` with every dict key passed through ``convert``.
+
+    Walks with an explicit stack instead of recursion, so nesting depth is not
+    bounded by the recursion limit. Only dicts, and lists that hold dicts, are
+    rebuilt; scalar-only lists and every other value are placed in the result
+    by reference.
     """
     if not isinstance(data, dict):
         return data
 
-    result = {}
-    for key, value in data.items():
-        new_key = camel_to_snake(key)
-
-        # Recursivamente transformar diccionarios anidados
-        if isinstance(value, dict):
-            result[new_key] = transform_dict_keys_to_snake(value)
-        elif isinstance(value, list):
-            # Transformar listas que contengan diccionarios
-            result[new_key] = [
-                transform_dict_keys_to_snake(item) if isinstance(item, dict) else item
-                for item in value
-            ]
+    result: Dict[str, Any] = {}
+    memo: Dict[int, bool] = {}
+    # (source container, empty target container of the same kind)
+    stack = [(data, result)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        source, target = pop()
+        if type(target) is dict:
+            for key, value in source.items():
+                if isinstance(value, dict):
+                    child = {}
+                    push((value, child))
+                    value = child
+                elif isinstance(value, list) and _holds_dict(value, memo):
+                    child = []
+                    push((value, child))
+                    value = child
+                target[convert(key)] = value
         else:
-            result[new_key] = value
-
+            append = target.append
+            for item in source:
+                if isinstance(item, dict):
+                    child = {}
+                    push((item, child))
+                    item = child
+                elif isinstance(item, list) and _holds_dict(item, memo):
+                    child = []
+                    push((item, child))
+                    item = child
+                append(item)
     return result
 
 
-def transform_dict_keys_to_camel(data: Dict[str, Any]) -> Dict[str, Any]:
+def transform_dict_keys_to_snake(data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Transforma todas las claves de un diccionario de snake_case a camelCase
+    Transforma todas las claves de un diccionario de camelCase a snake_case
     """
-    if not isinstance(data, dict):
-        return data
+    return _transform_keys(data, camel_to_snake)
 
-    result = {}
-    for key, value in data.items():
-        new_key = snake_to_camel(key)
-
-        # Recursivamente transformar diccionarios anidados
-        if isinstance(value, dict):
-            result[new_key] = transform_dict_keys_to_camel(value)
-        elif isinstance(value, list):
-            # Transformar listas que contengan diccionarios
-            result[new_key] = [
-                transform_dict_keys_to_camel(item) if isinstance(item, dict) else item
-                for item in value
-            ]
-        else:
-            result[new_key] = value
 
-    return result
\ No newline at end of file
+def transform_dict_keys_to_camel(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Transforma todas las claves de un diccionario de snake_case a camelCase
+    """
+    return _transform_keys(data, snake_to_camel)
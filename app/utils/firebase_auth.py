@@ -1,16 +1,44 @@
+import asyncio
+import hashlib
+import importlib.util
+import logging
 import os
-from typing import Optional
-
-try:
-    import firebase_admin  # type: ignore
-    from firebase_admin import auth, credentials  # type: ignore
-    _FIREBASE_AVAILABLE = True
-except ImportError:  # pragma: no cover
-    firebase_admin = None  # type: ignore
-    auth = None  # type: ignore
-    credentials = None  # type: ignore
-    _FIREBASE_AVAILABLE = False
-from fastapi import HTTPException, status
+import re
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.utils.ttl_cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Public x509 certs that sign Firebase ID tokens (rotated by Google every few hours)
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+FIREBASE_TOKEN_CACHE_SIZE = int(os.getenv("FIREBASE_TOKEN_CACHE_SIZE", "10000"))
+CLOCK_SKEW_SECONDS = 30
+# Refetch certs this long before Cache-Control says they expire
+CERT_REFRESH_MARGIN_SECONDS = 300
+CERT_RETRY_SECONDS = 60
+
+# firebase_admin and google.auth take ~0.25 s to import and most instances never
+# verify a token: they are imported on first use (or by the startup preload)
+_FIREBASE_AVAILABLE = importlib.util.find_spec("firebase_admin") is not None
+firebase_admin = None  # type: ignore
+auth = None  # type: ignore
+credentials = None  # type: ignore
+google_jwt = None  # type: ignore
+
+def _load_firebase() -> None:
+    global firebase_admin, auth, credentials, google_jwt
+    if firebase_admin is not None:
+        return
+    from firebase_admin import auth as _auth, credentials as _credentials  # type: ignore
+    from google.auth import jwt as _google_jwt  # type: ignore
+    import firebase_admin as _firebase_admin  # type: ignore
+    auth, credentials, google_jwt = _auth, _credentials, _google_jwt
+    # Last: firebase_admin set means everything is loaded
+    firebase_admin = _firebase_admin
 
 _initialized = False
 
@@ -18,6 +46,7 @@ def _init_if_needed():
     global _initialized
     if _initialized:
         return
+    _load_firebase()
     # Uses default application credentials (ADC) - in Cloud Run set GOOGLE_APPLICATION_CREDENTIALS or
     # mount secret JSON. If not present, will try metadata service credentials (not sufficient for Firebase).
     cred_path = os.getenv("FIREBASE_CREDENTIALS_JSON")
@@ -29,22 +58,167 @@ def _init_if_needed():
         firebase_admin.initialize_app()
     _initialized = True
 
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired Firebase ID token",
+    )
+
+# Verified claims by SHA-256 of the token, each kept until the token's own exp
+_token_cache = TTLCache(FIREBASE_TOKEN_CACHE_SIZE)
+
+def _token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+def _cached_claims(id_token: str) -> Optional[dict]:
+    claims = _token_cache.get(_token_key(id_token))
+    return None if claims is MISSING else claims
+
+def _cache_claims(id_token: str, claims: dict) -> None:
+    ttl = float(claims.get("exp", 0)) - time.time()
+    if ttl > 0:
+        _token_cache.set(_token_key(id_token), claims, ttl)
+
+def clear_token_cache() -> None:
+    global _token_cache
+    _token_cache = TTLCache(FIREBASE_TOKEN_CACHE_SIZE)
+
+
+class FirebaseCertCache:
+    """Google's token-signing certs, fetched ahead of expiry so verification never waits on them."""
+
+    def __init__(self, url: str = FIREBASE_CERTS_URL):
+        self.url = url
+        self.certs: Dict[str, str] = {}
+        self.expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def fresh(self) -> bool:
+        return bool(self.certs) and time.time() < self.expires_at
+
+    async def refresh(self) -> None:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else 3600
+        self.certs = response.json()
+        self.expires_at = time.time() + max_age
+
+    async def get(self) -> Dict[str, str]:
+        if not self.fresh:
+            async with self._lock:
+                if not self.fresh:
+                    await self.refresh()
+        return self.certs
+
+    async def run_refresher(self) -> None:
+        """Background task: resolve the project id, then keep certs fresh, refetching shortly before they expire."""
+        if not _FIREBASE_AVAILABLE:
+            return
+        try:
+            await resolve_project_id()
+        except Exception as exc:
+            logger.warning("Could not resolve the Firebase project id: %s", exc)
+        while True:
+            try:
+                await self.refresh()
+                delay = max(CERT_RETRY_SECONDS, self.expires_at - time.time() - CERT_REFRESH_MARGIN_SECONDS)
+            except Exception as exc:
+                logger.warning("Could not refresh Firebase certs: %s", exc)
+                delay = CERT_RETRY_SECONDS
+            await asyncio.sleep(delay)
+
+
+cert_cache = FirebaseCertCache()
+
+_project_id: Optional[str] = None
+
+def _get_project_id() -> Optional[str]:
+    global _project_id
+    if _project_id is None:
+        _project_id = os.getenv("FIREBASE_PROJECT_ID") or os.getenv("GOOGLE_CLOUD_PROJECT")
+        if not _project_id and _FIREBASE_AVAILABLE:
+            _init_if_needed()
+            _project_id = firebase_admin.get_app().project_id
+    return _project_id
+
+async def resolve_project_id() -> Optional[str]:
+    """``_get_project_id`` off the event loop: without an env var it imports and initializes firebase_admin."""
+    if _project_id is not None:
+        return _project_id
+    return await asyncio.to_thread(_get_project_id)
+
+def _verify_with_certs(id_token: str, certs: Dict[str, str], project_id: str) -> dict:
+    # Same checks as firebase_admin's verify_id_token, against prefetched certs (no network)
+    _load_firebase()
+    claims = google_jwt.decode(id_token, certs=certs, audience=project_id, clock_skew_in_seconds=CLOCK_SKEW_SECONDS)
+    if claims.get("iss") != f"https://securetoken.google.com/{project_id}":
+        raise ValueError("Token has an incorrect issuer")
+    subject = claims.get("sub")
+    if not isinstance(subject, str) or not subject or len(subject) > 128:
+        raise ValueError("Token has an invalid subject")
+    claims["uid"] = subject
+    return claims
+
 def verify_bearer_token(id_token: str) -> dict:
     if not _FIREBASE_AVAILABLE:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="firebase_admin not installed on server. Install firebase-admin and redeploy.",
         )
+    cached = _cached_claims(id_token)
+    if cached is not None:
+        return cached
     _init_if_needed()
     try:
-        decoded = auth.verify_id_token(id_token, clock_skew_seconds=30)
-        return decoded
+        decoded = auth.verify_id_token(id_token, clock_skew_seconds=CLOCK_SKEW_SECONDS)
     except Exception as exc:  # broad catch to avoid leaking internal errors
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired Firebase ID token",
-        ) from exc
+        raise _unauthorized() from exc
+    _cache_claims(id_token, decoded)
+    return decoded
+
+async def verify_bearer_token_async(id_token: str) -> dict:
+    """
+    Verify without blocking the event loop: cache hit (no crypto) → prefetched certs in a
+    worker thread → firebase_admin in a worker thread if the project id or certs are unavailable.
+    """
+    cached = _cached_claims(id_token)
+    if cached is not None:
+        return cached
+    if not _FIREBASE_AVAILABLE:
+        return verify_bearer_token(id_token)  # raises the 500 above
+
+    try:
+        project_id = await resolve_project_id()
+        certs = await cert_cache.get() if project_id else None
+    except Exception as exc:
+        logger.warning("Firebase certs unavailable, verifying with firebase_admin: %s", exc)
+        certs = None
+    if not certs:
+        return await asyncio.to_thread(verify_bearer_token, id_token)
+
+    try:
+        decoded = await asyncio.to_thread(_verify_with_certs, id_token, certs, project_id)
+    except Exception as exc:
+        raise _unauthorized() from exc
+    _cache_claims(id_token, decoded)
+    return decoded
 
 def get_uid(id_token: str) -> Optional[str]:
     data = verify_bearer_token(id_token)
     return data.get("uid")
+
+async def get_current_uid(request: Request) -> str:
+    """FastAPI dependency: uid of the caller's Firebase ID token (``Authorization: Bearer <token>``)."""
+    # Already verified by the admission pipeline when ADMISSION_REQUIRE_AUTH is on
+    claims = getattr(request.state, "firebase_claims", None)
+    if claims is None:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            raise _unauthorized()
+        claims = await verify_bearer_token_async(token.strip())
+    return claims["uid"]
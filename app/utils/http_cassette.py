@@ -0,0 +1,371 @@
+"""
+Record/replay of upstream HTTP traffic (OpenAI, Judge0, ip-api) for offline runs.
+
+A ``Cassette`` hooks the two HTTP stacks the code base uses: ``requests``
+(the scenario scripts) and ``httpx`` (``openai_service``, Judge0, the geo
+lookup and the OpenAI SDK behind ``challenge_service``). While active:
+
+- ``record``: requests go out as usual and each exchange is stored;
+- ``replay``: requests are answered from the file; an unknown request raises
+  ``CassetteMiss`` instead of reaching the network;
+- ``auto``: replay what is known, record what is not.
+
+Requests are matched on method, URL (query sorted) and body (JSON canonicalized,
+so key order does not matter); headers are not part of the key and only a few
+harmless response headers are stored, so API keys never reach the file. Repeated
+identical requests (Judge0 polling) replay in recorded order, and the last answer
+repeats once they run out.
+
+Each exchange keeps its original duration. ``latency_scale`` replays it (1.0 =
+as recorded, 0 = instantly), and ``summarize`` turns a cassette into per-endpoint
+latency and token figures that ``benchmarks/cassette_stats.py`` compares between
+recordings.
+
+    with Cassette("cassettes/verdict_chain.json", mode="replay").use():
+        run_suite(cases)
+
+Scripts can opt in through the environment with ``use_cassette_from_env()``:
+``HTTP_CASSETTE`` (file), ``HTTP_CASSETTE_MODE`` (default ``replay``) and
+``HTTP_CASSETTE_LATENCY`` (default ``0``).
+"""
+import asyncio
+import base64
+import contextlib
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import statistics
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay", "auto")
+CASSETTE_VERSION = 1
+# Solo se guardan estos headers de respuesta; nunca los de la request (API keys)
+KEPT_RESPONSE_HEADERS = ("content-type", "x-request-id", "openai-processing-ms", "retry-after")
+# Segmentos de ruta variables (tokens de Judge0, IPs) se agrupan en summarize()
+_VARIABLE_SEGMENT_RE = re.compile(r"^(?:[0-9a-f-]{16,}|[0-9.:]+)$", re.IGNORECASE)
+
+_install_lock = threading.Lock()
+_active: Optional["Cassette"] = None
+_originals: Dict[str, object] = {}
+
+
+class CassetteMiss(LookupError):
+    """A replayed request is not in the cassette."""
+
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit(str(url))
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def canonical_body(body) -> object:
+    """JSON bodies as sorted objects, anything else as text (or a digest when binary)."""
+    if body is None or body == b"" or body == "":
+        return None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        return json.loads(body)
+    except ValueError:
+        pass
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return "sha256:" + hashlib.sha256(body).hexdigest()
+
+
+def request_key(method: str, url: str, body) -> str:
+    payload = json.dumps(
+        [method.upper(), canonical_url(url), canonical_body(body)],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode_body(content: bytes, content_type: str) -> Dict[str, object]:
+    if "json" in content_type:
+        try:
+            return {"encoding": "json", "body": json.loads(content)}
+        except ValueError:
+            pass
+    try:
+        return {"encoding": "text", "body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"encoding": "base64", "body": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(response: Dict[str, object]) -> bytes:
+    encoding, body = response.get("encoding"), response.get("body")
+    if encoding == "json":
+        return json.dumps(body, ensure_ascii=False).encode("utf-8")
+    if encoding == "base64":
+        return base64.b64decode(body)
+    return (body or "").encode("utf-8")
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.interactions: List[dict] = []
+        self._by_key: Dict[str, List[dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.recorded = 0
+        if mode != "record" and os.path.exists(path):
+            self.load()
+        elif mode == "replay":
+            raise FileNotFoundError(f"cassette {path} does not exist; record it first")
+
+    # -- storage -----------------------------------------------------------
+
+    def load(self) -> None:
+        with open(self.path, encoding="utf-8") as handle:
+            document = json.load(handle)
+        for interaction in document.get("interactions", []):
+            self.interactions.append(interaction)
+            self._by_key.setdefault(interaction["key"], []).append(interaction)
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        document = {
+            "version": CASSETTE_VERSION,
+            "recorded": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "interactions": self.interactions,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2, ensure_ascii=False)
+            handle.write("\n")
+        os.replace(tmp_path, self.path)
+
+    # -- matching ----------------------------------------------------------
+
+    def lookup(self, method: str, url: str, body) -> Optional[dict]:
+        """Recorded exchange to answer with, or None when the request must go out.
+
+        Only loaded exchanges are candidates: what this session records is never
+        replayed to itself (a Judge0 poll must reach the server every time).
+        """
+        if self.mode == "record":
+            return None
+        key = request_key(method, url, body)
+        with self._lock:
+            candidates = self._by_key.get(key)
+            if not candidates:
+                if self.mode == "replay":
+                    raise CassetteMiss(f"{method.upper()} {canonical_url(url)} is not in {self.path}")
+                return None
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            self.hits += 1
+            return candidates[min(position, len(candidates) - 1)]
+
+    def record(self, method: str, url: str, body, status: int, headers, content: bytes, elapsed: float) -> None:
+        kept = {name: headers[name] for name in KEPT_RESPONSE_HEADERS if headers.get(name) is not None}
+        interaction = {
+            "key": request_key(method, url, body),
+            "request": {"method": method.upper(), "url": canonical_url(url), "body": canonical_body(body)},
+            "response": {"status": status, "headers": kept, **_encode_body(content, kept.get("content-type", ""))},
+            "elapsed_ms": round(elapsed * 1000, 3),
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+            self.recorded += 1
+
+    def replay_delay(self, interaction: dict) -> float:
+        return interaction.get("elapsed_ms", 0) / 1000 * self.latency_scale
+
+    # -- activation --------------------------------------------------------
+
+    @contextlib.contextmanager
+    def use(self) -> Iterator["Cassette"]:
+        """Install the HTTP hooks for the duration of the block; recordings are saved on exit."""
+        global _active
+        with _install_lock:
+            if _active is not None:
+                raise RuntimeError("another cassette is already active")
+            _install_hooks()
+            _active = self
+        try:
+            yield self
+        finally:
+            with _install_lock:
+                _active = None
+                _remove_hooks()
+            if self.recorded:
+                self.save()
+                logger.info("Cassette %s: %d exchanges recorded, %d replayed", self.path, self.recorded, self.hits)
+
+
+def use_cassette_from_env() -> contextlib.AbstractContextManager:
+    """``Cassette.use()`` configured by ``HTTP_CASSETTE*``, or a no-op when unset."""
+    path = os.getenv("HTTP_CASSETTE", "").strip()
+    if not path:
+        return contextlib.nullcontext()
+    mode = os.getenv("HTTP_CASSETTE_MODE", "replay").strip().lower()
+    if mode == "replay":
+        # Las llaves no viajan en una reproducción, pero los clientes exigen que existan
+        os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+        os.environ.setdefault("JUDGE0_API_KEY", "replay")
+    return Cassette(path, mode=mode, latency_scale=float(os.getenv("HTTP_CASSETTE_LATENCY", "0"))).use()
+
+
+# -- hooks -----------------------------------------------------------------
+
+def _install_hooks() -> None:
+    import httpx
+    import requests.adapters
+
+    _originals["requests"] = requests.adapters.HTTPAdapter.send
+    _originals["httpx"] = httpx.HTTPTransport.handle_request
+    _originals["httpx_async"] = httpx.AsyncHTTPTransport.handle_async_request
+    requests.adapters.HTTPAdapter.send = _requests_send
+    httpx.HTTPTransport.handle_request = _httpx_handle
+    httpx.AsyncHTTPTransport.handle_async_request = _httpx_handle_async
+
+
+def _remove_hooks() -> None:
+    import httpx
+    import requests.adapters
+
+    requests.adapters.HTTPAdapter.send = _originals.pop("requests")
+    httpx.HTTPTransport.handle_request = _originals.pop("httpx")
+    httpx.AsyncHTTPTransport.handle_async_request = _originals.pop("httpx_async")
+
+
+def _requests_response(interaction: dict, request):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    recorded = interaction["response"]
+    response = requests.Response()
+    response.status_code = recorded["status"]
+    response.headers = CaseInsensitiveDict(recorded.get("headers", {}))
+    response._content = _decode_body(recorded)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.reason = "Replayed"
+    response.elapsed = datetime.timedelta(milliseconds=interaction.get("elapsed_ms", 0))
+    return response
+
+
+def _requests_send(adapter, request, **kwargs):
+    cassette = _active
+    if cassette is None:
+        return _originals["requests"](adapter, request, **kwargs)
+    interaction = cassette.lookup(request.method, request.url, request.body)
+    if interaction is not None:
+        time.sleep(cassette.replay_delay(interaction))
+        return _requests_response(interaction, request)
+    started = time.perf_counter()
+    response = _originals["requests"](adapter, request, **kwargs)
+    content = response.content
+    cassette.record(request.method, request.url, request.body, response.status_code, response.headers, content, time.perf_counter() - started)
+    return response
+
+
+def _httpx_response(status: int, headers, content: bytes, request):
+    import httpx
+
+    # El cuerpo ya viene decodificado: sin content-encoding ni content-length originales
+    kept = [(name, value) for name, value in headers.items() if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+    return httpx.Response(status, headers=kept, content=content, request=request)
+
+
+def _httpx_handle(transport, request):
+    cassette = _active
+    if cassette is None:
+        return _originals["httpx"](transport, request)
+    body = request.read()
+    interaction = cassette.lookup(request.method, str(request.url), body)
+    if interaction is not None:
+        time.sleep(cassette.replay_delay(interaction))
+        recorded = interaction["response"]
+        return _httpx_response(recorded["status"], recorded.get("headers", {}), _decode_body(recorded), request)
+    started = time.perf_counter()
+    response = _originals["httpx"](transport, request)
+    try:
+        content = response.read()
+    finally:
+        response.close()
+    cassette.record(request.method, str(request.url), body, response.status_code, response.headers, content, time.perf_counter() - started)
+    return _httpx_response(response.status_code, response.headers, content, request)
+
+
+async def _httpx_handle_async(transport, request):
+    cassette = _active
+    if cassette is None:
+        return await _originals["httpx_async"](transport, request)
+    body = await request.aread()
+    interaction = cassette.lookup(request.method, str(request.url), body)
+    if interaction is not None:
+        await asyncio.sleep(cassette.replay_delay(interaction))
+        recorded = interaction["response"]
+        return _httpx_response(recorded["status"], recorded.get("headers", {}), _decode_body(recorded), request)
+    started = time.perf_counter()
+    response = await _originals["httpx_async"](transport, request)
+    try:
+        content = await response.aread()
+    finally:
+        await response.aclose()
+    cassette.record(request.method, str(request.url), body, response.status_code, response.headers, content, time.perf_counter() - started)
+    return _httpx_response(response.status_code, response.headers, content, request)
+
+
+# -- performance baseline --------------------------------------------------
+
+def endpoint_name(method: str, url: str) -> str:
+    """``POST api.openai.com/v1/responses``; tokens and IPs in the path become ``{id}``."""
+    parts = urlsplit(url)
+    segments = ["{id}" if _VARIABLE_SEGMENT_RE.match(segment) else segment for segment in parts.path.split("/")]
+    return f"{method.upper()} {parts.netloc}{'/'.join(segments)}"
+
+
+def summarize(interactions: List[dict]) -> Dict[str, Dict[str, float]]:
+    """Per-endpoint call count, recorded latency and token usage, in ``save_results`` shape."""
+    grouped: Dict[str, List[dict]] = {}
+    for interaction in interactions:
+        request = interaction["request"]
+        grouped.setdefault(endpoint_name(request["method"], request["url"]), []).append(interaction)
+
+    summary = {}
+    for name, group in grouped.items():
+        latencies = sorted(i.get("elapsed_ms", 0) * 1000 for i in group)
+        p95_index = min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)
+        usage = [i["response"]["body"].get("usage") or {} for i in group if isinstance(i["response"].get("body"), dict)]
+        stats = {
+            "calls": len(group),
+            "median_us": statistics.median(latencies),
+            "p95_us": latencies[p95_index],
+            "errors": sum(1 for i in group if i["response"]["status"] >= 400),
+        }
+        if usage:
+            stats["input_tokens"] = sum(u.get("input_tokens", u.get("prompt_tokens", 0)) for u in usage)
+            stats["output_tokens"] = sum(u.get("output_tokens", u.get("completion_tokens", 0)) for u in usage)
+            stats["reasoning_tokens"] = sum((u.get("output_tokens_details") or {}).get("reasoning_tokens", 0) for u in usage)
+        summary[name] = stats
+    return summary
+
+
+def load_interactions(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle).get("interactions", [])
@@ -0,0 +1,150 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A lifespan task sleeps ``LOOP_MONITOR_INTERVAL`` seconds at a time and measures
+how late it wakes up. The overshoot is how long other callbacks kept the loop
+busy, i.e. how long every request waited. It is exported on ``/metrics``:
+
+- ``event_loop_lag_seconds`` (histogram of every probe);
+- ``event_loop_lag_max_seconds`` (worst probe of the last ``LOOP_MONITOR_WINDOW`` probes);
+- ``event_loop_blocked_total`` / ``event_loop_blocked_seconds_total`` (probes over
+  ``LOOP_BLOCK_THRESHOLD_MS``).
+
+With ``LOOP_BLOCK_DEBUG=true`` a watchdog thread also notices a probe that is
+overdue by more than the threshold *while the loop is still blocked*, and grabs
+the loop thread's stack at that moment: the frame at the bottom is the blocking
+call (a synchronous ``requests.post``, a ``time.sleep``...). Each capture is
+logged as a warning and kept in ``loop_monitor.reports``. Stack capture costs a
+thread wake-up every half threshold, so it is meant for load tests and staging.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Deque, Dict, List, Optional
+
+from app.utils.metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.25"))
+LOOP_MONITOR_WINDOW = int(os.getenv("LOOP_MONITOR_WINDOW", "240"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCK_DEBUG = os.getenv("LOOP_BLOCK_DEBUG", "false").lower() == "true"
+LOOP_BLOCK_MAX_REPORTS = 100
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+lag_seconds = histogram("event_loop_lag_seconds", "Delay of the event-loop probe past its scheduled wake-up", buckets=LAG_BUCKETS)
+lag_max_seconds = gauge("event_loop_lag_max_seconds", "Worst event-loop probe delay over the recent window")
+blocked_total = counter("event_loop_blocked_total", "Event-loop probes delayed past LOOP_BLOCK_THRESHOLD_MS")
+blocked_seconds_total = counter("event_loop_blocked_seconds_total", "Total delay of the probes over LOOP_BLOCK_THRESHOLD_MS")
+
+
+def _blocking_site(frames: List[traceback.FrameSummary]) -> str:
+    """Innermost frame of our own code (``app/``), else the innermost frame."""
+    for frame in reversed(frames):
+        if f"{os.sep}app{os.sep}" in frame.filename and "loop_monitor" not in frame.filename:
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    frame = frames[-1]
+    return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+        capture_stacks: bool = LOOP_BLOCK_DEBUG,
+        window: int = LOOP_MONITOR_WINDOW,
+    ):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.capture_stacks = capture_stacks
+        self.recent: Deque[float] = collections.deque(maxlen=window)
+        self.reports: Deque[Dict[str, object]] = collections.deque(maxlen=LOOP_BLOCK_MAX_REPORTS)
+        # Hora (monotonic) en que la sonda debería despertar; None mientras no corre
+        self._due: Optional[float] = None
+        self._loop_thread_id: Optional[int] = None
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.recent, default=0.0)
+
+    def _record(self, lag: float, due: float) -> None:
+        self.recent.append(lag)
+        lag_seconds.observe(lag)
+        if lag > self.threshold:
+            blocked_total.inc()
+            blocked_seconds_total.inc(lag)
+            if self.reports and self.reports[-1]["due"] == due:
+                # El watchdog capturó este bloqueo en curso: ahora se sabe cuánto duró
+                self.reports[-1]["blocked_ms"] = round(lag * 1000, 1)
+            elif not self.capture_stacks:
+                logger.warning("Event loop blocked for %.0f ms", lag * 1000)
+
+    async def run(self) -> None:
+        """Probe forever; cancel the task to stop."""
+        self._loop_thread_id = threading.get_ident()
+        stop = threading.Event()
+        watchdog = None
+        if self.capture_stacks:
+            watchdog = threading.Thread(target=self._watch, args=(stop,), name="loop-watchdog", daemon=True)
+            watchdog.start()
+        lag_max_seconds.set_function(lambda: self.max_lag)
+        try:
+            while True:
+                due = self._due = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                self._record(max(0.0, time.monotonic() - due), due)
+        finally:
+            self._due = None
+            stop.set()
+            if watchdog is not None:
+                watchdog.join(timeout=1)
+
+    def _watch(self, stop: threading.Event) -> None:
+        """Watchdog thread: capture the loop thread's stack while a probe is overdue."""
+        reported_due = None
+        poll = max(self.threshold / 2, 0.005)
+        while not stop.wait(poll):
+            due = self._due
+            if due is None or due == reported_due:
+                continue
+            overdue = time.monotonic() - due
+            if overdue <= self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            frames = traceback.extract_stack(frame)
+            reported_due = due
+            report = {
+                "at": time.time(),
+                "due": due,
+                # blocked_ms se completa cuando la sonda por fin despierta
+                "blocked_ms": round(overdue * 1000, 1),
+                "site": _blocking_site(frames),
+                "stack": "".join(traceback.format_list(frames)),
+            }
+            self.reports.append(report)
+            logger.warning(
+                "Event loop blocked for more than %.0f ms at %s\n%s",
+                overdue * 1000, report["site"], report["stack"],
+            )
+
+    def blocking_sites(self) -> List[Dict[str, object]]:
+        """Captured reports grouped by site, worst first."""
+        sites: Dict[str, Dict[str, object]] = {}
+        for report in self.reports:
+            site = sites.setdefault(report["site"], {"site": report["site"], "count": 0, "max_blocked_ms": 0.0, "stack": report["stack"]})
+            site["count"] += 1
+            site["max_blocked_ms"] = max(site["max_blocked_ms"], report["blocked_ms"])
+        return sorted(sites.values(), key=lambda site: (-site["count"], -site["max_blocked_ms"]))
+
+
+loop_monitor = LoopMonitor()
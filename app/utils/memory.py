@@ -0,0 +1,208 @@
+"""
+Memory footprint metrics and on-demand tracemalloc snapshots.
+
+Cloud Run runs the API with ``--memory 512Mi`` (cloudbuild.yaml) and kills the
+instance when it goes over. ``/metrics`` exports, read at scrape time:
+
+- ``process_resident_memory_bytes`` / ``process_resident_memory_peak_bytes`` (RSS);
+- ``container_memory_bytes``: the cgroup usage Cloud Run enforces, which also
+  counts files in ``/tmp`` (in-memory there, e.g. the SQLite challenge store).
+  Outside Cloud Run the cgroup may be shared with other processes;
+- ``python_allocated_blocks`` and ``tracemalloc_traced_bytes``.
+
+``MemoryMonitor.run()`` samples the same values every ``MEMORY_SAMPLE_INTERVAL``
+seconds. It logs a warning when the instance crosses ``MEMORY_WARN_FRACTION``
+of ``MEMORY_BUDGET_MB``, and counts garbage-collector runs per generation.
+
+``TracemallocSnapshots`` backs the guarded ``/debug/memory`` routes. Tracing
+only starts on request (or with ``PYTHONTRACEMALLOC=N`` at boot) because it
+slows every allocation down.
+"""
+import asyncio
+import gc
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.utils.metrics import gauge
+
+logger = logging.getLogger(__name__)
+
+MEMORY_MONITOR_ENABLED = os.getenv("MEMORY_MONITOR_ENABLED", "true").lower() == "true"
+MEMORY_SAMPLE_INTERVAL = float(os.getenv("MEMORY_SAMPLE_INTERVAL", "15"))
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "512"))
+MEMORY_WARN_FRACTION = float(os.getenv("MEMORY_WARN_FRACTION", "0.8"))
+# Un snapshot con tracebacks puede pesar decenas de MB: se guardan pocos
+TRACEMALLOC_MAX_SNAPSHOTS = 3
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CGROUP_MEMORY_FILES = ("/sys/fs/cgroup/memory.current", "/sys/fs/cgroup/memory/memory.usage_in_bytes")
+
+
+def read_rss_bytes() -> Optional[int]:
+    """Current resident set size, from /proc (Linux, i.e. Cloud Run); None elsewhere."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def read_peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB en Linux, bytes en macOS
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    return max(peak, read_rss_bytes() or 0)
+
+
+def read_container_bytes() -> Optional[int]:
+    for path in CGROUP_MEMORY_FILES:
+        try:
+            with open(path, "rb") as handle:
+                return int(handle.read().strip())
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def memory_stats() -> Dict[str, object]:
+    traced, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        "rss_bytes": read_rss_bytes(),
+        "peak_rss_bytes": read_peak_rss_bytes(),
+        "container_bytes": read_container_bytes(),
+        "budget_bytes": int(MEMORY_BUDGET_MB * 1024 * 1024),
+        "python_allocated_blocks": sys.getallocatedblocks(),
+        "gc_counts": list(gc.get_count()),
+        "gc_collections": [generation["collections"] for generation in gc.get_stats()],
+        "tracemalloc": {"tracing": tracemalloc.is_tracing(), "traced_bytes": traced, "traced_peak_bytes": traced_peak},
+    }
+
+
+rss_bytes = gauge("process_resident_memory_bytes", "Resident memory of the process")
+rss_bytes.set_function(lambda: read_rss_bytes() or 0)
+peak_rss_bytes = gauge("process_resident_memory_peak_bytes", "Highest resident memory of the process so far")
+peak_rss_bytes.set_function(read_peak_rss_bytes)
+container_bytes = gauge("container_memory_bytes", "Memory charged to the container's cgroup (0 if unavailable)")
+container_bytes.set_function(lambda: read_container_bytes() or 0)
+budget_bytes = gauge("memory_budget_bytes", "Memory limit the instance is sized for (MEMORY_BUDGET_MB)")
+budget_bytes.set_function(lambda: MEMORY_BUDGET_MB * 1024 * 1024)
+allocated_blocks = gauge("python_allocated_blocks", "Memory blocks currently allocated by the Python allocator")
+allocated_blocks.set_function(sys.getallocatedblocks)
+traced_bytes = gauge("tracemalloc_traced_bytes", "Memory traced by tracemalloc (0 when not tracing)")
+traced_bytes.set_function(lambda: tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0)
+gc_collections = gauge("python_gc_collections", "Garbage collector runs per generation", ("generation",))
+
+
+class MemoryMonitor:
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL, budget_mb: float = MEMORY_BUDGET_MB, warn_fraction: float = MEMORY_WARN_FRACTION):
+        self.interval = interval
+        self.warn_bytes = budget_mb * 1024 * 1024 * warn_fraction
+        self.budget_mb = budget_mb
+        self._over = False
+
+    def sample(self) -> Dict[str, object]:
+        stats = memory_stats()
+        for generation, collections in enumerate(stats["gc_collections"]):
+            gc_collections.set(collections, generation=str(generation))
+        # Cloud Run (K_SERVICE) aplica el límite al cgroup; en otros entornos el
+        # cgroup puede ser compartido con otros procesos y se usa el RSS
+        used = stats["container_bytes"] if os.getenv("K_SERVICE") and stats["container_bytes"] else stats["rss_bytes"]
+        if used is not None:
+            over = used > self.warn_bytes
+            if over and not self._over:
+                logger.warning(
+                    "Memory at %.0f MiB, over %.0f%% of the %.0f MiB budget (rss %.0f MiB)",
+                    used / 2**20, self.warn_bytes / (self.budget_mb * 2**20) * 100, self.budget_mb, (stats["rss_bytes"] or 0) / 2**20,
+                )
+            self._over = over
+        return stats
+
+    async def run(self) -> None:
+        """Sample forever; cancel the task to stop."""
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+
+def _site(trace: tracemalloc.Statistic, key_type: str) -> str:
+    if key_type == "traceback":
+        return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in reversed(trace.traceback))
+    frame = trace.traceback[0]
+    return frame.filename if key_type == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+class TracemallocSnapshots:
+    """Start/stop tracing, top allocation sites, and diffs between stored snapshots."""
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, keep: int = TRACEMALLOC_MAX_SNAPSHOTS):
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._taken_at: Dict[str, float] = {}
+        self._keep = keep
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if tracemalloc.is_tracing():
+            return
+        tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        # Snapshots de una sesión anterior no son comparables con la siguiente
+        self._snapshots.clear()
+        self._taken_at.clear()
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing")
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def take(self) -> str:
+        snapshot_id = uuid.uuid4().hex[:8]
+        self._snapshots[snapshot_id] = self.snapshot()
+        self._taken_at[snapshot_id] = time.time()
+        while len(self._snapshots) > self._keep:
+            dropped, _ = self._snapshots.popitem(last=False)
+            self._taken_at.pop(dropped, None)
+        return snapshot_id
+
+    def get(self, snapshot_id: str) -> Optional[tracemalloc.Snapshot]:
+        return self._snapshots.get(snapshot_id)
+
+    def stored(self) -> List[Dict[str, object]]:
+        return [{"id": snapshot_id, "taken_at": self._taken_at[snapshot_id]} for snapshot_id in self._snapshots]
+
+    @staticmethod
+    def top(snapshot: tracemalloc.Snapshot, key_type: str = "lineno", limit: int = 20) -> List[Dict[str, object]]:
+        return [
+            {"site": _site(stat, key_type), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(key_type)[:limit]
+        ]
+
+    @staticmethod
+    def diff(base: tracemalloc.Snapshot, current: tracemalloc.Snapshot, key_type: str = "lineno", limit: int = 20) -> List[Dict[str, object]]:
+        """Sites that grew (or shrank) the most from ``base`` to ``current``."""
+        return [
+            {"site": _site(stat, key_type), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff, "size_bytes": stat.size}
+            for stat in current.compare_to(base, key_type)[:limit]
+        ]
+
+
+memory_monitor = MemoryMonitor()
+tracemalloc_snapshots = TracemallocSnapshots()
@@ -0,0 +1,241 @@
+"""
+Statistical sampling profiler for production diagnosis, served by ``/debug/profile``.
+
+A ``SamplingProfiler`` runs a thread that reads ``sys._current_frames()`` every
+``DEBUG_PROFILE_INTERVAL_MS`` and counts each distinct stack it sees. Nothing
+is hooked into the interpreter (no ``sys.setprofile``), so the profiled code
+runs at full speed, and nothing runs at all outside a profiling session: the
+routes and the request middleware are only installed when ``DEBUG_PROFILE_TOKEN``
+is set.
+
+Two ways to profile:
+
+- ``GET /debug/profile?seconds=10`` samples the event-loop thread (or every
+  thread with ``threads=all``) for N seconds;
+- a request sent with ``X-Profile-Request: <token>`` is profiled on its own:
+  only the samples taken while *its* asyncio task is running on the loop are
+  kept. The response carries ``X-Profile-Id``; fetch the result from
+  ``GET /debug/profile/requests/{id}``.
+
+Results come out as collapsed stacks (``a;b;c 42``, for flamegraph.pl,
+speedscope or inferno) or as a speedscope JSON file.
+"""
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Counter, Dict, List, Optional, Tuple
+
+DEBUG_PROFILE_TOKEN = os.getenv("DEBUG_PROFILE_TOKEN", "")
+DEBUG_PROFILE_MAX_SECONDS = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "60"))
+DEBUG_PROFILE_INTERVAL_MS = float(os.getenv("DEBUG_PROFILE_INTERVAL_MS", "5"))
+DEBUG_PROFILE_KEEP = 20
+# Profundidad máxima por stack: evita stacks gigantes en recursiones
+MAX_DEPTH = 128
+
+# (function name, file, first line of the function)
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the repo or to site-packages, so stacks stay readable."""
+    for marker in (f"{os.sep}site-packages{os.sep}", f"{os.sep}app{os.sep}"):
+        index = filename.rfind(marker)
+        if index != -1:
+            start = index + 1 if marker.endswith(f"app{os.sep}") else index + len(marker)
+            return filename[start:]
+    return os.path.basename(filename)
+
+
+def _walk(frame) -> Stack:
+    frames: List[Frame] = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+class Profile:
+    """Aggregated samples: how many times each stack (root first) was seen."""
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.stacks: Counter[Stack] = collections.Counter()
+        self.started = time.time()
+        self.duration = 0.0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def add(self, stack: Stack) -> None:
+        self.stacks[stack] += 1
+
+    @staticmethod
+    def frame_label(frame: Frame) -> str:
+        name, filename, line = frame
+        if not filename:
+            # Pseudo-frame with the thread name (threads=all)
+            return name.replace(";", ":")
+        return f"{name} ({_short_path(filename)}:{line})".replace(";", ":")
+
+    def to_collapsed(self) -> str:
+        lines = [
+            ";".join(self.frame_label(frame) for frame in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def to_speedscope(self) -> Dict[str, object]:
+        """speedscope "sampled" profile; weights are seconds of sampled time."""
+        index: Dict[Frame, int] = {}
+        frames: List[Dict[str, object]] = []
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, filename, line = frame
+                    frames.append({"name": name, "file": _short_path(filename), "line": line})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "fluent-reflect-api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def summary(self) -> Dict[str, object]:
+        return {"name": self.name, "samples": self.samples, "stacks": len(self.stacks),
+                "interval_ms": self.interval * 1000, "duration_s": round(self.duration, 3)}
+
+
+class SamplingProfiler:
+    """
+    Samples stacks on a background thread until ``stop()``.
+
+    ``thread_ids`` limits sampling to those threads (default: every thread but
+    the sampler). With ``task`` and ``loop``, a sample is only kept while
+    ``task`` is the task running on ``loop``; ``thread_ids`` must then be the
+    loop's thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval: float = DEBUG_PROFILE_INTERVAL_MS / 1000,
+        thread_ids: Optional[List[int]] = None,
+        task: Optional[asyncio.Task] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.profile = Profile(name, interval)
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.task = task
+        self.loop = loop
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def _thread_names(self) -> Dict[int, str]:
+        return {thread.ident: thread.name for thread in threading.enumerate()}
+
+    def _sample(self, own_id: int, names: Dict[int, str]) -> None:
+        if self.task is not None and asyncio.current_task(self.loop) is not self.task:
+            return
+        label_threads = self.thread_ids is None or len(self.thread_ids) > 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            stack = _walk(frame)
+            if label_threads:
+                stack = ((f"thread {names.get(thread_id, thread_id)}", "", 0),) + stack
+            self.profile.add(stack)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = self._thread_names()
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = self._thread_names()
+            self._sample(own_id, names)
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.profile.duration = time.perf_counter() - self._started
+        return self.profile
+
+
+class ProfileSessions:
+    """
+    One profiling session at a time, plus the latest per-request profiles.
+
+    Two overlapping sessions would each slow the other's samples down, and a
+    profile endpoint left open to retries should not be able to start dozens
+    of sampler threads.
+    """
+
+    def __init__(self, keep: int = DEBUG_PROFILE_KEEP):
+        self._busy = threading.Lock()
+        self._results: "collections.OrderedDict[str, Profile]" = collections.OrderedDict()
+        self._keep = keep
+
+    def try_start(self, make: Callable[[], SamplingProfiler]) -> Optional[SamplingProfiler]:
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return make().start()
+        except Exception:
+            self._busy.release()
+            raise
+
+    def finish(self, profiler: SamplingProfiler) -> Profile:
+        try:
+            return profiler.stop()
+        finally:
+            self._busy.release()
+
+    def store(self, profile: Profile, profile_id: Optional[str] = None) -> str:
+        profile_id = profile_id or uuid.uuid4().hex[:12]
+        self._results[profile_id] = profile
+        while len(self._results) > self._keep:
+            self._results.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._results.get(profile_id)
+
+    def recent(self) -> List[Dict[str, object]]:
+        return [{"id": profile_id, **profile.summary()} for profile_id, profile in reversed(self._results.items())]
+
+
+profile_sessions = ProfileSessions()
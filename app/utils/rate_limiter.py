@@ -1,60 +1,338 @@
+"""
+GCRA (generic cell rate algorithm) rate limiting.
+
+Each key stores a single float, its theoretical arrival time (TAT), so memory is
+constant per client no matter how many requests it makes. GCRA behaves like a
+token bucket of ``limit`` tokens refilled at ``limit / window_seconds`` tokens per
+second. Every route has its own limiter, so chat and challenge traffic from the
+same IP never share a window. Idle keys are dropped by a background sweeper.
+
+Limits are per process unless ``RATE_LIMIT_BACKEND=redis``: then every Cloud Run
+instance counts against shared fixed-window counters in Redis (see
+``RedisRateLimitBackend``).
+"""
+import asyncio
+import logging
+import math
+import os
 import time
-from typing import Dict, List
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
 from fastapi import HTTPException
 
-# In-memory storage for rate limiting
-# In production, use Redis or similar
-request_tracker: Dict[str, List[float]] = {}
+from app.utils.redis_client import RedisClient
+
+SWEEP_INTERVAL_SECONDS = 60
+SWEEP_CHUNK_SIZE = 10_000
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_LEASE_SIZE = int(os.getenv("RATE_LIMIT_LEASE_SIZE", "5"))
+RATE_LIMIT_KEY_PREFIX = os.getenv("RATE_LIMIT_KEY_PREFIX", "fluent-reflect:rl")
+# After a Redis failure, requests use the in-memory limiter for this long before retrying
+RATE_LIMIT_REDIS_RETRY_SECONDS = float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    window_seconds: float
+
+
+# Per-route limits; each route gets independent buckets per IP
+ROUTE_LIMITS: Dict[str, RateLimit] = {
+    "chat": RateLimit(limit=20, window_seconds=60),
+    "challenge": RateLimit(limit=10, window_seconds=60),
+    # Coarse flood limit applied by the admission pipeline to every gated request
+    "admission": RateLimit(limit=120, window_seconds=60),
+}
+
+
+class GCRARateLimiter:
+    """Constant-memory limiter: one theoretical arrival time per key."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.emission_interval = window_seconds / limit
+        self._tat: Dict[str, float] = {}
+
+    def hit(self, key: str, cost: int = 1, now: Optional[float] = None) -> float:
+        """
+        Consume ``cost`` tokens for ``key``.
+
+        Returns:
+            0.0 if the request is allowed, otherwise the seconds to wait before retrying
+        """
+        if now is None:
+            now = time.monotonic()
+
+        tat = self._tat.get(key, now)
+        if tat < now:
+            tat = now
+
+        new_tat = tat + self.emission_interval * cost
+        allow_at = new_tat - self.window_seconds
+        if allow_at > now:
+            return allow_at - now
+
+        self._tat[key] = new_tat
+        return 0.0
 
-def check_rate_limit(ip: str, limit: int = 20, window_seconds: int = 60) -> None:
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop keys whose bucket is full again (TAT in the past). Returns the number removed."""
+        if now is None:
+            now = time.monotonic()
+        expired = [key for key, tat in self._tat.items() if tat <= now]
+        for key in expired:
+            del self._tat[key]
+        return len(expired)
+
+    async def sweep_async(self, chunk_size: int = SWEEP_CHUNK_SIZE) -> int:
+        """Sweep in chunks, yielding to the event loop between them."""
+        keys = list(self._tat)
+        removed = 0
+        for start in range(0, len(keys), chunk_size):
+            now = time.monotonic()
+            for key in keys[start:start + chunk_size]:
+                tat = self._tat.get(key)
+                if tat is not None and tat <= now:
+                    del self._tat[key]
+                    removed += 1
+            await asyncio.sleep(0)
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+_limiters: Dict[str, GCRARateLimiter] = {}
+
+
+def get_limiter(route: Optional[str] = None, limit: int = 20, window_seconds: float = 60) -> GCRARateLimiter:
+    """Return the limiter for a route (or for an ad-hoc limit/window pair)."""
+    if route in ROUTE_LIMITS:
+        config = ROUTE_LIMITS[route]
+        name = route
+    else:
+        config = RateLimit(limit=limit, window_seconds=window_seconds)
+        name = route or f"{limit}/{window_seconds}"
+
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = GCRARateLimiter(config.limit, config.window_seconds)
+    return limiter
+
+
+def check_rate_limit(
+    ip: str,
+    limit: int = 20,
+    window_seconds: int = 60,
+    *,
+    route: Optional[str] = None,
+    cost: int = 1
+) -> None:
     """
-    Simple in-memory rate limiter.
+    In-memory GCRA rate limiter.
 
     Args:
         ip: Client IP address
-        limit: Maximum requests per window
-        window_seconds: Time window in seconds
+        limit: Maximum requests per window (ignored when ``route`` has a configured limit)
+        window_seconds: Time window in seconds (ignored when ``route`` has a configured limit)
+        route: Route bucket name, see ROUTE_LIMITS
+        cost: Tokens consumed by this request
 
     Raises:
         HTTPException: If rate limit is exceeded
     """
-    now = time.time()
-
-    # Initialize tracker for new IPs
-    if ip not in request_tracker:
-        request_tracker[ip] = []
-
-    # Clean old requests outside the time window
-    request_tracker[ip] = [
-        timestamp for timestamp in request_tracker[ip]
-        if now - timestamp < window_seconds
-    ]
-
-    # Check if limit exceeded
-    if len(request_tracker[ip]) >= limit:
+    limiter = get_limiter(route, limit, window_seconds)
+    retry_after = limiter.hit(ip, cost)
+    if retry_after:
         raise HTTPException(
             status_code=429,
-            detail=f"Rate limit exceeded. Maximum {limit} requests per {window_seconds} seconds."
+            detail=f"Rate limit exceeded. Maximum {limiter.limit} requests per {limiter.window_seconds:g} seconds.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
         )
 
-    # Add current request
-    request_tracker[ip].append(now)
 
-def cleanup_old_ips(max_age_seconds: int = 3600) -> None:
+class RateLimitBackend:
+    """Interface for rate limit storage, local or shared between instances."""
+
+    async def acquire(self, route: str, key: str, config: RateLimit, cost: int = 1) -> float:
+        """Consume tokens; return 0.0 if allowed, otherwise seconds until retry."""
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Drop local state that is no longer needed. Returns the number of entries removed."""
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process GCRA limiters (the default)."""
+
+    async def acquire(self, route: str, key: str, config: RateLimit, cost: int = 1) -> float:
+        return get_limiter(route, config.limit, config.window_seconds).hit(key, cost)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
     """
-    Clean up old IP entries to prevent memory leaks.
-    Call this periodically or on every N requests.
+    Fixed-window counters shared by every instance through a Redis-protocol server.
+
+    One atomic MULTI/EXEC transaction (SET NX PX + INCRBY + PTTL) reserves a *lease*
+    of several tokens, which this instance then hands out locally with no round trip.
+    A window that is already exhausted is also remembered locally, so rejected
+    traffic costs no round trip either. Unused leases expire with their window, which
+    can only make the shared limit stricter, never looser. The lease size is capped at
+    10% of the limit to keep that effect small.
+
+    If Redis is unreachable the backend falls back to the in-memory limiter rather than
+    rejecting traffic. A failure opens a circuit for ``retry_seconds``: meanwhile requests
+    go straight to memory instead of each waiting for the connect timeout. After that,
+    one request probes Redis again while the rest stay on memory until it answers.
     """
-    now = time.time()
-    to_remove = []
-
-    for ip, timestamps in request_tracker.items():
-        # Remove IPs with no recent activity
-        recent_requests = [t for t in timestamps if now - t < max_age_seconds]
-        if not recent_requests:
-            to_remove.append(ip)
+
+    def __init__(
+        self,
+        client: RedisClient,
+        lease_size: int = RATE_LIMIT_LEASE_SIZE,
+        prefix: str = RATE_LIMIT_KEY_PREFIX,
+        retry_seconds: float = RATE_LIMIT_REDIS_RETRY_SECONDS,
+    ):
+        self.client = client
+        self.lease_size = max(1, lease_size)
+        self.prefix = prefix
+        self.fallback = InMemoryRateLimitBackend()
+        self.retry_seconds = retry_seconds
+        # monotonic time until which Redis is skipped; 0 = circuit closed
+        self._open_until = 0.0
+        # (route, key) -> [window_index, tokens_left, window_exhausted]
+        self._leases: Dict[Tuple[str, str], list] = {}
+        self.round_trips = 0
+
+    def _lease_size(self, config: RateLimit) -> int:
+        return max(1, min(self.lease_size, config.limit // 10))
+
+    async def acquire(self, route: str, key: str, config: RateLimit, cost: int = 1) -> float:
+        now = time.time()
+        window_index = int(now // config.window_seconds)
+        retry_after = (window_index + 1) * config.window_seconds - now
+
+        lease = self._leases.get((route, key))
+        if lease is None or lease[0] != window_index:
+            lease = self._leases[(route, key)] = [window_index, 0, False]
+
+        if lease[1] >= cost:
+            lease[1] -= cost
+            return 0.0
+        if lease[2]:
+            return retry_after
+
+        monotonic_now = time.monotonic()
+        if monotonic_now < self._open_until:
+            return await self.fallback.acquire(route, key, config, cost)
+        probing = self._open_until > 0
+        if probing:
+            # Solo este request prueba Redis; los demás siguen en memoria mientras tanto
+            self._open_until = monotonic_now + self.retry_seconds
+
+        requested = max(cost - lease[1], self._lease_size(config))
+        redis_key = f"{self.prefix}:{route}:{key}:{window_index}"
+        window_ms = int(config.window_seconds * 1000)
+        try:
+            self.round_trips += 1
+            _, total, _ = await self.client.transaction(
+                ("SET", redis_key, 0, "PX", window_ms, "NX"),
+                ("INCRBY", redis_key, requested),
+                ("PTTL", redis_key),
+            )
+        except Exception as exc:
+            if not probing:
+                logger.warning(
+                    "Redis rate limit backend unavailable, using in-memory limits for %gs: %s", self.retry_seconds, exc
+                )
+            self._open_until = time.monotonic() + self.retry_seconds
+            return await self.fallback.acquire(route, key, config, cost)
+        if probing:
+            logger.info("Redis rate limit backend reachable again")
+        self._open_until = 0.0
+
+        # Only the part of the reservation that fits under the limit is ours
+        granted = max(0, min(requested, config.limit - (int(total) - requested)))
+        lease[1] += granted
+        if granted < requested:
+            lease[2] = True
+
+        if lease[1] >= cost:
+            lease[1] -= cost
+            return 0.0
+        return retry_after
+
+    def sweep(self) -> int:
+        now = time.time()
+        expired = [
+            lease_key for lease_key, lease in self._leases.items()
+            if lease[0] != int(now // ROUTE_LIMITS.get(lease_key[0], RateLimit(1, 60)).window_seconds)
+        ]
+        for lease_key in expired:
+            del self._leases[lease_key]
+        return len(expired)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Return the configured backend (RATE_LIMIT_BACKEND=memory|redis)."""
+    global _backend
+    if _backend is None:
+        if RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisRateLimitBackend(RedisClient(REDIS_URL))
         else:
-            request_tracker[ip] = recent_requests
+            _backend = InMemoryRateLimitBackend()
+    return _backend
+
+
+def set_rate_limit_backend(backend: Optional[RateLimitBackend]) -> None:
+    """Replace the process-wide backend (used by tests and alternative backends)."""
+    global _backend
+    _backend = backend
+
+
+async def enforce_rate_limit(ip: str, route: str, cost: int = 1) -> None:
+    """
+    Apply the configured limit of ``route`` through the active backend.
+
+    Raises:
+        HTTPException: If rate limit is exceeded
+    """
+    config = ROUTE_LIMITS[route]
+    retry_after = await get_rate_limit_backend().acquire(route, ip, config, cost)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded. Maximum {config.limit} requests per {config.window_seconds:g} seconds.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+def cleanup_old_ips() -> int:
+    """Drop idle keys from every limiter. Returns the number of keys removed."""
+    return sum(limiter.sweep() for limiter in list(_limiters.values()))
+
 
-    for ip in to_remove:
-        del request_tracker[ip]
\ No newline at end of file
+async def run_rate_limit_sweeper(interval_seconds: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """Background task that periodically drops idle keys without blocking requests."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        for limiter in list(_limiters.values()):
+            await limiter.sweep_async()
+        get_rate_limit_backend().sweep()
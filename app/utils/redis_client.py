@@ -0,0 +1,140 @@
+"""
+Minimal asyncio Redis (RESP2) client.
+
+Only what the shared rate limiter needs: plain commands and pipelined MULTI/EXEC
+transactions over a small connection pool. Works with any Redis-protocol server
+(Redis, Valkey, Memorystore, or ``standins/redis_server.py`` locally).
+"""
+import asyncio
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class RedisError(Exception):
+    """Error reply from the server or a protocol failure."""
+
+
+def _encode(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Redis connection closed")
+    prefix, payload = line[:1], line[1:-2]
+
+    if prefix == b"+":
+        return payload.decode("utf-8")
+    if prefix == b"-":
+        return RedisError(payload.decode("utf-8"))
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode("utf-8")
+    if prefix == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected RESP reply: {line!r}")
+
+
+def parse_redis_url(url: str) -> Tuple[str, int, Optional[str], int]:
+    """Return (host, port, password, db) from a redis:// URL."""
+    parsed = urlparse(url)
+    db = int(parsed.path.lstrip("/") or 0)
+    return parsed.hostname or "localhost", parsed.port or 6379, parsed.password, db
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, *commands: tuple) -> list:
+        self.writer.write(b"".join(_encode(*command) for command in commands))
+        await self.writer.drain()
+        return [await _read_reply(self.reader) for _ in commands]
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisClient:
+    """Small pooled client; connections are opened lazily and reused."""
+
+    def __init__(self, url: str, pool_size: int = 4, timeout: float = 0.5):
+        self.host, self.port, self.password, self.db = parse_redis_url(url)
+        self.timeout = timeout
+        self._pool: "asyncio.LifoQueue[Optional[_Connection]]" = asyncio.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put_nowait(None)
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = _Connection(reader, writer)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for reply in await connection.send(*setup) if setup else []:
+            if isinstance(reply, RedisError):
+                connection.close()
+                raise reply
+        return connection
+
+    async def _send(self, *commands: tuple) -> list:
+        connection = await self._pool.get()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(self._connect(), self.timeout)
+            replies = await asyncio.wait_for(connection.send(*commands), self.timeout)
+        except BaseException:
+            # A broken or timed-out connection may have unread replies, never reuse it
+            if connection is not None:
+                connection.close()
+            self._pool.put_nowait(None)
+            raise
+        self._pool.put_nowait(connection)
+        return replies
+
+    async def execute(self, *args):
+        """Run a single command and return its reply."""
+        (reply,) = await self._send(args)
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    async def transaction(self, *commands: tuple) -> List:
+        """Run commands atomically (MULTI/EXEC) in one round trip and return their replies."""
+        replies = await self._send(("MULTI",), *commands, ("EXEC",))
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        result = replies[-1]
+        if result is None:
+            raise RedisError("Transaction aborted")
+        return result
+
+    async def close(self) -> None:
+        """Close idle connections; the client reconnects lazily if used again."""
+        idle = []
+        while not self._pool.empty():
+            idle.append(self._pool.get_nowait())
+        for connection in idle:
+            if connection is not None:
+                connection.close()
+            self._pool.put_nowait(None)
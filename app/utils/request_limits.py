@@ -0,0 +1,145 @@
+"""
+Size governance for free-text request fields (code, execution output, chat messages).
+
+Two limits per field, both applied while the request body is parsed:
+
+- a hard byte cap: larger values are rejected (422) before they reach any service;
+- a token budget: values over it are cut down to their head and tail, after
+  collapsing runs of repeated lines (a ``while(true) console.log`` output becomes
+  a handful of lines). The prompt stays bounded whatever the client sends.
+
+Two exceptions:
+
+- Chat history is windowed, not rejected. Only the system messages and the last
+  ``CHAT_MESSAGE_WINDOW`` others reach the prompt, so older messages are dropped
+  before the per-message limits run. A long conversation, or one huge old
+  message, does not fail the request.
+- A verdict judges the code, so ``currentCode`` is never cut on ``finished``
+  requests. Code over the budget is rejected (422) with a message saying so.
+
+Tokens are estimated as characters / ``CHARS_PER_TOKEN``. That is cheap and
+slightly pessimistic for code, which is enough to bound prompt size. Every
+truncation or rejection is counted per field in ``/metrics``.
+"""
+import os
+from itertools import groupby
+from typing import List
+
+from app.utils.metrics import counter
+
+CHARS_PER_TOKEN = 4
+
+CHAT_MAX_CODE_BYTES = int(os.getenv("CHAT_MAX_CODE_BYTES", "256000"))
+CHAT_MAX_OUTPUT_BYTES = int(os.getenv("CHAT_MAX_OUTPUT_BYTES", "4000000"))
+CHAT_MAX_MESSAGE_BYTES = int(os.getenv("CHAT_MAX_MESSAGE_BYTES", "64000"))
+CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", "100"))
+# Non-system messages that reach the prompt (app/services/chat_context.py)
+CHAT_MESSAGE_WINDOW = 7
+CHAT_CODE_TOKEN_BUDGET = int(os.getenv("CHAT_CODE_TOKEN_BUDGET", "4000"))
+CHAT_OUTPUT_TOKEN_BUDGET = int(os.getenv("CHAT_OUTPUT_TOKEN_BUDGET", "1000"))
+CHAT_MESSAGE_TOKEN_BUDGET = int(os.getenv("CHAT_MESSAGE_TOKEN_BUDGET", "1500"))
+
+# Identical consecutive lines kept before the rest of the run is collapsed
+REPEAT_RUN_KEEP = 2
+
+field_truncations = counter(
+    "request_field_truncations_total", "Request fields cut down to their token budget", ("field",)
+)
+field_truncated_chars = counter(
+    "request_field_truncated_chars_total", "Characters removed from request fields by truncation", ("field",)
+)
+field_rejections = counter(
+    "request_field_rejections_total", "Requests rejected because a field exceeded its byte cap", ("field",)
+)
+messages_dropped = counter(
+    "request_messages_dropped_total", "Chat messages older than the prompt window, dropped before validation"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def utf8_length_exceeds(text: str, max_bytes: int) -> bool:
+    # A character is 1-4 bytes in UTF-8, so only encode when the bounds are inconclusive
+    if len(text) > max_bytes:
+        return True
+    if len(text) * 4 <= max_bytes:
+        return False
+    return len(text.encode("utf-8")) > max_bytes
+
+
+def collapse_repeated_lines(text: str, keep: int = REPEAT_RUN_KEEP) -> str:
+    """Replace runs of identical consecutive lines with ``keep`` copies and a count of the rest."""
+    lines: List[str] = []
+    collapsed = False
+    for line, group in groupby(text.split("\n")):
+        run = sum(1 for _ in group)
+        if run > keep + 1:
+            lines.extend([line] * keep)
+            lines.append(f"... [línea repetida {run - keep} veces más]")
+            collapsed = True
+        else:
+            lines.extend([line] * run)
+    return "\n".join(lines) if collapsed else text
+
+
+def truncate_head_tail(text: str, max_tokens: int) -> str:
+    """
+    Fit ``text`` into ``max_tokens``: collapse repeated lines, then keep the head and
+    the tail (split on line boundaries when possible) around an omission marker.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    text = collapse_repeated_lines(text)
+    if len(text) <= max_chars:
+        return text
+
+    half = max_chars // 2
+    head = text[:half]
+    cut = head.rfind("\n")
+    if cut > half // 2:
+        head = head[:cut]
+    tail = text[-half:] if half else ""
+    cut = tail.find("\n")
+    if 0 <= cut < half // 2:
+        tail = tail[cut + 1:]
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head}\n... [{omitted} caracteres omitidos] ...\n{tail}"
+
+
+def window_messages(messages, window: int = CHAT_MESSAGE_WINDOW):
+    """
+    System messages plus the last ``window`` others, in their original order.
+
+    Runs on the raw list (dicts or ChatMessage), before each message is validated.
+    """
+    if not isinstance(messages, list):
+        return messages
+    roles = [message.get("role") if isinstance(message, dict) else getattr(message, "role", None) for message in messages]
+    others = [i for i, role in enumerate(roles) if role != "system"]
+    if len(others) <= window:
+        return messages
+    dropped = set(others[:-window] if window else others)
+    messages_dropped.inc(len(dropped))
+    return [message for i, message in enumerate(messages) if i not in dropped]
+
+
+def reject_over_cap(value: str, field: str, max_bytes: int) -> str:
+    if value and utf8_length_exceeds(value, max_bytes):
+        field_rejections.inc(field=field)
+        raise ValueError(f"{field} exceeds the {max_bytes} byte limit")
+    return value
+
+
+def enforce_text_limit(value: str, field: str, max_bytes: int, token_budget: int) -> str:
+    """Field validator body: reject over ``max_bytes``, truncate over ``token_budget``."""
+    if not value:
+        return value
+    reject_over_cap(value, field, max_bytes)
+    truncated = truncate_head_tail(value, token_budget)
+    if truncated is not value:
+        field_truncations.inc(field=field)
+        field_truncated_chars.inc(max(0, len(value) - len(truncated)), field=field)
+    return truncated
@@ -0,0 +1,50 @@
+"""
+JSON responses rendered with orjson, plus a direct path for response models.
+
+``FastJSONResponse`` is the app's default response class. Routes that return a
+``CamelCaseModel`` wrap it in ``model_response``. FastAPI then sends that response
+as is, so the model is serialized once with Pydantic v2's
+``model_dump_json(by_alias=True)``. Without the wrapper FastAPI would dump the
+model to a dict, validate it again, convert it to JSON-safe values and then
+encode it.
+"""
+import json
+from typing import Any, Mapping, Optional
+
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+
+try:
+    import orjson  # type: ignore
+    _ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+    _ORJSON_AVAILABLE = False
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to UTF-8 JSON bytes (models use their camelCase aliases)."""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json(by_alias=True).encode("utf-8")
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    # Same output as Starlette's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson (stdlib json if it is not installed) and accepts models."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(
+    model: BaseModel,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+    background: Optional[BackgroundTask] = None,
+) -> FastJSONResponse:
+    """Response for a route's ``response_model`` instance, skipping FastAPI's re-validation and encoding."""
+    return FastJSONResponse(model, status_code=status_code, headers=headers, background=background)
@@ -0,0 +1,97 @@
+"""
+Per-request phase timers, emitted as a standard ``Server-Timing`` response header.
+
+``ServerTimingMiddleware`` (app/middleware/server_timing.py) opens a
+``ServerTimings`` for each request in a context variable. Code on the request
+path marks its stages with
+
+    with phase("llm"):
+        response = await call_openai(...)
+
+and the header lists them in order, plus the total:
+
+    Server-Timing: ratelimit;dur=0.1, geo;dur=0.4, prompt;dur=0.9, llm;dur=13870.2, total;dur=13875.0
+
+When the middleware is not installed (``SERVER_TIMING_ENABLED`` unset), ``phase``
+does one context-variable lookup and returns a shared no-op context manager.
+"""
+import os
+import time
+from contextvars import ContextVar, Token
+from typing import List, Optional, Tuple
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+SERVER_TIMING_LOG = os.getenv("SERVER_TIMING_LOG", "false").lower() == "true"
+
+
+class ServerTimings:
+    """Phases recorded for one request, in completion order."""
+
+    __slots__ = ("started", "entries")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries: List[Tuple[str, float]] = []
+
+    def add(self, name: str, duration_ms: float) -> None:
+        self.entries.append((name, duration_ms))
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def header_value(self) -> str:
+        metrics = [f"{name};dur={duration_ms:.1f}" for name, duration_ms in self.entries]
+        metrics.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[ServerTimings]] = ContextVar("server_timings", default=None)
+
+
+def activate(timings: ServerTimings) -> Token:
+    return _current.set(timings)
+
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+
+def current_timings() -> Optional[ServerTimings]:
+    return _current.get()
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: ServerTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self) -> "_Phase":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.timings.add(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class _NoopPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopPhase":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NOOP_PHASE = _NoopPhase()
+
+
+def phase(name: str):
+    """Time the enclosed block as ``name`` (a header token: letters, digits, ``_`` or ``-``)."""
+    timings = _current.get()
+    if timings is None:
+        return _NOOP_PHASE
+    return _Phase(timings, name)
@@ -4,36 +4,48 @@ import base64
 from typing import Optional, Tuple
 
 
-def validate_exercise_snapshots(
+def check_exercise_snapshots(
     exercise_name_snapshot: Optional[str],
     exercise_description_snapshot: Optional[str]
-) -> Tuple[bool, str]:
+) -> Tuple[bool, str, Optional[str]]:
     """
-    Validate snapshot consistency for exercise requests.
+    Validate snapshot consistency and decode the description in the same pass.
 
     Returns:
-        Tuple[bool, str]: (is_valid, error_message)
+        Tuple[bool, str, Optional[str]]: (is_valid, error_message, decoded_description)
     """
 
     # Case 1: No exercise active
     if not exercise_name_snapshot and not exercise_description_snapshot:
-        return True, ""
+        return True, "", None
 
     # Case 2: Inconsistent snapshots (security error)
     if exercise_name_snapshot and not exercise_description_snapshot:
-        return False, "Security error: exercise name without description snapshot"
+        return False, "Security error: exercise name without description snapshot", None
 
     if not exercise_name_snapshot and exercise_description_snapshot:
-        return False, "Security error: exercise description without name snapshot"
+        return False, "Security error: exercise description without name snapshot", None
 
     # Case 3: Both present - validate base64 format
-    if exercise_description_snapshot:
-        try:
-            base64.b64decode(exercise_description_snapshot).decode('utf-8')
-        except Exception:
-            return False, "Invalid base64 format in exercise description snapshot"
+    decoded_description = decode_exercise_description_snapshot(exercise_description_snapshot)
+    if decoded_description is None:
+        return False, "Invalid base64 format in exercise description snapshot", None
+
+    return True, "", decoded_description
+
+
+def validate_exercise_snapshots(
+    exercise_name_snapshot: Optional[str],
+    exercise_description_snapshot: Optional[str]
+) -> Tuple[bool, str]:
+    """
+    Validate snapshot consistency for exercise requests.
 
-    return True, ""
+    Returns:
+        Tuple[bool, str]: (is_valid, error_message)
+    """
+    is_valid, error_message, _ = check_exercise_snapshots(exercise_name_snapshot, exercise_description_snapshot)
+    return is_valid, error_message
 
 
 def decode_exercise_description_snapshot(
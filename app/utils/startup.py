@@ -0,0 +1,46 @@
+"""
+Background import of the heavy SDKs, so a cold start listens before they are loaded.
+
+``openai``, ``httpx`` and ``firebase_admin`` take about a second
+to import together, most of the container's cold start. The modules that use
+them import them inside the functions that need them. The lifespan then starts
+``preload_modules()``, which imports them in a worker thread right after the
+server starts listening. The first request usually finds them loaded; if it
+arrives earlier, it waits on the import lock for whatever is left, never for
+a second import.
+
+``benchmarks/startup_time.py`` checks that none of them is imported by
+``app.main`` again.
+"""
+import asyncio
+import importlib
+import logging
+import time
+from typing import Dict, Iterable
+
+from app.utils.metrics import gauge
+
+logger = logging.getLogger(__name__)
+
+# Request-path SDKs, in the order the routes need them (geo gate and Judge0 first)
+PRELOAD_MODULES = ("httpx", "openai")
+# Only when Firebase tokens are verified (ADMISSION_REQUIRE_AUTH / FIREBASE_PROJECT_ID)
+FIREBASE_MODULES = ("firebase_admin", "firebase_admin.auth", "firebase_admin.credentials", "google.auth.jwt")
+
+preload_seconds = gauge("startup_preload_seconds", "Time spent importing each module preloaded after startup", ("module",))
+
+
+async def preload_modules(modules: Iterable[str] = PRELOAD_MODULES) -> Dict[str, float]:
+    """Import ``modules`` one after the other in a worker thread; returns seconds per module."""
+    timings: Dict[str, float] = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(importlib.import_module, name)
+        except ImportError as exc:
+            logger.warning("Preload of %s failed: %s", name, exc)
+            continue
+        timings[name] = time.perf_counter() - started
+        preload_seconds.set(timings[name], module=name)
+    logger.info("Preloaded %s in %.2f s", ", ".join(timings), sum(timings.values()))
+    return timings
@@ -0,0 +1,46 @@
+"""Bounded LRU cache with per-entry expiry, shared by the geo and auth caches."""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU cache with a per-entry TTL and a hard size cap."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str, now: Optional[float] = None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        if now is None:
+            now = time.monotonic()
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.monotonic()
+        self._entries[key] = (now + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,92 @@
+"""Small stdlib-only timing helpers shared by the benchmark scripts."""
+import datetime
+import json
+import platform
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+
+def measure(func: Callable[[], object], *, repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """
+    Time ``func`` pyperf-style: calibrate the loop count so one run lasts at least
+    ``min_time`` seconds, then repeat and report per-call statistics in microseconds.
+    """
+    timer = timeit.Timer(func)
+    loops = 1
+    while True:
+        if timer.timeit(loops) >= min_time:
+            break
+        loops *= 2
+
+    runs = [timer.timeit(loops) / loops * 1e6 for _ in range(repeat)]
+    return {
+        "loops": loops,
+        "min_us": min(runs),
+        "median_us": statistics.median(runs),
+        "stdev_us": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+    }
+
+
+def format_table(headers: List[str], rows: List[List[object]]) -> str:
+    """Render rows as a markdown table."""
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "|" + "|".join("---" for _ in headers) + "|",
+    ]
+    for row in rows:
+        cells = [f"{cell:,.2f}" if isinstance(cell, float) else str(cell) for cell in row]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+
+def save_results(path: str, results: Dict[str, Dict[str, float]]) -> None:
+    """Store ``{benchmark name: measure() stats}`` as a JSON baseline, with the machine it ran on."""
+    document = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as baseline:
+        json.dump(document, baseline, indent=2, sort_keys=True)
+        baseline.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Dict[str, float]]:
+    with open(path, encoding="utf-8") as baseline:
+        return json.load(baseline)["results"]
+
+
+def compare_results(
+    baseline: Dict[str, Dict[str, float]],
+    current: Dict[str, Dict[str, float]],
+    threshold: float = 0.10,
+    stat: str = "median_us",
+) -> Tuple[str, List[str]]:
+    """
+    Markdown table of current vs baseline, and the names that got slower by more
+    than ``threshold`` (a fraction, 0.10 = 10%). Benchmarks missing on either side
+    are listed but never count as regressions.
+    """
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        before = baseline.get(name, {}).get(stat)
+        after = current.get(name, {}).get(stat)
+        if before is None or after is None:
+            rows.append([name, before if before is not None else "-", after if after is not None else "-", "-", "new" if before is None else "removed"])
+            continue
+        change = (after - before) / before if before else 0.0
+        verdict = "ok"
+        if change > threshold:
+            verdict = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "faster"
+        rows.append([name, before, after, f"{change:+.1%}", verdict])
+    unit = "µs" if stat.endswith("_us") else stat
+    return format_table(["benchmark", f"baseline {unit}", f"current {unit}", "change", "verdict"], rows), regressions
@@ -0,0 +1,131 @@
+"""
+camelCase/snake_case key transformer: the previous recursive version vs the current one.
+
+Payloads look like a chat request body with code, messages and challenge
+batches, scaled from 10 KB to 5 MB of JSON. The previous version is kept here
+verbatim (uncompiled ``re.sub`` per key, recursion). A final row shows that deep
+nesting which overflowed the recursion limit now transforms fine.
+
+Run from the repository root:
+    python -m benchmarks.bench_case_transform [--sizes 10000,100000,1000000,5000000]
+"""
+import argparse
+import json
+import re
+import sys
+from typing import Any, Dict, List
+
+from app.utils.case_transform import transform_dict_keys_to_camel, transform_dict_keys_to_snake
+from benchmarks._harness import format_table, measure
+
+
+def legacy_camel_to_snake(name: str) -> str:
+    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+def legacy_snake_to_camel(name: str) -> str:
+    components = name.split('_')
+    return components[0] + ''.join(word.capitalize() for word in components[1:])
+
+
+def legacy_to_snake(data: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for key, value in data.items():
+        new_key = legacy_camel_to_snake(key)
+        if isinstance(value, dict):
+            result[new_key] = legacy_to_snake(value)
+        elif isinstance(value, list):
+            result[new_key] = [legacy_to_snake(item) if isinstance(item, dict) else item for item in value]
+        else:
+            result[new_key] = value
+    return result
+
+
+def legacy_to_camel(data: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for key, value in data.items():
+        new_key = legacy_snake_to_camel(key)
+        if isinstance(value, dict):
+            result[new_key] = legacy_to_camel(value)
+        elif isinstance(value, list):
+            result[new_key] = [legacy_to_camel(item) if isinstance(item, dict) else item for item in value]
+        else:
+            result[new_key] = value
+    return result
+
+
+def _challenge(i: int) -> Dict[str, Any]:
+    return {
+        "challengeId": f"{i:016x}",
+        "title": f"Ejercicio {i}",
+        "templateCode": "function solve(nums) {\n  // Escribe tu solución aquí\n}\n",
+        "exerciseDescription": "RGFkbyB1biBhcnJlZ2xvIGRlIGVudGVyb3M=",
+        "cost": {"promptTokens": 900, "completionTokens": 2400, "costUsd": 0.0031},
+        "latencyMs": 812.5,
+        "testCases": [{"inputArgs": [1, 2, 3], "expectedOutput": 6, "isHidden": j % 2 == 0} for j in range(4)],
+    }
+
+
+def payload(size: int) -> Dict[str, Any]:
+    """A camelCase body of roughly ``size`` bytes of JSON."""
+    body: Dict[str, Any] = {
+        "languageId": 97,
+        "exerciseActive": True,
+        "currentCode": "function solve(nums) { return nums.reduce((a, b) => a + b, 0); }",
+        "messages": [{"role": "user", "content": f"Mensaje {i}"} for i in range(7)],
+        "challenges": [],
+    }
+    chunk = len(json.dumps(_challenge(0)))
+    body["challenges"] = [_challenge(i) for i in range(max(1, size // chunk))]
+    return body
+
+
+def _nested(depth: int) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"leafValue": 1}
+    for _ in range(depth):
+        data = {"nestedLevel": data}
+    return data
+
+
+def run(sizes: List[int]) -> str:
+    rows = []
+    for size in sizes:
+        camel = payload(size)
+        snake = transform_dict_keys_to_snake(camel)
+        assert snake == legacy_to_snake(camel)
+        assert transform_dict_keys_to_camel(snake) == legacy_to_camel(snake) == camel
+        actual = f"{len(json.dumps(camel)):,} B"
+        repeat = 5 if size <= 1_000_000 else 3
+        for direction, legacy, current, data in (
+            ("→ snake", legacy_to_snake, transform_dict_keys_to_snake, camel),
+            ("→ camel", legacy_to_camel, transform_dict_keys_to_camel, snake),
+        ):
+            old = measure(lambda: legacy(data), repeat=repeat, min_time=0.2)
+            new = measure(lambda: current(data), repeat=repeat, min_time=0.2)
+            rows.append([actual, direction, old["median_us"], new["median_us"], f"{old['median_us'] / new['median_us']:.1f}x"])
+
+    depth = sys.getrecursionlimit() * 2
+    try:
+        legacy_to_snake(_nested(depth))
+        legacy_result = "ok"
+    except RecursionError:
+        legacy_result = "RecursionError"
+    new = measure(lambda: transform_dict_keys_to_snake(_nested(depth)), repeat=3, min_time=0.2)
+    rows.append([f"depth {depth:,}", "→ snake", legacy_result, new["median_us"], "-"])
+    return format_table(["payload", "direction", "previous µs", "current µs", "speedup"], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000,5000000", help="comma-separated payload sizes in bytes")
+    args = parser.parse_args()
+    print(run([int(size) for size in args.sizes.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
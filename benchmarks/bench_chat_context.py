@@ -0,0 +1,118 @@
+"""
+Chat request preparation: per-service re-parsing vs a request-scoped ChatContext.
+
+Times everything the chat route does before the OpenAI call for a verdict
+request with large payloads. That covers trimming messages, validating and
+decoding the snapshot, detecting the prompt type, building the system prompts
+and flattening the conversation into the Responses API input. Both paths produce
+the same input string; the table reports latency and peak traced allocations.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_context [--sizes 10000,100000,250000]
+"""
+import argparse
+import base64
+import tracemalloc
+from typing import Callable, List
+
+from app.models.schemas import ChatMessage, ChatRequest
+from app.services.automatic_prompts_service import detect_automatic_prompt_type, get_automatic_system_prompt
+from app.services.chat_context import ChatContext
+from app.services.openai_service import build_openai_messages, build_responses_input
+from app.services.verdict_chain import build_verdict_reasoning_prompt
+from app.utils.message_utils import trim_messages
+from app.utils.snapshot_validator import check_exercise_snapshots, validate_exercise_snapshots
+from benchmarks._harness import format_table, measure
+
+
+def legacy_prepare(request: ChatRequest, language_name: str) -> str:
+    """The previous flow: route and service each detect, decode and convert on their own."""
+    trimmed = trim_messages(request.messages, limit=7)
+    validate_exercise_snapshots(request.exercise_name_snapshot, request.exercise_description_snapshot)
+
+    # Route: detect the prompt type for the response flags
+    user_message_content = request.messages[-1].content if request.messages and request.messages[-1].role == "user" else ""
+    detect_automatic_prompt_type(user_message_content, request.finished)
+
+    # Service: detect again, decode the snapshot again, concatenate with +=
+    user_message_content = trimmed[-1].content if trimmed and trimmed[-1].role == "user" else ""
+    prompt_type = detect_automatic_prompt_type(user_message_content, request.finished)
+    openai_messages = [{"role": "system", "content": get_automatic_system_prompt(
+        prompt_type, language_name, request.current_code, request.exercise_name_snapshot, request.execution_output
+    )}]
+    openai_messages.append({"role": "system", "content": build_verdict_reasoning_prompt(
+        language_name=language_name,
+        exercise_name_snapshot=request.exercise_name_snapshot,
+        exercise_description_snapshot=request.exercise_description_snapshot,
+        current_code=request.current_code,
+        execution_output=request.execution_output,
+    )})
+    for message in trimmed:
+        openai_messages.append({"role": message.role, "content": message.content})
+
+    input_content = ""
+    for msg in openai_messages:
+        if msg["role"] == "system":
+            input_content += f"SYSTEM: {msg['content']}\n\n"
+        elif msg["role"] == "user":
+            input_content += f"USER: {msg['content']}\n\n"
+        elif msg["role"] == "assistant":
+            input_content += f"ASSISTANT: {msg['content']}\n\n"
+    return input_content.strip()
+
+
+def context_prepare(request: ChatRequest, language_name: str) -> str:
+    _, _, exercise_description = check_exercise_snapshots(
+        request.exercise_name_snapshot, request.exercise_description_snapshot
+    )
+    context = ChatContext.from_request(request, language_name, exercise_description)
+    return build_responses_input(build_openai_messages(context))
+
+
+def _request(code_size: int) -> ChatRequest:
+    code = ("function solve(nums) {\n  // recorrer y acumular\n  return nums.reduce((a, b) => a + b, 0);\n}\n" * (code_size // 80 + 1))[:code_size]
+    description = ("Implementa solve(nums) que retorne la suma. " * (code_size // 200 + 1))[: max(1000, code_size // 4)]
+    messages = [
+        ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"Mensaje {i}:\n{code[: code_size // 8]}")
+        for i in range(12)
+    ] + [ChatMessage(role="user", content="Necesito veredicto del ejercicio.")]
+    return ChatRequest(
+        messages=messages,
+        languageId=97,
+        currentCode=code,
+        automatic=True,
+        finished=True,
+        exerciseNameSnapshot="Suma de arreglo",
+        exerciseDescriptionSnapshot=base64.b64encode(description.encode("utf-8")).decode("ascii"),
+        executionOutput="15\n" * 200,
+    )
+
+
+def _peak_kb(func: Callable[[], object]) -> float:
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def run(sizes: List[int]) -> str:
+    rows = []
+    for size in sizes:
+        request = _request(size)
+        assert legacy_prepare(request, "JavaScript") == context_prepare(request, "JavaScript")
+        for name, prepare in (("per-service parsing", legacy_prepare), ("ChatContext", context_prepare)):
+            timing = measure(lambda: prepare(request, "JavaScript"), repeat=5, min_time=0.2)
+            rows.append([f"{size:,} B", name, timing["median_us"], _peak_kb(lambda: prepare(request, "JavaScript"))])
+    return format_table(["current_code", "path", "median µs", "peak alloc KB"], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,250000", help="comma-separated current_code sizes in bytes")
+    args = parser.parse_args()
+    print(run([int(size) for size in args.sizes.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Offline geo database benchmark: compile time, file size, RSS and lookup latency.
+
+Builds a synthetic IPv4 range table the size of a city-level database (about one
+range per /24 in use), compiles it and times lookups on random addresses.
+
+Run from the repository root:
+    python -m benchmarks.bench_geo_db [--ranges 1000000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.services.geo_db import RangeTable, compile_csv
+from benchmarks._harness import format_table, measure
+
+
+def _rss_mb() -> float:
+    """Resident set size of this process (Linux); 0.0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _write_csv(path: str, ranges: int) -> None:
+    cities = [("CL", "Santiago"), ("CL", "Valparaiso"), ("AR", "Buenos Aires"), ("US", "Ashburn"), ("BR", "Sao Paulo")]
+    step = (0xDFFFFFFF - 0x01000000) // ranges
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(ranges):
+            start = 0x01000000 + i * step
+            country, city = cities[i % len(cities)]
+            handle.write(f"{start},{start + step - 1},{country},{city}\n")
+
+
+def run(ranges: int) -> str:
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "ranges.csv")
+        compiled = os.path.join(tmp, "ranges.bin")
+        _write_csv(source, ranges)
+
+        started = time.perf_counter()
+        compile_csv(source, compiled)
+        compile_s = time.perf_counter() - started
+
+        rss_before = _rss_mb()
+        table = RangeTable(compiled)
+        rss_after_open = _rss_mb()
+
+        ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(1024)]
+        position = [0]
+
+        def lookup():
+            position[0] = (position[0] + 1) & 1023
+            table.lookup(ips[position[0]])
+
+        timing = measure(lookup, repeat=5, min_time=0.2)
+        for ip in ips:
+            table.lookup(ip)
+        rss_after_lookups = _rss_mb()
+        table.close()
+
+        return format_table(
+            ["ranges", "compile s", "file MB", "RSS on open MB", "RSS after 1k lookups MB (page cache)", "lookup µs (median)"],
+            [[
+                f"{ranges:,}",
+                compile_s,
+                os.path.getsize(compiled) / (1024 * 1024),
+                rss_after_open - rss_before,
+                rss_after_lookups - rss_before,
+                timing["median_us"],
+            ]],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ranges", type=int, default=1_000_000)
+    args = parser.parse_args()
+    print(run(args.ranges))
+
+
+if __name__ == "__main__":
+    main()
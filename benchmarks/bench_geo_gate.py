@@ -0,0 +1,155 @@
+"""
+Geo gate throughput: ``@app.middleware("http")`` (BaseHTTPMiddleware) vs pure ASGI.
+
+Both apps mount the real execute router behind CORS, as in ``app.main``. Judge0 is
+stubbed with a canned result, and the geo resolver's cache is already warm, so the
+numbers show the cost of the middleware layer itself. Requests are driven
+straight into the ASGI app by concurrent asyncio workers, with no sockets
+involved.
+
+Run from the repository root:
+    python -m benchmarks.bench_geo_gate [--seconds 3] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+import app.routes.execute as execute_routes
+from app.middleware.gates import GeoGateMiddleware
+from app.services.geo_service import GeoResolver
+from benchmarks._harness import format_table
+
+ALLOWED_IP = "200.1.1.1"
+EXECUTE_BODY = json.dumps({"languageId": 63, "sourceCode": "console.log(1)", "stdin": ""}).encode()
+
+
+async def _stub_execute_code(language_id, source_code, stdin=""):
+    return {
+        "status": "Accepted", "stdout": "1\n", "stderr": None, "compile_output": None,
+        "time": "0.01", "memory": 1024, "exit_code": 0,
+    }
+
+
+async def _stub_fetch(ip):
+    return {"country": "CL", "city": "Santiago"}
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_methods=["*"], allow_headers=["*"])
+    app.include_router(execute_routes.router, prefix="/api")
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    return app
+
+
+def legacy_app(resolver: GeoResolver) -> FastAPI:
+    """The previous gate: BaseHTTPMiddleware that raises HTTPException."""
+    app = _base_app()
+
+    @app.middleware("http")
+    async def only_santiago(request: Request, call_next):
+        if request.url.path in ("/health", "/metrics", "/"):
+            return await call_next(request)
+        xff = request.headers.get("x-forwarded-for")
+        ip = xff.split(",")[0].strip() if xff else request.client.host
+        try:
+            g = await resolver.lookup(ip)
+            if not (g["country"] == "CL" and "santiago" in g["city"].lower()):
+                raise HTTPException(status_code=403, detail="Forbidden")
+            return await call_next(request)
+        except Exception:
+            raise HTTPException(status_code=403, detail="Forbidden")
+
+    return app
+
+
+def asgi_app(resolver: GeoResolver) -> FastAPI:
+    app = _base_app()
+    app.add_middleware(GeoGateMiddleware, resolver=resolver)
+    return app
+
+
+def _scope(method: str, path: str, body: bytes) -> dict:
+    headers = [(b"host", b"bench"), (b"x-forwarded-for", ALLOWED_IP.encode())]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("10.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+
+async def _request(app, method: str, path: str, body: bytes) -> int:
+    status = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)  # never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(_scope(method, path, body), receive, send)
+    return status
+
+
+async def _rps(app, method: str, path: str, body: bytes, seconds: float, concurrency: int) -> float:
+    assert await _request(app, method, path, body) == 200
+    deadline = time.perf_counter() + seconds
+    completed = 0
+
+    async def worker():
+        nonlocal completed
+        while time.perf_counter() < deadline:
+            await _request(app, method, path, body)
+            completed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return completed / (time.perf_counter() - started)
+
+
+async def run(seconds: float, concurrency: int) -> str:
+    execute_routes.execute_code = _stub_execute_code
+    resolver = GeoResolver(fetch=_stub_fetch)
+    apps = {"@app.middleware(\"http\")": legacy_app(resolver), "pure ASGI": asgi_app(resolver)}
+    targets = [("GET", "/health", b""), ("POST", "/api/execute", EXECUTE_BODY)]
+
+    results = {}
+    for name, app in apps.items():
+        for method, path, body in targets:
+            results[(name, path)] = await _rps(app, method, path, body, seconds, concurrency)
+
+    rows = []
+    for method, path, _ in targets:
+        before = results[("@app.middleware(\"http\")", path)]
+        after = results[("pure ASGI", path)]
+        rows.append([f"{method} {path}", before, after, f"{after / before:.2f}x"])
+    return format_table(["route", "before req/s", "after req/s", "speedup"], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each measurement")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    print(asyncio.run(run(args.seconds, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
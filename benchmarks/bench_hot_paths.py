@@ -0,0 +1,171 @@
+"""
+Request-path CPU microbenchmarks, with stored baselines and regression reports.
+
+Covers the pure-Python code that runs on every chat, execute or challenge
+request, each in a small and a large variant with realistic fixtures:
+
+- message trimming;
+- the automatic and verdict system prompts;
+- prompt assembly for the Responses API;
+- exercise detection in the reply;
+- snapshot validation;
+- the in-memory rate limit check;
+- template rendering.
+
+Run from the repository root:
+    python -m benchmarks.bench_hot_paths                                   # print results
+    python -m benchmarks.bench_hot_paths --save benchmarks/baselines/hot_paths.json
+    python -m benchmarks.bench_hot_paths --compare benchmarks/baselines/hot_paths.json
+
+``--compare`` prints current vs baseline medians and exits with status 1 when a
+benchmark got slower than ``--threshold`` (default 10%). That makes it usable as
+a CI gate. Baselines are only comparable on the machine that produced them, so
+regenerate them with ``--save`` before comparing on a different machine.
+"""
+import argparse
+import base64
+import itertools
+import sys
+from typing import Callable, Dict, List, Tuple
+
+from app.models.schemas import ChatMessage
+from app.services.automatic_prompts_service import get_automatic_system_prompt
+from app.services.challenge_templates import _freeze_challenge, _render_cached, _resolve_compiled, render_template
+from app.services.chat_context import ChatContext
+from app.services.openai_service import build_openai_messages, build_responses_input
+from app.services.verdict_chain import build_verdict_reasoning_prompt
+from app.utils.exercise_name_detector import detect_concrete_exercise
+from app.utils.message_utils import trim_messages
+from app.utils.rate_limiter import check_rate_limit
+from app.utils.snapshot_validator import validate_exercise_snapshots
+from benchmarks._harness import compare_results, format_table, load_results, measure, save_results
+
+CODE_LINE = "  total += nums[i] * (i % 2 === 0 ? 1 : -1); // alterna signos\n"
+DESCRIPTION = (
+    "Implementa la función sumaAlternada(nums) que recibe un arreglo de enteros y retorna la suma "
+    "alternando signos: el primer elemento suma, el segundo resta, y así sucesivamente. "
+)
+REPLY = (
+    "¡Buena idea! Para este ejercicio te propongo recorrer el arreglo una sola vez y acumular el resultado. "
+    "Piensa en qué pasa con un arreglo vacío y con números negativos. "
+)
+
+
+def _code(lines: int) -> str:
+    return "function sumaAlternada(nums) {\n  let total = 0;\n  for (let i = 0; i < nums.length; i++) {\n" + CODE_LINE * lines + "  }\n  return total;\n}\n"
+
+
+def _messages(count: int, content_size: int) -> List[ChatMessage]:
+    messages = [ChatMessage(role="system", content="Eres un entrevistador técnico.")]
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append(ChatMessage(role=role, content=(f"Mensaje {i}. " + REPLY)[:content_size].ljust(content_size, ".")))
+    return messages
+
+
+def _challenge(test_cases: int) -> dict:
+    return {
+        "title": "Suma alternada",
+        "description": DESCRIPTION,
+        "function_name": "sumaAlternada",
+        "function_signature": "function sumaAlternada(nums)",
+        "constraints": [f"-10^{k} <= nums[i] <= 10^{k}" for k in range(3, 3 + test_cases // 4 + 1)],
+        "test_cases": [{"input": f"[{', '.join(str(n) for n in range(i, i + 6))}]", "expected": str(-3)} for i in range(test_cases)],
+    }
+
+
+def _variant(size: str) -> dict:
+    large = size == "large"
+    code = _code(300 if large else 10)
+    description = DESCRIPTION * (20 if large else 1)
+    return {
+        "messages": _messages(60 if large else 8, 2000 if large else 200),
+        "code": code,
+        "output": "-3\n" * (250 if large else 3),
+        "description": description,
+        "description_b64": base64.b64encode(description.encode("utf-8")).decode("ascii"),
+        "reply": REPLY * (30 if large else 2) + "\nEjercicio confirmado: Suma alternada.\n",
+        "challenge": _challenge(24 if large else 4),
+    }
+
+
+def build_suite() -> List[Tuple[str, Callable[[], object]]]:
+    suite: List[Tuple[str, Callable[[], object]]] = []
+    ips = itertools.cycle([f"10.0.{i // 256}.{i % 256}" for i in range(10_000)])
+
+    for size in ("small", "large"):
+        fx = _variant(size)
+        messages = fx["messages"]
+        verdict_messages = messages + [ChatMessage(role="user", content="Evalúa mi solución.")]
+        verdict_context = ChatContext.build(
+            trim_messages(verdict_messages, limit=7),
+            "JavaScript",
+            is_automatic=True,
+            finished=True,
+            current_code=fx["code"],
+            execution_output=fx["output"],
+            exercise_name_snapshot="Suma alternada",
+            exercise_description_snapshot=fx["description_b64"],
+            exercise_description=fx["description"],
+        )
+        chat_context = ChatContext.build(trim_messages(messages, limit=7), "JavaScript", current_code=fx["code"])
+        compiled_key = _resolve_compiled("python").key
+        frozen = _freeze_challenge(fx["challenge"])
+
+        suite += [
+            (f"trim_messages[{size}]", lambda messages=messages: trim_messages(messages, limit=7)),
+            (f"automatic_system_prompt[{size}]", lambda fx=fx: get_automatic_system_prompt(
+                "EXERCISE_VERDICT", "JavaScript", fx["code"], "Suma alternada", fx["output"])),
+            (f"verdict_reasoning_prompt[{size}]", lambda fx=fx: build_verdict_reasoning_prompt(
+                language_name="JavaScript", exercise_name_snapshot="Suma alternada",
+                current_code=fx["code"], execution_output=fx["output"], decoded_description=fx["description"])),
+            (f"responses_input.chat[{size}]", lambda context=chat_context: build_responses_input(build_openai_messages(context))),
+            (f"responses_input.verdict[{size}]", lambda context=verdict_context: build_responses_input(build_openai_messages(context))),
+            (f"detect_concrete_exercise[{size}]", lambda reply=fx["reply"]: detect_concrete_exercise(reply)),
+            (f"validate_exercise_snapshots[{size}]", lambda fx=fx: validate_exercise_snapshots("Suma alternada", fx["description_b64"])),
+            (f"render_template.uncached[{size}]", lambda frozen=frozen: _render_cached.__wrapped__(compiled_key, frozen)),
+            (f"render_template.cached[{size}]", lambda challenge=fx["challenge"]: render_template(challenge, "python")),
+        ]
+
+    suite.append(("check_rate_limit[10k ips]", lambda: check_rate_limit(next(ips), limit=10**9, window_seconds=60)))
+    return suite
+
+
+def run(name_filter: str = "", min_time: float = 0.2, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    return {
+        name: measure(func, repeat=repeat, min_time=min_time)
+        for name, func in build_suite()
+        if name_filter in name
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run (default 0.2)")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per benchmark (default 5)")
+    parser.add_argument("--save", metavar="PATH", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    results = run(args.filter, args.min_time, args.repeat)
+    rows = [[name, stats["median_us"], stats["stdev_us"], stats["loops"]] for name, stats in results.items()]
+    print(format_table(["benchmark", "median µs", "stdev µs", "loops"], rows))
+
+    if args.save:
+        save_results(args.save, results)
+        print(f"\nBaseline saved to {args.save}")
+    if args.compare:
+        baseline = load_results(args.compare)
+        if args.filter:
+            baseline = {name: stats for name, stats in baseline.items() if args.filter in name}
+        report, regressions = compare_results(baseline, results, args.threshold)
+        print(f"\nComparison with {args.compare}:\n{report}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
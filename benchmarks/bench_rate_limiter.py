@@ -0,0 +1,115 @@
+"""
+Rate limiter microbenchmark: legacy sliding-window log vs GCRA, at 100k IPs.
+
+Run from the repository root:
+    python -m benchmarks.bench_rate_limiter [--ips 100000] [--hits 5]
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Dict, List
+
+from app.utils.rate_limiter import GCRARateLimiter
+from benchmarks._harness import format_table, measure
+
+
+class LegacyRateLimiter:
+    """The previous implementation: a list of timestamps per IP, rebuilt on every call."""
+
+    def __init__(self, limit: int, window_seconds: int):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.request_tracker: Dict[str, List[float]] = {}
+
+    def hit(self, ip: str) -> bool:
+        now = time.time()
+        if ip not in self.request_tracker:
+            self.request_tracker[ip] = []
+        self.request_tracker[ip] = [
+            timestamp for timestamp in self.request_tracker[ip]
+            if now - timestamp < self.window_seconds
+        ]
+        if len(self.request_tracker[ip]) >= self.limit:
+            return False
+        self.request_tracker[ip].append(now)
+        return True
+
+    def sweep(self, max_age_seconds: int = 3600) -> None:
+        now = time.time()
+        to_remove = []
+        for ip, timestamps in self.request_tracker.items():
+            recent_requests = [t for t in timestamps if now - t < max_age_seconds]
+            if not recent_requests:
+                to_remove.append(ip)
+            else:
+                self.request_tracker[ip] = recent_requests
+        for ip in to_remove:
+            del self.request_tracker[ip]
+
+
+def _ips(count: int) -> List[str]:
+    return [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(count)]
+
+
+def _populate(limiter, ips: List[str], hits: int) -> None:
+    for _ in range(hits):
+        for ip in ips:
+            limiter.hit(ip)
+
+
+def _memory_mb(factory, ips: List[str], hits: int) -> float:
+    tracemalloc.start()
+    limiter = factory()
+    _populate(limiter, ips, hits)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del limiter
+    return current / (1024 * 1024)
+
+
+def run(ip_count: int, hits: int) -> str:
+    ips = _ips(ip_count)
+    factories = {
+        "legacy list": lambda: LegacyRateLimiter(limit=20, window_seconds=60),
+        "GCRA": lambda: GCRARateLimiter(limit=20, window_seconds=60),
+    }
+
+    rows = []
+    for name, factory in factories.items():
+        limiter = factory()
+        started = time.perf_counter()
+        _populate(limiter, ips, hits)
+        populate_s = time.perf_counter() - started
+
+        hot_ip = ips[ip_count // 2]
+        # The hot key saturates quickly, so this times the steady-state rejection path
+        hot = measure(lambda: limiter.hit(hot_ip), repeat=5, min_time=0.1)
+
+        started = time.perf_counter()
+        limiter.sweep()
+        sweep_ms = (time.perf_counter() - started) * 1000
+
+        rows.append([
+            name,
+            populate_s / (ip_count * hits) * 1e6,
+            hot["median_us"],
+            sweep_ms,
+            _memory_mb(factory, ips, hits),
+        ])
+
+    return format_table(
+        ["implementation", "populate µs/check", "hot-key µs/check", "full sweep ms", f"memory MB ({ip_count:,} IPs × {hits})"],
+        rows,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ips", type=int, default=100_000)
+    parser.add_argument("--hits", type=int, default=5, help="requests recorded per IP before measuring")
+    args = parser.parse_args()
+    print(run(args.ips, args.hits))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Response serialization cost per endpoint: FastAPI's default path vs model_response.
+
+The default path is what FastAPI 0.104 does with a returned model and a
+``response_model``. It dumps the model to a dict, validates the dict against the
+response field, serializes it to JSON-safe values and then encodes it with the
+stdlib ``JSONResponse``. The fast path is ``model_response(model).body``, a
+single ``model_dump_json(by_alias=True)``. Both bodies are checked to decode to
+the same document.
+
+Run from the repository root:
+    python -m benchmarks.bench_serialization [--stdout-sizes 1000,64000,1000000]
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from app.main import app
+from app.models.schemas import (
+    BatchChallenge,
+    ChallengeBatchResponse,
+    ChallengeCost,
+    ChallengeResponse,
+    ChatResponse,
+    DropdownLanguage,
+    DropdownLanguagesResponse,
+    ExecuteResponse,
+    Language,
+    LanguagesResponse,
+)
+from app.utils.responses import model_response
+from benchmarks._harness import format_table, measure
+
+TEMPLATE = (
+    "/**\n * Implementa la función solve.\n * @param {number[]} nums\n * @returns {number}\n */\n"
+    "function solve(nums) {\n  // Escribe tu solución aquí\n}\n\nconsole.log(solve([1, 2, 3]));\n"
+)
+
+
+def _challenge(i: int) -> Dict[str, str]:
+    return dict(
+        challenge_id=f"{i:016x}",
+        title=f"Ejercicio {i}: suma de arreglo",
+        description="Dado un arreglo de enteros, retorna la suma de sus elementos. " * 8,
+        template_code=TEMPLATE * 6,
+        exercise_description="RGFkbyB1biBhcnJlZ2xvIGRlIGVudGVyb3MsIHJldG9ybmEgbGEgc3VtYS4=" * 10,
+    )
+
+
+def _cases(stdout_sizes: List[int]) -> List[Tuple[str, str, BaseModel]]:
+    cost = ChallengeCost(prompt_tokens=900, completion_tokens=2400, cost_usd=0.0031)
+    cases = [
+        ("/api/chat", "verdict text", ChatResponse(response="VEREDICTO: APROBADO ✅\n" + "Buen uso de reduce. " * 40)),
+        ("/api/generate-challenge", "1 challenge", ChallengeResponse(**_challenge(1))),
+        ("/api/generate-challenges/batch", "10 challenges", ChallengeBatchResponse(
+            challenges=[BatchChallenge(**_challenge(i), cost=cost, latency_ms=812.5) for i in range(10)],
+            model="gpt-5-mini", requested=10, invalid=0, llm_latency_ms=8125.0, total_latency_ms=8140.2, total_cost=cost,
+        )),
+        ("/api/languages", "60 languages", LanguagesResponse(
+            languages=[Language(id=i, name=f"Language {i} (runtime 1.{i})", is_archived=False) for i in range(60)]
+        )),
+        ("/api/languages/dropdown", "12 languages", DropdownLanguagesResponse(
+            languages=[DropdownLanguage(id=i, name=f"lang{i}", display_name=f"Language {i} (LTS)") for i in range(12)]
+        )),
+    ]
+    for size in stdout_sizes:
+        stdout = ("console.log line de salida\n" * (size // 27 + 1))[:size]
+        cases.append(("/api/execute", f"stdout {size:,} B", ExecuteResponse(
+            status="Accepted", stdout=stdout, stderr=None, compile_output=None, time="0.042", memory=41216, exit_code=0,
+        )))
+    return cases
+
+
+def _response_fields() -> Dict[str, object]:
+    return {route.path: route.response_field for route in app.routes if isinstance(route, APIRoute) and route.response_field}
+
+
+def run(stdout_sizes: List[int]) -> str:
+    fields = _response_fields()
+    loop = asyncio.new_event_loop()
+
+    async def default_body(model: BaseModel, field) -> bytes:
+        content = await serialize_response(field=field, response_content=model)
+        return JSONResponse(content).body
+
+    async def fast_body(model: BaseModel) -> bytes:
+        return model_response(model).body
+
+    # Both run as coroutines on the same loop so the loop overhead cancels out
+    def default_path(model: BaseModel, field) -> bytes:
+        return loop.run_until_complete(default_body(model, field))
+
+    def fast_path(model: BaseModel) -> bytes:
+        return loop.run_until_complete(fast_body(model))
+
+    rows = []
+    try:
+        for path, payload, model in _cases(stdout_sizes):
+            field = fields[path]
+            legacy_body = default_path(model, field)
+            body = fast_path(model)
+            assert json.loads(legacy_body) == json.loads(body), path
+
+            legacy = measure(lambda: default_path(model, field), repeat=5, min_time=0.2)
+            fast = measure(lambda: fast_path(model), repeat=5, min_time=0.2)
+            rows.append([
+                path, payload, f"{len(body):,}", legacy["median_us"], fast["median_us"],
+                f"{legacy['median_us'] / fast['median_us']:.1f}x",
+            ])
+    finally:
+        loop.close()
+    return format_table(["endpoint", "payload", "body bytes", "default µs", "model_response µs", "speedup"], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stdout-sizes", default="1000,64000,1000000", help="comma-separated /api/execute stdout sizes in bytes")
+    args = parser.parse_args()
+    print(run([int(size) for size in args.stdout_sizes.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
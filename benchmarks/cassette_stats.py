@@ -0,0 +1,48 @@
+"""
+Upstream latency and token usage from recorded HTTP cassettes.
+
+Every cassette recorded with ``app.utils.http_cassette`` keeps the duration of
+each exchange and OpenAI's usage block. This groups them per endpoint (Judge0
+tokens and IPs in paths are collapsed to ``{id}``) and compares two recordings,
+for example before and after a prompt change:
+
+    python -m benchmarks.cassette_stats cassettes/verdict_chain.json
+    python -m benchmarks.cassette_stats cassettes/verdict_chain.json --compare old/verdict_chain.json
+    python -m benchmarks.cassette_stats cassettes/verdict_chain.json --compare old/verdict_chain.json --stat output_tokens
+
+``--compare`` exits with status 1 when ``--stat`` (median latency by default)
+grew by more than ``--threshold``.
+"""
+import argparse
+import sys
+
+from app.utils.http_cassette import load_interactions, summarize
+from benchmarks._harness import compare_results, format_table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="cassette to summarize")
+    parser.add_argument("--compare", metavar="PATH", help="older cassette to compare against")
+    parser.add_argument("--stat", default="median_us", help="figure compared: median_us, p95_us, input_tokens, output_tokens, reasoning_tokens")
+    parser.add_argument("--threshold", type=float, default=0.10, help="growth that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    current = summarize(load_interactions(args.cassette))
+    rows = [
+        [name, stats["calls"], stats["errors"], stats["median_us"] / 1000, stats["p95_us"] / 1000,
+         stats.get("input_tokens", "-"), stats.get("output_tokens", "-"), stats.get("reasoning_tokens", "-")]
+        for name, stats in sorted(current.items())
+    ]
+    print(format_table(["endpoint", "calls", "errors", "p50 ms", "p95 ms", "input tok", "output tok", "reasoning tok"], rows))
+
+    if args.compare:
+        report, regressions = compare_results(summarize(load_interactions(args.compare)), current, args.threshold, stat=args.stat)
+        print(f"\n{args.stat} compared with {args.compare}:\n{report}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
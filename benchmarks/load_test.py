@@ -0,0 +1,355 @@
+"""
+Load test for the full API, with OpenAI, Judge0 and geo served by local stand-ins.
+
+Drives a weighted mix of traffic at a fixed arrival rate with a cap on requests
+in flight. Requests are scheduled open-loop, so a slow server does not slow the
+arrivals down. The mix covers normal chat, automatic prompts, verdicts, execute,
+challenge generation and the language catalogue. For each route the report gives
+throughput and p50/p95/p99 latency. Latency is measured from when the request
+was scheduled, so time spent queued behind the in-flight cap is included. The
+report also gives event-loop lag for the app and for the load generator; lag
+on the generator means the numbers are no longer trustworthy.
+
+By default the app (``app.main:app``, lifespan included) and the stand-ins run in
+this process, each on its own thread and event loop. Per-IP limits see one
+address per simulated client via X-Forwarded-For. ``--target`` points the
+generator at an app running elsewhere instead, e.g. a uvicorn process started
+with the ``*_URL`` overrides below. Its loop lag is then read from ``/metrics``
+when exposed.
+
+Run from the repository root:
+    python -m benchmarks.load_test --rps 50 --duration 30 --concurrency 80
+    python -m benchmarks.load_test --mix chat=1 --openai-latency-ms 3000 --rps 20
+    python -m benchmarks.load_test --target http://localhost:8000 --rps 20
+
+Stand-in overrides (what the in-process mode sets):
+    OPENAI_BASE_URL, JUDGE0_API_URL, GEO_API_URL, plus dummy API keys.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks._harness import format_table
+
+DEFAULT_MIX = "chat=35,automatic=15,verdict=10,execute=20,challenge=5,languages=15"
+
+_DESCRIPTION = "Implementa sumaAlternada(nums) que retorne la suma alternando signos."
+_CODE = "function sumaAlternada(nums) {\n  let total = 0;\n  nums.forEach((n, i) => { total += i % 2 ? -n : n; });\n  return total;\n}\n"
+_HISTORY = [
+    {"role": "user", "content": "Hola, quiero practicar arreglos."},
+    {"role": "assistant", "content": "Perfecto. ¿Prefieres algo de recorrido o de búsqueda?"},
+    {"role": "user", "content": "Recorrido, algo como sumar con signos alternados."},
+]
+
+ROUTES: Dict[str, Tuple[str, str, Optional[dict]]] = {
+    "chat": ("POST", "/api/chat", {
+        "messages": _HISTORY, "languageId": 97, "exerciseActive": False, "currentCode": "", "automatic": False,
+    }),
+    "automatic": ("POST", "/api/chat", {
+        "messages": _HISTORY + [{"role": "user", "content": "HINT_REQUEST"}], "languageId": 97,
+        "exerciseActive": True, "currentCode": _CODE, "automatic": True,
+    }),
+    "verdict": ("POST", "/api/chat", {
+        "messages": _HISTORY + [{"role": "user", "content": "Terminé el ejercicio."}], "languageId": 97,
+        "exerciseActive": True, "currentCode": _CODE, "automatic": True, "finished": True, "executionOutput": "2\n",
+        "exerciseNameSnapshot": "Suma alternada",
+        "exerciseDescriptionSnapshot": base64.b64encode(_DESCRIPTION.encode()).decode(),
+    }),
+    "execute": ("POST", "/api/execute", {"languageId": 97, "sourceCode": _CODE + "console.log(sumaAlternada([1, 2, 3]));", "stdin": ""}),
+    "challenge": ("POST", "/api/generate-challenge", {"language": "javascript", "difficulty": "easy", "topic": "arrays"}),
+    "languages": ("GET", "/api/languages", None),
+}
+
+
+@dataclass
+class RouteStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    service_ms: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, status: str, latency_ms: float, service_ms: float) -> None:
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latencies_ms.append(latency_ms)
+        self.service_ms.append(service_ms)
+
+    @property
+    def ok(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status.startswith("2"))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # nearest-rank
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route {name!r}; choose from {', '.join(ROUTES)}")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+async def probe_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Record how late ``asyncio.sleep(interval)`` wakes up on the current loop, in ms."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (loop.time() - started - interval) * 1000))
+
+
+def lag_summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples) if samples else 0.0,
+    }
+
+
+async def run_load(
+    base_url: str,
+    *,
+    rps: float,
+    duration: float,
+    concurrency: int,
+    mix: List[Tuple[str, float]],
+    ips: int = 5000,
+    poisson: bool = False,
+    seed: int = 7,
+) -> Dict[str, object]:
+    """Send ``rps * duration`` requests and return per-route stats plus generator loop lag."""
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    addresses = [f"200.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(1, ips + 1)]
+    bodies = {name: json.dumps(body).encode() if body is not None else None for name, (_, _, body) in ROUTES.items()}
+    stats = {name: RouteStats() for name in names}
+    semaphore = asyncio.Semaphore(concurrency)
+    lag: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(lag, stop))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def one(name: str, scheduled: float) -> None:
+            method, path, _ = ROUTES[name]
+            headers = {"X-Forwarded-For": rng.choice(addresses), "Content-Type": "application/json"}
+            async with semaphore:
+                sent = time.perf_counter()
+                try:
+                    response = await client.request(method, path, content=bodies[name], headers=headers)
+                    status = str(response.status_code)
+                except httpx.HTTPError as exc:
+                    status = exc.__class__.__name__
+                done = time.perf_counter()
+            stats[name].record(status, (done - scheduled) * 1000, (done - sent) * 1000)
+
+        total = int(rps * duration)
+        tasks = []
+        started = time.perf_counter()
+        offset = 0.0
+        for i in range(total):
+            offset = offset + rng.expovariate(rps) if poisson else i / rps
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(rng.choices(names, weights)[0], started + offset)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    return {"elapsed": elapsed, "routes": stats, "generator_lag": lag_summary(lag)}
+
+
+def report(result: Dict[str, object], app_lag: Optional[Dict[str, float]] = None) -> str:
+    elapsed = result["elapsed"]
+    rows = []
+    every = RouteStats()
+    for name, stats in result["routes"].items():
+        for status, count in stats.statuses.items():
+            every.statuses[status] = every.statuses.get(status, 0) + count
+        every.latencies_ms += stats.latencies_ms
+        every.service_ms += stats.service_ms
+        rows.append(_row(name, stats, elapsed))
+    rows.append(_row("all", every, elapsed))
+    table = format_table(
+        ["route", "requests", "ok", "other statuses", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "p99 service ms"], rows
+    )
+
+    lines = [table, ""]
+    generator = result["generator_lag"]
+    if app_lag is not None:
+        lines.append(f"app event-loop lag: p50 {app_lag['p50_ms']:.1f} ms, p99 {app_lag['p99_ms']:.1f} ms, max {app_lag['max_ms']:.1f} ms")
+    lines.append(
+        f"generator event-loop lag: p50 {generator['p50_ms']:.1f} ms, p99 {generator['p99_ms']:.1f} ms, max {generator['max_ms']:.1f} ms"
+    )
+    return "\n".join(lines)
+
+
+def _row(name: str, stats: RouteStats, elapsed: float) -> list:
+    other = ", ".join(f"{status}×{count}" for status, count in sorted(stats.statuses.items()) if not status.startswith("2"))
+    return [
+        name, len(stats.latencies_ms), stats.ok, other or "-", len(stats.latencies_ms) / elapsed if elapsed else 0.0,
+        percentile(stats.latencies_ms, 50), percentile(stats.latencies_ms, 95), percentile(stats.latencies_ms, 99),
+        max(stats.latencies_ms, default=0.0), percentile(stats.service_ms, 99),
+    ]
+
+
+def start_inprocess(args) -> Tuple[str, object, List[object]]:
+    """Start the stand-ins, point the app at them and serve it. Returns (url, app servers, all servers)."""
+    from standins import geo_server, judge0_server, openai_server
+    from standins._runner import BackgroundServers
+
+    upstreams = BackgroundServers("standins")
+    urls = upstreams.start({
+        "openai": openai_server.create_app(
+            latency_ms=args.openai_latency_ms,
+            profile=args.openai_profile,
+            latency_scale=args.openai_latency_scale,
+            faults=args.openai_faults,
+            hang_seconds=args.openai_hang_seconds,
+        ),
+        "judge0": judge0_server.create_app(latency_ms=args.judge0_latency_ms),
+        "geo": geo_server.create_app(latency_ms=args.geo_latency_ms),
+    })
+    # Must be set before app modules are imported: they read these at import time
+    os.environ.update({
+        "OPENAI_BASE_URL": f"{urls['openai']}/v1",
+        "OPENAI_API_KEY": "sk-standin",
+        "JUDGE0_API_URL": urls["judge0"],
+        "JUDGE0_API_KEY": "standin",
+        "GEO_API_URL": f"{urls['geo']}/json",
+        "GEO_DB_PATH": "",
+        "CHALLENGE_STORE": "memory",
+    })
+    # Captura el stack de cada callback que bloquee el loop de la app
+    os.environ.setdefault("LOOP_BLOCK_DEBUG", "true")
+    from app.main import app
+
+    app_servers = BackgroundServers("app")
+    app_url = app_servers.start({"app": app}, proxy_headers=True, lifespan="on")["app"]
+    return app_url, app_servers, [app_servers, upstreams]
+
+
+async def _scrape_lag(base_url: str) -> Optional[str]:
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+            response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    lines = [line for line in response.text.splitlines() if line.startswith("event_loop_") and "_bucket" not in line]
+    return "\n".join(lines) or None
+
+
+def add_inprocess_arguments(parser: argparse.ArgumentParser) -> None:
+    """Target and stand-in options read by ``start_inprocess`` (shared with benchmarks/memory_budget.py)."""
+    parser.add_argument("--target", help="base URL of an app started elsewhere (default: run it in-process)")
+    parser.add_argument("--openai-latency-ms", type=float, default=800.0)
+    parser.add_argument("--openai-profile", help="sample OpenAI latency and tokens per effort from this reasoning benchmark JSON")
+    parser.add_argument("--openai-latency-scale", type=float, default=1.0, help="multiplier for latencies sampled from --openai-profile")
+    parser.add_argument("--openai-faults", default="", help="OpenAI fault probabilities, e.g. 429=0.05,timeout=0.01")
+    parser.add_argument("--openai-hang-seconds", type=float, default=90.0, help="how long an OpenAI 'timeout' fault hangs")
+    parser.add_argument("--judge0-latency-ms", type=float, default=50.0)
+    parser.add_argument("--geo-latency-ms", type=float, default=20.0)
+    parser.add_argument("--show-stall-logs", action="store_true", help="log each loop stall as it happens, not only in the summary")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20.0, help="arrival rate, requests per second")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of traffic")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of traffic sent first and not reported")
+    parser.add_argument("--concurrency", type=int, default=80, help="max requests in flight (compare with Cloud Run --concurrency)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--ips", type=int, default=5000, help="distinct client IPs (X-Forwarded-For)")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed rate")
+    add_inprocess_arguments(parser)
+    parser.add_argument("--fail-on-blocking", action="store_true", help="exit 1 when a callback blocked the app's loop (in-process only)")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    servers = []
+    app_servers = None
+    base_url = args.target
+    if base_url is None:
+        base_url, app_servers, servers = start_inprocess(args)
+        if not args.show_stall_logs:
+            # Los stacks capturados se resumen al final del reporte
+            logging.getLogger("app.utils.loop_monitor").setLevel(logging.ERROR)
+
+    app_lag_samples: List[float] = []
+    app_probe_stop = None
+    exit_code = 0
+    try:
+        if args.warmup > 0:
+            asyncio.run(run_load(base_url, rps=args.rps, duration=args.warmup, concurrency=args.concurrency, mix=mix, ips=args.ips))
+        if app_servers is not None:
+            app_probe_stop = asyncio.Event()
+            asyncio.run_coroutine_threadsafe(_start_probe(app_lag_samples, app_probe_stop), app_servers.loop).result()
+        result = asyncio.run(run_load(
+            base_url, rps=args.rps, duration=args.duration, concurrency=args.concurrency,
+            mix=mix, ips=args.ips, poisson=args.poisson,
+        ))
+        if app_probe_stop is not None:
+            app_servers.loop.call_soon_threadsafe(app_probe_stop.set)
+        print(f"{args.rps:g} req/s offered for {args.duration:g}s, concurrency {args.concurrency}, target {base_url}\n")
+        print(report(result, lag_summary(app_lag_samples) if app_servers is not None else None))
+        if args.target:
+            scraped = asyncio.run(_scrape_lag(base_url))
+            if scraped:
+                print(f"app /metrics:\n{scraped}")
+        else:
+            sites = blocking_report()
+            if sites:
+                print(sites)
+                if args.fail_on_blocking:
+                    exit_code = 1
+    finally:
+        for server in servers:
+            server.stop()
+    sys.exit(exit_code)
+
+
+def blocking_report(limit: int = 5) -> Optional[str]:
+    """Blocking call sites captured by the app's loop monitor (in-process runs), worst first."""
+    from app.utils.loop_monitor import loop_monitor
+
+    sites = loop_monitor.blocking_sites()
+    if not sites:
+        return None
+    parts = [f"{len(loop_monitor.reports)} event-loop stall(s) captured, {len(sites)} site(s):"]
+    for site in sites[:limit]:
+        # Las últimas líneas del stack muestran la llamada que bloquea
+        tail = "".join(site["stack"].splitlines(keepends=True)[-6:])
+        parts.append(f"\n{site['count']}× up to {site['max_blocked_ms']:,.0f} ms at {site['site']}\n{tail}")
+    return "\n".join(parts)
+
+
+async def _start_probe(samples: List[float], stop: asyncio.Event) -> None:
+    # Runs on the app's loop so the probe measures the loop that serves requests
+    asyncio.get_running_loop().create_task(probe_loop_lag(samples, stop))
+
+
+if __name__ == "__main__":
+    main()
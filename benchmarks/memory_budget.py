@@ -0,0 +1,155 @@
+"""
+Steady-state memory under load, checked against the 512Mi Cloud Run budget.
+
+Drives the app with the load harness (benchmarks/load_test.py) in phases.
+After each phase it reads ``process_resident_memory_bytes`` from ``/metrics``.
+Exits with status 1 when:
+
+- the resident memory ever goes over ``--budget-mb`` (default 512, as in
+  cloudbuild.yaml), or
+- it keeps growing in steady state: more than ``--max-growth-mb`` between the
+  end of the first measured phase and the end of the last one. The warm-up
+  phase and the first phase are where caches and allocator arenas fill up.
+
+With ``--tracemalloc N`` the script also starts tracemalloc through
+``/debug/memory`` after the warm-up and prints the allocation sites that grew
+the most by the end. For an app started elsewhere that needs its
+``DEBUG_PROFILE_TOKEN`` in ``--debug-token``.
+
+Run from the repository root:
+    python -m benchmarks.memory_budget                                   # in-process, against stand-ins
+    python -m benchmarks.memory_budget --phases 10 --phase-seconds 30 --rps 40 --tracemalloc 5
+    python -m benchmarks.memory_budget --target http://localhost:8080 --debug-token "$DEBUG_PROFILE_TOKEN"
+
+In-process runs measure the whole process: app, load generator and stand-ins,
+so they overstate the app's footprint (by roughly 40 MiB) but not its growth.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import secrets
+import sys
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks._harness import format_table
+from benchmarks.load_test import DEFAULT_MIX, add_inprocess_arguments, parse_mix, run_load, start_inprocess
+
+MIB = 1024 * 1024
+MEMORY_METRICS = ("process_resident_memory_bytes", "process_resident_memory_peak_bytes", "python_allocated_blocks")
+
+
+def parse_memory_metrics(text: str) -> Dict[str, float]:
+    """Unlabelled memory gauges from a Prometheus text exposition."""
+    values = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in MEMORY_METRICS:
+            values[name] = float(value)
+    return values
+
+
+def check_budget(rss_samples: List[float], budget_mb: float, max_growth_mb: float) -> List[str]:
+    """Reasons the run failed; an empty list means it is within budget."""
+    failures = []
+    peak = max(rss_samples)
+    if peak > budget_mb * MIB:
+        failures.append(f"peak RSS {peak / MIB:.0f} MiB over the {budget_mb:g} MiB budget")
+    growth = rss_samples[-1] - rss_samples[0]
+    if len(rss_samples) > 1 and growth > max_growth_mb * MIB:
+        failures.append(f"RSS grew {growth / MIB:.1f} MiB in steady state (limit {max_growth_mb:g} MiB)")
+    return failures
+
+
+async def scrape_memory(base_url: str) -> Dict[str, float]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    return parse_memory_metrics(response.text)
+
+
+async def _debug(base_url: str, token: str, method: str, path: str, **params) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, headers={"X-Debug-Token": token}) as client:
+        response = await client.request(method, path, params=params)
+        response.raise_for_status()
+    return response.json()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20.0, help="arrival rate, requests per second")
+    parser.add_argument("--phases", type=int, default=5, help="measured phases (default 5)")
+    parser.add_argument("--phase-seconds", type=float, default=10.0, help="traffic per phase (default 10)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of traffic before the first phase")
+    parser.add_argument("--concurrency", type=int, default=80)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--ips", type=int, default=5000, help="distinct client IPs (X-Forwarded-For)")
+    parser.add_argument("--budget-mb", type=float, default=512.0, help="max resident memory (default 512)")
+    parser.add_argument("--max-growth-mb", type=float, default=16.0, help="max growth from the first to the last phase (default 16)")
+    parser.add_argument("--tracemalloc", type=int, default=0, metavar="FRAMES", help="trace allocations with this many frames and print the top growth")
+    parser.add_argument("--debug-token", help="DEBUG_PROFILE_TOKEN of a --target app (for --tracemalloc)")
+    add_inprocess_arguments(parser)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    servers = []
+    base_url = args.target
+    token = args.debug_token
+    if base_url is None:
+        # Habilita /debug/memory en la app in-process
+        token = os.environ.setdefault("DEBUG_PROFILE_TOKEN", secrets.token_hex(16))
+        base_url, _, servers = start_inprocess(args)
+        if not args.show_stall_logs:
+            logging.getLogger("app.utils.loop_monitor").setLevel(logging.ERROR)
+    if args.tracemalloc and not token:
+        parser.error("--tracemalloc against --target needs --debug-token")
+
+    def load(seconds: float) -> None:
+        asyncio.run(run_load(base_url, rps=args.rps, duration=seconds, concurrency=args.concurrency, mix=mix, ips=args.ips))
+
+    rows = []
+    rss: List[float] = []
+    diff: Optional[dict] = None
+    try:
+        before = asyncio.run(scrape_memory(base_url))
+        rows.append(["start", before["process_resident_memory_bytes"] / MIB, "-", int(before.get("python_allocated_blocks", 0))])
+        if args.warmup > 0:
+            load(args.warmup)
+        if args.tracemalloc:
+            asyncio.run(_debug(base_url, token, "POST", "/debug/memory/tracemalloc/start", frames=args.tracemalloc))
+            base = asyncio.run(_debug(base_url, token, "POST", "/debug/memory/snapshots"))["id"]
+        for phase in range(1, args.phases + 1):
+            load(args.phase_seconds)
+            sample = asyncio.run(scrape_memory(base_url))
+            rss.append(sample["process_resident_memory_bytes"])
+            change = f"{(rss[-1] - rss[0]) / MIB:+.1f}" if len(rss) > 1 else "-"
+            rows.append([f"phase {phase}", rss[-1] / MIB, change, int(sample.get("python_allocated_blocks", 0))])
+        if args.tracemalloc:
+            diff = asyncio.run(_debug(base_url, token, "GET", "/debug/memory/diff", base=base, limit=15))
+            asyncio.run(_debug(base_url, token, "POST", "/debug/memory/tracemalloc/stop"))
+    finally:
+        for server in servers:
+            server.stop()
+
+    print(f"{args.rps:g} req/s, {args.phases} phases of {args.phase_seconds:g}s after {args.warmup:g}s of warm-up, target {base_url}\n")
+    print(format_table(["phase", "RSS MiB", "vs phase 1 MiB", "allocated blocks"], rows))
+    if diff is not None:
+        print("\nTop allocation growth since the warm-up (tracemalloc):\n")
+        print(format_table(
+            ["site", "growth KiB", "blocks", "total KiB"],
+            [[item["site"], item["size_diff_bytes"] / 1024, item["count_diff"], item["size_bytes"] / 1024] for item in diff["diff"]],
+        ))
+
+    failures = check_budget(rss, args.budget_mb, args.max_growth_mb)
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"\nWithin budget: peak {max(rss) / MIB:.0f} MiB <= {args.budget_mb:g} MiB, "
+          f"steady-state growth {(rss[-1] - rss[0]) / MIB:+.1f} MiB <= {args.max_growth_mb:g} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Cold-start import benchmark for the API, with a time budget and a list of forbidden imports.
+
+Each run starts a fresh interpreter with ``python -X importtime -c "import app.main"``
+and parses its per-module timings. The script reports:
+
+- the median import time of ``app.main`` and the median wall time of the process;
+- the packages that cost the most (self time summed per top-level package);
+- the heavy SDKs that were imported at boot even though they should be lazy
+  (see app/utils/startup.py).
+
+Run from the repository root:
+    python -m benchmarks.startup_time                                  # 5 runs, report only
+    python -m benchmarks.startup_time --budget-ms 700                  # exit 1 above 700 ms
+    python -m benchmarks.startup_time --save benchmarks/baselines/startup.json
+    python -m benchmarks.startup_time --compare benchmarks/baselines/startup.json
+
+The script exits with status 1 when the median import time exceeds ``--budget-ms``,
+when a ``--forbid`` module is imported by ``app.main``, or when ``--compare`` finds a
+regression. Timings depend on the machine and on a warm page cache; the first
+run after a reinstall is slower, so it is reported but left out of the median.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Set
+
+from benchmarks._harness import compare_results, format_table, load_results, save_results
+
+TARGET = "app.main"
+# Imported lazily or by the lifespan preload; never by app.main itself
+FORBIDDEN = ("openai", "httpx", "requests", "firebase_admin", "google.auth")
+DEFAULT_BUDGET_MS = 800.0
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$")
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """Records of ``-X importtime`` output, in the order Python printed them."""
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def package_totals(records: List[ImportRecord]) -> Dict[str, int]:
+    """Self time in µs summed per top-level package."""
+    totals: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        totals[package] = totals.get(package, 0) + record.self_us
+    return totals
+
+
+def forbidden_imports(modules: Set[str], forbidden=FORBIDDEN) -> List[str]:
+    return sorted(name for name in forbidden if name in modules)
+
+
+def run_once(target: str = TARGET) -> Dict[str, object]:
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    wall_us = (time.perf_counter() - started) * 1e6
+    if process.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{process.stderr[-2000:]}")
+    records = parse_importtime(process.stderr)
+    cumulative = next((r.cumulative_us for r in records if r.module == target), 0)
+    return {"import_us": cumulative, "wall_us": wall_us, "records": records}
+
+
+def measure(runs: int, target: str = TARGET) -> Dict[str, object]:
+    # La primera corrida calienta el page cache y los .pyc: se descarta
+    warmup = run_once(target)
+    samples = [run_once(target) for _ in range(runs)]
+    imports = [sample["import_us"] for sample in samples]
+    walls = [sample["wall_us"] for sample in samples]
+    modules = {record.module for record in warmup["records"]}
+    return {
+        "first_import_us": warmup["import_us"],
+        "import": {"median_us": statistics.median(imports), "min_us": min(imports)},
+        "wall": {"median_us": statistics.median(walls), "min_us": min(walls)},
+        "packages": package_totals(samples[-1]["records"]),
+        "modules": modules,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="timed interpreter starts (default 5)")
+    parser.add_argument("--target", default=TARGET, help=f"module to import (default {TARGET})")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help=f"max median import time (default {DEFAULT_BUDGET_MS:g})")
+    parser.add_argument("--forbid", default=",".join(FORBIDDEN), help="modules that must not be imported at boot ('' to allow all)")
+    parser.add_argument("--top", type=int, default=10, help="packages to list (default 10)")
+    parser.add_argument("--save", metavar="PATH", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    result = measure(args.runs, args.target)
+    import_ms = result["import"]["median_us"] / 1000
+    print(f"import {args.target}: median {import_ms:.0f} ms, min {result['import']['min_us'] / 1000:.0f} ms "
+          f"(first run {result['first_import_us'] / 1000:.0f} ms, {len(result['modules'])} modules)")
+    print(f"process wall (interpreter + imports): median {result['wall']['median_us'] / 1000:.0f} ms\n")
+
+    top = sorted(result["packages"].items(), key=lambda item: -item[1])[:args.top]
+    print(format_table(["package", "self ms"], [[name, us / 1000] for name, us in top]))
+
+    failed = False
+    forbidden = forbidden_imports(result["modules"], [name for name in args.forbid.split(",") if name])
+    if forbidden:
+        failed = True
+        print(f"\nFORBIDDEN at boot: {', '.join(forbidden)} (import them lazily, see app/utils/startup.py)")
+    if import_ms > args.budget_ms:
+        failed = True
+        print(f"\nOVER BUDGET: {import_ms:.0f} ms > {args.budget_ms:g} ms")
+    else:
+        print(f"\nWithin budget: {import_ms:.0f} ms <= {args.budget_ms:g} ms")
+
+    results = {f"import {args.target}": result["import"], "process wall": result["wall"]}
+    if args.save:
+        save_results(args.save, results)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        table, regressions = compare_results(load_results(args.compare), results, args.threshold)
+        print("\n" + table)
+        if regressions:
+            failed = True
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
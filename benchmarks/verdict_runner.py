@@ -0,0 +1,299 @@
+"""
+Verdict benchmark: accuracy, latency, reasoning tokens and cost per model configuration.
+
+Runs the ``VerdictCase`` corpus of ``test_verdict_chain_e2e.py`` concurrently
+against the Responses API for every configuration of a matrix:
+
+- reasoning effort (``--efforts minimal,low``);
+- output token cap (``--max-tokens 400,800``);
+- with or without the verdict reasoning prompt (``--reasoning-prompt on,off``).
+
+Each configuration reports verdict accuracy against ``expected_verdict``, p50/p95
+latency, incomplete and empty replies, mean reasoning tokens and cost, as JSON
+and as the markdown report that replaces the hand-written
+REASONING_BENCHMARK_REPORT.md:
+
+    python -m benchmarks.verdict_runner --concurrency 8 --repeat 3 \\
+        --json verdict_benchmark_results.json --markdown REASONING_BENCHMARK_REPORT.md
+
+It calls ``OPENAI_BASE_URL`` (real API by default; point it at
+``standins/openai_server.py`` for a dry run), and honours ``HTTP_CASSETTE`` so
+a recorded matrix can be replayed offline. Prices are USD per million tokens;
+reasoning tokens are billed as output.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import math
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+import httpx
+
+from app.services.openai_service import OPENAI_BASE_URL, get_openai_headers
+from app.utils.http_cassette import use_cassette_from_env
+from benchmarks._harness import format_table
+from test_verdict_chain_e2e import (
+    VerdictCase,
+    _canonical_cases,
+    _detect_verdict,
+    _encode_description,
+    build_verdict_payload,
+    parse_verdict_response,
+)
+
+# Precios de gpt-5-mini (USD por millón de tokens)
+INPUT_PRICE_PER_M = 0.25
+OUTPUT_PRICE_PER_M = 2.00
+RETRY_STATUSES = {429, 500, 502, 503}
+
+
+@dataclass(frozen=True)
+class VerdictConfig:
+    effort: str
+    max_output_tokens: int
+    reasoning_prompt: bool
+
+    @property
+    def name(self) -> str:
+        return f"{self.effort} · {self.max_output_tokens} tok · {'con' if self.reasoning_prompt else 'sin'} reasoning prompt"
+
+
+def build_matrix(efforts: List[str], max_tokens: List[int], reasoning_prompt: List[bool]) -> List[VerdictConfig]:
+    return [VerdictConfig(*combo) for combo in itertools.product(efforts, max_tokens, reasoning_prompt)]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+async def _run_one(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    case: VerdictCase,
+    config: VerdictConfig,
+    retries: int,
+) -> dict:
+    payload = build_verdict_payload(
+        language_name=case.language_name,
+        exercise_name=case.exercise_name,
+        exercise_description_b64=_encode_description(case.exercise_description),
+        current_code=case.current_code,
+        execution_output=case.execution_output,
+        effort=config.effort,
+        max_output_tokens=config.max_output_tokens,
+        include_reasoning_prompt=config.reasoning_prompt,
+    )
+    sample = {"case": case.name, "expected": case.expected_verdict, "config": config.name, "retries": 0}
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            response = await client.post(url, headers=headers, content=json.dumps(payload))
+        except httpx.HTTPError as e:
+            sample["error"] = f"{type(e).__name__}: {e}"
+            break
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            sample["retries"] += 1
+            await asyncio.sleep(float(response.headers.get("retry-after", 2 ** attempt)))
+            continue
+        if response.status_code >= 400:
+            sample["error"] = f"HTTP {response.status_code}"
+            break
+        parsed = parse_verdict_response(response.json(), response.headers.get("x-request-id", "unknown"))
+        detected = _detect_verdict(parsed["text"])
+        sample.update(
+            detected=detected,
+            success=detected == case.expected_verdict,
+            status=parsed["status"],
+            empty=not parsed["text"],
+            input_tokens=parsed["input_tokens"],
+            output_tokens=parsed["output_tokens"],
+            reasoning_tokens=parsed["reasoning_tokens"],
+            request_id=parsed["request_id"],
+        )
+        break
+    sample["latency_s"] = round(time.perf_counter() - started, 3)
+    return sample
+
+
+async def run_matrix(
+    cases: List[VerdictCase],
+    configs: List[VerdictConfig],
+    *,
+    url: str,
+    concurrency: int = 8,
+    repeat: int = 1,
+    retries: int = 2,
+    timeout: float = 120.0,
+) -> List[dict]:
+    """Every (config, case, repetition) once, at most ``concurrency`` in flight."""
+    headers = get_openai_headers()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def bounded(case: VerdictCase, config: VerdictConfig) -> dict:
+            async with semaphore:
+                return await _run_one(client, url, headers, case, config, retries)
+
+        jobs = [bounded(case, config) for config in configs for case in cases for _ in range(repeat)]
+        return await asyncio.gather(*jobs)
+
+
+def summarize(
+    samples: List[dict],
+    configs: List[VerdictConfig],
+    input_price: float = INPUT_PRICE_PER_M,
+    output_price: float = OUTPUT_PRICE_PER_M,
+) -> Dict[str, dict]:
+    summary: Dict[str, dict] = {}
+    for config in configs:
+        group = [s for s in samples if s["config"] == config.name]
+        answered = [s for s in group if "error" not in s]
+        latencies = [s["latency_s"] for s in answered]
+        input_tokens = sum(s["input_tokens"] for s in answered)
+        output_tokens = sum(s["output_tokens"] for s in answered)
+        cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+        summary[config.name] = {
+            **asdict(config),
+            "samples": len(group),
+            "errors": len(group) - len(answered),
+            "accuracy": sum(1 for s in answered if s["success"]) / len(group) if group else 0.0,
+            "incomplete": sum(1 for s in answered if s["status"] == "incomplete"),
+            "empty": sum(1 for s in answered if s["empty"]),
+            "p50_s": statistics.median(latencies) if latencies else 0.0,
+            "p95_s": _percentile(latencies, 95),
+            "mean_reasoning_tokens": statistics.mean(s["reasoning_tokens"] for s in answered) if answered else 0.0,
+            "mean_output_tokens": statistics.mean(s["output_tokens"] for s in answered) if answered else 0.0,
+            "cost_usd": round(cost, 6),
+            "cost_per_1k_verdicts_usd": round(cost / len(answered) * 1000, 4) if answered else 0.0,
+        }
+    return summary
+
+
+def render_markdown(document: dict) -> str:
+    meta, summary, samples = document["meta"], document["summary"], document["samples"]
+    rows = [
+        [name, f"{s['accuracy']:.0%}", s["samples"], s["errors"], s["incomplete"], s["empty"],
+         s["p50_s"], s["p95_s"], s["mean_reasoning_tokens"], s["mean_output_tokens"], f"${s['cost_per_1k_verdicts_usd']:.2f}"]
+        for name, s in summary.items()
+    ]
+    best = min(summary.items(), key=lambda item: (-item[1]["accuracy"], item[1]["p95_s"], item[1]["cost_usd"]))[0] if summary else "-"
+
+    lines = [
+        "# 📊 Verdict Benchmark Report",
+        "",
+        f"_Generado por `python -m benchmarks.verdict_runner` el {meta['created']}. No editar a mano: volver a correr el runner._",
+        "",
+        "## 🧪 Metodología",
+        f"- **Casos**: {meta['cases']} `VerdictCase` de `test_verdict_chain_e2e.py`, {meta['repeat']} repetición(es) por configuración",
+        f"- **Modelo**: `{meta['model']}` vía `{meta['url']}`, concurrencia {meta['concurrency']}",
+        f"- **Precios**: ${meta['input_price_per_m']:.2f} / ${meta['output_price_per_m']:.2f} por millón de tokens de entrada / salida (razonamiento se cobra como salida)",
+        "- **Accuracy**: veredicto detectado (APROBADO / REPROBADO / ABSTENERSE) igual a `expected_verdict`; errores cuentan como fallos",
+        "",
+        "## 📈 Resultados",
+        "",
+        format_table(
+            ["configuración", "accuracy", "muestras", "errores", "incomplete", "vacías", "p50 s", "p95 s", "reasoning tok", "output tok", "costo / 1k"],
+            rows,
+        ),
+        "",
+        f"**Mejor configuración** (accuracy, luego p95, luego costo): {best}",
+        "",
+        "## ❌ Veredictos distintos al esperado",
+        "",
+    ]
+    misses = [s for s in samples if not s.get("success")]
+    if misses:
+        lines.append(format_table(
+            ["configuración", "caso", "esperado", "detectado"],
+            [[s["config"], s["case"], s["expected"], s.get("detected") or s.get("error", "-")] for s in misses],
+        ))
+    else:
+        lines.append("Ninguno.")
+    return "\n".join(lines) + "\n"
+
+
+def _on_off(value: str) -> List[bool]:
+    choices = {"on": True, "off": False}
+    try:
+        return [choices[part.strip()] for part in value.split(",") if part.strip()]
+    except KeyError:
+        raise argparse.ArgumentTypeError("use on, off or on,off")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--efforts", default="minimal,low", help="comma-separated reasoning efforts (default minimal,low)")
+    parser.add_argument("--max-tokens", default="400", help="comma-separated max_output_tokens caps (default 400)")
+    parser.add_argument("--reasoning-prompt", type=_on_off, default=[True], help="on, off or on,off (default on)")
+    parser.add_argument("--cases", default="", help="comma-separated case names (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case and configuration")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--retries", type=int, default=2, help="retries on 429/5xx")
+    parser.add_argument("--url", default=f"{OPENAI_BASE_URL}/responses", help="Responses API endpoint")
+    parser.add_argument("--input-price", type=float, default=INPUT_PRICE_PER_M, help="USD per million input tokens")
+    parser.add_argument("--output-price", type=float, default=OUTPUT_PRICE_PER_M, help="USD per million output tokens")
+    parser.add_argument("--json", metavar="PATH", help="write summary and samples as JSON")
+    parser.add_argument("--markdown", metavar="PATH", help="write the markdown report (e.g. REASONING_BENCHMARK_REPORT.md)")
+    args = parser.parse_args()
+
+    cases = _canonical_cases()
+    if args.cases:
+        wanted = {name.strip() for name in args.cases.split(",")}
+        cases = [case for case in cases if case.name in wanted]
+        if not cases:
+            sys.exit(f"no cases named {args.cases}")
+    configs = build_matrix(
+        [effort.strip() for effort in args.efforts.split(",") if effort.strip()],
+        [int(tokens) for tokens in args.max_tokens.split(",") if tokens.strip()],
+        args.reasoning_prompt,
+    )
+
+    print(f"{len(cases)} cases × {len(configs)} configurations × {args.repeat} → {len(cases) * len(configs) * args.repeat} requests")
+    started = time.perf_counter()
+    with use_cassette_from_env():
+        samples = asyncio.run(run_matrix(
+            cases, configs, url=args.url, concurrency=args.concurrency, repeat=args.repeat, retries=args.retries,
+        ))
+    elapsed = time.perf_counter() - started
+
+    document = {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "model": "gpt-5-mini",
+            "url": args.url,
+            "cases": len(cases),
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "input_price_per_m": args.input_price,
+            "output_price_per_m": args.output_price,
+            "wall_time_s": round(elapsed, 3),
+        },
+        "summary": summarize(samples, configs, args.input_price, args.output_price),
+        "samples": samples,
+    }
+    markdown = render_markdown(document)
+    print(markdown)
+    print(f"Wall time: {elapsed:.1f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2, ensure_ascii=False)
+            handle.write("\n")
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as handle:
+            handle.write(markdown)
+
+
+if __name__ == "__main__":
+    main()
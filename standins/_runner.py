@@ -0,0 +1,76 @@
+"""
+Run ASGI apps with uvicorn on a background thread, for load tests and offline runs.
+
+Every app listens on an ephemeral localhost port. All apps of one
+``BackgroundServers`` share that thread's event loop, which ``loop`` exposes so
+callers can schedule probes on it.
+"""
+import asyncio
+import threading
+from typing import Dict, List, Optional
+
+import uvicorn
+
+
+class BackgroundServers:
+    def __init__(self, name: str = "standins"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._servers: List[uvicorn.Server] = []
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self, apps: Dict[str, object], *, proxy_headers: bool = False, lifespan: str = "off", timeout: float = 30) -> Dict[str, str]:
+        """Serve each app and return ``{name: "http://127.0.0.1:<port>"}``."""
+        configs = {
+            name: uvicorn.Config(
+                app,
+                host="127.0.0.1",
+                port=0,
+                log_level="warning",
+                access_log=False,
+                lifespan=lifespan,
+                proxy_headers=proxy_headers,
+                forwarded_allow_ips="*" if proxy_headers else None,
+            )
+            for name, app in apps.items()
+        }
+        self._servers = [uvicorn.Server(config) for config in configs.values()]
+        for server in self._servers:
+            server.install_signal_handlers = lambda: None  # only the main thread may install them
+
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout) or not all(server.started for server in self._servers):
+            raise RuntimeError(f"{self.name}: servers did not start within {timeout}s")
+
+        urls = {}
+        for name, server in zip(configs, self._servers):
+            port = server.servers[0].sockets[0].getsockname()[1]
+            urls[name] = f"http://127.0.0.1:{port}"
+        return urls
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        async def serve_all():
+            tasks = [asyncio.create_task(server.serve()) for server in self._servers]
+            while not all(server.started for server in self._servers):
+                if any(task.done() for task in tasks):
+                    break
+                await asyncio.sleep(0.01)
+            self._ready.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.loop.run_until_complete(serve_all())
+        finally:
+            self._ready.set()
+            self.loop.close()
+
+    def stop(self, timeout: float = 10) -> None:
+        for server in self._servers:
+            server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,58 @@
+"""
+ip-api.com stand-in for load tests and offline runs.
+
+``GET /json/{ip}`` answers in ip-api's shape. Every IP resolves to Santiago, CL,
+except those under ``--foreign-prefix`` (default ``8.``), which resolve to the US
+so the geo gate has something to reject.
+
+    python -m standins.geo_server --port 8103
+    GEO_API_URL=http://localhost:8103/json uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+class FakeGeo:
+    def __init__(self, latency_ms: float = 0.0, foreign_prefix: str = "8.", seed=None):
+        self.latency_ms = latency_ms
+        self.foreign_prefix = foreign_prefix
+        self.random = random.Random(seed)
+        self.lookups = 0
+
+    async def lookup(self, request: Request) -> JSONResponse:
+        self.lookups += 1
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.random.uniform(0.8, 1.2) * self.latency_ms / 1000)
+        ip = request.path_params["ip"]
+        if self.foreign_prefix and ip.startswith(self.foreign_prefix):
+            return JSONResponse({"status": "success", "query": ip, "countryCode": "US", "city": "Mountain View"})
+        return JSONResponse({"status": "success", "query": ip, "countryCode": "CL", "city": "Santiago"})
+
+
+def create_app(latency_ms: float = 0.0, foreign_prefix: str = "8.", seed=None) -> Starlette:
+    fake = FakeGeo(latency_ms=latency_ms, foreign_prefix=foreign_prefix, seed=seed)
+    app = Starlette(routes=[Route("/json/{ip}", fake.lookup, methods=["GET"])])
+    app.state.fake = fake
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8103)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--foreign-prefix", default="8.", help="IPs with this prefix resolve outside Chile")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.foreign_prefix), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
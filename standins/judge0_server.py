@@ -0,0 +1,111 @@
+"""
+Judge0 CE stand-in for load tests and offline runs.
+
+Implements what ``app.services.judge0_service`` calls: ``POST /submissions``,
+``GET /submissions/{token}`` (base64 encoded, as requested by the app) and
+``GET /languages``. Each submission reports "Processing" for
+``processing_polls`` polls and then "Accepted" with a canned stdout.
+
+    python -m standins.judge0_server --port 8102
+    JUDGE0_API_URL=http://localhost:8102 JUDGE0_API_KEY=standin uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import base64
+import random
+import uuid
+from typing import Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+LANGUAGES = [
+    {"id": 50, "name": "C (GCC 9.2.0)", "is_archived": False},
+    {"id": 54, "name": "C++ (GCC 9.2.0)", "is_archived": False},
+    {"id": 62, "name": "Java (OpenJDK 13.0.1)", "is_archived": False},
+    {"id": 63, "name": "JavaScript (Node.js 12.14.0)", "is_archived": False},
+    {"id": 71, "name": "Python (3.8.1)", "is_archived": False},
+    {"id": 74, "name": "TypeScript (3.7.4)", "is_archived": False},
+    {"id": 97, "name": "JavaScript (Node.js 20.17.0)", "is_archived": False},
+    {"id": 10, "name": "C++ (GCC 7.4.0)", "is_archived": True},
+]
+
+
+def _b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+
+class FakeJudge0:
+    def __init__(self, latency_ms: float = 0.0, processing_polls: int = 0, stdout: str = "3\n", seed=None):
+        self.latency_ms = latency_ms
+        self.processing_polls = processing_polls
+        self.stdout = stdout
+        self.random = random.Random(seed)
+        # token -> polls left before the submission finishes
+        self.submissions: Dict[str, int] = {}
+
+    async def _wait(self) -> None:
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.random.uniform(0.8, 1.2) * self.latency_ms / 1000)
+
+    async def submit(self, request: Request) -> JSONResponse:
+        await request.json()
+        await self._wait()
+        token = uuid.uuid4().hex
+        self.submissions[token] = self.processing_polls
+        return JSONResponse({"token": token}, status_code=201)
+
+    async def result(self, request: Request) -> JSONResponse:
+        await self._wait()
+        token = request.path_params["token"]
+        polls_left = self.submissions.get(token)
+        if polls_left is None:
+            return JSONResponse({"error": "submission not found"}, status_code=404)
+        if polls_left > 0:
+            self.submissions[token] = polls_left - 1
+            return JSONResponse({"token": token, "status": {"id": 2, "description": "Processing"}})
+        del self.submissions[token]
+        return JSONResponse({
+            "token": token,
+            "stdout": _b64(self.stdout),
+            "stderr": None,
+            "compile_output": None,
+            "message": None,
+            "exit_code": 0,
+            "time": "0.042",
+            "memory": 41216,
+            "status": {"id": 3, "description": "Accepted"},
+        })
+
+    async def languages(self, request: Request) -> JSONResponse:
+        await self._wait()
+        return JSONResponse(LANGUAGES)
+
+
+def create_app(latency_ms: float = 0.0, processing_polls: int = 0, seed=None) -> Starlette:
+    fake = FakeJudge0(latency_ms=latency_ms, processing_polls=processing_polls, seed=seed)
+    app = Starlette(routes=[
+        Route("/submissions", fake.submit, methods=["POST"]),
+        Route("/submissions/{token}", fake.result, methods=["GET"]),
+        Route("/languages", fake.languages, methods=["GET"]),
+    ])
+    app.state.fake = fake
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--processing-polls", type=int, default=0, help="polls answered with Processing before the result")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.processing_polls), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+"""
+OpenAI-compatible stand-in for load tests and offline runs.
+
+Serves ``POST /v1/responses`` (used by the chat flow) and ``POST /v1/chat/completions``
+(used by challenge generation, context analysis and the chat fallback). Replies are
+shaped after what the app parses:
+
+- chat replies, or a verdict when the prompt carries the verdict chain;
+- a challenge JSON, single or ``{"challenges": [...]}``, for the generator prompts.
+
+Both endpoints support ``"stream": true`` (server-sent events in OpenAI's format).
+``GET /v1/models/{model}`` answers the app's startup probe (app/services/warmup.py).
+
+Latency and tokens
+    By default every reply takes ``--latency-ms`` (± ``--jitter``). With ``--profile``
+    pointing at a reasoning benchmark file (``reasoning_benchmark_results.json``), each
+    ``/v1/responses`` call instead samples latency, reasoning tokens and output tokens
+    from the recorded runs of the requested ``reasoning.effort``. Reasoning tokens count
+    against ``max_output_tokens`` as they do upstream: when the budget runs out the reply
+    is cut and comes back with ``status: "incomplete"``. ``--latency-scale`` speeds up
+    (or slows down) sampled latencies.
+
+Failures
+    ``--faults "429=0.05,timeout=0.01"`` injects failures with the given probabilities:
+    ``429``, ``500`` and ``503`` (OpenAI error bodies), ``timeout`` (the request hangs for
+    ``--hang-seconds``), ``disconnect`` (the connection drops mid-body) and ``incomplete``
+    (the reply is cut as if the token budget ran out).
+
+``GET /_standin/stats`` reports what was served; ``POST /_standin/config`` changes
+``latency_ms``, ``latency_scale`` or ``faults`` while running.
+
+    python -m standins.openai_server --port 8101 --latency-ms 800
+    python -m standins.openai_server --profile reasoning_benchmark_results.json --faults 429=0.02
+    OPENAI_BASE_URL=http://localhost:8101/v1 OPENAI_API_KEY=sk-standin uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+CHAT_REPLY = (
+    "Buena pregunta. Antes de escribir código, dime qué harías con un arreglo vacío "
+    "y cómo recorrerías los elementos una sola vez."
+)
+VERDICT_REPLY = (
+    "VEREDICTO: APROBADO ✅\n\nLa solución recorre el arreglo una vez y maneja el caso vacío. "
+    "Complejidad O(n) en tiempo y O(1) en memoria."
+)
+# Relleno para alcanzar el largo de salida muestreado del perfil
+FILLER = " Piensa también en los casos borde y en cómo probarías tu solución."
+BATCH_COUNT_REGEX = re.compile(r"Generate (\d+) DIFFERENT")
+CHARS_PER_TOKEN = 4
+DEFAULT_REASONING_TOKENS = 64
+STREAM_CHUNK_CHARS = 24
+FAULTS = ("429", "500", "503", "timeout", "disconnect", "incomplete")
+ERRORS = {
+    "429": ("Rate limit reached for requests", "requests", "rate_limit_exceeded"),
+    "500": ("The server had an error while processing your request.", "server_error", None),
+    "503": ("The engine is currently overloaded, please try again later.", "server_error", None),
+}
+
+
+def challenge(index: int = 0) -> dict:
+    return {
+        "title": f"Suma alternada {index}" if index else "Suma alternada",
+        "description": "Dado un arreglo de enteros, retorna la suma alternando signos (+, -, +, ...).",
+        "function_name": "sumaAlternada",
+        "function_signature": "function sumaAlternada(nums)",
+        "constraints": ["0 <= nums.length <= 10^4", "-10^4 <= nums[i] <= 10^4"],
+        "test_cases": [
+            {"input": "[1, 2, 3]", "expected": "2", "explanation": "1 - 2 + 3"},
+            {"input": "[]", "expected": "0", "explanation": "Arreglo vacío"},
+            {"input": "[5, 5]", "expected": "0", "explanation": "5 - 5"},
+        ],
+    }
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _fit(text: str, tokens: int) -> str:
+    """Pad ``text`` with filler or cut it so it is about ``tokens`` tokens long."""
+    target = max(0, tokens) * CHARS_PER_TOKEN
+    while len(text) < target:
+        text += FILLER
+    return text[:target]
+
+
+@dataclass
+class EffortProfile:
+    """Recorded runs of one reasoning effort: parallel lists, one entry per run."""
+    latencies_s: List[float] = field(default_factory=list)
+    reasoning_tokens: List[int] = field(default_factory=list)
+    output_tokens: List[int] = field(default_factory=list)
+
+
+def load_profiles(path: str) -> Dict[str, EffortProfile]:
+    """Group the runs of a reasoning benchmark file by effort.
+
+    Accepts ``{"results": [...]}`` (``reasoning_benchmark_results.json``) or a bare
+    list. Runs without a response time (errors) are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    runs = data.get("results", []) if isinstance(data, dict) else data
+    profiles: Dict[str, EffortProfile] = {}
+    for run in runs:
+        if not run.get("effort") or run.get("response_time_seconds") is None:
+            continue
+        profile = profiles.setdefault(run["effort"], EffortProfile())
+        profile.latencies_s.append(float(run["response_time_seconds"]))
+        profile.reasoning_tokens.append(int(run.get("reasoning_tokens") or 0))
+        profile.output_tokens.append(int(run.get("output_tokens") or 0))
+    if not profiles:
+        raise ValueError(f"{path} has no usable runs")
+    return profiles
+
+
+def parse_faults(spec: str) -> Dict[str, float]:
+    """``"429=0.05,timeout=0.01"`` -> ``{"429": 0.05, "timeout": 0.01}``."""
+    faults: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, rate = part.partition("=")
+        name = name.strip()
+        if name not in FAULTS:
+            raise ValueError(f"unknown fault {name!r}; expected one of {', '.join(FAULTS)}")
+        faults[name] = float(rate)
+    if sum(faults.values()) > 1:
+        raise ValueError("fault probabilities add up to more than 1")
+    return faults
+
+
+@dataclass
+class Reply:
+    text: str
+    status: str  # "completed" | "incomplete"
+    input_tokens: int
+    reasoning_tokens: int
+    latency_s: float
+
+    @property
+    def output_tokens(self) -> int:
+        return (_tokens(self.text) if self.text else 0) + self.reasoning_tokens
+
+
+def _sse(event: Optional[str], payload) -> bytes:
+    data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    return (f"event: {event}\ndata: {data}\n\n" if event else f"data: {data}\n\n").encode("utf-8")
+
+
+class _Disconnect:
+    """ASGI response that sends half of ``body`` and returns: uvicorn drops the connection."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": self.body[: len(self.body) // 2], "more_body": True})
+
+
+def _error(fault: str) -> JSONResponse:
+    message, kind, code = ERRORS[fault]
+    headers = {"retry-after": "1"} if fault == "429" else None
+    return JSONResponse(
+        {"error": {"message": message, "type": kind, "param": None, "code": code}},
+        status_code=int(fault),
+        headers=headers,
+    )
+
+
+class FakeOpenAI:
+    """Request handlers plus the knobs shared by all endpoints."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter: float = 0.2,
+        seed=None,
+        profiles: Optional[Dict[str, EffortProfile]] = None,
+        latency_scale: float = 1.0,
+        faults: Optional[Dict[str, float]] = None,
+        hang_seconds: float = 90.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.profiles = profiles or {}
+        self.latency_scale = latency_scale
+        self.faults = dict(faults or {})
+        self.hang_seconds = hang_seconds
+        self.requests = 0
+        self.stats: Counter = Counter()
+
+    # -- models ------------------------------------------------------------
+
+    def _latency_s(self, base_s: float) -> float:
+        spread = base_s * self.jitter
+        return max(0.0, self.random.uniform(base_s - spread, base_s + spread))
+
+    def _pick_fault(self) -> Optional[str]:
+        roll = self.random.random()
+        for name, rate in self.faults.items():
+            if roll < rate:
+                return name
+            roll -= rate
+        return None
+
+    def _reply(self, text: str, prompt: str, effort: Optional[str], max_output_tokens: Optional[int], fault: Optional[str]) -> Reply:
+        profile = self.profiles.get(effort) if effort else None
+        if profile is None and self.profiles and effort:
+            # Esfuerzo sin datos: usar el perfil más barato disponible
+            profile = self.profiles.get("minimal") or next(iter(self.profiles.values()))
+        if profile is not None:
+            run = self.random.randrange(len(profile.latencies_s))
+            latency_s = self._latency_s(profile.latencies_s[run]) * self.latency_scale
+            reasoning_tokens = profile.reasoning_tokens[run]
+            text_tokens = max(_tokens(text), profile.output_tokens[run] - reasoning_tokens)
+            text = _fit(text, text_tokens)
+        else:
+            latency_s = self._latency_s(self.latency_ms / 1000)
+            reasoning_tokens = 0 if effort in (None, "minimal") else DEFAULT_REASONING_TOKENS
+            text_tokens = _tokens(text)
+
+        status = "completed"
+        if max_output_tokens is not None:
+            # El razonamiento consume el mismo presupuesto que el texto visible
+            reasoning_tokens = min(reasoning_tokens, max_output_tokens)
+            remaining = max_output_tokens - reasoning_tokens
+            if text_tokens > remaining:
+                text, status = _fit(text, remaining), "incomplete"
+        if fault == "incomplete":
+            text, status = _fit(text, text_tokens // 2), "incomplete"
+        return Reply(text=text, status=status, input_tokens=_tokens(prompt), reasoning_tokens=reasoning_tokens, latency_s=latency_s)
+
+    async def _fault_response(self, fault: Optional[str]):
+        """Error response for ``fault``, or None when the request should be answered."""
+        if fault in ERRORS:
+            return _error(fault)
+        if fault == "timeout":
+            await asyncio.sleep(self.hang_seconds)
+            return _error("503")
+        return None
+
+    # -- /v1/responses -----------------------------------------------------
+
+    def _response_object(self, body: dict, reply: Reply, response_id: str, message_id: str) -> dict:
+        return {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": reply.status,
+            "incomplete_details": {"reason": "max_output_tokens"} if reply.status == "incomplete" else None,
+            "model": body.get("model", "gpt-5-mini"),
+            "output": [
+                {"id": f"rs_{uuid.uuid4().hex}", "type": "reasoning", "summary": []},
+                {
+                    "id": message_id,
+                    "type": "message",
+                    "status": reply.status,
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": reply.text, "annotations": []}] if reply.text else [],
+                },
+            ],
+            "usage": {
+                "input_tokens": reply.input_tokens,
+                "output_tokens": reply.output_tokens,
+                "output_tokens_details": {"reasoning_tokens": reply.reasoning_tokens},
+                "total_tokens": reply.input_tokens + reply.output_tokens,
+            },
+        }
+
+    async def responses(self, request: Request):
+        self.requests += 1
+        self.stats["responses"] += 1
+        body = await request.json()
+        fault = self._pick_fault()
+        if fault:
+            self.stats[f"fault_{fault}"] += 1
+        failed = await self._fault_response(fault)
+        if failed is not None:
+            return failed
+
+        prompt = body.get("input", "")
+        if not isinstance(prompt, str):
+            prompt = json.dumps(prompt, ensure_ascii=False)
+        text = VERDICT_REPLY if "VEREDICTO" in prompt else CHAT_REPLY
+        effort = (body.get("reasoning") or {}).get("effort")
+        reply = self._reply(text, prompt, effort, body.get("max_output_tokens"), fault)
+        self.stats[reply.status] += 1
+        response_id, message_id = f"resp_{uuid.uuid4().hex}", f"msg_{uuid.uuid4().hex}"
+
+        if body.get("stream"):
+            return StreamingResponse(self._stream_response(body, reply, response_id, message_id), media_type="text/event-stream")
+        await asyncio.sleep(reply.latency_s)
+        payload = self._response_object(body, reply, response_id, message_id)
+        if fault == "disconnect":
+            return _Disconnect(json.dumps(payload).encode("utf-8"))
+        return JSONResponse(payload)
+
+    async def _stream_response(self, body: dict, reply: Reply, response_id: str, message_id: str) -> AsyncIterator[bytes]:
+        final = self._response_object(body, reply, response_id, message_id)
+        reasoning_item, message_item = final["output"]
+        seq = iter(range(1_000_000))
+
+        def event(kind: str, **fields) -> bytes:
+            return _sse(kind, {"type": kind, "sequence_number": next(seq), **fields})
+
+        in_progress = {**final, "status": "in_progress", "incomplete_details": None, "output": [], "usage": None}
+        yield event("response.created", response=in_progress)
+        yield event("response.in_progress", response=in_progress)
+
+        # Reparte la latencia: razonamiento antes del primer delta, el resto entre los deltas
+        chunks = [reply.text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(reply.text), STREAM_CHUNK_CHARS)]
+        reasoning_share = reply.reasoning_tokens / max(1, reply.output_tokens)
+        await asyncio.sleep(reply.latency_s * max(0.1, reasoning_share))
+        yield event("response.output_item.added", output_index=0, item=reasoning_item)
+        yield event("response.output_item.done", output_index=0, item=reasoning_item)
+        yield event("response.output_item.added", output_index=1, item={**message_item, "status": "in_progress", "content": []})
+
+        if chunks:
+            part = {"type": "output_text", "text": "", "annotations": []}
+            yield event("response.content_part.added", item_id=message_id, output_index=1, content_index=0, part=part)
+            per_chunk = reply.latency_s * (1 - max(0.1, reasoning_share)) / len(chunks)
+            for chunk in chunks:
+                await asyncio.sleep(per_chunk)
+                yield event("response.output_text.delta", item_id=message_id, output_index=1, content_index=0, delta=chunk)
+            yield event("response.output_text.done", item_id=message_id, output_index=1, content_index=0, text=reply.text)
+            yield event("response.content_part.done", item_id=message_id, output_index=1, content_index=0, part={**part, "text": reply.text})
+        yield event("response.output_item.done", output_index=1, item=message_item)
+        yield event("response.incomplete" if reply.status == "incomplete" else "response.completed", response=final)
+
+    # -- /v1/chat/completions ----------------------------------------------
+
+    async def chat_completions(self, request: Request):
+        self.requests += 1
+        self.stats["chat_completions"] += 1
+        body = await request.json()
+        fault = self._pick_fault()
+        if fault:
+            self.stats[f"fault_{fault}"] += 1
+        failed = await self._fault_response(fault)
+        if failed is not None:
+            return failed
+
+        messages = body.get("messages") or []
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        batch = BATCH_COUNT_REGEX.search(system)
+        if batch:
+            content = json.dumps({"challenges": [challenge(i + 1) for i in range(int(batch.group(1)))]}, ensure_ascii=False)
+        elif "challenge generator" in system:
+            content = json.dumps(challenge(), ensure_ascii=False)
+        elif "VEREDICTO" in system:
+            content = VERDICT_REPLY
+        else:
+            content = CHAT_REPLY
+        prompt = "".join(str(m.get("content", "")) for m in messages)
+        reply = self._reply(content, prompt, None, body.get("max_tokens"), fault)
+        self.stats[reply.status] += 1
+        finish_reason = "length" if reply.status == "incomplete" else "stop"
+        completion_id, created, model = f"chatcmpl-{uuid.uuid4().hex}", int(time.time()), body.get("model", "gpt-3.5-turbo")
+        usage = {
+            "prompt_tokens": reply.input_tokens,
+            "completion_tokens": reply.output_tokens,
+            "total_tokens": reply.input_tokens + reply.output_tokens,
+        }
+
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                self._stream_chat(reply, completion_id, created, model, finish_reason, usage if include_usage else None),
+                media_type="text/event-stream",
+            )
+        await asyncio.sleep(reply.latency_s)
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply.text},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        }
+        if fault == "disconnect":
+            return _Disconnect(json.dumps(payload).encode("utf-8"))
+        return JSONResponse(payload)
+
+    async def _stream_chat(self, reply: Reply, completion_id: str, created: int, model: str, finish_reason: str, usage: Optional[dict]) -> AsyncIterator[bytes]:
+        def chunk(delta: dict, finish: Optional[str] = None) -> bytes:
+            return _sse(None, {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            })
+
+        pieces = [reply.text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(reply.text), STREAM_CHUNK_CHARS)]
+        await asyncio.sleep(reply.latency_s * 0.1)
+        yield chunk({"role": "assistant", "content": ""})
+        per_piece = reply.latency_s * 0.9 / max(1, len(pieces))
+        for piece in pieces:
+            await asyncio.sleep(per_piece)
+            yield chunk({"content": piece})
+        yield chunk({}, finish_reason)
+        if usage is not None:
+            yield _sse(None, {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": [], "usage": usage})
+        yield _sse(None, "[DONE]")
+
+    async def model(self, request: Request) -> JSONResponse:
+        self.stats["models"] += 1
+        return JSONResponse({"id": request.path_params["model"], "object": "model", "created": 0, "owned_by": "standin"})
+
+    # -- control -----------------------------------------------------------
+
+    async def get_stats(self, request: Request) -> JSONResponse:
+        return JSONResponse({
+            "requests": self.requests,
+            "counts": dict(self.stats),
+            "latency_ms": self.latency_ms,
+            "latency_scale": self.latency_scale,
+            "faults": self.faults,
+            "profiles": sorted(self.profiles),
+        })
+
+    async def set_config(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        try:
+            if "faults" in body:
+                faults = body["faults"]
+                self.faults = parse_faults(faults) if isinstance(faults, str) else parse_faults(",".join(f"{k}={v}" for k, v in faults.items()))
+            if "latency_ms" in body:
+                self.latency_ms = float(body["latency_ms"])
+            if "latency_scale" in body:
+                self.latency_scale = float(body["latency_scale"])
+        except (TypeError, ValueError) as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return await self.get_stats(request)
+
+
+def create_app(
+    latency_ms: float = 0.0,
+    jitter: float = 0.2,
+    seed=None,
+    profile: Optional[str] = None,
+    latency_scale: float = 1.0,
+    faults: Optional[str] = None,
+    hang_seconds: float = 90.0,
+) -> Starlette:
+    fake = FakeOpenAI(
+        latency_ms=latency_ms,
+        jitter=jitter,
+        seed=seed,
+        profiles=load_profiles(profile) if profile else None,
+        latency_scale=latency_scale,
+        faults=parse_faults(faults) if faults else None,
+        hang_seconds=hang_seconds,
+    )
+    app = Starlette(routes=[
+        Route("/v1/responses", fake.responses, methods=["POST"]),
+        Route("/v1/chat/completions", fake.chat_completions, methods=["POST"]),
+        Route("/v1/models/{model}", fake.model, methods=["GET"]),
+        Route("/_standin/stats", fake.get_stats, methods=["GET"]),
+        Route("/_standin/config", fake.set_config, methods=["POST"]),
+    ])
+    app.state.fake = fake
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="mean response latency without a profile")
+    parser.add_argument("--jitter", type=float, default=0.2, help="uniform spread around the mean, as a fraction")
+    parser.add_argument("--profile", help="reasoning benchmark JSON to sample latency and tokens from, per effort")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for latencies sampled from --profile")
+    parser.add_argument("--faults", default="", help=f"fault=probability pairs; faults: {', '.join(FAULTS)}")
+    parser.add_argument("--hang-seconds", type=float, default=90.0, help="how long a 'timeout' fault hangs")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    app = create_app(
+        args.latency_ms, args.jitter, seed=args.seed, profile=args.profile,
+        latency_scale=args.latency_scale, faults=args.faults, hang_seconds=args.hang_seconds,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Redis-compatible stand-in for local development, tests and load tests.
+
+Implements the RESP2 subset used by ``app.utils.redis_client``: PING, AUTH, SELECT,
+GET, SET (NX/PX/EX), INCR, INCRBY, PTTL, DEL, FLUSHALL and MULTI/EXEC/DISCARD.
+Each command runs to completion on the event loop, so transactions are atomic just
+as they are in Redis.
+
+    python -m standins.redis_server --port 6380
+    RATE_LIMIT_BACKEND=redis REDIS_URL=redis://localhost:6380/0 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Error(str):
+    pass
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, _Error):
+        return b"-" + value.encode() + b"\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+    if value in ("OK", "QUEUED", "PONG"):
+        return b"+" + value.encode() + b"\r\n"
+    data = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class RedisStandIn:
+    """In-memory keyspace with millisecond expiries."""
+
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        self.data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self.commands = 0
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def run(self, args: List[str]):
+        self.commands += 1
+        name, args = args[0].upper(), args[1:]
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            return _Error(f"ERR unknown command '{name}'")
+        try:
+            return handler(*args)
+        except (TypeError, ValueError):
+            return _Error(f"ERR wrong arguments for '{name}' command")
+
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_auth(self, *args):
+        return "OK" if self.password is None or args[-1] == self.password else _Error("WRONGPASS invalid password")
+
+    def cmd_select(self, db):
+        int(db)
+        return "OK"
+
+    def cmd_flushall(self):
+        self.data.clear()
+        return "OK"
+
+    def cmd_get(self, key):
+        return self._get(key)
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires_at = None
+        nx = "NX" in options
+        if "PX" in options:
+            expires_at = time.monotonic() + int(options[options.index("PX") + 1]) / 1000
+        elif "EX" in options:
+            expires_at = time.monotonic() + int(options[options.index("EX") + 1])
+        if nx and self._get(key) is not None:
+            return None
+        self.data[key] = (str(value), expires_at)
+        return "OK"
+
+    def cmd_incrby(self, key, amount):
+        current = self._get(key)
+        value = int(current or 0) + int(amount)
+        expires_at = self.data[key][1] if current is not None else None
+        self.data[key] = (str(value), expires_at)
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_pttl(self, key):
+        if self._get(key) is None:
+            return -2
+        expires_at = self.data[key][1]
+        if expires_at is None:
+            return -1
+        return max(0, int((expires_at - time.monotonic()) * 1000))
+
+    def cmd_del(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.decode().split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(line[1:-2])):
+        header = await reader.readline()
+        data = await reader.readexactly(int(header[1:-2]) + 2)
+        args.append(data[:-2].decode())
+    return args
+
+
+async def _handle(store: RedisStandIn, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    queued: Optional[List[List[str]]] = None
+    try:
+        while True:
+            args = await _read_command(reader)
+            if not args:
+                break
+            name = args[0].upper()
+            if name == "MULTI":
+                queued = []
+                reply = "OK"
+            elif name == "EXEC":
+                reply = [store.run(command) for command in queued] if queued is not None else _Error("ERR EXEC without MULTI")
+                queued = None
+            elif name == "DISCARD":
+                queued = None
+                reply = "OK"
+            elif queued is not None:
+                queued.append(args)
+                reply = "QUEUED"
+            else:
+                reply = store.run(args)
+            writer.write(_encode(reply))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+        # Client went away or the server is shutting down
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host: str = "127.0.0.1", port: int = 0, password: Optional[str] = None):
+    """Start the stand-in; returns (server, store). Port 0 picks a free port."""
+    store = RedisStandIn(password=password)
+    server = await asyncio.start_server(lambda r, w: _handle(store, r, w), host, port)
+    return server, store
+
+
+async def _main(host: str, port: int, password: Optional[str]) -> None:
+    server, _ = await start_server(host, port, password)
+    print(f"Redis stand-in listening on {host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Redis-compatible stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--password", default=None)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port, args.password))
+
+
+if __name__ == "__main__":
+    main()
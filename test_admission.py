@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.middleware.admission import AdmissionMiddleware, IPList, StrikeCounter, run_admission_sweeper
+from app.middleware.gates import client_ip_from_scope
+from app.services.geo_service import GeoResolver
+from app.utils.rate_limiter import RateLimit
+
+SANTIAGO_IPS = {f"200.1.1.{i}" for i in range(1, 50)}
+_pipeline_ids = itertools.count()
+
+
+def _build(rate_limit=RateLimit(limit=100, window_seconds=3600), **options):
+    calls = []
+
+    async def fetch(ip):
+        calls.append(ip)
+        if ip in SANTIAGO_IPS:
+            return {"country": "CL", "city": "Santiago"}
+        return {"country": "US", "city": "Ashburn"}
+
+    app = FastAPI()
+
+    @app.get("/api/data")
+    async def data(request: Request):
+        return {"claims": getattr(request.state, "firebase_claims", None)}
+
+    options.setdefault("allowlist", IPList())
+    options.setdefault("blocklist", IPList())
+    pipeline = AdmissionMiddleware(
+        app,
+        resolver=GeoResolver(fetch=fetch, ttl=0, negative_ttl=0),
+        route=f"admission-test-{next(_pipeline_ids)}",
+        rate_limit=rate_limit,
+        **options,
+    )
+    return TestClient(pipeline), pipeline, calls
+
+
+def _get(client, ip, **headers):
+    return client.get("/api/data", headers={"X-Forwarded-For": ip, **headers})
+
+
+def test_ip_list_ttl_and_networks():
+    ip_list = IPList(["1.2.3.4", "10.0.0.0/8"])
+    ip_list.add("5.6.7.8", ttl=10, now=0)
+
+    assert ip_list.contains("1.2.3.4", now=5)
+    assert ip_list.contains("10.20.30.40", now=5)
+    assert ip_list.contains("5.6.7.8", now=5)
+    assert not ip_list.contains("5.6.7.8", now=11)
+    assert ip_list.sweep(now=11) == 1
+    assert not ip_list.contains("9.9.9.9", now=11)
+
+
+def test_strike_counter_promotes_at_limit():
+    strikes = StrikeCounter(limit=3, window_seconds=60)
+    assert not strikes.strike("1.1.1.1", now=0)
+    assert not strikes.strike("1.1.1.1", now=1)
+    assert strikes.strike("1.1.1.1", now=2)
+    # A new window starts from zero
+    assert not strikes.strike("2.2.2.2", now=0)
+    assert not strikes.strike("2.2.2.2", now=61)
+
+
+def test_blocklisted_ip_costs_no_lookup():
+    client, pipeline, calls = _build(blocklist=IPList(["200.1.1.1"]))
+    response = _get(client, "200.1.1.1")
+    assert response.status_code == 403
+    assert calls == []
+    assert pipeline.rejections["blocklist"] == 1
+
+
+def test_allowlisted_ip_skips_geo():
+    client, _, calls = _build(allowlist=IPList(["8.8.0.0/16"]))
+    assert _get(client, "8.8.4.4").status_code == 200
+    assert calls == []
+
+
+def test_repeated_geo_failures_promote_to_blocklist():
+    client, pipeline, calls = _build(strike_limit=3)
+    for _ in range(3):
+        assert _get(client, "3.3.3.3").status_code == 403
+    assert pipeline.promotions == 1
+    assert len(calls) == 3
+
+    for _ in range(10):
+        assert _get(client, "3.3.3.3").status_code == 403
+    assert len(calls) == 3
+    assert pipeline.rejections["blocklist"] == 10
+
+
+def test_geo_lookup_errors_are_not_strikes():
+    outage = {"down": True}
+
+    async def fetch(ip):
+        if outage["down"]:
+            raise TimeoutError("ip-api timed out")
+        return {"country": "CL", "city": "Santiago"}
+
+    app = FastAPI()
+    app.get("/api/data")(lambda: {"ok": True})
+    pipeline = AdmissionMiddleware(
+        app,
+        resolver=GeoResolver(fetch=fetch, ttl=0, negative_ttl=0),
+        route=f"admission-test-{next(_pipeline_ids)}",
+        rate_limit=RateLimit(limit=100, window_seconds=3600),
+        allowlist=IPList(),
+        blocklist=IPList(),
+        strike_limit=3,
+    )
+    client = TestClient(pipeline)
+    for _ in range(5):
+        assert _get(client, "200.1.1.20").status_code == 403
+    assert pipeline.promotions == 0
+
+    outage["down"] = False
+    assert _get(client, "200.1.1.20").status_code == 200
+
+
+def test_rate_limit_runs_before_geo_and_strikes():
+    client, pipeline, calls = _build(rate_limit=RateLimit(limit=2, window_seconds=3600), strike_limit=2)
+    assert _get(client, "200.1.1.9").status_code == 200
+    assert _get(client, "200.1.1.9").status_code == 200
+    response = _get(client, "200.1.1.9")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(calls) == 2
+
+    _get(client, "200.1.1.9")
+    assert pipeline.promotions == 1
+    assert _get(client, "200.1.1.9").status_code == 403
+
+
+def test_background_sweeper_drops_expired_blocks():
+    _, pipeline, _ = _build(block_ttl=0.01)
+    pipeline.blocklist.add("3.3.3.3", ttl=0.01)
+    pipeline.strikes.strike("4.4.4.4", now=0)
+
+    async def sweep_once():
+        task = asyncio.create_task(run_admission_sweeper(interval_seconds=0.05))
+        await asyncio.sleep(0.08)
+        task.cancel()
+
+    asyncio.run(sweep_once())
+    assert len(pipeline.blocklist) == 0 and pipeline.strikes._strikes == {}
+
+
+def test_client_ip_is_the_hop_cloud_run_appends():
+    scope = {"client": ("169.254.1.1", 443), "headers": [(b"x-forwarded-for", b"200.1.1.7, 3.3.3.3")]}
+    assert client_ip_from_scope(scope) == "3.3.3.3"
+    assert client_ip_from_scope(scope, trusted_hops=2) == "200.1.1.7"
+    assert client_ip_from_scope(scope, trusted_hops=0) == "169.254.1.1"
+    assert client_ip_from_scope({"client": ("127.0.0.1", 5000), "headers": []}) == "127.0.0.1"
+
+
+def test_forged_forwarded_for_cannot_blocklist_a_victim():
+    client, pipeline, _ = _build(strike_limit=3)
+    for _ in range(5):
+        assert _get(client, "200.1.1.30, 3.3.3.3").status_code == 403
+    # Los strikes caen sobre la IP real del atacante, no sobre la víctima
+    assert _get(client, "200.1.1.30").status_code == 200
+    assert pipeline.blocklist.contains("3.3.3.3") and not pipeline.blocklist.contains("200.1.1.30")
+
+
+def test_auth_stage_only_when_enabled():
+    async def verify(token):
+        if token != "good":
+            raise ValueError("bad token")
+        return {"uid": "user-1"}
+
+    client, pipeline, _ = _build(require_auth=True, verify_token=verify)
+    assert _get(client, "200.1.1.20").status_code == 401
+    assert _get(client, "200.1.1.20", Authorization="Bearer nope").status_code == 401
+    response = _get(client, "200.1.1.20", Authorization="Bearer good")
+    assert response.status_code == 200
+    assert response.json() == {"claims": {"uid": "user-1"}}
+    assert pipeline.rejections["auth"] == 2
@@ -0,0 +1,28 @@
+from benchmarks._harness import compare_results, load_results, save_results
+from benchmarks.bench_hot_paths import build_suite
+
+
+def test_compare_flags_only_slowdowns_over_threshold():
+    baseline = {"a": {"median_us": 10.0}, "b": {"median_us": 10.0}, "c": {"median_us": 10.0}, "gone": {"median_us": 1.0}}
+    current = {"a": {"median_us": 10.5}, "b": {"median_us": 12.0}, "c": {"median_us": 5.0}, "new": {"median_us": 1.0}}
+    report, regressions = compare_results(baseline, current, threshold=0.10)
+    assert regressions == ["b"]
+    assert "| b | 10.00 | 12.00 | +20.0% | REGRESSION |" in report
+    assert "| c | 10.00 | 5.00 | -50.0% | faster |" in report
+    assert "| new | - | 1.00 | - | new |" in report
+    assert "| gone | 1.00 | - | - | removed |" in report
+
+
+def test_baseline_round_trip(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    results = {"trim_messages[small]": {"median_us": 2.0, "min_us": 1.9, "stdev_us": 0.1, "loops": 1024}}
+    save_results(path, results)
+    assert load_results(path) == results
+
+
+def test_hot_path_suite_runs():
+    names = set()
+    for name, func in build_suite():
+        func()
+        names.add(name)
+    assert {"trim_messages[large]", "responses_input.verdict[small]", "check_rate_limit[10k ips]"} <= names
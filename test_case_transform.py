@@ -0,0 +1,64 @@
+import sys
+
+from app.utils.case_transform import (
+    camel_to_snake,
+    snake_to_camel,
+    transform_dict_keys_to_camel,
+    transform_dict_keys_to_snake,
+)
+
+
+def test_key_conversion_is_memoized():
+    assert camel_to_snake("canGenerateExercise") == "can_generate_exercise"
+    assert camel_to_snake("HTTPResponseCode") == "http_response_code"
+    assert snake_to_camel("can_generate_exercise") == "canGenerateExercise"
+    before = camel_to_snake.cache_info().hits
+    camel_to_snake("canGenerateExercise")
+    assert camel_to_snake.cache_info().hits == before + 1
+
+
+def test_nested_dicts_and_lists_round_trip():
+    camel = {
+        "languageId": 97,
+        "chatContext": [{"role": "user", "content": "hola"}, "texto", 3],
+        "totalCost": {"promptTokens": 10, "costUsd": 0.5},
+        "matrixRows": [[{"cellValue": 1}], []],
+        "emptyValue": None,
+    }
+    snake = transform_dict_keys_to_snake(camel)
+    assert snake == {
+        "language_id": 97,
+        "chat_context": [{"role": "user", "content": "hola"}, "texto", 3],
+        "total_cost": {"prompt_tokens": 10, "cost_usd": 0.5},
+        "matrix_rows": [[{"cell_value": 1}], []],
+        "empty_value": None,
+    }
+    assert list(snake) == ["language_id", "chat_context", "total_cost", "matrix_rows", "empty_value"]
+    assert transform_dict_keys_to_camel(snake) == camel
+    # Containers holding dicts are rebuilt, never shared with the input
+    assert snake["chat_context"] is not camel["chatContext"]
+    assert snake["matrix_rows"][1] is camel["matrixRows"][1]
+    assert transform_dict_keys_to_snake("no es dict") == "no es dict"
+
+
+def test_scalar_lists_are_not_copied():
+    camel = {"testCases": [{"inputArgs": [1, 2], "expected": "3"}], "tags": ["arrays", "loops"], "grid": [[1, 2], [3]]}
+    snake = transform_dict_keys_to_snake(camel)
+
+    assert snake == {"test_cases": [{"input_args": [1, 2], "expected": "3"}], "tags": ["arrays", "loops"], "grid": [[1, 2], [3]]}
+    assert snake["tags"] is camel["tags"]
+    assert snake["grid"] is camel["grid"]
+    assert snake["test_cases"][0]["input_args"] is camel["testCases"][0]["inputArgs"]
+    assert snake["test_cases"] is not camel["testCases"]
+
+
+def test_deep_nesting_does_not_hit_the_recursion_limit():
+    depth = sys.getrecursionlimit() * 2
+    data = {"leafValue": 1}
+    for _ in range(depth):
+        data = {"nestedLevel": [data]}
+
+    result = transform_dict_keys_to_snake(data)
+    for _ in range(depth):
+        result = result["nested_level"][0]
+    assert result == {"leaf_value": 1}
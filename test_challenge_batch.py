@@ -0,0 +1,111 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes.challenge import router as challenge_router
+from app.services import challenge_service
+from app.services.challenge_store import InMemoryChallengeStore, set_challenge_store
+from app.utils import rate_limiter
+
+
+def _challenge(title, function_name):
+    return {
+        "title": title,
+        "description": f"Resuelve {title}.",
+        "function_name": function_name,
+        "function_signature": f"function {function_name}(n)",
+        "constraints": ["n > 0"],
+        "test_cases": [{"input": "3", "expected": "3"}],
+    }
+
+
+class FakeCompletions:
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(self.payload)))],
+            usage=SimpleNamespace(prompt_tokens=900, completion_tokens=600),
+        )
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    completions = FakeCompletions({
+        "challenges": [
+            _challenge("FizzBuzz", "fizzBuzz"),
+            {"title": "Sin nombre de función"},
+            _challenge("Palíndromo", "isPalindrome"),
+        ]
+    })
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(challenge_service, "get_openai_client", lambda: client)
+    set_challenge_store(InMemoryChallengeStore())
+    yield completions
+    set_challenge_store(None)
+
+
+def test_batch_uses_one_call_and_splits_costs(fake_openai):
+    batch = asyncio.run(challenge_service.generate_challenge_batch(language="python", count=3))
+
+    assert len(fake_openai.calls) == 1
+    assert "3 DIFFERENT programming challenges" in fake_openai.calls[0]["messages"][0]["content"]
+    assert batch["invalid"] == 1
+    assert [c["title"] for c in batch["challenges"]] == ["FizzBuzz", "Palíndromo"]
+    assert "def fizzBuzz(n):" in batch["challenges"][0]["template_code"]
+
+    completion_tokens = sum(c["cost"]["completion_tokens"] for c in batch["challenges"])
+    assert abs(completion_tokens - 600) <= 1
+    total_cost = sum(c["cost"]["cost_usd"] for c in batch["challenges"])
+    assert total_cost == pytest.approx(batch["total_cost"]["cost_usd"], rel=1e-3)
+
+
+def test_batch_serves_stored_exercises_without_new_tokens(fake_openai):
+    asyncio.run(challenge_service.generate_challenge_batch(exercise_names=["FizzBuzz", "Anagram"], count=2))
+
+    batch = asyncio.run(challenge_service.generate_challenge_batch(exercise_names=["fizz buzz"], count=1))
+
+    assert len(fake_openai.calls) == 1
+    assert batch["challenges"][0]["title"] == "FizzBuzz"
+    assert batch["total_cost"]["cost_usd"] == 0
+
+
+def test_batch_endpoint(fake_openai):
+    app = FastAPI()
+    app.include_router(challenge_router, prefix="/api")
+    client = TestClient(app)
+
+    response = client.post("/api/generate-challenges/batch", json={"language": "go", "count": 3})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["challenges"][0]["cost"]["costUsd"] > 0
+    assert "latencyMs" in body["challenges"][0]
+
+    assert client.post("/api/generate-challenges/batch", json={"count": 50}).status_code == 422
+    assert client.post("/api/generate-challenges/batch", json={"language": "cobol"}).status_code == 400
+
+
+def test_batch_endpoint_charges_one_token_per_named_exercise(fake_openai, monkeypatch):
+    app = FastAPI()
+    app.include_router(challenge_router, prefix="/api")
+    client = TestClient(app)
+    names = [f"Ejercicio {i}" for i in range(10)]
+
+    # Limitadores vacíos: otros tests ya gastaron tokens de "testclient"
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    first = client.post("/api/generate-challenges/batch", json={"count": 1, "exerciseNames": names})
+    # El bucket "challenge" admite 10 por minuto: la primera petición lo agotó
+    second = client.post("/api/generate-challenges/batch", json={"count": 1, "exerciseNames": names})
+
+    assert first.status_code == 200
+    assert "10 DIFFERENT programming challenges" in fake_openai.calls[0]["messages"][0]["content"]
+    assert second.status_code == 429
+    assert len(fake_openai.calls) == 1
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes.challenge import router as challenge_router
+from app.services import challenge_service
+from app.services.challenge_store import (
+    ChallengeStore,
+    InMemoryChallengeStore,
+    SQLiteChallengeStore,
+    normalize_exercise_name,
+    set_challenge_store,
+)
+
+
+STORED_CHALLENGE = {
+    "challenge_id": "c-123",
+    "title": "FizzBuzz",
+    "description": "Imprime Fizz, Buzz o FizzBuzz.",
+    "template_code": "function fizzBuzz(n) {\n}",
+    "exercise_description": "SW1wcmltZSBGaXp6LCBCdXp6IG8gRml6ekJ1enou",
+    "exercise_name": "FizzBuzz",
+    "language": "JavaScript",
+    "difficulty": "easy",
+    "challenge_data": {
+        "title": "FizzBuzz",
+        "description": "Imprime Fizz, Buzz o FizzBuzz.",
+        "function_name": "fizzBuzz",
+        "function_signature": "function fizzBuzz(n)",
+        "test_cases": [{"input": "15", "expected": "FizzBuzz"}],
+    },
+}
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        instance = SQLiteChallengeStore(str(tmp_path / "challenges.sqlite3"))
+    else:
+        instance = InMemoryChallengeStore()
+    set_challenge_store(instance)
+    yield instance
+    set_challenge_store(None)
+
+
+def test_normalize_exercise_name():
+    assert normalize_exercise_name("FizzBuzz") == "fizzbuzz"
+    assert normalize_exercise_name(" Fizz Buzz! ") == "fizzbuzz"
+    assert normalize_exercise_name("Búsqueda Binaria") == "busquedabinaria"
+    assert normalize_exercise_name(None) == ""
+
+
+def test_store_get_and_find(store):
+    store.save(STORED_CHALLENGE)
+
+    assert store.get("c-123")["title"] == "FizzBuzz"
+    assert store.get("missing") is None
+    assert store.find("fizz buzz", "javascript", "EASY")["challenge_id"] == "c-123"
+    assert store.find("FizzBuzz", "Python", "easy") is None
+    assert store.find("FizzBuzz", "JavaScript", "hard") is None
+
+
+def test_names_without_letters_or_digits_never_match(store):
+    store.save({**STORED_CHALLENGE, "exercise_name": "¿?"})
+
+    # " " y "¿?" se normalizan a "", igual que el nombre guardado
+    assert store.find(" ", "javascript", "easy") is None
+    assert store.find("¿?", "javascript", "easy") is None
+
+
+def test_confirmed_exercise_is_served_without_llm_call(store, monkeypatch):
+    store.save(STORED_CHALLENGE)
+
+    def fail_client():
+        raise AssertionError("stored challenges must not call OpenAI")
+
+    monkeypatch.setattr(challenge_service, "get_openai_client", fail_client)
+
+    challenge = asyncio.run(
+        challenge_service.generate_challenge(language="javascript", exercise_name="FizzBuzz")
+    )
+
+    assert challenge["challenge_id"] == "c-123"
+    assert set(challenge) == set(challenge_service.PUBLIC_CHALLENGE_FIELDS)
+
+
+def test_incomplete_backend_fails_on_instantiation():
+    class GetOnlyStore(ChallengeStore):
+        def get(self, challenge_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
+
+
+def test_store_calls_run_off_the_event_loop(monkeypatch):
+    class RecordingStore(InMemoryChallengeStore):
+        threads = set()
+
+        def find(self, *args):
+            self.threads.add(threading.get_ident())
+            return super().find(*args)
+
+        def save(self, challenge):
+            self.threads.add(threading.get_ident())
+            super().save(challenge)
+
+    store = RecordingStore()
+    store.save(STORED_CHALLENGE)
+    RecordingStore.threads.clear()
+    set_challenge_store(store)
+    try:
+        challenge = asyncio.run(challenge_service.generate_challenge(language="javascript", exercise_name="FizzBuzz"))
+    finally:
+        set_challenge_store(None)
+
+    assert challenge["challenge_id"] == "c-123"
+    assert RecordingStore.threads and threading.get_ident() not in RecordingStore.threads
+
+
+def test_sqlite_store_evicts_oldest_rows(tmp_path):
+    store = SQLiteChallengeStore(str(tmp_path / "challenges.sqlite3"), max_challenges=3)
+    for i in range(5):
+        store.save({**STORED_CHALLENGE, "challenge_id": f"c-{i}", "exercise_name": f"Ejercicio {i}", "created_at": 1000.0 + i})
+
+    assert len(store) == 3
+    assert store.get("c-0") is None and store.get("c-1") is None
+    assert store.find("Ejercicio 4", "javascript", "easy")["challenge_id"] == "c-4"
+
+
+def test_get_challenge_endpoint(store):
+    store.save(STORED_CHALLENGE)
+    app = FastAPI()
+    app.include_router(challenge_router, prefix="/api")
+    client = TestClient(app)
+
+    response = client.get("/api/challenges/c-123")
+    assert response.status_code == 200
+    assert response.json()["templateCode"] == STORED_CHALLENGE["template_code"]
+
+    etag = response.headers["etag"]
+    assert client.get("/api/challenges/c-123", headers={"If-None-Match": etag}).status_code == 304
+
+    python = client.get("/api/challenges/c-123", params={"language": "python"})
+    assert "def fizzBuzz(n):" in python.json()["templateCode"]
+
+    assert client.get("/api/challenges/missing").status_code == 404
+    # Un ETag válido no confirma un challenge que esta instancia no tiene
+    assert client.get("/api/challenges/missing", headers={"If-None-Match": '"missing:"'}).status_code == 404
+    assert client.get("/api/challenges/c-123", params={"language": "cobol"}).status_code == 400
@@ -1,7 +1,18 @@
+import asyncio
+
+import pytest
+
+from app.services import challenge_service
 from app.services.challenge_service import (
     generate_javascript_template,
     generate_python_template,
 )
+from app.services.challenge_templates import (
+    UnsupportedLanguageError,
+    render_template,
+    resolve_language,
+)
+from app.services.judge0_service import SUPPORTED_LANGUAGES
 
 
 SAMPLE_CHALLENGE = {
@@ -38,3 +49,36 @@ def test_python_template_includes_metadata_sections():
     assert "# 📥 Ejemplos de Entrada/Salida:" in template
     assert "# 🛑 Restricciones:" in template
     assert "print(sum(2, 3))" in template
+
+
+def test_every_supported_language_renders_a_template():
+    for info in SUPPORTED_LANGUAGES.values():
+        spec = resolve_language(info["name"])
+        template = render_template(SAMPLE_CHALLENGE, info["name"])
+
+        assert f"{spec.comment} 🧪 Ejercicio: Suma A+B" in template
+        assert f"{spec.comment} ✍️ TU CÓDIGO AQUÍ" in template
+        if spec.call is not None:
+            assert "sum(2, 3)" in template
+
+
+def test_native_signatures_are_kept_and_js_signatures_are_translated():
+    java = render_template({**SAMPLE_CHALLENGE, "function_signature": "int sum(int a, int b)"}, "java")
+    assert "public static int sum(int a, int b) {" in java
+    assert "System.out.println(sum(2, 3));" in java
+
+    python = generate_python_template(SAMPLE_CHALLENGE)
+    assert "def sum(a, b):" in python
+
+    go = render_template(SAMPLE_CHALLENGE, "golang")
+    assert "func sum(a interface{}, b interface{}) interface{} {" in go
+
+
+def test_unsupported_language_fails_before_calling_openai(monkeypatch):
+    def fail_client():
+        raise AssertionError("OpenAI must not be called for unsupported languages")
+
+    monkeypatch.setattr(challenge_service, "get_openai_client", fail_client)
+
+    with pytest.raises(UnsupportedLanguageError):
+        asyncio.run(challenge_service.generate_challenge(language="cobol"))
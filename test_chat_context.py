@@ -0,0 +1,79 @@
+import base64
+
+import app.services.chat_context as chat_context_module
+import app.utils.snapshot_validator as snapshot_validator
+from app.models.schemas import ChatMessage, ChatRequest
+from app.services.chat_context import ChatContext
+from app.services.openai_service import build_openai_messages, build_responses_input
+from app.utils.snapshot_validator import check_exercise_snapshots
+
+DESCRIPTION = "Implementa sumar(a, b) que retorne la suma."
+
+
+def _verdict_request(**overrides):
+    data = dict(
+        messages=[ChatMessage(role="user", content=f"mensaje {i}") for i in range(10)]
+        + [ChatMessage(role="user", content="Necesito veredicto")],
+        languageId=97,
+        currentCode="function sumar(a, b) { return a + b; }",
+        automatic=True,
+        finished=True,
+        exerciseNameSnapshot="Sumar",
+        exerciseDescriptionSnapshot=base64.b64encode(DESCRIPTION.encode()).decode(),
+        executionOutput="3",
+    )
+    data.update(overrides)
+    return ChatRequest(**data)
+
+
+def test_check_exercise_snapshots_returns_decoded_description():
+    request = _verdict_request()
+    assert check_exercise_snapshots(request.exercise_name_snapshot, request.exercise_description_snapshot) == (True, "", DESCRIPTION)
+    assert check_exercise_snapshots(None, None) == (True, "", None)
+    assert check_exercise_snapshots("Sumar", None)[0] is False
+    assert check_exercise_snapshots("Sumar", "%%%no-base64%%%")[0] is False
+
+
+def test_context_is_built_once_from_request(monkeypatch):
+    detections = []
+    original_detect = chat_context_module.detect_automatic_prompt_type
+    monkeypatch.setattr(
+        chat_context_module,
+        "detect_automatic_prompt_type",
+        lambda *args: detections.append(args) or original_detect(*args),
+    )
+    decodes = []
+    original_decode = snapshot_validator.base64.b64decode
+    monkeypatch.setattr(snapshot_validator.base64, "b64decode", lambda value: decodes.append(value) or original_decode(value))
+
+    request = _verdict_request()
+    _, _, description = check_exercise_snapshots(request.exercise_name_snapshot, request.exercise_description_snapshot)
+    context = ChatContext.from_request(request, "JavaScript", description)
+    input_content = build_responses_input(build_openai_messages(context))
+
+    assert context.prompt_type == "EXERCISE_VERDICT"
+    assert context.exercise_description == DESCRIPTION
+    assert len(context.messages) == 7
+    assert context.messages[-1] == {"role": "user", "content": "Necesito veredicto"}
+    assert len(detections) == 1
+    assert len(decodes) == 1
+    assert DESCRIPTION in input_content
+
+
+def test_responses_input_matches_role_prefixed_transcript():
+    messages = [
+        {"role": "system", "content": "  sys  "},
+        {"role": "user", "content": "hola"},
+        {"role": "tool", "content": "ignored"},
+        {"role": "assistant", "content": "respuesta\n"},
+    ]
+    assert build_responses_input(messages) == "SYSTEM:   sys  \n\nUSER: hola\n\nASSISTANT: respuesta"
+
+
+def test_regular_chat_context_has_no_prompt_type():
+    request = _verdict_request(automatic=False, finished=False, exerciseNameSnapshot=None, exerciseDescriptionSnapshot=None)
+    context = ChatContext.from_request(request, "Python")
+    assert context.prompt_type is None
+    system_prompt = build_openai_messages(context)[0]["content"]
+    assert "El usuario está trabajando con Python" in system_prompt
+    assert "```python\nfunction sumar" in system_prompt
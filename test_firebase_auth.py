@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import threading
+import time
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+import app.utils.firebase_auth as firebase_auth
+
+PROJECT_ID = "demo-fluent-reflect"
+
+
+def _signing_material():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+    return crypt.RSASigner.from_string(key_pem, key_id="kid-1"), {"kid-1": cert_pem}
+
+
+SIGNER, CERTS = _signing_material()
+
+
+def _token(uid="user-123", expires_in=3600, audience=PROJECT_ID):
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{audience}",
+        "aud": audience,
+        "sub": uid,
+        "iat": now,
+        "auth_time": now,
+        "exp": now + expires_in,
+    }
+    return google_jwt.encode(SIGNER, payload).decode()
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    firebase_auth.clear_token_cache()
+    monkeypatch.setattr(firebase_auth, "_project_id", PROJECT_ID)
+    monkeypatch.setattr(firebase_auth.cert_cache, "certs", CERTS)
+    monkeypatch.setattr(firebase_auth.cert_cache, "expires_at", time.time() + 3600)
+
+    calls = []
+    original = firebase_auth._verify_with_certs
+
+    def counting(*args):
+        calls.append(args[0])
+        return original(*args)
+
+    monkeypatch.setattr(firebase_auth, "_verify_with_certs", counting)
+    yield calls
+    firebase_auth.clear_token_cache()
+
+
+def test_verified_claims_are_cached_until_exp(verifier):
+    token = _token()
+
+    async def scenario():
+        first = await firebase_auth.verify_bearer_token_async(token)
+        second = await firebase_auth.verify_bearer_token_async(token)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["uid"] == second["uid"] == "user-123"
+    assert len(verifier) == 1
+    # The sync entry point shares the cache
+    assert firebase_auth.verify_bearer_token(token)["uid"] == "user-123"
+    assert len(verifier) == 1
+
+
+def test_invalid_tokens_are_rejected_and_not_cached(verifier):
+    bad_audience = _token(audience="someone-else")
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(firebase_auth.verify_bearer_token_async(bad_audience))
+        assert exc_info.value.status_code == 401
+    assert len(verifier) == 2
+
+
+def test_expired_tokens_are_rejected(verifier):
+    with pytest.raises(HTTPException):
+        asyncio.run(firebase_auth.verify_bearer_token_async(_token(expires_in=-3600)))
+
+
+def test_project_id_is_resolved_off_the_event_loop(verifier, monkeypatch):
+    monkeypatch.setattr(firebase_auth, "_project_id", None)
+    threads = []
+
+    def resolve():
+        # Sin variable de entorno, firebase_admin se importa e inicializa aquí
+        threads.append(threading.get_ident())
+        firebase_auth._project_id = PROJECT_ID
+        return PROJECT_ID
+
+    monkeypatch.setattr(firebase_auth, "_get_project_id", resolve)
+    claims = asyncio.run(firebase_auth.verify_bearer_token_async(_token()))
+
+    assert claims["uid"] == "user-123"
+    assert threads and threads[0] != threading.get_ident()
+    asyncio.run(firebase_auth.verify_bearer_token_async(_token(uid="other")))
+    assert len(threads) == 1
+
+
+def test_uid_dependency(verifier):
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(uid: str = Depends(firebase_auth.get_current_uid)):
+        return {"uid": uid}
+
+    client = TestClient(app)
+    assert client.get("/me").status_code == 401
+    assert client.get("/me", headers={"Authorization": "Bearer not-a-jwt"}).status_code == 401
+    response = client.get("/me", headers={"Authorization": f"Bearer {_token(uid='abc')}"})
+    assert response.status_code == 200
+    assert response.json() == {"uid": "abc"}
@@ -0,0 +1,106 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.geo_db import GeoDatabase, RangeTable, compile_csv
+from app.services.geo_service import GeoLookupError, GeoResolver
+
+IP2LOCATION_ROWS = [
+    '"ip_from","ip_to","country_code","country_name","region_name","city_name"',
+    '"3355443200","3355443455","CL","Chile","Santiago Metropolitan","Santiago"',  # 200.0.0.0/24
+    '"3355443456","3355443711","CL","Chile","Valparaiso","Valparaiso"',  # 200.0.1.0/24
+    '"134744064","134744319","US","United States","California","Mountain View"',  # 8.8.8.0/24
+    '"58568784045719197223097215437582106624","58568784124947359737361553031126056959","CL","Chile","Santiago Metropolitan","Santiago"',  # 2c0f:f000::/32
+]
+
+
+def _write(path, rows):
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_compiled_table_lookups(tmp_path):
+    source = _write(tmp_path / "db3.csv", IP2LOCATION_ROWS)
+    compiled = str(tmp_path / "db3.bin")
+    compile_csv(source, compiled)
+    table = RangeTable(compiled)
+    try:
+        assert table.lookup("200.0.0.1") == {"country": "CL", "city": "Santiago"}
+        assert table.lookup("200.0.0.255") == {"country": "CL", "city": "Santiago"}
+        assert table.lookup("200.0.1.7") == {"country": "CL", "city": "Valparaiso"}
+        assert table.lookup("8.8.8.8") == {"country": "US", "city": "Mountain View"}
+        assert table.lookup("::ffff:200.0.0.9") == {"country": "CL", "city": "Santiago"}
+        assert table.lookup("200.0.2.1") is None
+        assert table.lookup("1.1.1.1") is None
+        assert table.lookup("2c0f:f000::1") == {"country": "CL", "city": "Santiago"}
+        assert table.lookup("2001:db8::1") is None
+        with pytest.raises(ValueError):
+            table.lookup("not-an-ip")
+    finally:
+        table.close()
+
+
+def test_short_csv_layout_with_dotted_ips(tmp_path):
+    source = _write(tmp_path / "ranges.csv", [
+        "start,end,country,city",
+        "190.160.0.0,190.160.255.255,cl,Santiago",
+    ])
+    db = GeoDatabase(source, compiled_path=str(tmp_path / "ranges.bin"))
+    try:
+        assert db.lookup("190.160.12.34") == {"country": "CL", "city": "Santiago"}
+    finally:
+        db.close()
+
+
+def test_hot_reload_swaps_table(tmp_path):
+    source = _write(tmp_path / "ranges.csv", ["10.0.0.0,10.0.0.255,CL,Santiago"])
+    db = GeoDatabase(source, compiled_path=str(tmp_path / "ranges.bin"))
+    try:
+        assert db.reload_if_changed() is False
+
+        _write(tmp_path / "ranges.csv", ["10.0.0.0,10.0.0.255,AR,Buenos Aires"])
+        stat = os.stat(source)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert db.reload_if_changed() is True
+        assert db.lookup("10.0.0.1") == {"country": "AR", "city": "Buenos Aires"}
+    finally:
+        db.close()
+
+
+def test_resolver_uses_offline_db_before_http(tmp_path):
+    source = _write(tmp_path / "ranges.csv", ["10.0.0.0,10.0.0.255,CL,Santiago"])
+    calls = []
+
+    async def fetch(ip):
+        calls.append(ip)
+        return {"country": "US", "city": "Ashburn"}
+
+    db = GeoDatabase(source, compiled_path=str(tmp_path / "ranges.bin"))
+    offline_only = GeoResolver(fetch=fetch, db=db, http_fallback=False)
+    with_fallback = GeoResolver(fetch=fetch, db=db, http_fallback=True)
+    try:
+        assert asyncio.run(offline_only.lookup("10.0.0.1"))["city"] == "Santiago"
+        with pytest.raises(GeoLookupError):
+            asyncio.run(offline_only.lookup("11.0.0.1"))
+        assert calls == []
+
+        assert asyncio.run(with_fallback.lookup("11.0.0.1"))["city"] == "Ashburn"
+        assert calls == ["11.0.0.1"]
+    finally:
+        db.close()
+
+
+def test_precompiled_copy_next_to_the_source_is_used(tmp_path):
+    source = _write(tmp_path / "db3.csv", IP2LOCATION_ROWS)
+    compile_csv(source, source + ".bin")
+    built_at = os.path.getmtime(source + ".bin")
+    db = GeoDatabase(source)
+    try:
+        assert db.lookup("200.0.1.7") == {"country": "CL", "city": "Valparaiso"}
+    finally:
+        db.close()
+    # Ya compilada en la imagen: nada se escribe en runtime
+    assert os.path.getmtime(source + ".bin") == built_at
+    assert sorted(os.listdir(tmp_path)) == ["db3.csv", "db3.csv.bin"]
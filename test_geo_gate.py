@@ -0,0 +1,69 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.gates import GeoGateMiddleware
+from app.services.geo_service import GeoResolver
+
+LOCATIONS = {
+    "200.1.1.1": {"country": "CL", "city": "Santiago"},
+    "8.8.8.8": {"country": "US", "city": "Mountain View"},
+}
+
+
+async def _fetch(ip):
+    if ip not in LOCATIONS:
+        raise RuntimeError("lookup failed")
+    return LOCATIONS[ip]
+
+
+def _client(fail_open=False):
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/data")
+    async def data():
+        return {"ok": True}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk-{i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(GeoGateMiddleware, fail_open=fail_open, resolver=GeoResolver(fetch=_fetch))
+    return TestClient(app)
+
+
+def test_allowed_city_passes():
+    # La última entrada es la que agrega Cloud Run; la primera la manda el cliente
+    response = _client().get("/api/data", headers={"X-Forwarded-For": "8.8.8.8, 200.1.1.1"})
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+
+
+def test_other_location_gets_prebuilt_403():
+    response = _client().get("/api/data", headers={"X-Forwarded-For": "8.8.8.8"})
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Forbidden"}
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_failed_lookup_fails_closed_unless_configured():
+    assert _client().get("/api/data", headers={"X-Forwarded-For": "1.2.3.4"}).status_code == 403
+    assert _client(fail_open=True).get("/api/data", headers={"X-Forwarded-For": "1.2.3.4"}).status_code == 200
+
+
+def test_exempt_paths_skip_lookup():
+    response = _client().get("/health", headers={"X-Forwarded-For": "8.8.8.8"})
+    assert response.status_code == 200
+
+
+def test_streaming_responses_pass_through():
+    response = _client().get("/api/stream", headers={"X-Forwarded-For": "200.1.1.1"})
+    assert response.status_code == 200
+    assert response.text == "chunk-0\nchunk-1\nchunk-2\n"
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.services.geo_service import GeoLookupError, GeoResolver, cache_key
+from app.utils.ttl_cache import MISSING, TTLCache
+
+SANTIAGO = {"country": "CL", "city": "Santiago"}
+
+
+def _counting_fetch(result=SANTIAGO, delay=0.0, error=None):
+    calls = []
+
+    async def fetch(ip):
+        calls.append(ip)
+        if delay:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return dict(result)
+
+    return fetch, calls
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1, ttl=60, now=0)
+    cache.set("b", 2, ttl=60, now=0)
+    assert cache.get("a", now=1) == 1  # "a" becomes most recently used
+    cache.set("c", 3, ttl=60, now=1)
+
+    assert len(cache) == 2
+    assert cache.get("a", now=2) == 1
+    assert cache.get("c", now=2) == 3
+    assert cache.get("b", now=2) is MISSING
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_entries=10)
+    cache.set("a", 1, ttl=10, now=0)
+    cache.set("b", 2, ttl=100, now=0)
+
+    assert cache.purge_expired(now=50) == 1
+    assert len(cache) == 1
+    assert cache.get("b", now=50) == 2
+
+
+def test_cache_key_prefix_aggregation():
+    assert cache_key("200.1.2.3", by_prefix=False) == "200.1.2.3"
+    assert cache_key("200.1.2.3", by_prefix=True) == "200.1.2.0/24"
+    assert cache_key("2800:150:1:2::1", by_prefix=True) == "2800:150:1::/48"
+
+
+def test_concurrent_misses_share_one_lookup():
+    fetch, calls = _counting_fetch(delay=0.01)
+    resolver = GeoResolver(fetch=fetch)
+
+    async def scenario():
+        return await asyncio.gather(*(resolver.lookup("200.1.2.3") for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert calls == ["200.1.2.3"]
+    assert all(result == SANTIAGO for result in results)
+    assert asyncio.run(resolver.lookup("200.1.2.3")) == SANTIAGO
+    assert len(calls) == 1
+
+
+def test_prefix_aggregation_reuses_neighbour_lookup():
+    fetch, calls = _counting_fetch()
+    resolver = GeoResolver(fetch=fetch, by_prefix=True)
+
+    async def scenario():
+        await resolver.lookup("200.1.2.3")
+        await resolver.lookup("200.1.2.200")
+        await resolver.lookup("200.1.3.1")
+
+    asyncio.run(scenario())
+    assert calls == ["200.1.2.3", "200.1.3.1"]
+
+
+def test_failed_lookups_are_negatively_cached():
+    fetch, calls = _counting_fetch(error=RuntimeError("timeout"))
+    resolver = GeoResolver(fetch=fetch, negative_ttl=60)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(GeoLookupError):
+                await resolver.lookup("200.1.2.3")
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_invalid_ip_is_rejected_without_lookup():
+    fetch, calls = _counting_fetch()
+    resolver = GeoResolver(fetch=fetch, by_prefix=True)
+
+    with pytest.raises(GeoLookupError):
+        asyncio.run(resolver.lookup("not-an-ip"))
+    assert calls == []
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+import requests
+
+import app.services.challenge_service as challenge_service
+import app.services.judge0_service as judge0_service
+import test_verdict_chain_e2e as verdict_e2e
+from app.utils.http_cassette import Cassette, CassetteMiss, request_key, summarize
+from standins import judge0_server, openai_server
+from standins._runner import BackgroundServers
+
+VERDICT_CASSETTE = "cassettes/verdict_chain.json"
+
+
+@pytest.fixture
+def standins(monkeypatch):
+    servers = BackgroundServers("test-cassette")
+    urls = servers.start({
+        "openai": openai_server.create_app(latency_ms=30, jitter=0),
+        "judge0": judge0_server.create_app(processing_polls=1),
+    })
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-standin-secret")
+    monkeypatch.setenv("JUDGE0_API_KEY", "judge0-standin-secret")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{urls['openai']}/v1")
+    monkeypatch.setattr(judge0_service, "JUDGE0_API", urls["judge0"])
+    yield servers, urls
+    servers.stop()
+
+
+def test_request_key_ignores_json_key_order_and_query_order():
+    a = request_key("post", "https://API.example.com/v1/x?b=2&a=1", b'{"a": 1, "b": [1, 2]}')
+    b = request_key("POST", "https://api.example.com/v1/x?a=1&b=2", '{"b":[1,2],"a":1}')
+    assert a == b
+    assert a != request_key("POST", "https://api.example.com/v1/x?a=1&b=2", '{"b":[2,1],"a":1}')
+
+
+def test_record_then_replay_offline_for_every_http_stack(standins, tmp_path):
+    servers, urls = standins
+    path = str(tmp_path / "stacks.json")
+    payload = {"model": "gpt-5-mini", "input": "VEREDICTO", "reasoning": {"effort": "minimal"}}
+
+    def run_all():
+        raw = requests.post(f"{urls['openai']}/v1/responses", data=json.dumps(payload), timeout=5).json()
+        execution = asyncio.run(judge0_service.execute_code(97, "console.log(3)"))
+        completion = challenge_service.get_openai_client().chat.completions.create(
+            model="gpt-3.5-turbo", messages=[{"role": "system", "content": "You are a challenge generator"}],
+        )
+        return raw["output"][1]["content"][0]["text"], execution, completion.choices[0].message.content
+
+    with Cassette(path, mode="record").use() as cassette:
+        recorded = run_all()
+    # 1 Responses + 1 submit + 2 polls ("Processing", then the result) + 1 chat completion
+    assert cassette.recorded == 5
+    saved = open(path, encoding="utf-8").read()
+    assert "standin-secret" not in saved
+
+    servers.stop()
+    with Cassette(path, mode="replay").use() as cassette:
+        replayed = run_all()
+    assert replayed == recorded
+    assert cassette.hits == 5
+
+
+def test_replay_raises_on_unknown_requests_and_missing_files(tmp_path):
+    path = str(tmp_path / "empty.json")
+    with pytest.raises(FileNotFoundError):
+        Cassette(path, mode="replay")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"version": 1, "interactions": []}, handle)
+    with Cassette(path, mode="replay").use():
+        with pytest.raises(CassetteMiss):
+            requests.get("https://api.openai.com/v1/models", timeout=5)
+
+
+def test_latency_simulation_replays_recorded_durations(tmp_path):
+    path = str(tmp_path / "slow.json")
+    url = "https://ip-api.example/json/200.1.2.3"
+    interaction = {
+        "key": request_key("GET", url, None),
+        "request": {"method": "GET", "url": url, "body": None},
+        "response": {"status": 200, "headers": {"content-type": "application/json"}, "encoding": "json", "body": {"countryCode": "CL"}},
+        "elapsed_ms": 200.0,
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"version": 1, "interactions": [interaction]}, handle)
+
+    for scale, slow in ((0.0, False), (1.0, True)):
+        with Cassette(path, mode="replay", latency_scale=scale).use():
+            started = time.perf_counter()
+            assert requests.get(url, timeout=5).json() == {"countryCode": "CL"}
+            assert (time.perf_counter() - started >= 0.2) is slow
+
+
+def test_summarize_groups_endpoints_and_adds_up_tokens():
+    def interaction(url, elapsed_ms, usage=None):
+        body = {"usage": usage} if usage else {"status": {"id": 3}}
+        return {"request": {"method": "POST" if usage else "GET", "url": url}, "response": {"status": 200, "body": body}, "elapsed_ms": elapsed_ms}
+
+    usage = {"input_tokens": 100, "output_tokens": 40, "output_tokens_details": {"reasoning_tokens": 8}}
+    summary = summarize([
+        interaction("https://api.openai.com/v1/responses", 900, usage),
+        interaction("https://api.openai.com/v1/responses", 1100, usage),
+        interaction("https://judge0/submissions/4f1c2a9e-0d5b-4a8f-9a51-7d1e4a2c9b10", 30),
+        interaction("https://judge0/submissions/8b2e7f4d-3c1a-4e6b-8f90-2a7c5d1e3b42", 50),
+    ])
+    responses = summary["POST api.openai.com/v1/responses"]
+    assert responses["calls"] == 2
+    assert responses["median_us"] == 1_000_000
+    assert (responses["input_tokens"], responses["output_tokens"], responses["reasoning_tokens"]) == (200, 80, 16)
+    assert summary["GET judge0/submissions/{id}"]["calls"] == 2
+
+
+def test_verdict_suite_replays_offline_in_seconds(standins, tmp_path, monkeypatch):
+    servers, urls = standins
+    path = str(tmp_path / "verdict.json")
+    cases = verdict_e2e._canonical_cases()[:4]
+    monkeypatch.setattr(verdict_e2e, "OPENAI_URL", f"{urls['openai']}/v1/responses")
+
+    with Cassette(path, mode="record").use():
+        recorded = verdict_e2e.run_suite(cases, allow_escalation=False, verbose=False)
+    servers.stop()
+
+    started = time.perf_counter()
+    with Cassette(path, mode="replay").use():
+        replayed = verdict_e2e.run_suite(cases, allow_escalation=False, verbose=False)
+    assert time.perf_counter() - started < 1
+    assert [r["detected"] for r in replayed["results"]] == [r["detected"] for r in recorded["results"]]
+
+
+@pytest.mark.skipif(
+    not os.path.exists(VERDICT_CASSETTE),
+    reason=f"record it first: HTTP_CASSETTE={VERDICT_CASSETTE} HTTP_CASSETTE_MODE=record python test_verdict_chain_e2e.py",
+)
+def test_recorded_verdict_corpus_replays():
+    with Cassette(VERDICT_CASSETTE, mode="replay").use():
+        summary = verdict_e2e.run_suite(verdict_e2e._canonical_cases(), verbose=False)
+    assert len(summary["results"]) == len(verdict_e2e._canonical_cases())
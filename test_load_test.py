@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+
+import app.services.judge0_service as judge0_service
+import app.services.openai_service as openai_service
+from app.services.chat_context import ChatContext
+from app.models.schemas import ChatMessage
+from benchmarks.load_test import parse_mix, percentile, run_load
+from standins import geo_server, judge0_server, openai_server
+from standins._runner import BackgroundServers
+
+
+@pytest.fixture(scope="module")
+def standins():
+    servers = BackgroundServers("test-standins")
+    urls = servers.start({
+        "openai": openai_server.create_app(),
+        "judge0": judge0_server.create_app(processing_polls=0),
+        "geo": geo_server.create_app(),
+    })
+    yield urls
+    servers.stop()
+
+
+def test_mix_and_percentiles():
+    assert parse_mix("chat=3,execute") == [("chat", 3.0), ("execute", 1.0)]
+    with pytest.raises(ValueError):
+        parse_mix("nope=1")
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 99) == 0.0
+
+
+def test_services_work_against_the_standins(standins, monkeypatch):
+    monkeypatch.setenv("JUDGE0_API_KEY", "standin")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-standin")
+    monkeypatch.setattr(judge0_service, "JUDGE0_API", standins["judge0"])
+    monkeypatch.setattr(openai_service, "OPENAI_BASE_URL", f"{standins['openai']}/v1")
+
+    result = asyncio.run(judge0_service.execute_code(97, "console.log(3)"))
+    assert result["status"] == "Accepted"
+    assert result["stdout"] == "3\n"
+
+    context = ChatContext.build([ChatMessage(role="user", content="Hola")], "JavaScript")
+    reply = asyncio.run(openai_service.chat_with_context(context))
+    assert reply == openai_server.CHAT_REPLY
+
+
+def test_run_load_reports_every_request():
+    app = FastAPI()
+
+    @app.get("/api/languages")
+    async def languages():
+        return []
+
+    servers = BackgroundServers("test-app")
+    url = servers.start({"app": app})["app"]
+    try:
+        result = asyncio.run(run_load(url, rps=50, duration=0.4, concurrency=4, mix=[("languages", 1)], ips=10))
+    finally:
+        servers.stop()
+    stats = result["routes"]["languages"]
+    assert stats.statuses == {"200": 20}
+    assert len(stats.latencies_ms) == 20
+    assert set(result["generator_lag"]) == {"p50_ms", "p99_ms", "max_ms"}
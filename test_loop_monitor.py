@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from app.utils import loop_monitor as monitor_module
+from app.utils.loop_monitor import LoopMonitor
+from app.utils.metrics import Histogram
+
+
+def _blocking_call():
+    # Lo mismo que hace un requests.post dentro de un endpoint async
+    time.sleep(0.2)
+
+
+async def _run_blocking(monitor: LoopMonitor) -> None:
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.05)
+    _blocking_call()
+    await asyncio.sleep(0.05)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("probe_seconds", "Probe", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, route="/x")
+    lines = histogram.render()
+    assert 'probe_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'probe_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 'probe_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'probe_seconds_sum{route="/x"} 4.05' in lines
+    assert 'probe_seconds_count{route="/x"} 4' in lines
+    assert histogram.value(route="/x") == 4
+
+
+def test_blocking_call_is_measured_and_its_stack_captured():
+    blocked_before = monitor_module.blocked_total.value()
+    probes_before = monitor_module.lag_seconds.value()
+    monitor = LoopMonitor(interval=0.01, threshold_ms=50, capture_stacks=True)
+
+    asyncio.run(_run_blocking(monitor))
+
+    assert monitor_module.blocked_total.value() > blocked_before
+    assert monitor_module.lag_seconds.value() > probes_before
+    assert monitor.max_lag >= 0.1
+    report = monitor.reports[-1]
+    assert "_blocking_call" in report["site"]
+    assert "_run_blocking" in report["stack"]
+    # La sonda completa la duración real cuando despierta
+    assert report["blocked_ms"] >= 150
+    assert monitor.blocking_sites()[0]["count"] == 1
+
+
+def test_without_debug_only_the_lag_is_recorded():
+    monitor = LoopMonitor(interval=0.01, threshold_ms=50, capture_stacks=False)
+    asyncio.run(_run_blocking(monitor))
+    assert monitor.max_lag >= 0.1
+    assert not monitor.reports
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import tracemalloc
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.routes.debug import router as debug_router
+from app.utils import memory, profiler
+from app.utils.memory import MemoryMonitor, TracemallocSnapshots, read_rss_bytes
+from app.utils.metrics import registry
+from benchmarks.memory_budget import MIB, check_budget, parse_memory_metrics
+
+TOKEN = "debug-secret"
+
+
+def _allocate_strings(count: int) -> list:
+    return ["x" * 1000 + str(i) for i in range(count)]
+
+
+@pytest.fixture
+def tracing():
+    snapshots = TracemallocSnapshots()
+    snapshots.start(1)
+    yield snapshots
+    snapshots.stop()
+
+
+def test_rss_is_exported_on_metrics():
+    values = parse_memory_metrics(registry.render())
+    assert values["process_resident_memory_bytes"] > 10 * MIB
+    assert values["process_resident_memory_peak_bytes"] >= values["process_resident_memory_bytes"]
+    assert read_rss_bytes() > 0
+
+
+def test_monitor_warns_once_when_over_the_budget(caplog):
+    monitor = MemoryMonitor(interval=1, budget_mb=1, warn_fraction=0.5)
+    with caplog.at_level(logging.WARNING, logger="app.utils.memory"):
+        monitor.sample()
+        monitor.sample()
+    assert len([record for record in caplog.records if "budget" in record.message]) == 1
+    assert memory.gc_collections.value(generation="0") >= 0
+
+
+def test_top_and_diff_point_at_the_allocating_line(tracing):
+    base = tracing.take()
+    kept = _allocate_strings(2000)
+    current = tracing.take()
+
+    top = tracing.top(tracing.get(current), limit=5)
+    diff = tracing.diff(tracing.get(base), tracing.get(current), limit=3)
+    assert "test_memory.py" in top[0]["site"]
+    assert "test_memory.py" in diff[0]["site"] and diff[0]["size_diff_bytes"] > 2000 * 1000
+    assert len(kept) == 2000
+
+    tracing.take()
+    tracing.take()
+    # Solo se guardan los últimos TRACEMALLOC_MAX_SNAPSHOTS
+    assert tracing.get(base) is None and len(tracing.stored()) == 3
+
+
+def test_debug_memory_routes(monkeypatch):
+    monkeypatch.setattr(profiler, "DEBUG_PROFILE_TOKEN", TOKEN)
+    app = FastAPI()
+    app.include_router(debug_router)
+    headers = {"X-Debug-Token": TOKEN}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers) as client:
+            not_tracing = await client.get("/debug/memory/top")
+            await client.post("/debug/memory/tracemalloc/start")
+            try:
+                base = (await client.post("/debug/memory/snapshots")).json()["id"]
+                kept = _allocate_strings(2000)
+                diff = (await client.get("/debug/memory/diff", params={"base": base, "limit": 5})).json()
+                stats = (await client.get("/debug/memory")).json()
+                missing = await client.get("/debug/memory/diff", params={"base": "nope"})
+            finally:
+                await client.post("/debug/memory/tracemalloc/stop")
+            return not_tracing, diff, stats, missing, kept
+
+    not_tracing, diff, stats, missing, _ = asyncio.run(scenario())
+    assert not_tracing.status_code == 409
+    assert any("test_memory.py" in item["site"] for item in diff["diff"])
+    assert stats["tracemalloc"]["tracing"] and stats["rss_bytes"] > 0 and len(stats["snapshots"]) == 1
+    assert missing.status_code == 404
+    assert not tracemalloc.is_tracing()
+
+
+def test_budget_check():
+    assert check_budget([100 * MIB, 104 * MIB, 105 * MIB], budget_mb=512, max_growth_mb=16) == []
+    failures = check_budget([100 * MIB, 300 * MIB, 600 * MIB], budget_mb=512, max_growth_mb=16)
+    assert len(failures) == 2 and "over the 512 MiB budget" in failures[0]
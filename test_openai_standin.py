@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import app.services.challenge_service as challenge_service
+from standins import openai_server
+from standins._runner import BackgroundServers
+
+PROFILE = "reasoning_benchmark_results.json"
+
+
+def _events(raw: str):
+    events = []
+    for block in raw.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines.get("event"), lines["data"]))
+    return events
+
+
+def test_load_profiles_groups_runs_by_effort():
+    profiles = openai_server.load_profiles(PROFILE)
+    assert set(profiles) == {"minimal", "low", "medium", "high"}
+    assert profiles["minimal"].reasoning_tokens == [0]
+    assert profiles["high"].latencies_s == [9.036]
+
+
+def test_parse_faults_rejects_unknown_names_and_excess_probability():
+    assert openai_server.parse_faults("429=0.1, timeout=0.05") == {"429": 0.1, "timeout": 0.05}
+    with pytest.raises(ValueError):
+        openai_server.parse_faults("teapot=0.1")
+    with pytest.raises(ValueError):
+        openai_server.parse_faults("429=0.7,500=0.7")
+
+
+def test_reasoning_tokens_count_against_the_output_budget():
+    # Con el perfil del benchmark, "high" gasta 576 tokens razonando
+    client = TestClient(openai_server.create_app(profile=PROFILE, latency_scale=0, seed=1))
+    body = {"model": "gpt-5-mini", "input": "Hola", "reasoning": {"effort": "high"}, "max_output_tokens": 300}
+    data = client.post("/v1/responses", json=body).json()
+    assert data["status"] == "incomplete"
+    assert data["incomplete_details"] == {"reason": "max_output_tokens"}
+    assert data["usage"]["output_tokens_details"]["reasoning_tokens"] == 300
+    assert data["output"][1]["content"] == []
+
+    body["reasoning"]["effort"] = "minimal"
+    body["max_output_tokens"] = 2000
+    data = client.post("/v1/responses", json=body).json()
+    assert data["status"] == "completed"
+    assert data["usage"]["output_tokens_details"]["reasoning_tokens"] == 0
+    # El largo del texto sigue el perfil (588 tokens de salida)
+    assert data["usage"]["output_tokens"] == 588
+
+
+def test_streaming_responses_emit_deltas_that_add_up_to_the_text():
+    client = TestClient(openai_server.create_app())
+    body = {"model": "gpt-5-mini", "input": "VEREDICTO", "stream": True}
+    with client.stream("POST", "/v1/responses", json=body) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _events(response.read().decode("utf-8"))
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "response.created"
+    assert kinds[-1] == "response.completed"
+    deltas = "".join(json.loads(data)["delta"] for kind, data in events if kind == "response.output_text.delta")
+    assert deltas == openai_server.VERDICT_REPLY
+    final = json.loads(events[-1][1])["response"]
+    assert final["output"][1]["content"][0]["text"] == deltas
+
+
+def test_streaming_chat_completions_end_with_done_and_usage():
+    client = TestClient(openai_server.create_app())
+    body = {"messages": [{"role": "user", "content": "Hola"}], "stream": True, "stream_options": {"include_usage": True}}
+    with client.stream("POST", "/v1/chat/completions", json=body) as response:
+        events = _events(response.read().decode("utf-8"))
+    assert events[-1] == (None, "[DONE]")
+    chunks = [json.loads(data) for _, data in events[:-1]]
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"])
+    assert text == openai_server.CHAT_REPLY
+    assert chunks[-1]["usage"]["completion_tokens"] > 0
+
+
+def test_injected_faults_and_runtime_config():
+    client = TestClient(openai_server.create_app(faults="429=1"))
+    response = client.post("/v1/chat/completions", json={"messages": []})
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "rate_limit_exceeded"
+
+    assert client.post("/_standin/config", json={"faults": {"incomplete": 1}}).status_code == 200
+    data = client.post("/v1/chat/completions", json={"messages": []}).json()
+    assert data["choices"][0]["finish_reason"] == "length"
+    assert len(data["choices"][0]["message"]["content"]) < len(openai_server.CHAT_REPLY)
+
+    stats = client.get("/_standin/stats").json()
+    assert stats["counts"]["fault_429"] == 1
+    assert stats["counts"]["fault_incomplete"] == 1
+    assert client.post("/_standin/config", json={"faults": "nope=1"}).status_code == 400
+
+
+def test_challenge_client_follows_the_base_url_override(monkeypatch):
+    servers = BackgroundServers("test-openai")
+    url = servers.start({"openai": openai_server.create_app()})["openai"]
+    try:
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-standin")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{url}/v1")
+        client = challenge_service.get_openai_client()
+        completion = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "system", "content": "You are a challenge generator"}],
+        )
+    finally:
+        servers.stop()
+    assert json.loads(completion.choices[0].message.content)["function_name"] == "sumaAlternada"
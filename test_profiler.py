@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.profiling import RequestProfilerMiddleware
+from app.routes.debug import router as debug_router
+from app.utils import profiler
+from app.utils.profiler import Profile, ProfileSessions
+
+TOKEN = "debug-secret"
+
+
+def _busy_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _other_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(profiler, "DEBUG_PROFILE_TOKEN", TOKEN)
+    sessions = ProfileSessions()
+    monkeypatch.setattr("app.routes.debug.profile_sessions", sessions)
+    app = FastAPI()
+    app.include_router(debug_router)
+
+    @app.get("/work")
+    async def work():
+        _busy_work(0.1)
+        await asyncio.sleep(0.05)
+        _busy_work(0.1)
+        return {"ok": True}
+
+    app.add_middleware(RequestProfilerMiddleware, token=TOKEN, interval_ms=2, sessions=sessions)
+    return app
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_collapsed_and_speedscope_output():
+    profile = Profile("manual", interval=0.005)
+    root = ("main", "/srv/app/main.py", 1)
+    leaf = ("handler", "/srv/venv/lib/python3.11/site-packages/fastapi/routing.py", 10)
+    for _ in range(3):
+        profile.add((root, leaf))
+    profile.add((root,))
+
+    assert profile.to_collapsed() == (
+        "main (app/main.py:1);handler (fastapi/routing.py:10) 3\n"
+        "main (app/main.py:1) 1\n"
+    )
+    speedscope = profile.to_speedscope()
+    frames = speedscope["shared"]["frames"]
+    sampled = speedscope["profiles"][0]
+    assert [frame["name"] for frame in frames] == ["main", "handler"]
+    assert sampled["samples"] == [[0, 1], [0]]
+    assert sampled["weights"] == [0.015, 0.005]
+
+
+def test_profile_for_n_seconds_sees_the_busy_code(app):
+    async def scenario():
+        async with _client(app) as client:
+            async def busy():
+                await asyncio.sleep(0.05)
+                _busy_work(0.2)
+
+            response, _ = await asyncio.gather(
+                client.get("/debug/profile", params={"seconds": 0.4, "interval_ms": 2}, headers={"X-Debug-Token": TOKEN}),
+                busy(),
+            )
+            return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert "_busy_work (" in response.text
+    hottest = response.text.splitlines()[0]
+    assert int(hottest.rsplit(" ", 1)[1]) > 10
+
+
+def test_tagged_request_profile_only_contains_its_own_task(app):
+    async def scenario():
+        async with _client(app) as client:
+            async def other():
+                await asyncio.sleep(0.02)
+                _other_work(0.1)
+
+            response, _ = await asyncio.gather(client.get("/work", headers={"X-Profile-Request": TOKEN}), other())
+            profile_id = response.headers["x-profile-id"]
+            collapsed = await client.get(f"/debug/profile/requests/{profile_id}", headers={"X-Debug-Token": TOKEN})
+            speedscope = await client.get(
+                f"/debug/profile/requests/{profile_id}", params={"format": "speedscope"}, headers={"X-Debug-Token": TOKEN}
+            )
+            untagged = await client.get("/work")
+            return collapsed, speedscope, untagged
+
+    collapsed, speedscope, untagged = asyncio.run(scenario())
+    assert "_busy_work (" in collapsed.text
+    assert "_other_work" not in collapsed.text
+    assert json.loads(speedscope.content)["profiles"][0]["type"] == "sampled"
+    assert "x-profile-id" not in untagged.headers
+
+
+def test_debug_routes_are_guarded(app, monkeypatch):
+    async def get(path, **headers):
+        async with _client(app) as client:
+            return await client.get(path, headers=headers)
+
+    assert asyncio.run(get("/debug/profile/requests")).status_code == 403
+    assert asyncio.run(get("/debug/profile/requests", **{"X-Debug-Token": "wrong"})).status_code == 403
+    assert asyncio.run(get("/debug/profile/requests", **{"X-Debug-Token": TOKEN})).status_code == 200
+    monkeypatch.setattr(profiler, "DEBUG_PROFILE_TOKEN", "")
+    assert asyncio.run(get("/debug/profile/requests", **{"X-Debug-Token": ""})).status_code == 404
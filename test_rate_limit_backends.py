@@ -0,0 +1,94 @@
+import asyncio
+import os
+import time
+
+from app.utils.rate_limiter import RateLimit, RedisRateLimitBackend
+from app.utils.redis_client import RedisClient
+from standins.redis_server import start_server
+
+
+async def _with_redis(scenario):
+    """Run the scenario against TEST_REDIS_URL, or a local stand-in if unset."""
+    url = os.getenv("TEST_REDIS_URL")
+    server = None
+    if not url:
+        server, _ = await start_server()
+        url = f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0"
+    try:
+        return await scenario(url)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+
+def test_shared_limit_across_instances():
+    async def scenario(url):
+        config = RateLimit(limit=20, window_seconds=3600)
+        # Two "Cloud Run instances" with their own clients and local leases
+        instances = [
+            RedisRateLimitBackend(RedisClient(url), lease_size=5, prefix=f"test:{id(config)}")
+            for _ in range(2)
+        ]
+        allowed = 0
+        for i in range(60):
+            if await instances[i % 2].acquire("chat", "1.2.3.4", config) == 0:
+                allowed += 1
+        for backend in instances:
+            await backend.close()
+        return allowed, sum(backend.round_trips for backend in instances)
+
+    allowed, round_trips = asyncio.run(_with_redis(scenario))
+
+    # Never more than the configured limit, no matter how many instances
+    assert 16 <= allowed <= 20
+    # Leases batch tokens, so far fewer round trips than requests
+    assert round_trips < 30
+
+
+def test_exhausted_window_is_rejected_locally():
+    async def scenario(url):
+        config = RateLimit(limit=3, window_seconds=3600)
+        backend = RedisRateLimitBackend(RedisClient(url), prefix=f"test:{id(config)}")
+        results = [await backend.acquire("challenge", "5.6.7.8", config) for _ in range(10)]
+        round_trips = backend.round_trips
+        await backend.close()
+        return results, round_trips
+
+    results, round_trips = asyncio.run(_with_redis(scenario))
+
+    assert results[:3] == [0.0, 0.0, 0.0]
+    assert all(retry_after > 0 for retry_after in results[3:])
+    assert round_trips == 4
+
+
+def test_falls_back_to_memory_when_redis_is_down():
+    async def scenario():
+        config = RateLimit(limit=2, window_seconds=60)
+        backend = RedisRateLimitBackend(RedisClient("redis://127.0.0.1:1/0", timeout=0.2), prefix="down")
+        return [await backend.acquire("fallback-test", "9.9.9.9", config) for _ in range(3)]
+
+    results = asyncio.run(scenario())
+
+    assert results[:2] == [0.0, 0.0]
+    assert results[2] > 0
+
+
+def test_open_circuit_skips_redis_until_retry():
+    async def scenario():
+        config = RateLimit(limit=100, window_seconds=60)
+        backend = RedisRateLimitBackend(RedisClient("redis://127.0.0.1:1/0", timeout=0.2), prefix="down", retry_seconds=0.3)
+        started = time.perf_counter()
+        for _ in range(20):
+            await backend.acquire("circuit-test", "9.9.9.9", config)
+        elapsed = time.perf_counter() - started
+        during = backend.round_trips
+        await asyncio.sleep(0.35)
+        await backend.acquire("circuit-test", "9.9.9.9", config)
+        return elapsed, during, backend.round_trips
+
+    elapsed, during, after = asyncio.run(scenario())
+
+    # Solo el primer request espera el timeout de conexión
+    assert during == 1 and elapsed < 0.3
+    assert after == 2
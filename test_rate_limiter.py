@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import rate_limiter
+from app.utils.rate_limiter import GCRARateLimiter, check_rate_limit
+
+
+def test_gcra_allows_limit_then_rejects_until_refill():
+    limiter = GCRARateLimiter(limit=3, window_seconds=60)
+
+    assert [limiter.hit("1.1.1.1", now=0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.hit("1.1.1.1", now=0) == pytest.approx(20.0)
+
+    # One token refills every window / limit seconds
+    assert limiter.hit("1.1.1.1", now=20) == 0.0
+    assert limiter.hit("1.1.1.1", now=20) > 0
+
+
+def test_gcra_cost_and_constant_memory_per_key():
+    limiter = GCRARateLimiter(limit=10, window_seconds=60)
+
+    assert limiter.hit("ip", cost=10, now=0) == 0.0
+    assert limiter.hit("ip", cost=1, now=0) > 0
+    for _ in range(100):
+        limiter.hit("ip", now=0)
+    assert len(limiter) == 1
+
+
+def test_sweep_drops_only_idle_keys():
+    limiter = GCRARateLimiter(limit=2, window_seconds=10)
+    limiter.hit("idle", now=0)
+    limiter.hit("busy", cost=2, now=95)
+
+    assert limiter.sweep(now=100) == 1
+    assert len(limiter) == 1
+
+
+def test_sweep_async_drops_keys_in_chunks():
+    limiter = GCRARateLimiter(limit=2, window_seconds=10)
+    for i in range(25):
+        limiter.hit(f"10.0.0.{i}", now=0)
+
+    assert asyncio.run(limiter.sweep_async(chunk_size=10)) == 25
+    assert len(limiter) == 0
+
+
+def test_routes_have_independent_buckets(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+
+    for _ in range(10):
+        check_rate_limit("9.9.9.9", route="challenge")
+    with pytest.raises(HTTPException) as exc_info:
+        check_rate_limit("9.9.9.9", route="challenge")
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+    # The chat bucket of the same IP is untouched
+    check_rate_limit("9.9.9.9", route="chat")
@@ -12,6 +12,8 @@ import statistics
 from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 
+from app.utils.http_cassette import use_cassette_from_env
+
 # Load environment variables
 load_dotenv()
 
@@ -222,7 +224,9 @@ Proporciona una explicación detallada y el código completo optimizado."""
 
 if __name__ == "__main__":
     try:
-        results = run_reasoning_benchmark()
+        # HTTP_CASSETTE=cassettes/reasoning_efforts.json [HTTP_CASSETTE_MODE=record] para correr sin red
+        with use_cassette_from_env():
+            results = run_reasoning_benchmark()
         print("\n✅ Benchmark completado exitosamente")
     except Exception as e:
         print(f"\n❌ Error en benchmark: {e}")
\ No newline at end of file
@@ -0,0 +1,122 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+import app.utils.request_limits as request_limits
+from app.models.schemas import ChatMessage, ChatRequest
+from app.routes.chat import router as chat_router
+from app.utils.metrics import Registry
+from app.utils.request_limits import collapse_repeated_lines, estimate_tokens, truncate_head_tail
+
+
+def test_runaway_output_collapses_repeated_lines():
+    output = "start\n" + "loop\n" * 100_000 + "end"
+    truncated = truncate_head_tail(output, max_tokens=50)
+    assert truncated == "start\nloop\nloop\n... [línea repetida 99998 veces más]\nend"
+    # Short runs are left alone
+    assert collapse_repeated_lines("a\na\na\nb") == "a\na\na\nb"
+
+
+def test_head_and_tail_are_kept_on_line_boundaries():
+    lines = [f"line {i}" for i in range(10_000)]
+    truncated = truncate_head_tail("\n".join(lines), max_tokens=100)
+    assert truncated.startswith("line 0\nline 1\n")
+    assert truncated.endswith("line 9998\nline 9999")
+    assert "caracteres omitidos" in truncated
+    assert estimate_tokens(truncated) <= 110
+    for line in truncated.split("\n"):
+        assert line in lines or "omitidos" in line
+    # Within budget: returned untouched
+    text = "print(1)\n" * 10
+    assert truncate_head_tail(text, max_tokens=100) is text
+
+
+def test_chat_request_fields_are_truncated_and_counted():
+    before = request_limits.field_truncations.value(field="execution_output")
+    request = ChatRequest(
+        currentCode="function f() {}",
+        executionOutput="tick\n" * 500_000,
+        messages=[ChatMessage(role="user", content="hola")],
+    )
+    assert request.current_code == "function f() {}"
+    assert estimate_tokens(request.execution_output) <= request_limits.CHAT_OUTPUT_TOKEN_BUDGET
+    assert request_limits.field_truncations.value(field="execution_output") == before + 1
+    assert request_limits.field_truncated_chars.value(field="execution_output") > 0
+
+
+def test_over_cap_fields_are_rejected():
+    too_big = "x" * (request_limits.CHAT_MAX_CODE_BYTES + 1)
+    with pytest.raises(ValidationError):
+        ChatRequest(currentCode=too_big)
+    # Multi-byte characters count by their UTF-8 size
+    with pytest.raises(ValidationError):
+        ChatRequest(currentCode="ñ" * (request_limits.CHAT_MAX_CODE_BYTES // 2 + 1))
+    assert request_limits.field_rejections.value(field="current_code") >= 2
+
+
+def test_long_history_is_windowed_before_message_limits():
+    huge = "x" * (request_limits.CHAT_MAX_MESSAGE_BYTES + 1)
+    history = [{"role": "system", "content": "contexto"}, {"role": "user", "content": huge}]
+    history += [{"role": "user" if i % 2 else "assistant", "content": f"mensaje {i}"} for i in range(200)]
+    before = request_limits.messages_dropped.value()
+
+    request = ChatRequest(messages=history)
+
+    window = request_limits.CHAT_MESSAGE_WINDOW
+    assert [message.content for message in request.messages] == ["contexto"] + [f"mensaje {i}" for i in range(200 - window, 200)]
+    assert request_limits.messages_dropped.value() == before + 201 - window
+    # Un mensaje gigante que sí entra en la ventana sigue siendo rechazado
+    with pytest.raises(ValidationError):
+        ChatRequest(messages=history[:-1] + [{"role": "user", "content": huge}])
+
+
+def test_verdict_code_is_rejected_instead_of_truncated():
+    long_code = "\n".join(f"const v{i} = {i};" for i in range(5000))
+    assert request_limits.estimate_tokens(long_code) > request_limits.CHAT_CODE_TOKEN_BUDGET
+
+    practice = ChatRequest(currentCode=long_code)
+    assert "caracteres omitidos" in practice.current_code
+    with pytest.raises(ValidationError, match="verdicts are limited"):
+        ChatRequest(currentCode=long_code, finished=True, automatic=True)
+    verdict = ChatRequest(currentCode="function f() {}", finished=True, automatic=True)
+    assert verdict.current_code == "function f() {}"
+
+
+def test_chat_endpoint_rejects_oversized_body_with_422():
+    app = FastAPI()
+    app.include_router(chat_router, prefix="/api")
+    response = TestClient(app).post(
+        "/api/chat", json={"currentCode": "x" * (request_limits.CHAT_MAX_CODE_BYTES + 1)}
+    )
+    assert response.status_code == 422
+
+
+def test_metrics_render_prometheus_text():
+    registry = Registry()
+    truncations = registry.counter("field_truncations_total", "Truncated fields", ("field",))
+    truncations.inc(field="current_code")
+    truncations.inc(3, field='we"ird')
+    registry.gauge("loop_lag_seconds", "Lag").set_function(lambda: 0.25)
+    assert registry.render() == (
+        "# HELP field_truncations_total Truncated fields\n"
+        "# TYPE field_truncations_total counter\n"
+        'field_truncations_total{field="current_code"} 1\n'
+        'field_truncations_total{field="we\\"ird"} 3\n'
+        "# HELP loop_lag_seconds Lag\n"
+        "# TYPE loop_lag_seconds gauge\n"
+        "loop_lag_seconds 0.25\n"
+    )
+    assert registry.counter("field_truncations_total", "Truncated fields", ("field",)) is truncations
+    with pytest.raises(ValueError):
+        registry.gauge("field_truncations_total", "Truncated fields", ("field",))
+
+
+def test_metrics_endpoint_exposes_truncation_counters():
+    from app.main import app
+
+    ChatRequest(executionOutput="spam\n" * 100_000)
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'request_field_truncations_total{field="execution_output"}' in response.text
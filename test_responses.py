@@ -0,0 +1,67 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.utils.responses as responses
+from app.models.schemas import ChallengeResponse, ChatResponse, ExecuteResponse
+from app.utils.responses import FastJSONResponse, dumps, model_response
+
+CHALLENGE = ChallengeResponse(
+    challenge_id="abc123",
+    title="Suma",
+    description="Implementa sumar(a, b) — ñandú ☃",
+    template_code="function sumar(a, b) {\n  // tu código\n}\n" * 50,
+    exercise_description="SW1wbGVtZW50YQ==",
+)
+
+
+def test_models_serialize_with_camel_case_aliases():
+    payload = json.loads(dumps(CHALLENGE))
+    assert payload == CHALLENGE.model_dump(by_alias=True)
+    assert "templateCode" in payload and "template_code" not in payload
+
+
+def test_plain_content_matches_stdlib_json(monkeypatch):
+    content = {"message": "Fluent Reflect API está corriendo", "items": [1, 2.5, None, True], "nested": {"a": "ü"}}
+    expected = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert json.loads(dumps(content)) == content
+    # Without orjson the body is byte-identical to Starlette's JSONResponse
+    monkeypatch.setattr(responses, "_ORJSON_AVAILABLE", False)
+    assert dumps(content) == expected
+
+
+def test_routes_return_the_same_body_as_fastapi_serialization():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    chat = ChatResponse(response="hola", can_generate_exercise=True, exercise_name="Suma")
+    execute = {"status": "Accepted", "stdout": "3\n", "stderr": None, "compile_output": None,
+               "time": "0.01", "memory": 1024, "exit_code": 0}
+
+    @app.get("/legacy/chat", response_model=ChatResponse)
+    async def legacy_chat():
+        return chat
+
+    @app.get("/fast/chat", response_model=ChatResponse)
+    async def fast_chat():
+        return model_response(chat)
+
+    @app.get("/legacy/execute", response_model=ExecuteResponse)
+    async def legacy_execute():
+        return execute
+
+    @app.get("/fast/execute", response_model=ExecuteResponse)
+    async def fast_execute():
+        return model_response(ExecuteResponse(**execute), headers={"ETag": '"x"'})
+
+    client = TestClient(app)
+    for name in ("chat", "execute"):
+        legacy = client.get(f"/legacy/{name}")
+        fast = client.get(f"/fast/{name}")
+        assert fast.status_code == 200
+        assert fast.headers["content-type"] == "application/json"
+        assert fast.json() == legacy.json()
+    assert client.get("/fast/execute").headers["etag"] == '"x"'
+    assert client.get("/fast/execute").json()["exitCode"] == 0
+    # Both paths still document the response model
+    schema = app.openapi()["paths"]["/fast/chat"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/ChatResponse"}
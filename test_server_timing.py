@@ -0,0 +1,85 @@
+import asyncio
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.server_timing import ServerTimingMiddleware
+from app.services.geo_service import GeoResolver
+from app.utils.rate_limiter import InMemoryRateLimitBackend, RateLimit
+from app.utils.server_timing import ServerTimings, activate, current_timings, deactivate, phase
+
+HEADER = re.compile(r"^[a-z0-9_]+;dur=\d+\.\d(, [a-z0-9_]+;dur=\d+\.\d)*$")
+
+
+def _names(header):
+    return [metric.split(";")[0] for metric in header.split(", ")]
+
+
+def test_phases_are_noops_without_an_active_request():
+    assert current_timings() is None
+    with phase("llm") as first, phase("geo") as second:
+        pass
+    assert first is second  # shared no-op, nothing allocated
+
+
+def test_phases_are_recorded_in_order_with_total():
+    timings = ServerTimings()
+    token = activate(timings)
+    try:
+        with phase("prompt"):
+            pass
+        with phase("llm"):
+            pass
+    finally:
+        deactivate(token)
+    assert current_timings() is None
+    header = timings.header_value()
+    assert HEADER.match(header)
+    assert _names(header) == ["prompt", "llm", "total"]
+
+
+def _blocking_llm_call():
+    with phase("llm"):
+        pass
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/api/work")
+    async def work():
+        with phase("prompt"):
+            await asyncio.sleep(0)
+        # Phases in worker threads land in the same request (context is copied)
+        await asyncio.to_thread(_blocking_llm_call)
+        return {"ok": True}
+
+    async def fetch(ip):
+        return {"country": "CL", "city": "Santiago"} if ip == "testclient" else {"country": "US", "city": "X"}
+
+    app.add_middleware(
+        AdmissionMiddleware,
+        resolver=GeoResolver(fetch=fetch),
+        route="server-timing-test",
+        rate_limit=RateLimit(100, 60),
+        backend=InMemoryRateLimitBackend(),
+    )
+    app.add_middleware(ServerTimingMiddleware)
+    return TestClient(app)
+
+
+def test_header_covers_admission_and_route_phases():
+    client = _app()
+    response = client.get("/api/work")
+    assert response.status_code == 200
+    assert HEADER.match(response.headers["server-timing"])
+    assert _names(response.headers["server-timing"]) == ["ratelimit", "geo", "prompt", "llm", "total"]
+
+
+def test_rejected_requests_are_timed_too():
+    client = _app()
+    response = client.get("/api/work", headers={"X-Forwarded-For": "8.8.8.8"})
+    assert response.status_code == 403
+    assert _names(response.headers["server-timing"]) == ["ratelimit", "geo", "total"]
@@ -0,0 +1,35 @@
+import asyncio
+import sys
+
+from app.utils.startup import preload_modules, preload_seconds
+from benchmarks.startup_time import FORBIDDEN, forbidden_imports, package_totals, parse_importtime, run_once
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     fastapi.types
+import time:      3000 |       3120 |   fastapi.applications
+import time:       400 |       3520 | fastapi
+import time:      7000 |      10520 | app.main
+"""
+
+
+def test_parse_importtime_and_group_by_package():
+    records = parse_importtime(IMPORTTIME)
+    assert [record.module for record in records] == ["fastapi.types", "fastapi.applications", "fastapi", "app.main"]
+    assert records[-1].cumulative_us == 10520 and records[0].depth == 2
+    assert package_totals(records) == {"fastapi": 3520, "app": 7000}
+
+
+def test_app_main_does_not_import_the_heavy_sdks():
+    result = run_once("app.main")
+    modules = {record.module for record in result["records"]}
+    assert "fastapi" in modules
+    assert forbidden_imports(modules, FORBIDDEN) == []
+
+
+def test_preload_imports_in_a_worker_and_skips_missing_modules():
+    sys.modules.pop("colorsys", None)
+    timings = asyncio.run(preload_modules(("colorsys", "module_that_does_not_exist")))
+    assert list(timings) == ["colorsys"]
+    assert "colorsys" in sys.modules
+    assert preload_seconds.value(module="colorsys") == timings["colorsys"]
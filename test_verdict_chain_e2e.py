@@ -16,6 +16,7 @@ from dotenv import load_dotenv
 from app.services.automatic_prompts_service import get_automatic_system_prompt
 from app.services.openai_service import get_openai_headers
 from app.services.verdict_chain import build_verdict_reasoning_prompt
+from app.utils.http_cassette import use_cassette_from_env
 
 
 load_dotenv()
@@ -40,19 +41,18 @@ ESCALATED_EFFORT = "low"
 DEFAULT_MAX_TOKENS = 400
 
 
-def _build_input_content(system_prompt: str, reasoning_prompt: str) -> str:
+def _build_input_content(system_prompt: str, reasoning_prompt: Optional[str]) -> str:
     """Mirror chat_with_openai concatenation for responses endpoint."""
 
-    fragments = [
-        ("SYSTEM", system_prompt),
-        ("SYSTEM", reasoning_prompt),
-        ("USER", USER_FINAL_MESSAGE),
-    ]
+    fragments = [("SYSTEM", system_prompt)]
+    if reasoning_prompt:
+        fragments.append(("SYSTEM", reasoning_prompt))
+    fragments.append(("USER", USER_FINAL_MESSAGE))
 
     return "\n\n".join(f"{role}: {content}" for role, content in fragments)
 
 
-def _send_verdict_request(
+def build_verdict_payload(
     *,
     language_name: str,
     exercise_name: str,
@@ -61,7 +61,10 @@ def _send_verdict_request(
     execution_output: str,
     effort: str,
     max_output_tokens: int,
+    include_reasoning_prompt: bool = True,
 ) -> dict:
+    """Responses API payload for one verdict, as the automatic EXERCISE_VERDICT flow builds it."""
+
     system_prompt = get_automatic_system_prompt(
         "EXERCISE_VERDICT",
         language_name,
@@ -70,36 +73,26 @@ def _send_verdict_request(
         execution_output=execution_output,
     )
 
-    reasoning_prompt = build_verdict_reasoning_prompt(
-        language_name=language_name,
-        exercise_name_snapshot=exercise_name,
-        exercise_description_snapshot=exercise_description_b64,
-        current_code=current_code,
-        execution_output=execution_output,
-    )
-
-    input_content = _build_input_content(system_prompt, reasoning_prompt)
+    reasoning_prompt = None
+    if include_reasoning_prompt:
+        reasoning_prompt = build_verdict_reasoning_prompt(
+            language_name=language_name,
+            exercise_name_snapshot=exercise_name,
+            exercise_description_snapshot=exercise_description_b64,
+            current_code=current_code,
+            execution_output=execution_output,
+        )
 
-    payload = {
+    return {
         "model": "gpt-5-mini",
-        "input": input_content,
-        "max_output_tokens": max(max_output_tokens, 300),
+        "input": _build_input_content(system_prompt, reasoning_prompt),
+        "max_output_tokens": max_output_tokens,
         "truncation": "auto",
         "reasoning": {"effort": effort},
     }
 
-    headers = get_openai_headers()
-
-    response = requests.post(
-        OPENAI_URL,
-        headers=headers,
-        data=json.dumps(payload),
-        timeout=120,
-    )
-
-    response.raise_for_status()
-    data = response.json()
 
+def parse_verdict_response(data: dict, request_id: str = "unknown") -> dict:
     texts: List[str] = []
     for item in data.get("output", []):
         if item.get("type") != "message":
@@ -110,8 +103,8 @@ def _send_verdict_request(
 
     result_text = "\n".join(t.strip() for t in texts if t.strip())
 
-    usage = data.get("usage", {})
-    reasoning_tokens = usage.get("output_tokens_details", {}).get("reasoning_tokens", 0)
+    usage = data.get("usage") or {}
+    reasoning_tokens = (usage.get("output_tokens_details") or {}).get("reasoning_tokens", 0)
 
     return {
         "text": result_text,
@@ -119,11 +112,44 @@ def _send_verdict_request(
         "reasoning_tokens": reasoning_tokens,
         "output_tokens": usage.get("output_tokens", 0),
         "input_tokens": usage.get("input_tokens", 0),
-        "request_id": response.headers.get("x-request-id", "unknown"),
+        "request_id": request_id,
         "raw": data,
     }
 
 
+def _send_verdict_request(
+    *,
+    language_name: str,
+    exercise_name: str,
+    exercise_description_b64: str,
+    current_code: str,
+    execution_output: str,
+    effort: str,
+    max_output_tokens: int,
+) -> dict:
+    payload = build_verdict_payload(
+        language_name=language_name,
+        exercise_name=exercise_name,
+        exercise_description_b64=exercise_description_b64,
+        current_code=current_code,
+        execution_output=execution_output,
+        effort=effort,
+        max_output_tokens=max(max_output_tokens, 300),
+    )
+
+    headers = get_openai_headers()
+
+    response = requests.post(
+        OPENAI_URL,
+        headers=headers,
+        data=json.dumps(payload),
+        timeout=120,
+    )
+
+    response.raise_for_status()
+    return parse_verdict_response(response.json(), response.headers.get("x-request-id", "unknown"))
+
+
 def _detect_verdict(output_text: str) -> Optional[str]:
     upper = output_text.upper()
     if "APROBADO" in upper:
@@ -747,4 +773,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    # HTTP_CASSETTE=cassettes/verdict_chain.json [HTTP_CASSETTE_MODE=record] para correr sin red
+    with use_cassette_from_env():
+        main()
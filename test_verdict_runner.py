@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.verdict_runner import VerdictConfig, build_matrix, render_markdown, run_matrix, summarize
+from standins import openai_server
+from standins._runner import BackgroundServers
+from test_verdict_chain_e2e import _canonical_cases, _encode_description, build_verdict_payload
+
+
+@pytest.fixture
+def openai_url(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-standin")
+    servers = BackgroundServers("test-verdicts")
+    app = openai_server.create_app(latency_ms=100, jitter=0)
+    url = servers.start({"openai": app})["openai"]
+    yield f"{url}/v1/responses", app.state.fake
+    servers.stop()
+
+
+def test_matrix_is_the_cartesian_product_with_distinct_names():
+    configs = build_matrix(["minimal", "low"], [400, 800], [True, False])
+    assert len(configs) == 8
+    assert len({config.name for config in configs}) == 8
+
+
+def test_payload_can_leave_out_the_reasoning_prompt():
+    case = _canonical_cases()[0]
+    kwargs = dict(
+        language_name=case.language_name,
+        exercise_name=case.exercise_name,
+        exercise_description_b64=_encode_description(case.exercise_description),
+        current_code=case.current_code,
+        execution_output=case.execution_output,
+        effort="low",
+        max_output_tokens=800,
+    )
+    with_prompt = build_verdict_payload(**kwargs)
+    without = build_verdict_payload(**kwargs, include_reasoning_prompt=False)
+    assert len(without["input"]) < len(with_prompt["input"])
+    assert without["reasoning"] == {"effort": "low"} and without["max_output_tokens"] == 800
+
+
+def test_cases_run_concurrently_and_are_scored(openai_url):
+    url, fake = openai_url
+    cases = _canonical_cases()[:8]
+    configs = [VerdictConfig("minimal", 400, True)]
+
+    started = time.perf_counter()
+    samples = asyncio.run(run_matrix(cases, configs, url=url, concurrency=8))
+    # 8 requests de 100 ms en paralelo, no 800 ms en serie
+    assert time.perf_counter() - started < 0.5
+    assert fake.requests == 8
+
+    summary = summarize(samples, configs)[configs[0].name]
+    expected_approved = sum(1 for case in cases if case.expected_verdict == "APROBADO")
+    assert summary["accuracy"] == expected_approved / len(cases)
+    assert summary["samples"] == 8 and summary["errors"] == 0
+    assert 0.09 < summary["p50_s"] < 0.3
+
+
+def test_upstream_errors_count_as_misses(openai_url):
+    url, fake = openai_url
+    fake.faults = {"429": 1.0}
+    configs = [VerdictConfig("minimal", 400, False)]
+    samples = asyncio.run(run_matrix(_canonical_cases()[:2], configs, url=url, retries=0))
+    assert [sample["error"] for sample in samples] == ["HTTP 429", "HTTP 429"]
+    summary = summarize(samples, configs)[configs[0].name]
+    assert summary["errors"] == 2 and summary["accuracy"] == 0
+
+
+def test_cost_and_report():
+    config = VerdictConfig("low", 800, True)
+    sample = {
+        "case": "A", "expected": "REPROBADO", "config": config.name, "detected": "APROBADO", "success": False,
+        "status": "completed", "empty": False, "input_tokens": 4_000, "output_tokens": 500, "reasoning_tokens": 128,
+        "latency_s": 2.0, "retries": 0,
+    }
+    summary = summarize([sample, {**sample, "case": "B", "detected": "REPROBADO", "success": True}], [config], 0.25, 2.00)
+    stats = summary[config.name]
+    # 2 × (4000 × 0.25 + 500 × 2.00) / 1e6
+    assert stats["cost_usd"] == pytest.approx(0.004)
+    assert stats["cost_per_1k_verdicts_usd"] == pytest.approx(2.0)
+    assert stats["accuracy"] == 0.5
+
+    meta = {"created": "now", "cases": 2, "repeat": 1, "model": "gpt-5-mini", "url": "u", "concurrency": 8,
+            "input_price_per_m": 0.25, "output_price_per_m": 2.0}
+    markdown = render_markdown({"meta": meta, "summary": summary, "samples": [sample]})
+    assert f"| {config.name} | 50% |" in markdown
+    assert "| A | REPROBADO | APROBADO |" in markdown
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+
+import app.main as main
+from app.services import judge0_service, openai_service, warmup
+from app.services.geo_service import GeoResolver
+from app.services.warmup import WarmupState, warm_up
+from standins import geo_server, judge0_server, openai_server
+from standins._runner import BackgroundServers
+
+
+def test_warm_up_opens_the_upstreams_and_caches_the_languages(monkeypatch):
+    servers = BackgroundServers("test-warmup")
+    urls = servers.start({
+        "openai": openai_server.create_app(),
+        "judge0": judge0_server.create_app(),
+        "geo": geo_server.create_app(),
+    })
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-standin")
+    monkeypatch.setenv("JUDGE0_API_KEY", "standin")
+    monkeypatch.setattr(openai_service, "OPENAI_BASE_URL", f"{urls['openai']}/v1")
+    monkeypatch.setattr(judge0_service, "JUDGE0_API", urls["judge0"])
+    monkeypatch.setattr(judge0_service, "_languages", None)
+    monkeypatch.setattr("app.services.geo_service.GEO_API_URL", f"{urls['geo']}/json")
+    monkeypatch.setattr(warmup, "geo_resolver", GeoResolver())
+
+    async def scenario():
+        try:
+            return await warm_up(WarmupState(), modules=("httpx",))
+        finally:
+            await judge0_service.aclose()
+            await warmup.geo_resolver.aclose()
+            await openai_service.aclose()
+
+    try:
+        state = asyncio.run(scenario())
+        stats = httpx.get(f"{urls['openai']}/_standin/stats").json()
+    finally:
+        servers.stop()
+
+    assert state.ready
+    assert {name: step["status"] for name, step in state.steps.items()} == {
+        "imports": "ok", "templates": "ok", "judge0": "ok", "openai": "ok", "geo": "ok",
+    }
+    assert state.steps["openai"]["detail"] == "HTTP 200"
+    assert stats["counts"]["models"] == 1 and stats["requests"] == 0
+    # Con los servidores detenidos, el catálogo sale del caché
+    languages = asyncio.run(judge0_service.get_languages())
+    assert state.steps["judge0"]["detail"] == f"{len(languages)} languages"
+
+
+def test_failed_or_unconfigured_upstreams_do_not_block_readiness(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("JUDGE0_API_KEY", "standin")
+    # Nada escucha en el puerto 9 (discard)
+    monkeypatch.setattr(judge0_service, "JUDGE0_API", "http://127.0.0.1:9")
+
+    async def scenario():
+        try:
+            return await warm_up(WarmupState(), modules=(), upstreams=("judge0", "openai"), timeout=2)
+        finally:
+            await judge0_service.aclose()
+
+    state = asyncio.run(scenario())
+    assert state.ready
+    assert state.steps["judge0"]["status"] == "failed"
+    assert state.steps["openai"]["status"] == "skipped"
+
+
+def test_ready_endpoint_turns_green_once_warm(monkeypatch):
+    state = WarmupState()
+    monkeypatch.setattr(main, "warmup_state", state)
+
+    async def get_ready():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.get("/ready")
+
+    warming = asyncio.run(get_ready())
+    state.mark_ready()
+    ready = asyncio.run(get_ready())
+    assert warming.status_code == 503 and warming.json()["status"] == "warming"
+    assert ready.status_code == 200 and ready.json()["status"] == "ready"